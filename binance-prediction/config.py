@@ -6,7 +6,7 @@ LSTM 项目主配置文件（兼容入口）
 - 但为了满足教程/脚本中更通用的命名习惯，我们提供一个 `config.py` 作为兼容入口。
 
 用法:
-    from config import DataConfig, ModelConfig, TrainingConfig, PathConfig
+    from config import DataConfig, ModelConfig, TrainingConfig, PathConfig, RunConfig
 
 作者: qinshihuang166
 """
@@ -16,6 +16,8 @@ from config_lstm import (  # noqa: F401
     ModelConfig,
     TrainingConfig,
     PathConfig,
+    BacktestConfig,
+    RunConfig,
     PresetConfigs,
     VisualizationConfig,
     LogConfig,
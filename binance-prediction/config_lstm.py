@@ -5,39 +5,53 @@ LSTM Model Configuration
 这个文件包含所有可调整的超参数和配置选项
 This file contains all tunable hyperparameters and configuration options
 
+配置类是不可变的 dataclass，类属性是默认值；一次运行使用一个 RunConfig 实例，
+修改参数用 RunConfig.replace() 得到新实例（不同交易对/试验互不影响）
+Config classes are frozen dataclasses whose class attributes are the defaults;
+each run carries its own RunConfig instance.
+
 作者: qinshihuang166
 日期: 2024
 """
 
 import os
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Dict, List, Optional, Tuple
 
 # ============================================
 # 数据配置 / Data Configuration
 # ============================================
 
+@dataclass(frozen=True)
 class DataConfig:
     """数据获取和处理配置"""
     
     # Binance API 配置
-    SYMBOL = 'BTCUSDT'  # 交易对 / Trading pair
-    INTERVAL = '1h'  # K线间隔: 1m, 5m, 15m, 1h, 4h, 1d / Candlestick interval
-    LOOKBACK_DAYS = 365  # 获取多少天的历史数据 / Days of historical data
+    SYMBOL: str = 'BTCUSDT'  # 交易对 / Trading pair
+    INTERVAL: str = '1h'  # K线间隔: 1m, 5m, 15m, 1h, 4h, 1d / Candlestick interval
+    LOOKBACK_DAYS: int = 365  # 获取多少天的历史数据 / Days of historical data
+    
+    # 数据路径配置（文件名由 SYMBOL 推导，见下方属性）
+    DATA_DIR: str = 'data'  # 原始数据目录
+    LSTM_DATA_DIR: str = 'lstm_data'  # LSTM处理后的数据目录
+    
+    # 存储格式配置
+    STORAGE_FORMAT: str = 'parquet'  # 'parquet' (列式存储，需要pyarrow) 或 'csv'
+    RAW_FLOAT_DTYPE: str = 'float64'  # 原始K线价格/成交量的存储精度
+    PROCESSED_FLOAT_DTYPE: str = 'float32'  # 归一化后特征的存储精度
     
-    # 数据路径配置
-    DATA_DIR = 'data'  # 原始数据目录
-    LSTM_DATA_DIR = 'lstm_data'  # LSTM处理后的数据目录
-    RAW_DATA_FILE = f'{DATA_DIR}/{SYMBOL}_raw_data.csv'
-    PROCESSED_DATA_FILE = f'{LSTM_DATA_DIR}/{SYMBOL}_processed.csv'
+    # 特征缓存配置（按原始数据 + 指标配置 + scaler 的哈希寻址）
+    USE_FEATURE_CACHE: bool = True  # 重复评估/回测时直接读取已归一化的特征
+    FEATURE_CACHE_MAX_MB: int = 2048  # 缓存总大小上限，超出后淘汰最久未使用的条目
     
     # 数据划分比例
-    TRAIN_RATIO = 0.70  # 70% 训练集
-    VAL_RATIO = 0.15    # 15% 验证集
-    TEST_RATIO = 0.15   # 15% 测试集
+    TRAIN_RATIO: float = 0.70  # 70% 训练集
+    VAL_RATIO: float = 0.15    # 15% 验证集
+    TEST_RATIO: float = 0.15   # 15% 测试集
     
     # 特征工程配置
-    USE_TECHNICAL_INDICATORS = True  # 是否使用技术指标
-    TECHNICAL_INDICATORS = [
+    USE_TECHNICAL_INDICATORS: bool = True  # 是否使用技术指标
+    TECHNICAL_INDICATORS: Tuple[str, ...] = (
         'RSI',           # 相对强弱指标
         'MACD',          # 移动平均收敛散度
         'MACD_signal',   # MACD信号线
@@ -49,143 +63,310 @@ class DataConfig:
         'EMA_26',        # 26期指数移动平均
         'ATR',           # 平均真实范围
         'OBV',           # 能量潮
-    ]
+    )
     
     # 时间序列窗口配置
-    TIME_STEPS = 60  # 使用过去60个时间点预测下一个 / Use past 60 timesteps to predict next one
-    PREDICTION_HORIZON = 1  # 预测未来1个时间点 / Predict 1 timestep ahead
+    TIME_STEPS: int = 60  # 使用过去60个时间点预测下一个 / Use past 60 timesteps to predict next one
+    PREDICTION_HORIZON: int = 1  # 预测未来1个时间点；>1 时训练一次输出全部步数的多输出模型 / >1 trains a direct multi-horizon head
+    LAZY_WINDOWS: bool = True  # 使用零拷贝窗口视图，内存占用不随 TIME_STEPS 增长
+    MEMMAP_FEATURES: bool = False  # 特征矩阵保存为 .npy 并内存映射（超大数据集）
+    
+    # 面板训练：多个交易对共用一个模型（train_lstm.py --panel）
+    PANEL_SYMBOLS: Tuple[str, ...] = ('BTCUSDT', 'ETHUSDT', 'BNBUSDT')  # 默认参与面板训练的交易对
     
     # 数据归一化
-    SCALER_TYPE = 'MinMaxScaler'  # 可选: 'MinMaxScaler', 'StandardScaler'
-    FEATURE_RANGE = (0, 1)  # MinMaxScaler的范围
+    SCALER_TYPE: str = 'MinMaxScaler'  # 可选: 'MinMaxScaler', 'StandardScaler'
+    FEATURE_RANGE: Tuple[float, float] = (0, 1)  # MinMaxScaler的范围
+    
+    @property
+    def RAW_DATA_FILE(self) -> str:
+        """原始数据文件（随 SYMBOL 变化）"""
+        return f'{self.DATA_DIR}/{self.SYMBOL}_raw_data.csv'
+    
+    @property
+    def PROCESSED_DATA_FILE(self) -> str:
+        """处理后的数据文件（随 SYMBOL 变化）"""
+        return f'{self.LSTM_DATA_DIR}/{self.SYMBOL}_processed.csv'
 
 
 # ============================================
 # 模型配置 / Model Configuration
 # ============================================
 
+@dataclass(frozen=True)
 class ModelConfig:
     """LSTM 模型架构配置"""
     
     # 模型类型
-    MODEL_TYPE = 'BiLSTM'  # 可选: 'LSTM', 'BiLSTM', 'GRU', 'BiGRU'
+    MODEL_TYPE: str = 'BiLSTM'  # 可选: 'LSTM', 'BiLSTM', 'GRU', 'BiGRU'
     
     # 网络架构
     # 层配置格式: [第一层单元数, 第二层单元数, ...]
-    LSTM_UNITS = [128, 64, 32]  # 三层LSTM，每层的单元数
-    DENSE_UNITS = [16]  # Dense层配置
+    LSTM_UNITS: Tuple[int, ...] = (128, 64, 32)  # 三层LSTM，每层的单元数
+    DENSE_UNITS: Tuple[int, ...] = (16,)  # Dense层配置
     
     # Dropout 配置（防止过拟合）
-    DROPOUT_RATE = 0.2  # Dropout比例 (0.2 = 20%)
-    RECURRENT_DROPOUT = 0.1  # LSTM内部的Dropout
+    DROPOUT_RATE: float = 0.2  # Dropout比例 (0.2 = 20%)
+    RECURRENT_DROPOUT: float = 0.1  # LSTM内部的Dropout
+    # 快速路径：循环层不用 recurrent_dropout（非零时 Keras 不能用 cuDNN 融合内核，
+    # CPU 上也退回逐门计算），层间 Dropout 换成 SpatialDropout1D（整条序列共用一个掩码）
+    # 基准测试: python scripts/lstm/benchmark_rnn.py
+    RNN_FAST_PATH: bool = False
     
     # 正则化配置（防止过拟合）
-    USE_L1_REGULARIZATION = False  # 是否使用L1正则化
-    USE_L2_REGULARIZATION = True   # 是否使用L2正则化
-    L1_LAMBDA = 0.0001  # L1正则化系数
-    L2_LAMBDA = 0.001   # L2正则化系数
+    USE_L1_REGULARIZATION: bool = False  # 是否使用L1正则化
+    USE_L2_REGULARIZATION: bool = True   # 是否使用L2正则化
+    L1_LAMBDA: float = 0.0001  # L1正则化系数
+    L2_LAMBDA: float = 0.001   # L2正则化系数
     
     # BatchNormalization
-    USE_BATCH_NORMALIZATION = True  # 是否使用批标准化
+    USE_BATCH_NORMALIZATION: bool = True  # 是否使用批标准化
+    
+    # 面板模型的交易对嵌入维度（每个交易对学习一个向量，拼接到每个时间步的特征后）
+    SYMBOL_EMBEDDING_DIM: int = 8
     
     # 激活函数
-    LSTM_ACTIVATION = 'tanh'  # LSTM激活函数
-    DENSE_ACTIVATION = 'relu'  # Dense层激活函数
-    OUTPUT_ACTIVATION = 'linear'  # 输出层激活函数 (回归问题用linear)
+    LSTM_ACTIVATION: str = 'tanh'  # LSTM激活函数
+    DENSE_ACTIVATION: str = 'relu'  # Dense层激活函数
+    OUTPUT_ACTIVATION: str = 'linear'  # 输出层激活函数 (回归问题用linear)
     
     # 损失函数和优化器
-    LOSS_FUNCTION = 'mse'  # 可选: 'mse', 'mae', 'huber'
-    OPTIMIZER = 'adam'  # 可选: 'adam', 'rmsprop', 'sgd'
-    LEARNING_RATE = 0.001  # 初始学习率
+    LOSS_FUNCTION: str = 'mse'  # 可选: 'mse', 'mae', 'huber'
+    OPTIMIZER: str = 'adam'  # 可选: 'adam', 'rmsprop', 'sgd'
+    LEARNING_RATE: float = 0.001  # 初始学习率
     
     # 评估指标
-    METRICS = ['mae', 'mse']  # 训练时跟踪的指标
+    METRICS: Tuple[str, ...] = ('mae', 'mse')  # 训练时跟踪的指标
+    
+    # 轻量推理文件导出（scripts/lstm/export_lstm.py）
+    EXPORT_QUANTIZATION: str = 'dynamic'  # 'none', 'float16', 'dynamic' (int8权重), 'int8' (全整数，需要校准数据)
+    EXPORT_CALIBRATION_SAMPLES: int = 200  # int8 量化的校准窗口数（取自训练集）
+    
+    # 流式推理（serve_lstm.py --streaming）：每根K线只前进一步，定期用完整窗口重新同步
+    STREAM_RESYNC_EVERY: int = 240  # 每多少根K线重新同步一次（<= 0 只在K线缺口/模型更新时同步）
 
 
 # ============================================
 # 训练配置 / Training Configuration
 # ============================================
 
+@dataclass(frozen=True)
 class TrainingConfig:
     """模型训练配置"""
     
     # 基础训练参数
-    EPOCHS = 100  # 最大训练轮数
-    BATCH_SIZE = 32  # 批大小 (根据内存调整: 16, 32, 64, 128)
-    VALIDATION_SPLIT = 0.0  # 不使用，我们手动划分了验证集
-    SHUFFLE = False  # 时间序列数据不打乱顺序
+    EPOCHS: int = 100  # 最大训练轮数
+    BATCH_SIZE: int = 32  # 批大小 (根据内存调整: 16, 32, 64, 128)
+    VALIDATION_SPLIT: float = 0.0  # 不使用，我们手动划分了验证集
+    SHUFFLE: bool = False  # 时间序列数据不打乱顺序
+    
+    # 流式输入管道（tf.data）
+    USE_TF_DATA: bool = False  # 用 tf.data 按批次并行组装窗口并预取，数据准备与训练重叠
+    TF_DATA_CACHE_DIR: Optional[str] = None  # 可选: tf.data 磁盘缓存目录（第一个 epoch 后直接读缓存）
     
     # 早停配置（Early Stopping）
-    USE_EARLY_STOPPING = True  # 是否使用早停
-    EARLY_STOPPING_PATIENCE = 15  # 多少个epoch没有改善就停止
-    EARLY_STOPPING_MIN_DELTA = 0.0001  # 最小改善幅度
-    EARLY_STOPPING_MONITOR = 'val_loss'  # 监控的指标
-    RESTORE_BEST_WEIGHTS = True  # 恢复最佳权重
+    USE_EARLY_STOPPING: bool = True  # 是否使用早停
+    EARLY_STOPPING_PATIENCE: int = 15  # 多少个epoch没有改善就停止
+    EARLY_STOPPING_MIN_DELTA: float = 0.0001  # 最小改善幅度
+    EARLY_STOPPING_MONITOR: str = 'val_loss'  # 监控的指标
+    RESTORE_BEST_WEIGHTS: bool = True  # 恢复最佳权重
     
     # 学习率调整配置（ReduceLROnPlateau）
-    USE_REDUCE_LR = True  # 是否使用学习率衰减
-    REDUCE_LR_FACTOR = 0.5  # 学习率衰减因子
-    REDUCE_LR_PATIENCE = 7  # 多少个epoch没有改善就降低学习率
-    REDUCE_LR_MIN_LR = 1e-7  # 最小学习率
-    REDUCE_LR_MONITOR = 'val_loss'  # 监控的指标
+    USE_REDUCE_LR: bool = True  # 是否使用学习率衰减
+    REDUCE_LR_FACTOR: float = 0.5  # 学习率衰减因子
+    REDUCE_LR_PATIENCE: int = 7  # 多少个epoch没有改善就降低学习率
+    REDUCE_LR_MIN_LR: float = 1e-7  # 最小学习率
+    REDUCE_LR_MONITOR: str = 'val_loss'  # 监控的指标
     
     # 模型检查点配置（ModelCheckpoint）
-    USE_MODEL_CHECKPOINT = True  # 是否保存最佳模型
-    CHECKPOINT_MONITOR = 'val_loss'  # 监控的指标
-    CHECKPOINT_MODE = 'min'  # 'min' 表示指标越小越好
-    CHECKPOINT_SAVE_BEST_ONLY = True  # 只保存最佳模型
-    CHECKPOINT_SAVE_WEIGHTS_ONLY = False  # 保存完整模型
+    USE_MODEL_CHECKPOINT: bool = True  # 是否保存最佳模型
+    CHECKPOINT_MONITOR: str = 'val_loss'  # 监控的指标
+    CHECKPOINT_MODE: str = 'min'  # 'min' 表示指标越小越好
+    CHECKPOINT_SAVE_BEST_ONLY: bool = True  # 只保存最佳模型
+    CHECKPOINT_SAVE_WEIGHTS_ONLY: bool = False  # 保存完整模型
     
     # 训练日志配置
-    VERBOSE = 1  # 训练时的输出详细程度: 0=静默, 1=进度条, 2=每个epoch一行
-    USE_TENSORBOARD = False  # 是否使用TensorBoard (可选)
+    VERBOSE: int = 1  # 训练时的输出详细程度: 0=静默, 1=进度条, 2=每个epoch一行
+    USE_TENSORBOARD: bool = False  # 是否使用TensorBoard (可选)
     
     # GPU配置
-    USE_GPU = True  # 是否尝试使用GPU
-    GPU_MEMORY_GROWTH = True  # 动态分配GPU内存
-    MIXED_PRECISION = False  # 混合精度训练（需要GPU）
+    USE_GPU: bool = True  # 是否尝试使用GPU
+    GPU_MEMORY_GROWTH: bool = True  # 动态分配GPU内存
+    MIXED_PRECISION: bool = False  # 混合精度训练（需要GPU）
 
 
 # ============================================
 # 路径配置 / Path Configuration
 # ============================================
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(frozen=True)
 class PathConfig:
-    """文件路径配置"""
+    """文件路径配置（模型/检查点/scaler/结果文件名都按交易对区分）"""
+    
+    # 交易对（决定下面各文件名的前缀）
+    SYMBOL: str = DataConfig.SYMBOL
+    PANEL_NAME = 'panel'  # 面板模型的文件名前缀（小写，不会与交易对重名）
     
     # 基础目录
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    DATA_DIR = os.path.join(BASE_DIR, 'data')
-    LSTM_DATA_DIR = os.path.join(BASE_DIR, 'lstm_data')
-    MODELS_DIR = os.path.join(BASE_DIR, 'lstm_models')
-    RESULTS_DIR = os.path.join(BASE_DIR, 'lstm_results')
-    LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+    BASE_DIR: str = BASE_DIR
+    DATA_DIR: str = os.path.join(BASE_DIR, 'data')
+    LSTM_DATA_DIR: str = os.path.join(BASE_DIR, 'lstm_data')
+    MODELS_DIR: str = os.path.join(BASE_DIR, 'lstm_models')
+    RESULTS_DIR: str = os.path.join(BASE_DIR, 'lstm_results')
+    LOGS_DIR: str = os.path.join(BASE_DIR, 'logs')
+    KLINE_STORE_DIR: str = os.path.join(BASE_DIR, 'data', 'klines')  # 本地K线仓库（增量下载）
+    FEATURE_CACHE_DIR: str = os.path.join(BASE_DIR, 'lstm_data', 'feature_cache')  # 特征缓存
     
     # 模型保存路径
-    MODEL_NAME = f'{DataConfig.SYMBOL}_lstm_model.h5'
-    MODEL_PATH = os.path.join(MODELS_DIR, MODEL_NAME)
-    CHECKPOINT_PATH = os.path.join(MODELS_DIR, f'{DataConfig.SYMBOL}_checkpoint.h5')
+    @property
+    def MODEL_NAME(self) -> str:
+        return f'{self.SYMBOL}_lstm_model.h5'
+    
+    @property
+    def MODEL_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, self.MODEL_NAME)
+    
+    @property
+    def CHECKPOINT_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, f'{self.SYMBOL}_checkpoint.h5')
+    
+    # 轻量推理文件（TFLite / NumPy）和导出报告
+    @property
+    def TFLITE_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, f'{self.SYMBOL}_lstm_model.tflite')
+    
+    @property
+    def NUMPY_MODEL_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, f'{self.SYMBOL}_lstm_model.npz')
+    
+    def export_report_path(self, fmt: str) -> str:
+        """导出报告按格式分开保存，TFLite 和 NumPy 导出互不覆盖 / One report per export format"""
+        return os.path.join(self.MODELS_DIR, f'{self.SYMBOL}_{fmt}_export_report.json')
     
     # Scaler保存路径
-    SCALER_PATH = os.path.join(MODELS_DIR, f'{DataConfig.SYMBOL}_scaler.pkl')
+    @property
+    def SCALER_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, f'{self.SYMBOL}_scaler.pkl')
     
     # 结果保存路径
-    TRAINING_HISTORY_PATH = os.path.join(RESULTS_DIR, 'training_history.csv')
-    PREDICTIONS_PATH = os.path.join(RESULTS_DIR, 'predictions.csv')
+    @property
+    def TRAINING_HISTORY_PATH(self) -> str:
+        return os.path.join(self.RESULTS_DIR, f'{self.SYMBOL}_training_history.csv')
+    
+    @property
+    def PREDICTIONS_PATH(self) -> str:
+        return os.path.join(self.RESULTS_DIR, f'{self.SYMBOL}_predictions.csv')
+    
+    # 面板模型（多个交易对共用）：交易对列表和各自的scaler
+    @property
+    def PANEL_META_PATH(self) -> str:
+        return os.path.join(self.MODELS_DIR, f'{self.PANEL_NAME}_meta.pkl')
+    
+    def panel_paths(self) -> 'PathConfig':
+        """面板模型的路径（模型/检查点/训练历史以 panel_ 为前缀，不覆盖单交易对模型）"""
+        return replace(self, SYMBOL=self.PANEL_NAME)
     
     # 创建必要的目录
-    @staticmethod
-    def create_directories():
+    def create_directories(self, verbose: bool = True):
         """创建所有必要的目录"""
         for dir_path in [
-            PathConfig.DATA_DIR,
-            PathConfig.LSTM_DATA_DIR,
-            PathConfig.MODELS_DIR,
-            PathConfig.RESULTS_DIR,
-            PathConfig.LOGS_DIR
+            self.DATA_DIR,
+            self.LSTM_DATA_DIR,
+            self.MODELS_DIR,
+            self.RESULTS_DIR,
+            self.LOGS_DIR
         ]:
             os.makedirs(dir_path, exist_ok=True)
-            print(f"✓ 目录已创建/确认: {dir_path}")
+            if verbose:
+                print(f"✓ 目录已创建/确认: {dir_path}")
+
+
+# ============================================
+# 回测配置 / Backtest Configuration
+# ============================================
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    """事件驱动回测的成本和账户规则"""
+    
+    INITIAL_CAPITAL: float = 10_000.0  # 初始资金 (USDT)
+    FEE_RATE: float = 0.001  # 手续费率：Binance 现货 taker 0.1%
+    HALF_SPREAD_BPS: float = 1.0  # 半个买卖价差（基点）
+    IMPACT_BPS: float = 10.0  # 成交量 100% 参与率时的冲击成本（基点）
+    IMPACT_EXPONENT: float = 0.5  # 冲击曲线指数（0.5 = 平方根冲击模型）
+    LATENCY_BARS: int = 1  # 收盘产生信号后，延迟几根K线在开盘价成交（0 = 当根收盘价成交）
+    MAX_LEVERAGE: float = 1.0  # 最大杠杆
+    MAINTENANCE_MARGIN: float = 0.005  # 维持保证金率，净值低于该比例时强平
+    ALLOW_SHORT: bool = False  # 是否允许做空
+
+
+# ============================================
+# 单次运行配置 / Per-run Configuration
+# ============================================
+
+@dataclass(frozen=True)
+class RunConfig:
+    """
+    一次训练/评估/服务所用的全部配置（不可变）
+    
+    每个交易对、每个试验各自持有一个实例，互不影响，可以在同一进程中并发使用，
+    也可以直接传给工作进程（可 pickle）。修改参数用 replace() 得到新实例：
+    
+        config = RunConfig().replace(SYMBOL='ETHUSDT', EPOCHS=50)
+        config.paths.MODEL_PATH  # .../lstm_models/ETHUSDT_lstm_model.h5
+    """
+    
+    data: DataConfig = field(default_factory=DataConfig)
+    model: ModelConfig = field(default_factory=ModelConfig)
+    training: TrainingConfig = field(default_factory=TrainingConfig)
+    paths: PathConfig = field(default_factory=PathConfig)
+    backtest: BacktestConfig = field(default_factory=BacktestConfig)
+    
+    SECTIONS = ('data', 'model', 'training', 'paths', 'backtest')
+    
+    def __post_init__(self):
+        # 路径始终跟随数据配置中的交易对
+        if self.paths.SYMBOL != self.data.SYMBOL:
+            object.__setattr__(self, 'paths', replace(self.paths, SYMBOL=self.data.SYMBOL))
+    
+    @classmethod
+    def for_symbol(cls, symbol: str, **overrides) -> 'RunConfig':
+        """某个交易对的默认配置 / Default config for a symbol"""
+        return cls().replace(SYMBOL=symbol, **overrides)
+    
+    def section_of(self, name: str) -> str:
+        """参数名所属的配置段（按 data → model → training → paths → backtest 顺序查找）"""
+        for section in self.SECTIONS:
+            if name in {f.name for f in fields(getattr(self, section))}:
+                return section
+        raise KeyError(f"❌ 未知的配置参数: {name}")
+    
+    def replace(self, **overrides: Any) -> 'RunConfig':
+        """
+        返回修改了部分参数的新配置（原实例不变）
+        
+        Args:
+            **overrides: 参数名（如 SYMBOL、LSTM_UNITS、EPOCHS）到新值；列表会转成元组
+            
+        Returns:
+            新的 RunConfig
+        """
+        changes: Dict[str, Dict[str, Any]] = {}
+        for name, value in overrides.items():
+            if isinstance(value, list):
+                value = tuple(value)
+            changes.setdefault(self.section_of(name), {})[name] = value
+        sections = {section: replace(getattr(self, section), **values) for section, values in changes.items()}
+        if 'SYMBOL' in changes.get('paths', {}) and 'data' not in sections:
+            sections['data'] = replace(self.data, SYMBOL=sections['paths'].SYMBOL)
+        return replace(self, **sections)
+    
+    def get(self, name: str) -> Any:
+        """按参数名读取 / Read a parameter by name"""
+        return getattr(getattr(self, self.section_of(name)), name)
 
 
 # ============================================
@@ -193,50 +374,63 @@ class PathConfig:
 # ============================================
 
 class PresetConfigs:
-    """预设的配置方案，方便快速切换"""
+    """预设的配置方案：在传入的配置上覆盖部分参数，返回新配置（不修改全局状态）"""
     
     @staticmethod
-    def quick_test():
+    def quick_test(config: Optional[RunConfig] = None) -> RunConfig:
         """快速测试配置（小数据量，快速训练）"""
-        DataConfig.LOOKBACK_DAYS = 90
-        DataConfig.TIME_STEPS = 30
-        ModelConfig.LSTM_UNITS = [64, 32]
-        ModelConfig.DENSE_UNITS = [16]
-        TrainingConfig.EPOCHS = 20
-        TrainingConfig.BATCH_SIZE = 64
-        TrainingConfig.EARLY_STOPPING_PATIENCE = 5
+        config = (config or RunConfig()).replace(
+            LOOKBACK_DAYS=90,
+            TIME_STEPS=30,
+            LSTM_UNITS=(64, 32),
+            DENSE_UNITS=(16,),
+            EPOCHS=20,
+            BATCH_SIZE=64,
+            EARLY_STOPPING_PATIENCE=5,
+        )
         print("✓ 已应用【快速测试】配置")
+        return config
     
     @staticmethod
-    def production():
+    def production(config: Optional[RunConfig] = None) -> RunConfig:
         """生产环境配置（完整训练）"""
-        DataConfig.LOOKBACK_DAYS = 730  # 2年数据
-        DataConfig.TIME_STEPS = 60
-        ModelConfig.LSTM_UNITS = [256, 128, 64]
-        ModelConfig.DENSE_UNITS = [32, 16]
-        TrainingConfig.EPOCHS = 200
-        TrainingConfig.BATCH_SIZE = 32
-        TrainingConfig.EARLY_STOPPING_PATIENCE = 20
+        config = (config or RunConfig()).replace(
+            LOOKBACK_DAYS=730,  # 2年数据
+            TIME_STEPS=60,
+            LSTM_UNITS=(256, 128, 64),
+            DENSE_UNITS=(32, 16),
+            EPOCHS=200,
+            BATCH_SIZE=32,
+            EARLY_STOPPING_PATIENCE=20,
+        )
         print("✓ 已应用【生产环境】配置")
+        return config
     
     @staticmethod
-    def gpu_optimized():
+    def gpu_optimized(config: Optional[RunConfig] = None) -> RunConfig:
         """GPU优化配置（大批量）"""
-        TrainingConfig.BATCH_SIZE = 128
-        TrainingConfig.USE_GPU = True
-        TrainingConfig.MIXED_PRECISION = True
-        ModelConfig.LSTM_UNITS = [512, 256, 128]
+        config = (config or RunConfig()).replace(
+            BATCH_SIZE=128,
+            USE_GPU=True,
+            MIXED_PRECISION=True,
+            RNN_FAST_PATH=True,
+            LSTM_UNITS=(512, 256, 128),
+        )
         print("✓ 已应用【GPU优化】配置")
+        return config
     
     @staticmethod
-    def cpu_friendly():
+    def cpu_friendly(config: Optional[RunConfig] = None) -> RunConfig:
         """CPU友好配置（小批量，简单模型）"""
-        TrainingConfig.BATCH_SIZE = 16
-        TrainingConfig.USE_GPU = False
-        ModelConfig.LSTM_UNITS = [64, 32]
-        ModelConfig.DENSE_UNITS = [16]
-        TrainingConfig.EPOCHS = 50
+        config = (config or RunConfig()).replace(
+            BATCH_SIZE=16,
+            USE_GPU=False,
+            LSTM_UNITS=(64, 32),
+            DENSE_UNITS=(16,),
+            EPOCHS=50,
+        )
         print("✓ 已应用【CPU友好】配置")
+        return config
 
 
 # ============================================
@@ -290,65 +484,73 @@ class LogConfig:
 # 辅助函数 / Helper Functions
 # ============================================
 
-def print_config_summary():
-    """打印当前配置摘要"""
+def print_config_summary(config: Optional[RunConfig] = None):
+    """打印配置摘要（默认打印默认配置）"""
+    config = config or RunConfig()
+    data, model, training = config.data, config.model, config.training
     print("=" * 60)
     print("LSTM 模型配置摘要 / LSTM Model Configuration Summary")
     print("=" * 60)
     print(f"\n📊 数据配置:")
-    print(f"  - 交易对: {DataConfig.SYMBOL}")
-    print(f"  - 时间间隔: {DataConfig.INTERVAL}")
-    print(f"  - 历史数据: {DataConfig.LOOKBACK_DAYS} 天")
-    print(f"  - 时间窗口: {DataConfig.TIME_STEPS} 个时间点")
-    print(f"  - 数据划分: 训练{int(DataConfig.TRAIN_RATIO*100)}% / 验证{int(DataConfig.VAL_RATIO*100)}% / 测试{int(DataConfig.TEST_RATIO*100)}%")
+    print(f"  - 交易对: {data.SYMBOL}")
+    print(f"  - 时间间隔: {data.INTERVAL}")
+    print(f"  - 历史数据: {data.LOOKBACK_DAYS} 天")
+    print(f"  - 时间窗口: {data.TIME_STEPS} 个时间点")
+    print(f"  - 数据划分: 训练{int(data.TRAIN_RATIO*100)}% / 验证{int(data.VAL_RATIO*100)}% / 测试{int(data.TEST_RATIO*100)}%")
     
     print(f"\n🧠 模型配置:")
-    print(f"  - 模型类型: {ModelConfig.MODEL_TYPE}")
-    print(f"  - LSTM层: {ModelConfig.LSTM_UNITS}")
-    print(f"  - Dense层: {ModelConfig.DENSE_UNITS}")
-    print(f"  - Dropout: {ModelConfig.DROPOUT_RATE}")
-    print(f"  - 批标准化: {'启用' if ModelConfig.USE_BATCH_NORMALIZATION else '禁用'}")
+    print(f"  - 模型类型: {model.MODEL_TYPE}")
+    print(f"  - LSTM层: {list(model.LSTM_UNITS)}")
+    print(f"  - Dense层: {list(model.DENSE_UNITS)}")
+    print(f"  - Dropout: {model.DROPOUT_RATE}")
+    print(f"  - 循环层快速路径: {'启用' if model.RNN_FAST_PATH else f'禁用 (recurrent_dropout={model.RECURRENT_DROPOUT})'}")
+    print(f"  - 批标准化: {'启用' if model.USE_BATCH_NORMALIZATION else '禁用'}")
     
     print(f"\n🏋️ 训练配置:")
-    print(f"  - 最大轮数: {TrainingConfig.EPOCHS}")
-    print(f"  - 批大小: {TrainingConfig.BATCH_SIZE}")
-    print(f"  - 学习率: {ModelConfig.LEARNING_RATE}")
-    print(f"  - 早停: {'启用' if TrainingConfig.USE_EARLY_STOPPING else '禁用'} (耐心值: {TrainingConfig.EARLY_STOPPING_PATIENCE})")
-    print(f"  - 学习率衰减: {'启用' if TrainingConfig.USE_REDUCE_LR else '禁用'}")
-    print(f"  - GPU加速: {'尝试启用' if TrainingConfig.USE_GPU else '禁用'}")
+    print(f"  - 最大轮数: {training.EPOCHS}")
+    print(f"  - 批大小: {training.BATCH_SIZE}")
+    print(f"  - 学习率: {model.LEARNING_RATE}")
+    print(f"  - 早停: {'启用' if training.USE_EARLY_STOPPING else '禁用'} (耐心值: {training.EARLY_STOPPING_PATIENCE})")
+    print(f"  - 学习率衰减: {'启用' if training.USE_REDUCE_LR else '禁用'}")
+    print(f"  - GPU加速: {'尝试启用' if training.USE_GPU else '禁用'}")
     
     print(f"\n📁 路径配置:")
-    print(f"  - 模型保存: {PathConfig.MODEL_PATH}")
-    print(f"  - 结果保存: {PathConfig.RESULTS_DIR}")
+    print(f"  - 模型保存: {config.paths.MODEL_PATH}")
+    print(f"  - 结果保存: {config.paths.RESULTS_DIR}")
     print("=" * 60)
 
 
-def get_input_shape(num_features: int) -> Tuple[int, int]:
+def get_input_shape(num_features: int, config: Optional[DataConfig] = None) -> Tuple[int, int]:
     """
     获取LSTM输入形状
     
     Args:
         num_features: 特征数量
+        config: 数据配置，默认使用默认配置
     
     Returns:
         (time_steps, num_features)
     """
-    return (DataConfig.TIME_STEPS, num_features)
+    return ((config or DataConfig()).TIME_STEPS, num_features)
 
 
-def estimate_training_time() -> str:
+def estimate_training_time(config: Optional[RunConfig] = None) -> str:
     """
     估算训练时间
     
+    Args:
+        config: 运行配置，默认使用默认配置
+    
     Returns:
         预估的训练时间字符串
     """
+    training = (config or RunConfig()).training
+    
     # 粗略估算（基于经验）
-    epochs = TrainingConfig.EPOCHS
-    batch_size = TrainingConfig.BATCH_SIZE
+    epochs = training.EPOCHS
     
     # CPU大约每个epoch 20-30秒，GPU大约5-10秒
-    if TrainingConfig.USE_GPU:
+    if training.USE_GPU:
         time_per_epoch = 7  # 秒
         device = "GPU"
     else:
@@ -369,4 +571,4 @@ if __name__ == "__main__":
     print(f"\n✅ 配置文件加载成功！")
     
     # 创建必要的目录
-    PathConfig.create_directories()
+    PathConfig().create_directories()
@@ -1,6 +1,8 @@
 import os
 import sys
-from flask import Flask, render_template, jsonify
+import json
+import threading
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 import pandas as pd
 import joblib
 
@@ -9,7 +11,11 @@ import joblib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.binance_client import BinanceUtility
-from utils.data_processor import DataProcessor
+from utils.streaming_indicators import StreamingBasicIndicators
+from utils.micro_batcher import MicroBatcher
+from utils.market_data_cache import MarketDataCache
+from utils.prediction_scheduler import PredictionScheduler
+from utils.kline_stream import WS_BASE_URL, KlineStreamClient
 
 app = Flask(__name__)
 
@@ -17,6 +23,52 @@ app = Flask(__name__)
 MODELS = {}
 SYMBOLS = ['BTCUSDT', 'ETHUSDT']
 
+# 每个交易对一个流式指标引擎：已收盘的K线只处理一次，之后每次请求 O(1) 更新
+# One streaming indicator engine per symbol: closed candles are processed once
+INDICATORS = {}
+INDICATOR_LOCKS = {}
+
+FEATURE_COLS = ['open', 'high', 'low', 'close', 'volume', 'sma_7', 'sma_25', 'rsi_14', 'roc', 'volatility']
+
+# 微批处理：短时间内对同一交易对的并发请求合并成一次 predict_proba 调用
+# Micro-batching: concurrent requests for one symbol share a single predict_proba call
+BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', '64'))
+BATCH_MAX_WAIT_MS = float(os.getenv('PREDICT_BATCH_MAX_WAIT_MS', '5'))
+
+# 整个进程共用一个 Binance 客户端（只初始化一次 Client）
+# One Binance client for the whole process (Client is initialized once)
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client():
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = BinanceUtility()
+        return _CLIENT
+
+# K线缓存：直到下一根K线收盘才重新下载，并发请求共享同一次下载
+# Kline cache: refreshed after each candle close, concurrent misses share one fetch
+MARKET_DATA = MarketDataCache(lambda symbol, interval, start_str:
+                              get_client().fetch_historical_data(symbol, interval, start_str))
+
+# 流式模式（KLINE_STREAM=1）：订阅 WebSocket K线流，K线收盘即触发预测，不再轮询 REST
+# Streaming mode: subscribe to kline streams and predict as soon as a candle closes
+# KLINE_STREAM_URL 可指向本地回放服务器 / can point at a local replay server
+STREAMING = os.getenv('KLINE_STREAM', '0') == '1'
+KLINE_STREAM = None
+
+def market_frame(symbol):
+    """
+    最近的K线及最后一行是否已收盘
+    
+    Returns:
+        (df, last_closed)
+    """
+    if KLINE_STREAM is not None:
+        return KLINE_STREAM.frame(symbol)
+    return MARKET_DATA.get(symbol, '1h', '2 days ago UTC'), False
+
 def load_models():
     """
     从 models 目录加载预训练模型
@@ -31,6 +83,27 @@ def load_models():
         else:
             print(f"警告: 未找到模型 / Warning: Model not found at {model_path}")
 
+def predict_batch(symbol, rows):
+    """
+    对同一交易对的一批特征行做一次向量化预测
+    
+    Args:
+        symbol: 交易对
+        rows: 特征字典列表
+        
+    Returns:
+        每行对应的 (prediction, confidence)
+    """
+    model = MODELS[symbol]
+    features = pd.DataFrame(rows, columns=FEATURE_COLS)
+    probs = model.predict_proba(features)
+    # 与 model.predict 一致：取概率最大的类别
+    labels = model.classes_[probs.argmax(axis=1)]
+    return [(int(label), float(prob.max())) for label, prob in zip(labels, probs)]
+
+
+PREDICT_BATCHER = MicroBatcher(predict_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -40,42 +113,136 @@ def predict_page(symbol):
     # 页面逻辑由 index.html 中的 JS 处理，或者这里渲染
     return render_template('index.html')
 
+def compute_prediction(symbol):
+    """
+    计算一个交易对的最新预测（由调度器在K线收盘后调用）
+    
+    Returns:
+        JSON 可序列化的预测字典
+    """
+    # 获取最近的数据进行预测（流式缓冲区或内存缓存）
+    df, last_closed = market_frame(symbol)
+    
+    if df is None or len(df) < 30:
+        raise ValueError("Insufficient data from Binance")
+        
+    # 增量更新指标：只提交新收盘的K线，最后一根（未收盘）用 peek 计算
+    lock = INDICATOR_LOCKS.setdefault(symbol, threading.Lock())
+    with lock:
+        engine = INDICATORS.setdefault(symbol, StreamingBasicIndicators())
+        indicators = engine.catch_up(df, last_closed=last_closed)
+    
+    latest = df.iloc[-1]
+    latest_features = {**latest[['open', 'high', 'low', 'close', 'volume']].to_dict(), **indicators}
+    
+    prediction, confidence = PREDICT_BATCHER.submit(symbol, latest_features)
+    
+    return {
+        "symbol": symbol,
+        "current_price": float(df['close'].iloc[-1]),
+        "prediction": "UP" if prediction == 1 else "DOWN",
+        "confidence": confidence,
+        "timestamp": str(df['timestamp'].iloc[-1])
+    }
+
+
+# 预测快照：每根K线收盘后为所有交易对计算一次，API 直接读取
+# Prediction snapshots: computed once per candle close, read by the API in O(1)
+SCHEDULER = PredictionScheduler(compute_prediction, SYMBOLS, interval='1h')
+STREAM_KEEPALIVE_SECONDS = 15
+
 @app.route('/api/predict/<symbol>')
 def api_predict(symbol):
     """
-    预测 API 接口
+    预测 API 接口（读取最新快照）
     """
     if symbol not in MODELS:
         return jsonify({"error": f"Model for {symbol} not found. Please train it first."}), 404
     
+    snapshot = SCHEDULER.get(symbol)
+    if snapshot is not None:
+        return jsonify(snapshot)
+    
+    # 还没有快照（调度器刚启动或上次计算失败）时当场计算一次
     try:
-        client = BinanceUtility()
-        # 获取最近的数据进行预测
-        df = client.fetch_historical_data(symbol, '1h', '2 days ago UTC')
-        
-        if df is None or len(df) < 30:
-            return jsonify({"error": "Insufficient data from Binance"}), 500
-            
-        processor = DataProcessor()
-        df_processed = processor.add_technical_indicators(df)
-        
-        feature_cols = ['open', 'high', 'low', 'close', 'volume', 'sma_7', 'sma_25', 'rsi_14', 'roc', 'volatility']
-        latest_features = df_processed[feature_cols].tail(1)
-        
-        prediction = int(MODELS[symbol].predict(latest_features)[0])
-        prob = MODELS[symbol].predict_proba(latest_features)[0].tolist()
-        
-        return jsonify({
-            "symbol": symbol,
-            "current_price": float(df['close'].iloc[-1]),
-            "prediction": "UP" if prediction == 1 else "DOWN",
-            "confidence": max(prob),
-            "timestamp": str(df['timestamp'].iloc[-1])
-        })
+        return jsonify(SCHEDULER.refresh(symbol))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream')
+def api_stream():
+    """
+    Server-Sent Events：连接时推送当前快照，之后每次快照更新时推送
+    
+    可选参数 ?symbol=BTCUSDT 只订阅一个交易对：
+    - 没有该交易对的模型 → 推送一条 error 事件后结束
+    - 还没有快照 → 先推送一条 pending 事件，快照生成后照常推送
+    """
+    symbol = request.args.get('symbol')
+    
+    def events():
+        if symbol is not None and symbol not in MODELS:
+            error = {"error": f"Model for {symbol} not found. Please train it first."}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+            return
+        if symbol is not None and SCHEDULER.get(symbol) is None:
+            pending = {"symbol": symbol, "message": "Prediction not ready yet, waiting for the next update"}
+            yield f"event: pending\ndata: {json.dumps(pending)}\n\n"
+        
+        sent = {}
+        version = -1
+        while True:
+            version, snapshots = SCHEDULER.wait_for_update(version, timeout=STREAM_KEEPALIVE_SECONDS)
+            fresh = [snap for sym, snap in snapshots.items()
+                     if (symbol is None or sym == symbol) and sent.get(sym) != snap['version']]
+            if not fresh:
+                # 注释行保持连接（避免代理超时断开）
+                yield ": keep-alive\n\n"
+                continue
+            for snap in fresh:
+                sent[snap['symbol']] = snap['version']
+                yield f"data: {json.dumps(snap)}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/batch_stats')
+def api_batch_stats():
+    """微批处理和行情缓存统计 / Micro-batching and market data cache statistics"""
+    return jsonify({**PREDICT_BATCHER.stats(), 'market_data': MARKET_DATA.stats()})
+
+def start_kline_stream(symbols):
+    """
+    启动K线流：先用 REST 历史数据预填缓冲区，之后每根K线收盘刷新对应交易对的快照
+    Start the kline stream: seed buffers from REST, then refresh on every close
+    """
+    global KLINE_STREAM
+    stream = KlineStreamClient(
+        symbols, '1h',
+        base_url=os.getenv('KLINE_STREAM_URL', WS_BASE_URL),
+        on_closed=lambda symbol, candle: SCHEDULER.refresh(symbol),
+        backfill=lambda symbol, interval, start_ms, end_ms:
+            get_client().fetch_historical_data(symbol, interval, start_ms, end_ms))
+    for symbol in symbols:
+        try:
+            df = MARKET_DATA.get(symbol, '1h', '2 days ago UTC')
+            if df is not None and len(df) > 1:
+                stream.seed(symbol, df.iloc[:-1])  # 最后一根还未收盘
+        except Exception as e:
+            print(f"⚠️ 预填 {symbol} 的K线失败（将从流中累积）: {e}")
+    KLINE_STREAM = stream
+    stream.start()
+    return stream
+
 if __name__ == '__main__':
     load_models()
+    # 只调度已加载模型的交易对，启动时先计算一次快照
+    SCHEDULER.symbols = [symbol for symbol in SYMBOLS if symbol in MODELS]
+    if STREAMING:
+        start_kline_stream(SCHEDULER.symbols)
+        SCHEDULER.refresh_all()
+    else:
+        SCHEDULER.start()
     # 生产环境建议使用 Gunicorn
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # 关闭自动重载：重载器会再启动一个进程，导致调度器运行两份
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True, use_reloader=False)
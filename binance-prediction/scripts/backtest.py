@@ -9,8 +9,34 @@ import argparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.data_processor import DataProcessor
+from utils.vectorized_backtest import run_sweep, parse_grid
 
-def run_backtest(symbol, model_path, data_path):
+def run_parameter_sweep(symbol, model, X_test, df_test, args):
+    """
+    参数扫描：信号 = 上涨概率 - 0.5，所有阈值/持仓周期/仓位组合一次性向量化回测
+    Parameter sweep: every threshold/holding/sizing variant in one vectorized pass
+    """
+    up_index = list(model.classes_).index(1)
+    edge = model.predict_proba(X_test)[:, up_index] - 0.5
+    
+    # 与上面的策略一致：t 时刻的预测决定 t+1 的仓位
+    scores = pd.Series(edge).shift(1).fillna(0.0).values
+    returns = df_test['close'].pct_change().fillna(0).values
+    
+    result = run_sweep({'proba': scores}, returns,
+                       thresholds=parse_grid(args.thresholds),
+                       hold_periods=parse_grid(args.holds, int),
+                       sizes=parse_grid(args.sizes),
+                       fee=args.fee, allow_short=args.allow_short)
+    
+    print(f"参数扫描: {len(result.params)} 个变体，用时 {result.elapsed:.3f} 秒 / Swept {len(result.params)} variants")
+    print(result.top(10)[['threshold', 'hold', 'size', 'total_return', 'sharpe', 'max_drawdown', 'trades']])
+    
+    out_path = f'data/{symbol}_backtest_sweep.csv'
+    pd.concat([result.params, result.stats], axis=1).to_csv(out_path, index_label='variant')
+    print(f"扫描结果已保存至: {out_path} / Sweep results saved to: {out_path}")
+
+def run_backtest(symbol, model_path, data_path, sweep_args=None):
     print(f"开始对 {symbol} 进行回测... / Starting backtest for {symbol}...")
     
     # 1. 加载数据和模型
@@ -66,12 +92,21 @@ def run_backtest(symbol, model_path, data_path):
     market_return = df_test['cum_market_returns'].iloc[-1]
     print(f"策略最终累计收益: {final_return:.4f}")
     print(f"市场基准最终收益: {market_return:.4f}")
+    
+    if sweep_args is not None:
+        run_parameter_sweep(symbol, model, X_test, df_test, sweep_args)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Backtest ML Strategy')
     parser.add_argument('--symbol', type=str, default='BTCUSDT')
     parser.add_argument('--model', type=str, required=True)
     parser.add_argument('--data', type=str, required=True)
+    parser.add_argument('--sweep', action='store_true', help='Sweep thresholds/holding periods/sizes in one vectorized pass')
+    parser.add_argument('--thresholds', type=str, default='0:0.3:16', help="Probability edge thresholds, 'a,b,c' or 'start:stop:num'")
+    parser.add_argument('--holds', type=str, default='1,2,4,8', help='Holding periods (bars)')
+    parser.add_argument('--sizes', type=str, default='0.5,1.0', help='Position sizes (fraction of equity)')
+    parser.add_argument('--fee', type=float, default=0.0, help='Fee per unit of turnover')
+    parser.add_argument('--allow-short', action='store_true')
     
     args = parser.parse_args()
-    run_backtest(args.symbol, args.model, args.data)
+    run_backtest(args.symbol, args.model, args.data, sweep_args=args if args.sweep else None)
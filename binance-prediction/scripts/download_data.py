@@ -6,25 +6,34 @@ import argparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.binance_client import BinanceUtility
+from utils.kline_store import KlineStore
+from utils.parallel_downloader import download_symbols
+from utils.async_binance_client import download_symbols_async
 
 def main():
     parser = argparse.ArgumentParser(description='Download Historical Data from Binance')
     parser.add_argument('--symbols', type=str, default='BTCUSDT,ETHUSDT', help='Comma separated symbols')
     parser.add_argument('--interval', type=str, default='1h', help='Time interval (1m, 5m, 1h, 1d)')
     parser.add_argument('--start', type=str, default='2 years ago UTC', help='Start time')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent download workers (shared rate limit)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Use the asyncio client (pooled session, concurrent page ranges)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-download everything instead of using the local kline store')
     
     args = parser.parse_args()
-    symbols = args.symbols.split(',')
+    symbols = [symbol.strip() for symbol in args.symbols.split(',')]
     
-    client = BinanceUtility()
+    # 本地K线仓库：只下载上次运行之后新收盘的K线
+    # Local kline store: only klines closed since the last run are downloaded
+    store = None if args.no_cache else KlineStore(os.path.join('data', 'klines'))
     
     if not os.path.exists('data'):
         os.makedirs('data')
-        
-    for symbol in symbols:
-        symbol = symbol.strip()
-        print(f"正在下载 {symbol}... / Downloading {symbol}...")
-        df = client.fetch_historical_data(symbol, args.interval, args.start)
+
+    if store is not None:
+        for symbol in symbols:
+            store.seed_from_csv(symbol, args.interval, f'data/{symbol}_hist.csv')
+
+    def save_result(symbol, df):
         if df is not None:
             file_path = f'data/{symbol}_hist.csv'
             df.to_csv(file_path, index=False)
@@ -32,5 +41,27 @@ def main():
         else:
             print(f"下载 {symbol} 失败 / Failed to download {symbol}")
 
+    if args.use_async:
+        # 异步下载：一个连接池，长历史按页区间并发请求
+        # Async download: one pooled session, page ranges fetched concurrently
+        print(f"异步下载 {len(symbols)} 个交易对... / Downloading {len(symbols)} symbols asynchronously...")
+        download_symbols_async(symbols, args.interval, args.start, store=store, on_result=save_result)
+        return
+
+    if args.workers > 1:
+        # 并发下载：所有线程共享同一个请求权重预算
+        # Concurrent download: all workers share one request-weight budget
+        print(f"并发下载 {len(symbols)} 个交易对 ({args.workers} 线程)... / "
+              f"Downloading {len(symbols)} symbols with {args.workers} workers...")
+        download_symbols(symbols, args.interval, args.start, store=store,
+                         max_workers=args.workers, on_result=save_result)
+        return
+
+    client = BinanceUtility(kline_store=store)
+    for symbol in symbols:
+        print(f"正在下载 {symbol}... / Downloading {symbol}...")
+        df = client.fetch_historical_data(symbol, args.interval, args.start)
+        save_result(symbol, df)
+
 if __name__ == "__main__":
     main()
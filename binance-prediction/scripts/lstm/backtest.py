@@ -6,18 +6,24 @@ LSTM 回测脚本（Backtesting）
 - 对比 Buy & Hold 基准
 
 注意：
-- 这里只是教学性质的回测示例（不含手续费/滑点/杠杆/做空等）
+- 默认回测是教学性质的示例（不含手续费/滑点/杠杆/做空等）
+- --event 使用事件驱动回测：手续费、滑点曲线、做空、杠杆、下单延迟和强平（参数见 BacktestConfig）
 - 不构成任何投资建议
 
 使用：
     cd binance-prediction
     python scripts/lstm/backtest.py
+    # 含手续费/滑点/延迟的事件驱动回测（允许做空，2 倍杠杆）
+    python scripts/lstm/backtest.py --event --allow-short --leverage 2
+    # 一次性扫描阈值/持仓周期/仓位的所有组合
+    python scripts/lstm/backtest.py --sweep --thresholds 0:0.01:21 --holds 1,2,4,8 --sizes 0.5,1 --fee 0.001
 
 作者: qinshihuang166
 """
 
 from __future__ import annotations
 
+import argparse
 import os
 import sys
 from datetime import datetime
@@ -27,9 +33,14 @@ import pandas as pd
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config_lstm import DataConfig, PathConfig
+from config_lstm import BacktestConfig, DataConfig, PathConfig, RunConfig
 from utils.lstm_data_processor import LSTMDataProcessor
+from utils.lstm_windows import predict_in_batches
+from utils.lstm_forecaster import engine_model_path, load_inference_model
 from utils.lstm_metrics import calc_regression_metrics, calc_direction_metrics
+from utils.market_data_cache import INTERVAL_SECONDS
+from utils.vectorized_backtest import run_sweep, parse_grid
+from utils.event_backtest import ExecutionModel, run_event_backtest
 
 
 def _ensure_matplotlib_backend() -> None:
@@ -38,16 +49,19 @@ def _ensure_matplotlib_backend() -> None:
     matplotlib.use('Agg')
 
 
-def load_model() -> "object":
+def load_model(paths: PathConfig, engine: str = 'keras') -> "object":
+    if engine != 'keras':
+        return load_inference_model(engine_model_path(paths, engine), engine)
+
     import tensorflow as tf
 
-    if not os.path.exists(PathConfig.MODEL_PATH):
+    if not os.path.exists(paths.MODEL_PATH):
         raise FileNotFoundError(
-            f"❌ 找不到模型文件: {PathConfig.MODEL_PATH}\n"
-            f"请先训练模型：python scripts/lstm/train_lstm.py"
+            f"❌ 找不到模型文件: {paths.MODEL_PATH}\n"
+            f"请先训练模型：python scripts/lstm/train_lstm.py --symbol {paths.SYMBOL}"
         )
 
-    return tf.keras.models.load_model(PathConfig.MODEL_PATH)
+    return tf.keras.models.load_model(paths.MODEL_PATH)
 
 
 def inverse_close(processor: LSTMDataProcessor, close_scaled: np.ndarray) -> np.ndarray:
@@ -61,35 +75,38 @@ def inverse_close(processor: LSTMDataProcessor, close_scaled: np.ndarray) -> np.
 def build_test_set(processor: LSTMDataProcessor) -> dict:
     """构建测试集并返回真实价格序列"""
 
-    df_raw = processor.load_raw_data()
-    df_raw = processor.clean_data(df_raw)
-    df_raw = processor.add_features(df_raw)
-    df_features_real = processor.select_features(df_raw)
-
-    processor.load_scaler(PathConfig.SCALER_PATH)
-    df_features_scaled = processor.normalize_data(df_features_real, fit=False)
+    # 重复回测时直接读取特征缓存
+    processor.load_scaler()
+    df_features_real, df_features_scaled = processor.prepare_features(fit=False)
 
     X_all, y_scaled_all = processor.create_sequences(df_features_scaled.values)
+    time_steps = processor.config.TIME_STEPS
 
-    y_real_all = df_features_real['close'].values[DataConfig.TIME_STEPS :]
+    # 多步目标时样本数比 close 序列少 horizon-1 个
+    y_real_all = df_features_real['close'].values[time_steps:][: len(X_all)]
 
     X_train, X_val, X_test, y_train_scaled, y_val_scaled, y_test_scaled = processor.split_data(X_all, y_scaled_all)
 
     total = len(y_real_all)
-    train_size = int(total * DataConfig.TRAIN_RATIO)
-    val_size = int(total * DataConfig.VAL_RATIO)
+    train_size = int(total * processor.config.TRAIN_RATIO)
+    val_size = int(total * processor.config.VAL_RATIO)
 
     y_test_real = y_real_all[train_size + val_size :]
 
     # 同步取出测试集对应的时间戳（便于画图/保存）
-    ts_all = df_features_real.index.values[DataConfig.TIME_STEPS :]
+    ts_all = df_features_real.index.values[time_steps:][: len(X_all)]
     ts_test = ts_all[train_size + val_size :]
 
+    # 测试集的 OHLCV（事件驱动回测需要开盘价/最高价/最低价/成交量）
+    ohlcv_all = df_features_real[['open', 'high', 'low', 'close', 'volume']].iloc[time_steps:][: len(X_all)]
+    ohlcv_test = ohlcv_all.iloc[train_size + val_size :]
+
     return {
         'X_test': X_test,
         'y_test_scaled': y_test_scaled,
         'y_test_real': y_test_real,
         'ts_test': ts_test,
+        'ohlcv_test': ohlcv_test,
     }
 
 
@@ -147,22 +164,153 @@ def plot_equity_curve(df: pd.DataFrame, out_path: str) -> None:
     plt.close()
 
 
+def periods_per_year(interval: str = DataConfig.INTERVAL) -> float:
+    return 365 * 86400 / INTERVAL_SECONDS.get(interval, 3600)
+
+
+def run_event_driven(ohlcv: pd.DataFrame, y_pred: np.ndarray, args, config: RunConfig,
+                     out_dir: str, ts: str) -> None:
+    """
+    事件驱动回测：第 t 根K线收盘时，用对第 t+1 根收盘价的预测决定目标仓位
+    （预测上涨 → +杠杆倍数，预测下跌 → 做空或空仓），按 BacktestConfig 的成本成交
+    """
+    close = ohlcv['close'].values
+    long_signal = np.append(y_pred[1:] > close[:-1], False)
+    short_value = -args.leverage if args.allow_short else 0.0
+    target = np.where(long_signal, args.leverage, short_value)
+    target[-1] = 0.0  # 最后一根K线平仓
+
+    execution = ExecutionModel(
+        fee_rate=args.fee,
+        half_spread_bps=args.spread_bps,
+        impact_bps=args.impact_bps,
+        impact_exponent=config.backtest.IMPACT_EXPONENT,
+        latency_bars=args.latency_bars,
+        max_leverage=args.leverage,
+        maintenance_margin=config.backtest.MAINTENANCE_MARGIN,
+        allow_short=args.allow_short,
+    )
+    result = run_event_backtest(
+        ohlcv['open'].values, ohlcv['high'].values, ohlcv['low'].values, close, ohlcv['volume'].values,
+        target, execution, initial_capital=config.backtest.INITIAL_CAPITAL,
+        periods_per_year=periods_per_year(config.data.INTERVAL),
+    )
+
+    stats = result.stats
+    print(f'\n⚙️ 事件驱动回测（{len(close)} 根K线，{len(result.trades)} 笔成交，用时 {result.elapsed:.3f} 秒）')
+    print(f'  手续费 {args.fee:.4%} | 半价差 {args.spread_bps} bps | 冲击 {args.impact_bps} bps | '
+          f'延迟 {args.latency_bars} 根 | 杠杆 {args.leverage}x | 做空 {"是" if args.allow_short else "否"}')
+    print(f'  期末净值    : {stats["final_equity"]:.2f} (初始 {config.backtest.INITIAL_CAPITAL:.2f})')
+    print(f'  总收益      : {stats["total_return"]:.2%}')
+    print(f'  夏普比率    : {stats["sharpe"]:.2f}')
+    print(f'  最大回撤    : {stats["max_drawdown"]:.2%}')
+    print(f'  手续费合计  : {stats["total_fees"]:.2f}')
+    print(f'  滑点成本合计: {stats["total_slippage"]:.2f}')
+    print(f'  强平次数    : {int(stats["liquidations"])}')
+
+    curve = pd.DataFrame({
+        'close': close,
+        'target': target,
+        'position': result.position,
+        'cash': result.cash,
+        'equity': result.equity,
+    }, index=ohlcv.index)
+    curve_path = os.path.join(out_dir, f'backtest_event_{ts}.csv')
+    curve.to_csv(curve_path)
+    trades_path = os.path.join(out_dir, f'backtest_event_trades_{ts}.csv')
+    result.trades.to_csv(trades_path, index=False)
+    print(f'\n💾 事件驱动回测明细已保存: {curve_path}')
+    print(f'💾 成交记录已保存: {trades_path}')
+
+
+def run_parameter_sweep(y_true: np.ndarray, y_pred_all: np.ndarray, args, config: RunConfig,
+                        out_dir: str, ts: str) -> None:
+    """
+    参数扫描：每个预测步长是一个策略（信号 = 预测收益率），
+    与阈值、持仓周期、仓位组合后一次性向量化回测
+    """
+    prev_true = np.roll(y_true, 1)
+    prev_true[0] = y_true[0]
+    market_ret = y_true / prev_true - 1.0
+    market_ret[0] = 0.0
+
+    # 第 k 步的预测价格相对当前价的预期收益率
+    scores = {f'h{k + 1}': y_pred_all[:, k] / prev_true - 1.0 for k in range(y_pred_all.shape[1])}
+
+    result = run_sweep(
+        scores,
+        market_ret,
+        thresholds=parse_grid(args.thresholds),
+        hold_periods=parse_grid(args.holds, int),
+        sizes=parse_grid(args.sizes),
+        fee=args.fee,
+        allow_short=args.allow_short,
+        periods_per_year=periods_per_year(config.data.INTERVAL),
+    )
+
+    print(f'\n🧮 参数扫描：{len(result.params)} 个变体 × {len(market_ret)} 根K线，用时 {result.elapsed:.3f} 秒')
+    top = result.top(args.top, by=args.rank_by)
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(top[['strategy', 'threshold', 'hold', 'size', 'total_return', 'sharpe', 'max_drawdown', 'trades']])
+
+    stats_path = os.path.join(out_dir, f'backtest_sweep_{ts}.csv')
+    pd.concat([result.params, result.stats], axis=1).to_csv(stats_path, index_label='variant')
+    print(f'\n💾 全部变体统计已保存: {stats_path}')
+
+    # 最优几个变体的净值曲线，加上 Buy & Hold 基准
+    curves = result.equity_frame(top.index)
+    curves.columns = [f"{r.strategy} thr={r.threshold:.4f} hold={r.hold} size={r.size}" for r in top.itertuples()]
+    curves.insert(0, 'cum_market', np.cumprod(1 + market_ret))
+    curves_path = os.path.join(out_dir, f'backtest_sweep_equity_{ts}.csv')
+    curves.to_csv(curves_path, index=False)
+    print(f'💾 最优变体净值曲线已保存: {curves_path}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='LSTM 回测 / LSTM backtest')
+    parser.add_argument('--symbol', type=str, default=DataConfig.SYMBOL, help='交易对，例如 BTCUSDT')
+    parser.add_argument('--tflite', dest='engine', action='store_const', const='tflite', default='keras',
+                        help='使用 export_lstm.py 导出的 TFLite 文件预测')
+    parser.add_argument('--numpy', dest='engine', action='store_const', const='numpy',
+                        help='使用 export_lstm.py --format numpy 导出的 NumPy 模型预测')
+    parser.add_argument('--sweep', action='store_true', help='向量化扫描所有参数组合 / Vectorized parameter sweep')
+    parser.add_argument('--thresholds', type=str, default='0:0.005:11',
+                        help="入场阈值（预测收益率），'a,b,c' 或 'start:stop:num'")
+    parser.add_argument('--holds', type=str, default='1,2,4,8', help='持仓周期（K线数）')
+    parser.add_argument('--sizes', type=str, default='0.5,1.0', help='仓位比例')
+    parser.add_argument('--event', action='store_true',
+                        help='事件驱动回测（手续费/滑点/做空/杠杆/延迟）/ Event-driven backtest with costs')
+    parser.add_argument('--fee', type=float, default=BacktestConfig.FEE_RATE, help='每单位换手的手续费率')
+    parser.add_argument('--spread-bps', type=float, default=BacktestConfig.HALF_SPREAD_BPS, help='半个买卖价差（基点）')
+    parser.add_argument('--impact-bps', type=float, default=BacktestConfig.IMPACT_BPS, help='100%% 参与率时的冲击成本（基点）')
+    parser.add_argument('--latency-bars', type=int, default=BacktestConfig.LATENCY_BARS, help='下单延迟（K线数）')
+    parser.add_argument('--leverage', type=float, default=BacktestConfig.MAX_LEVERAGE, help='杠杆倍数')
+    parser.add_argument('--allow-short', action='store_true', default=BacktestConfig.ALLOW_SHORT, help='允许做空')
+    parser.add_argument('--rank-by', type=str, default='sharpe', help='排序指标')
+    parser.add_argument('--top', type=int, default=10, help='显示前 N 个变体')
+    return parser.parse_args()
+
+
 def main() -> None:
+    args = parse_args()
+
     print('=' * 70)
     print('📈 LSTM 回测（Backtesting）')
     print('=' * 70)
 
-    PathConfig.create_directories()
+    config = RunConfig.for_symbol(args.symbol)
+    config.paths.create_directories()
 
-    model = load_model()
-    processor = LSTMDataProcessor()
+    model = load_model(config.paths, args.engine)
+    processor = LSTMDataProcessor(config.data, config.paths)
     test = build_test_set(processor)
 
     X_test = test['X_test']
     y_true = test['y_test_real']
 
-    y_pred_scaled = model.predict(X_test, verbose=0).reshape(-1)
-    y_pred = inverse_close(processor, y_pred_scaled)
+    # 多步模型取第1步预测 / First horizon of multi-output models
+    y_pred_scaled_all = predict_in_batches(model, X_test)
+    y_pred = inverse_close(processor, y_pred_scaled_all[:, 0])
 
     # 回归和方向指标（用于参考）
     reg = calc_regression_metrics(y_true, y_pred)
@@ -185,7 +333,15 @@ def main() -> None:
 
     # 保存
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-    out_dir = PathConfig.RESULTS_DIR
+    out_dir = config.paths.RESULTS_DIR
+
+    if args.event:
+        run_event_driven(test['ohlcv_test'], y_pred, args, config, out_dir, ts)
+
+    if args.sweep:
+        y_pred_all = np.column_stack([inverse_close(processor, y_pred_scaled_all[:, k])
+                                      for k in range(y_pred_scaled_all.shape[1])])
+        run_parameter_sweep(y_true, y_pred_all, args, config, out_dir, ts)
 
     csv_path = os.path.join(out_dir, f'backtest_{ts}.csv')
     bt.to_csv(csv_path, index=False)
@@ -0,0 +1,154 @@
+"""
+技术指标计算基准测试
+Technical Indicator Benchmark
+
+对比 add_all_indicators 的 pandas 实现和 NumPy 融合内核的耗时，并检查结果一致。
+Times the pandas implementation of add_all_indicators against the fused NumPy
+kernel and checks that both produce the same values.
+
+作者: qinshihuang166
+使用方法:
+    python benchmark_indicators.py                          # 10k / 1M / 10M 行
+    python benchmark_indicators.py --sizes 10000,100000     # 自定义行数
+    python benchmark_indicators.py --repeat 5               # 每个规模重复5次取最快
+"""
+
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.technical_indicators import TechnicalIndicators, INDICATOR_COLUMNS
+
+
+def make_ohlcv(n_rows: int, seed: int = 42, flat_every: int = 5000, flat_len: int = 60) -> pd.DataFrame:
+    """
+    生成随机游走的 1 小时 OHLCV 数据
+
+    每 flat_every 行插入 flat_len 行价格不变的区间（停牌 / 无成交），
+    检查布林带在平坦区间内是否精确为 0。
+    """
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.005, n_rows)))
+    spread = np.abs(rng.normal(0, 0.003, n_rows)) * close
+    for start in range(flat_every // 2, n_rows, flat_every):
+        close[start:start + flat_len] = close[start]
+        spread[start:start + flat_len] = 0.0
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2017-01-01', periods=n_rows, freq='h'),
+        'open': close * (1 + rng.normal(0, 0.001, n_rows)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.gamma(2.0, 500.0, n_rows),
+    })
+
+
+def run_engine(df: pd.DataFrame, engine: str) -> pd.DataFrame:
+    # pandas 实现每个指标都会打印，计时时屏蔽输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        return TechnicalIndicators.add_all_indicators(df, engine=engine)
+
+
+def time_engine(df: pd.DataFrame, engine: str, repeat: int) -> float:
+    """返回最快耗时（秒）；结果立即释放，避免大数据量时两份结果同时占用内存"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run_engine(df, engine)
+        best = min(best, time.perf_counter() - start)
+        del result
+    return best
+
+
+def flat_windows(df: pd.DataFrame) -> np.ndarray:
+    """20 根K线收盘价完全相同的位置（布林带窗口内价格不变）"""
+    close = df['close']
+    return (close.rolling(20).max() == close.rolling(20).min()).to_numpy()
+
+
+def max_relative_error(expected: pd.DataFrame, actual: pd.DataFrame,
+                       exclude: Optional[np.ndarray] = None) -> float:
+    """
+    所有指标列上的最大相对误差（NaN 位置必须一致）
+
+    exclude 标记的行不参与比较（平坦区间单独用 flat_run_width 检查）。
+
+    误差主要来自布林带，而且来自 pandas 一侧：pandas 的滚动方差是在线累加的，数据
+    很长时会积累误差（价格不变的区间之后更明显，100 万行时约 1e-3 的绝对误差）；
+    NumPy 内核每个窗口单独计算，与逐窗口精确计算的标准差相差在 1e-10 以内。
+    """
+    worst = 0.0
+    for col in INDICATOR_COLUMNS:
+        a = expected[col].to_numpy(dtype=np.float64)
+        b = actual[col].to_numpy(dtype=np.float64)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            return float('inf')
+        mask = np.isfinite(a)
+        if exclude is not None:
+            mask &= ~exclude
+        if mask.any():
+            scale = np.maximum(np.abs(a[mask]), 1.0)
+            worst = max(worst, float(np.max(np.abs(a[mask] - b[mask]) / scale)))
+    return worst
+
+
+def flat_run_width(result: pd.DataFrame, flat: np.ndarray) -> float:
+    """
+    平坦区间上 BB_width 的最大值；NumPy 内核应精确为 0
+    Largest BB_width over windows of identical closes
+
+    pandas 的滚动方差是在线累加的，数据很长时平坦区间上也可能不为 0，只作参考。
+    """
+    if not flat.any():
+        return 0.0
+    return float(np.abs(result['BB_width'].to_numpy()[flat]).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='技术指标计算基准测试: pandas vs NumPy 内核')
+    parser.add_argument('--sizes', type=str, default='10000,1000000,10000000',
+                        help='逗号分隔的数据行数 (默认: 10000,1000000,10000000)')
+    parser.add_argument('--repeat', type=int, default=3, help='每个规模重复次数，取最快 (默认: 3)')
+    parser.add_argument('--verify-rows', type=int, default=1000000,
+                        help='结果一致性检查使用的最大行数 (默认: 1000000)')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    print("=" * 70)
+    print(" " * 18 + "⏱️ 技术指标计算基准测试")
+    print("=" * 70)
+    print(f"\n{'行数':>12} {'pandas (s)':>12} {'NumPy (s)':>12} {'加速比':>8} {'最大相对误差':>14} {'平坦区间 pandas / NumPy':>24}")
+    print("-" * 70)
+
+    for n_rows in sizes:
+        df = make_ohlcv(n_rows)
+        pandas_time = time_engine(df, 'pandas', args.repeat)
+        numpy_time = time_engine(df, 'numpy', args.repeat)
+
+        sample = df.iloc[:args.verify_rows]
+        expected, actual = run_engine(sample, 'pandas'), run_engine(sample, 'numpy')
+        flat = flat_windows(sample)
+        error = max_relative_error(expected, actual, exclude=flat)
+        flat_pandas, flat_numpy = flat_run_width(expected, flat), flat_run_width(actual, flat)
+        print(f"{n_rows:>12,} {pandas_time:>12.3f} {numpy_time:>12.3f} "
+              f"{pandas_time / numpy_time:>7.1f}x {error:>14.2e} {flat_pandas:>12.2e} {flat_numpy:>10.2e}")
+        assert flat_numpy == 0.0, f"平坦区间 BB_width 应为 0，实际 {flat_numpy:.2e}"
+        del df, sample, expected, actual, flat
+
+    print("-" * 70)
+    print("\n✅ 基准测试完成!")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,13 +17,18 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from utils.binance_client import BinanceUtility
+from utils.kline_store import KlineStore
+from utils.parallel_downloader import download_symbols
+from utils.async_binance_client import download_symbols_async
+from utils.columnar_storage import columnar_path, load_table, save_table, table_exists
 from config_lstm import DataConfig, PathConfig
 
 
 def download_data(symbol: str = None, 
                  interval: str = None, 
                  days: int = None,
-                 save_path: str = None):
+                 save_path: str = None,
+                 use_cache: bool = True):
     """
     下载历史数据
     
@@ -32,11 +37,13 @@ def download_data(symbol: str = None,
         interval: 时间间隔
         days: 回溯天数
         save_path: 保存路径
+        use_cache: 是否使用本地K线仓库（只增量下载缺失的K线）
     """
-    # 使用配置或参数
-    symbol = symbol or DataConfig.SYMBOL
-    interval = interval or DataConfig.INTERVAL
-    days = days or DataConfig.LOOKBACK_DAYS
+    # 使用配置或参数（保存路径跟随交易对）
+    config = DataConfig(SYMBOL=symbol or DataConfig.SYMBOL)
+    symbol = config.SYMBOL
+    interval = interval or config.INTERVAL
+    days = days or config.LOOKBACK_DAYS
     
     print("="*60)
     print("📥 Binance 数据下载器")
@@ -48,7 +55,8 @@ def download_data(symbol: str = None,
     
     # 初始化Binance客户端
     try:
-        client = BinanceUtility()
+        store = KlineStore(PathConfig.KLINE_STORE_DIR) if use_cache else None
+        client = BinanceUtility(kline_store=store)
     except Exception as e:
         print(f"❌ 初始化Binance客户端失败: {e}")
         print("\n💡 提示: 如果没有API密钥，可以使用公开API（有请求限制）")
@@ -89,9 +97,10 @@ def download_data(symbol: str = None,
         print(f"  成交量范围: {df['volume'].min():.2f} - {df['volume'].max():.2f}")
         
         # 保存数据
-        PathConfig.create_directories()
-        save_path = save_path or DataConfig.RAW_DATA_FILE
-        df.to_csv(save_path, index=False)
+        PathConfig().create_directories()
+        save_path = save_path or config.RAW_DATA_FILE
+        save_path = save_table(df, save_path, fmt=config.STORAGE_FORMAT,
+                               float_dtype=config.RAW_FLOAT_DTYPE)
         
         print(f"\n💾 数据已保存到: {save_path}")
         print(f"   文件大小: {os.path.getsize(save_path) / 1024:.2f} KB")
@@ -111,7 +120,10 @@ def download_data(symbol: str = None,
 
 def download_multiple_symbols(symbols: list, 
                              interval: str = None, 
-                             days: int = None):
+                             days: int = None,
+                             use_cache: bool = True,
+                             workers: int = 1,
+                             use_async: bool = False):
     """
     下载多个交易对的数据
     
@@ -119,6 +131,9 @@ def download_multiple_symbols(symbols: list,
         symbols: 交易对列表
         interval: 时间间隔
         days: 回溯天数
+        use_cache: 是否使用本地K线仓库
+        workers: 并发线程数（>1 时并发下载，所有线程共享同一个请求权重预算）
+        use_async: 使用异步客户端（单个事件循环 + 连接池，长历史按页区间并发下载）
     """
     results = {}
     
@@ -126,21 +141,25 @@ def download_multiple_symbols(symbols: list,
     print(f"📥 批量下载 {len(symbols)} 个交易对的数据")
     print("="*60)
     
-    for i, symbol in enumerate(symbols, 1):
-        print(f"\n[{i}/{len(symbols)}] 下载 {symbol}...")
+    if workers > 1 or use_async:
+        results = _download_concurrently(symbols, interval, days, use_cache, workers, use_async)
+    else:
+        for i, symbol in enumerate(symbols, 1):
+            print(f"\n[{i}/{len(symbols)}] 下载 {symbol}...")
         
-        # 生成保存路径
-        save_path = os.path.join(DataConfig.DATA_DIR, f'{symbol}_raw_data.csv')
+            # 生成保存路径
+            save_path = DataConfig(SYMBOL=symbol).RAW_DATA_FILE
         
-        # 下载
-        success = download_data(
-            symbol=symbol,
-            interval=interval,
-            days=days,
-            save_path=save_path
-        )
+            # 下载
+            success = download_data(
+                symbol=symbol,
+                interval=interval,
+                days=days,
+                save_path=save_path,
+                use_cache=use_cache
+            )
         
-        results[symbol] = success
+            results[symbol] = success
     
     # 打印汇总
     print("\n" + "="*60)
@@ -156,24 +175,55 @@ def download_multiple_symbols(symbols: list,
     print("="*60)
 
 
-def validate_existing_data():
+def _download_concurrently(symbols: list, interval: str, days: int,
+                           use_cache: bool, workers: int, use_async: bool = False) -> dict:
+    """并发下载多个交易对，返回 {symbol: 是否成功}"""
+    interval = interval or DataConfig.INTERVAL
+    days = days or DataConfig.LOOKBACK_DAYS
+    start_str = (datetime.now() - timedelta(days=days)).strftime("%d %b, %Y")
+    store = KlineStore(PathConfig.KLINE_STORE_DIR) if use_cache else None
+    
+    PathConfig().create_directories()
+    if use_async:
+        print("⚡ 异步模式: 一个连接池，所有交易对和页区间并发下载，共享请求权重预算")
+    else:
+        print(f"⚡ 并发模式: {workers} 个线程，共享请求权重预算")
+    
+    def save(symbol, df):
+        if df is None or df.empty:
+            print(f"  ❌ {symbol}: 下载失败或数据为空")
+            return
+        save_path = save_table(df, DataConfig(SYMBOL=symbol).RAW_DATA_FILE,
+                               fmt=DataConfig.STORAGE_FORMAT, float_dtype=DataConfig.RAW_FLOAT_DTYPE)
+        print(f"  ✅ {symbol}: {len(df)} 行 "
+              f"({df['timestamp'].min()} 到 {df['timestamp'].max()}) → {save_path}")
+    
+    if use_async:
+        frames = download_symbols_async(symbols, interval, start_str, store=store, on_result=save)
+    else:
+        frames = download_symbols(symbols, interval, start_str, store=store,
+                                  max_workers=workers, on_result=save)
+    return {symbol: df is not None and not df.empty for symbol, df in frames.items()}
+
+
+def validate_existing_data(symbol: str = None):
     """验证已存在的数据"""
-    data_file = DataConfig.RAW_DATA_FILE
+    data_file = DataConfig(SYMBOL=symbol or DataConfig.SYMBOL).RAW_DATA_FILE
     
-    if not os.path.exists(data_file):
+    if not table_exists(data_file):
         print(f"❌ 数据文件不存在: {data_file}")
         print("请先运行下载命令！")
         return False
     
     try:
-        import pandas as pd
-        df = pd.read_csv(data_file)
+        df = load_table(data_file, fmt=DataConfig.STORAGE_FORMAT)
+        file_path = columnar_path(data_file) if os.path.exists(columnar_path(data_file)) else data_file
         
         print("="*60)
         print("✅ 数据文件验证")
         print("="*60)
-        print(f"文件路径: {data_file}")
-        print(f"文件大小: {os.path.getsize(data_file) / 1024:.2f} KB")
+        print(f"文件路径: {file_path}")
+        print(f"文件大小: {os.path.getsize(file_path) / 1024:.2f} KB")
         print(f"数据行数: {len(df)}")
         print(f"数据列数: {len(df.columns)}")
         print(f"列名: {list(df.columns)}")
@@ -215,6 +265,12 @@ def main():
   # 下载多个交易对
   python download_lstm_data.py --symbols BTCUSDT,ETHUSDT,BNBUSDT --days 365
   
+  # 并发下载多个交易对（8个线程共享限流额度）
+  python download_lstm_data.py --symbols BTCUSDT,ETHUSDT,BNBUSDT --workers 8
+  
+  # 异步下载（长历史按页区间并发请求）
+  python download_lstm_data.py --symbols BTCUSDT,ETHUSDT --days 1825 --async
+  
   # 验证已存在的数据
   python download_lstm_data.py --validate
         """
@@ -248,6 +304,26 @@ def main():
         help=f'回溯天数 (默认: {DataConfig.LOOKBACK_DAYS})'
     )
     
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='批量下载时的并发线程数 (默认: 1，即逐个下载)'
+    )
+    
+    parser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='使用异步客户端（连接池 + 页区间并发下载）'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不使用本地K线仓库，重新下载全部数据'
+    )
+    
     parser.add_argument(
         '--validate',
         action='store_true',
@@ -258,7 +334,7 @@ def main():
     
     # 验证模式
     if args.validate:
-        validate_existing_data()
+        validate_existing_data(args.symbol)
         return
     
     # 批量下载模式
@@ -267,7 +343,20 @@ def main():
         download_multiple_symbols(
             symbols=symbols,
             interval=args.interval,
-            days=args.days
+            days=args.days,
+            use_cache=not args.no_cache,
+            workers=args.workers,
+            use_async=args.use_async
+        )
+        return
+    
+    if args.use_async:
+        download_multiple_symbols(
+            symbols=[args.symbol or DataConfig.SYMBOL],
+            interval=args.interval,
+            days=args.days,
+            use_cache=not args.no_cache,
+            use_async=True
         )
         return
     
@@ -275,7 +364,8 @@ def main():
     success = download_data(
         symbol=args.symbol,
         interval=args.interval,
-        days=args.days
+        days=args.days,
+        use_cache=not args.no_cache
     )
     
     if success:
@@ -11,6 +11,8 @@ LSTM 模型评估脚本（综合评估）
     cd binance-prediction
     python scripts/lstm/evaluate.py
 
+多个时间区间上的滚动前向验证（每折重新训练）见 scripts/lstm/walk_forward.py
+
 作者: qinshihuang166
 """
 
@@ -27,8 +29,10 @@ import pandas as pd
 # 添加项目根目录
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config_lstm import DataConfig, PathConfig
+from config_lstm import DataConfig, PathConfig, RunConfig
 from utils.lstm_data_processor import LSTMDataProcessor
+from utils.lstm_windows import predict_in_batches
+from utils.lstm_forecaster import engine_model_path, load_inference_model
 from utils.lstm_metrics import calc_regression_metrics, calc_direction_metrics, calc_naive_baseline
 
 
@@ -40,48 +44,45 @@ def _ensure_matplotlib_backend() -> None:
     matplotlib.use('Agg')
 
 
-def load_model() -> "object":
-    """加载训练好的模型"""
+def load_model(paths: PathConfig, engine: str = 'keras') -> "object":
+    """加载训练好的模型（engine 为 tflite / numpy 时加载 export_lstm.py 导出的文件）"""
+
+    if engine != 'keras':
+        return load_inference_model(engine_model_path(paths, engine), engine)
 
     import tensorflow as tf
 
-    if not os.path.exists(PathConfig.MODEL_PATH):
+    if not os.path.exists(paths.MODEL_PATH):
         raise FileNotFoundError(
-            f"❌ 找不到模型文件: {PathConfig.MODEL_PATH}\n"
-            f"请先训练模型：python scripts/lstm/train_lstm.py"
+            f"❌ 找不到模型文件: {paths.MODEL_PATH}\n"
+            f"请先训练模型：python scripts/lstm/train_lstm.py --symbol {paths.SYMBOL}"
         )
 
-    return tf.keras.models.load_model(PathConfig.MODEL_PATH)
+    return tf.keras.models.load_model(paths.MODEL_PATH)
 
 
 def build_eval_dataset(processor: LSTMDataProcessor) -> dict:
     """构建评估所需的数据集（包含 scaled 和 real 两套 y）"""
 
-    # 1. 原始数据
-    df_raw = processor.load_raw_data()
-    df_raw = processor.clean_data(df_raw)
-    df_raw = processor.add_features(df_raw)
-
-    # 2. 选择特征（原始尺度）
-    df_features_real = processor.select_features(df_raw)
-
-    # 3. 使用训练时的 scaler 做 transform
-    processor.load_scaler(PathConfig.SCALER_PATH)
-    df_features_scaled = processor.normalize_data(df_features_real, fit=False)
+    # 1-3. 原始数据 → 特征（原始尺度）→ 使用训练时的 scaler 做 transform
+    #      重复评估时直接读取特征缓存
+    processor.load_scaler()
+    df_features_real, df_features_scaled = processor.prepare_features(fit=False)
 
     # 4. 构建序列（X 使用 scaled）
     X_all, y_scaled_all = processor.create_sequences(df_features_scaled.values)
 
     # y_true_real：用真实 close 对齐
-    y_real_all = df_features_real['close'].values[DataConfig.TIME_STEPS :]
+    # 多步目标时样本数比 close 序列少 horizon-1 个
+    y_real_all = df_features_real['close'].values[processor.config.TIME_STEPS :][: len(X_all)]
 
     # 5. 划分（按时间顺序）
     X_train, X_val, X_test, y_train_scaled, y_val_scaled, y_test_scaled = processor.split_data(X_all, y_scaled_all)
 
     # 真实价格也按同样切分
     total = len(y_real_all)
-    train_size = int(total * DataConfig.TRAIN_RATIO)
-    val_size = int(total * DataConfig.VAL_RATIO)
+    train_size = int(total * processor.config.TRAIN_RATIO)
+    val_size = int(total * processor.config.VAL_RATIO)
 
     y_train_real = y_real_all[:train_size]
     y_val_real = y_real_all[train_size : train_size + val_size]
@@ -142,29 +143,39 @@ def save_confusion_matrix(cm: np.ndarray, out_path: str) -> None:
 def main() -> None:
     parser = argparse.ArgumentParser(description='LSTM 模型评估脚本')
     parser.add_argument('--symbol', type=str, default=DataConfig.SYMBOL, help='交易对，例如 BTCUSDT')
+    parser.add_argument('--no-feature-cache', action='store_true', help='不使用特征缓存，重新计算特征')
+    parser.add_argument('--tflite', dest='engine', action='store_const', const='tflite', default='keras',
+                        help='评估 export_lstm.py 导出的 TFLite 文件')
+    parser.add_argument('--numpy', dest='engine', action='store_const', const='numpy',
+                        help='评估 export_lstm.py --format numpy 导出的 NumPy 模型')
     args = parser.parse_args()
 
-    # 当前版本：symbol 主要用于展示。若你要训练多币种，建议每个币种单独训练/保存模型。
+    # 每个交易对使用自己的数据、模型和 scaler
+    config = RunConfig.for_symbol(args.symbol)
+    if args.no_feature_cache:
+        config = config.replace(USE_FEATURE_CACHE=False)
+
     print('=' * 70)
     print('📊 LSTM 模型评估')
     print('=' * 70)
     print(f'交易对: {args.symbol}')
 
     # 准备目录
-    PathConfig.create_directories()
+    config.paths.create_directories()
 
     # 加载模型
-    model = load_model()
+    model = load_model(config.paths, args.engine)
 
     # 构建数据
-    processor = LSTMDataProcessor()
+    processor = LSTMDataProcessor(config.data, config.paths)
     data = build_eval_dataset(processor)
 
     X_test = data['X_test']
     y_test_real = data['y_test_real']
 
     # 模型预测（scaled）
-    y_pred_scaled = model.predict(X_test, verbose=0).reshape(-1)
+    # 多步模型取第1步预测 / First horizon of multi-output models
+    y_pred_scaled = predict_in_batches(model, X_test)[:, 0]
 
     # 转回真实价格
     y_pred_real = inverse_close(processor, y_pred_scaled)
@@ -198,7 +209,7 @@ def main() -> None:
 
     # 保存结果
     ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-    out_dir = PathConfig.RESULTS_DIR
+    out_dir = config.paths.RESULTS_DIR
 
     metrics_path = os.path.join(out_dir, f'eval_metrics_{ts}.json')
     pd.DataFrame(
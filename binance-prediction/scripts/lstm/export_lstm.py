@@ -0,0 +1,153 @@
+"""
+LSTM 模型导出（轻量推理文件）
+LSTM Model Export (lightweight inference artifact)
+
+--format tflite（默认）：把训练好的 Keras 模型导出为 TFLite 文件，可选量化：
+- none    : float32，与原模型几乎完全一致
+- float16 : 权重 float16，文件约减半
+- dynamic : 权重 int8（默认），文件约为 1/4，不需要校准数据
+- int8    : 权重和激活都是 int8，用训练集窗口校准
+
+--format numpy：导出权重和结构 (.npz)，由 utils/lstm_numpy.py 用纯 NumPy 推理，
+与 Keras 的输出一致（float32 舍入误差），单向模型还支持逐根K线前进一步。
+
+导出后自动在测试集上与 Keras 模型对比（预测差异、MAE 和方向准确率的变化、
+文件大小、单窗口延迟），报告保存为 JSON。
+TFLite 推理端安装 ai-edge-litert 或 tflite-runtime 后不需要导入 TensorFlow，
+NumPy 模型只需要 NumPy：
+    python scripts/lstm/predict_lstm.py --tflite
+    python scripts/lstm/evaluate.py --numpy
+
+使用：
+    cd binance-prediction
+    python scripts/lstm/export_lstm.py
+    python scripts/lstm/export_lstm.py --symbol ETHUSDT --quantization int8 --calibration-samples 500
+    python scripts/lstm/export_lstm.py --format numpy
+
+作者: qinshihuang166
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config_lstm import DataConfig, ModelConfig, RunConfig
+from utils.lstm_data_processor import LSTMDataProcessor
+from utils.lstm_export import QUANTIZATION_MODES, compare_models, export_tflite, print_export_report
+from utils.lstm_forecaster import engine_model_path, load_inference_model
+from utils.lstm_numpy import NumpyModel
+from utils.lstm_windows import as_batch
+
+CLOSE_INDEX = 3
+
+
+def build_export_dataset(processor: LSTMDataProcessor) -> dict:
+    """训练集窗口（校准用）和测试集窗口 + 真实价格（对比用）"""
+    processor.load_scaler()
+    df_features_real, df_features_scaled = processor.prepare_features(fit=False)
+    X_all, y_all = processor.create_sequences(df_features_scaled.values)
+    X_train, _, X_test, _, _, _ = processor.split_data(X_all, y_all)
+
+    T = processor.config.TIME_STEPS
+    y_real_all = df_features_real['close'].values[T:][:len(X_all)]
+    return {
+        'X_train': X_train,
+        'X_test': X_test,
+        'y_test_real': y_real_all[len(y_real_all) - len(X_test):],
+    }
+
+
+def calibration_windows(X, n_samples: int) -> np.ndarray:
+    """在训练集上等间隔取 n_samples 个窗口"""
+    n = min(n_samples, len(X))
+    index = np.unique(np.linspace(0, len(X) - 1, n).astype(int))
+    return np.stack([as_batch(X, i, i + 1)[0] for i in index])
+
+
+def inverse_close(processor: LSTMDataProcessor, close_scaled: np.ndarray) -> np.ndarray:
+    """把 scaled close 反归一化成真实价格"""
+    close_scaled = np.asarray(close_scaled).reshape(-1)
+    full = np.zeros((len(close_scaled), len(processor.feature_columns)), dtype=float)
+    full[:, CLOSE_INDEX] = close_scaled
+    return processor.scaler.inverse_transform(full)[:, CLOSE_INDEX]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='LSTM 模型导出 / Export a lightweight inference model')
+    parser.add_argument('--symbol', type=str, default=DataConfig.SYMBOL, help='交易对，例如 BTCUSDT')
+    parser.add_argument('--format', type=str, default='tflite', choices=['tflite', 'numpy'],
+                        help='导出格式：TFLite 文件或 NumPy 权重')
+    parser.add_argument('--quantization', type=str, default=ModelConfig.EXPORT_QUANTIZATION,
+                        choices=QUANTIZATION_MODES, help='量化方式（只用于 TFLite）')
+    parser.add_argument('--calibration-samples', type=int, default=ModelConfig.EXPORT_CALIBRATION_SAMPLES,
+                        help='int8 量化的校准窗口数')
+    args = parser.parse_args()
+
+    config = RunConfig.for_symbol(args.symbol)
+    paths = config.paths
+
+    print('=' * 70)
+    print('📦 LSTM 模型导出')
+    print('=' * 70)
+    quantization = args.quantization if args.format == 'tflite' else 'none'
+    print(f'交易对: {args.symbol}, 格式: {args.format}, 量化方式: {quantization}')
+
+    if not os.path.exists(paths.MODEL_PATH):
+        print(f"❌ 模型文件不存在: {paths.MODEL_PATH}")
+        print(f"\n💡 请先训练模型: python scripts/lstm/train_lstm.py --symbol {args.symbol}")
+        sys.exit(1)
+
+    import tensorflow as tf
+
+    print(f"📂 加载模型: {paths.MODEL_PATH}")
+    model = tf.keras.models.load_model(paths.MODEL_PATH, compile=False)
+
+    # 窗口长度和预测步数以模型为准（可能用预设配置训练）
+    config = config.replace(TIME_STEPS=int(model.input_shape[1]),
+                            PREDICTION_HORIZON=int(model.output_shape[-1]))
+
+    processor = LSTMDataProcessor(config.data, paths)
+    data = build_export_dataset(processor)
+
+    export_path = engine_model_path(paths, args.format)
+    if args.format == 'numpy':
+        print("\n🔄 导出 NumPy 权重...")
+        size = NumpyModel.from_keras(model).save(export_path)
+    else:
+        calibration = None
+        if quantization == 'int8':
+            calibration = calibration_windows(data['X_train'], args.calibration_samples)
+            print(f"\n🎯 校准窗口: {len(calibration)} 个（训练集）")
+        print("\n🔄 转换为 TFLite...")
+        size = export_tflite(model, export_path, quantization, calibration)
+    print(f"✓ 已导出: {export_path}")
+
+    lite_model = load_inference_model(export_path, args.format)
+    report = compare_models(model, lite_model, data['X_test'], data['y_test_real'],
+                            lambda close: inverse_close(processor, close))
+    report.update({
+        'symbol': args.symbol,
+        'format': args.format,
+        'quantization': quantization,
+        'keras_size_kb': os.path.getsize(paths.MODEL_PATH) / 1024,
+        'lite_size_kb': size / 1024,
+        'model_path': paths.MODEL_PATH,
+        'export_path': export_path,
+    })
+    print_export_report(report)
+
+    report_path = paths.export_report_path(args.format)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 导出报告已保存: {report_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,25 +18,52 @@ from datetime import datetime, timedelta
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from config_lstm import DataConfig, PathConfig
-from utils.lstm_data_processor import LSTMDataProcessor
+from config_lstm import DataConfig, RunConfig
+from utils.lstm_data_processor import LSTMDataProcessor, append_symbol_column
 from utils.binance_client import BinanceUtility
+from utils.lstm_forecaster import MultiStepForecaster, engine_model_path, load_inference_model
 import warnings
 warnings.filterwarnings('ignore')
 
 
-def load_model_and_scaler():
-    """加载训练好的模型和scaler"""
-    import tensorflow as tf
+def resolve_model_paths(config: RunConfig, engine: str = 'keras'):
+    """
+    交易对实际使用的模型路径：该交易对没有单独训练的模型时，回退到默认交易对的模型
+    
+    Returns:
+        PathConfig（模型和 scaler 总是来自同一个交易对）
+    """
+    paths = config.paths
+    if not os.path.exists(engine_model_path(paths, engine)) and config.data.SYMBOL != DataConfig.SYMBOL:
+        default_paths = RunConfig().paths
+        if os.path.exists(engine_model_path(default_paths, engine)):
+            print(f"⚠️ 没有 {config.data.SYMBOL} 的模型，使用 {DataConfig.SYMBOL} 的模型和 scaler")
+            return default_paths
+    return paths
+
+
+def load_model_and_scaler(config: RunConfig, engine: str = 'keras', paths=None):
+    """
+    加载交易对对应的模型和scaler
+    
+    该交易对没有单独训练的模型时，回退到默认交易对的模型
     
-    model_path = PathConfig.MODEL_PATH
-    scaler_path = PathConfig.SCALER_PATH
+    Args:
+        config: 运行配置
+        engine: 'keras'，或 export_lstm.py 导出的 'tflite' / 'numpy'（不导入 TensorFlow）
+        paths: 已经用 resolve_model_paths 解析过的路径（默认当场解析）
+    """
+    paths = paths or resolve_model_paths(config, engine)
+    model_path = engine_model_path(paths, engine)
+    scaler_path = paths.SCALER_PATH
     
     # 检查文件是否存在
     if not os.path.exists(model_path):
         print(f"❌ 模型文件不存在: {model_path}")
         print("\n💡 请先训练模型:")
         print("   python scripts/lstm/train_lstm.py")
+        if engine != 'keras':
+            print(f"   python scripts/lstm/export_lstm.py --format {engine}")
         sys.exit(1)
     
     if not os.path.exists(scaler_path):
@@ -47,16 +74,44 @@ def load_model_and_scaler():
     
     # 加载模型
     print(f"📂 加载模型: {model_path}")
-    model = tf.keras.models.load_model(model_path)
+    if engine == 'keras':
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model_path)
+    else:
+        model = load_inference_model(model_path, engine)
     
     # 加载scaler
     print(f"📂 加载Scaler: {scaler_path}")
-    processor = LSTMDataProcessor()
+    processor = LSTMDataProcessor(config.data, paths)
     processor.load_scaler(scaler_path)
     
     return model, processor
 
 
+def load_panel_model(config: RunConfig):
+    """
+    加载面板模型（多个交易对共用）和每个交易对的 scaler
+    
+    Returns:
+        (model, {交易对: 数据处理器}, 元数据)
+    """
+    import tensorflow as tf
+    import utils.lstm_model_builder  # noqa: F401  注册 SymbolEmbedding 层
+    
+    paths = config.paths.panel_paths()
+    for path in (paths.MODEL_PATH, paths.PANEL_META_PATH):
+        if not os.path.exists(path):
+            print(f"❌ 面板模型文件不存在: {path}")
+            print("\n💡 请先训练面板模型:")
+            print("   python scripts/lstm/train_lstm.py --panel")
+            sys.exit(1)
+    
+    print(f"📂 加载面板模型: {paths.MODEL_PATH}")
+    model = tf.keras.models.load_model(paths.MODEL_PATH, compile=False)
+    processors, meta = LSTMDataProcessor(config.data, paths).load_panel_processors()
+    return model, processors, meta
+
+
 def prepare_recent_data(processor, symbol, interval, time_steps):
     """准备最近的数据用于预测"""
     print(f"\n📥 获取最新数据...")
@@ -113,34 +168,118 @@ def predict_next_price(model, X, processor):
     return predicted_price
 
 
+def inverse_close(processor, close_scaled):
+    """把归一化的 close 反归一化成真实价格（形状保持不变）"""
+    close_scaled = np.asarray(close_scaled, dtype=float)
+    full = np.zeros((close_scaled.size, len(processor.feature_columns)))
+    full[:, 3] = close_scaled.reshape(-1)  # close在索引3
+    return processor.scaler.inverse_transform(full)[:, 3].reshape(close_scaled.shape)
+
+
 def predict_multiple_steps(model, X, processor, steps):
-    """预测未来多个时间步"""
-    predictions = []
-    current_X = X.copy()
-    
-    for i in range(steps):
-        # 预测下一个值
-        prediction_scaled = model.predict(current_X, verbose=0)
-        predictions.append(prediction_scaled[0, 0])
+    """
+    预测未来多个时间步
+    
+    使用编译好的单步推理函数和环形缓冲区递归预测；模型带多步输出头时一次前向完成。
+    X 的第一维可以是多个交易对/情景，整批一起预测。
+    
+    Args:
+        model: 训练好的模型
+        X: (batch, time_steps, features) 归一化窗口
+        processor: 带 scaler 的数据处理器
+        steps: 预测步数
         
-        # 更新输入（滑动窗口）
-        # 将新预测添加到序列末尾，移除最旧的数据点
-        new_point = current_X[0, -1, :].copy()  # 复制最后一个点的所有特征
-        new_point[3] = prediction_scaled[0, 0]  # 更新close值
+    Returns:
+        batch 为 1 时返回 (steps,) 的价格，否则返回 (batch, steps)
+    """
+    forecaster = MultiStepForecaster(model)
+    predicted_prices = inverse_close(processor, forecaster.forecast(X, steps))
+    
+    if predicted_prices.shape[0] == 1:
+        return predicted_prices[0]
+    return predicted_prices
+
+
+def run_batch_forecast(symbols, steps, config: RunConfig, engine: str = 'keras'):
+    """
+    多个交易对一起预测：每个交易对用自己的模型和 scaler，
+    使用同一个模型文件的交易对（包括回退到默认模型的）拼成一个批次，一次前向计算
+    """
+    groups = {}
+    for symbol in symbols:
+        symbol_config = config.replace(SYMBOL=symbol)
+        paths = resolve_model_paths(symbol_config, engine)
+        groups.setdefault(engine_model_path(paths, engine), (symbol_config, paths, []))[2].append(symbol)
+    
+    current_prices, predicted_prices = {}, {}
+    for symbol_config, paths, group in groups.values():
+        model, processor = load_model_and_scaler(symbol_config, engine, paths)
+        # 窗口长度以模型为准（可能用预设配置训练）
+        time_steps = int(model.input_shape[1])
+        windows = []
+        for symbol in group:
+            print(f"\n🔹 {symbol}")
+            X, df = prepare_recent_data(processor, symbol, config.data.INTERVAL, time_steps)
+            windows.append(X[0])
+            current_prices[symbol] = df['close'].iloc[-1]
         
-        # 滚动窗口
-        current_X = np.roll(current_X, -1, axis=1)
-        current_X[0, -1, :] = new_point
+        prices = np.asarray(predict_multiple_steps(model, np.stack(windows), processor, steps))
+        predicted_prices.update(zip(group, prices.reshape(len(group), steps)))
     
-    # 反归一化所有预测
-    predictions_array = np.array(predictions).reshape(-1, 1)
-    full_predictions = np.zeros((len(predictions), len(processor.feature_columns)))
-    full_predictions[:, 3] = predictions_array.flatten()
+    report_batch_forecast(symbols, [current_prices[s] for s in symbols],
+                          np.stack([predicted_prices[s] for s in symbols]), steps, config)
+
+
+def run_panel_forecast(model, processors, meta, symbols, steps, config: RunConfig):
+    """
+    面板模型批量预测：每个交易对用自己的 scaler 归一化并追加编号列，
+    所有交易对的窗口拼成一个批次，一次前向计算
+    """
+    windows, current_prices = [], []
+    for symbol in symbols:
+        if symbol not in processors:
+            print(f"❌ 面板模型没有训练过 {symbol}（可用: {', '.join(meta['symbols'])}）")
+            sys.exit(1)
+        print(f"\n🔹 {symbol}")
+        X, df = prepare_recent_data(processors[symbol], symbol, config.data.INTERVAL, meta['time_steps'])
+        windows.append(append_symbol_column(X[0], meta['symbols'].index(symbol)))
+        current_prices.append(df['close'].iloc[-1])
+    
+    scaled = MultiStepForecaster(model).forecast(np.stack(windows), steps)
+    predicted_prices = np.stack([inverse_close(processors[symbol], row) for symbol, row in zip(symbols, scaled)])
+    report_batch_forecast(symbols, current_prices, predicted_prices, steps, config)
+
+
+def report_batch_forecast(symbols, current_prices, predicted_prices, steps, config: RunConfig):
+    """打印并保存批量预测结果"""
+    summary = pd.DataFrame({
+        'symbol': symbols,
+        'current_price': current_prices,
+        'final_price': predicted_prices[:, -1],
+    })
+    summary['change_pct'] = (summary['final_price'] - summary['current_price']) / summary['current_price'] * 100
     
-    predictions_real = processor.scaler.inverse_transform(full_predictions)
-    predicted_prices = predictions_real[:, 3]
+    print("\n" + "="*70)
+    print(f"📊 {len(symbols)} 个交易对未来 {steps} 步预测（最终价格）")
+    print("="*70)
+    print(summary.to_string(index=False))
+    print("="*70)
     
-    return predicted_prices
+    save_path = os.path.join(config.paths.RESULTS_DIR, f'predictions_batch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+    pd.DataFrame(predicted_prices, index=symbols,
+                 columns=[f'step_{i + 1}' for i in range(steps)]).to_csv(save_path, index_label='symbol')
+    print(f"\n💾 预测结果已保存: {save_path}")
+
+
+def print_disclaimer():
+    """免责声明"""
+    print("\n" + "="*70)
+    print("⚠️  免责声明")
+    print("="*70)
+    print("本预测仅供参考，不构成投资建议。")
+    print("加密货币交易存在高风险，请谨慎决策。")
+    print("历史数据不能保证未来表现。")
+    print("="*70)
 
 
 def main():
@@ -159,6 +298,16 @@ def main():
   # 预测ETH价格
   python predict_lstm.py --symbol ETHUSDT
   
+  # 多个交易对一起预测未来24小时（一个批次）
+  python predict_lstm.py --symbols BTCUSDT,ETHUSDT,BNBUSDT --steps 24
+  
+  # 面板模型：一个模型、一次前向预测所有交易对
+  python predict_lstm.py --panel --steps 24
+  
+  # 使用导出的 TFLite 文件或 NumPy 模型（export_lstm.py），不需要完整的 TensorFlow
+  python predict_lstm.py --tflite --steps 24
+  python predict_lstm.py --numpy --steps 24
+  
   # 显示详细信息
   python predict_lstm.py --verbose
         """
@@ -171,6 +320,13 @@ def main():
         help=f'交易对符号 (默认: {DataConfig.SYMBOL})'
     )
     
+    parser.add_argument(
+        '--symbols',
+        type=str,
+        default=None,
+        help='逗号分隔的多个交易对，整批一起预测 (例如: BTCUSDT,ETHUSDT)'
+    )
+    
     parser.add_argument(
         '--steps',
         type=int,
@@ -178,6 +334,29 @@ def main():
         help='预测未来多少个时间步 (默认: 1)'
     )
     
+    parser.add_argument(
+        '--panel',
+        action='store_true',
+        help='使用面板模型（train_lstm.py --panel 训练），默认预测它训练过的所有交易对'
+    )
+    
+    parser.add_argument(
+        '--tflite',
+        dest='engine',
+        action='store_const',
+        const='tflite',
+        default='keras',
+        help='使用 export_lstm.py 导出的 TFLite 文件推理'
+    )
+    
+    parser.add_argument(
+        '--numpy',
+        dest='engine',
+        action='store_const',
+        const='numpy',
+        help='使用 export_lstm.py --format numpy 导出的 NumPy 模型推理（只需要 NumPy）'
+    )
+    
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -189,13 +368,34 @@ def main():
     print("="*70)
     print(" "*20 + "🔮 LSTM 价格预测")
     print("="*70)
-    print(f"\n交易对: {args.symbol}")
+    print(f"\n交易对: {args.symbols or args.symbol}")
     print(f"预测步数: {args.steps}")
     print("="*70)
     
+    if args.panel:
+        print("\n⚙️ 步骤 1: 加载面板模型")
+        model, processors, meta = load_panel_model(RunConfig())
+        symbols = ([s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+                   if args.symbols else list(meta['symbols']))
+        config = RunConfig().replace(INTERVAL=meta['interval'])
+        print("\n⚙️ 步骤 2-3: 准备数据并批量预测")
+        run_panel_forecast(model, processors, meta, symbols, args.steps, config)
+        print_disclaimer()
+        return
+    
+    if args.symbols:
+        # 每个交易对加载自己的模型和 scaler
+        symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+        print("\n⚙️ 步骤 1-3: 加载模型、准备数据并批量预测")
+        run_batch_forecast(symbols, args.steps, RunConfig(), engine=args.engine)
+        print_disclaimer()
+        return
+    
+    config = RunConfig.for_symbol(args.symbol)
+    
     # 1. 加载模型和scaler
     print("\n⚙️ 步骤 1: 加载模型")
-    model, processor = load_model_and_scaler()
+    model, processor = load_model_and_scaler(config, engine=args.engine)
     
     if args.verbose:
         print("\n模型架构:")
@@ -206,8 +406,8 @@ def main():
     X, df_original = prepare_recent_data(
         processor, 
         args.symbol, 
-        DataConfig.INTERVAL,
-        DataConfig.TIME_STEPS
+        config.data.INTERVAL,
+        int(model.input_shape[1])  # 窗口长度以模型为准
     )
     
     # 3. 进行预测
@@ -257,7 +457,7 @@ def main():
         interval_minutes = {
             '1m': 1, '5m': 5, '15m': 15, '30m': 30,
             '1h': 60, '2h': 120, '4h': 240, '1d': 1440
-        }.get(DataConfig.INTERVAL, 60)
+        }.get(config.data.INTERVAL, 60)
         
         for i in range(1, args.steps + 1):
             future_time = current_time + timedelta(minutes=interval_minutes * i)
@@ -296,18 +496,11 @@ def main():
         print("="*70)
         
         # 保存预测结果
-        save_path = os.path.join(PathConfig.RESULTS_DIR, f'predictions_{args.symbol}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
+        save_path = os.path.join(config.paths.RESULTS_DIR, f'predictions_{args.symbol}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
         predictions_df.to_csv(save_path, index=False)
         print(f"\n💾 预测结果已保存: {save_path}")
     
-    # 免责声明
-    print("\n" + "="*70)
-    print("⚠️  免责声明")
-    print("="*70)
-    print("本预测仅供参考，不构成投资建议。")
-    print("加密货币交易存在高风险，请谨慎决策。")
-    print("历史数据不能保证未来表现。")
-    print("="*70)
+    print_disclaimer()
 
 
 if __name__ == "__main__":
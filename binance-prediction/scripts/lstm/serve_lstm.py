@@ -0,0 +1,563 @@
+"""
+LSTM 常驻预测服务
+LSTM Model Server
+
+predict_lstm.py 每次运行都要导入 TensorFlow、加载模型和 scaler、下载数据，
+冷启动需要数秒。这个服务常驻内存：
+- 启动时加载所有交易对的模型和 scaler，并做一次预热前向（编译推理函数）
+- 后台线程在每根K线收盘后刷新特征窗口（下载、指标、归一化都不在请求路径上）
+- 请求只做一次前向计算；同一根K线内相同步数的请求直接返回缓存结果
+- 模型文件被重新训练覆盖后，下一次刷新时自动热加载
+- --panel：所有交易对共用一个面板模型（train_lstm.py --panel），内存中只有一个模型，
+  /api/lstm/predict 把所有交易对的窗口拼成一个批次一次预测
+- --numpy / --tflite：使用 export_lstm.py 导出的模型，服务进程不需要导入 TensorFlow
+- --streaming：保存每个交易对的循环层状态，每根新K线只前进一步（单向模型），
+  定期用完整窗口重新同步（utils/lstm_streaming.py）
+The server keeps every symbol's model and scaler in memory, refreshes the
+feature windows in a background thread after each candle close and answers
+requests with a single forward pass over the cached window.
+
+作者: qinshihuang166
+使用方法:
+    python serve_lstm.py                              # 加载 lstm_models/ 下所有模型
+    python serve_lstm.py --symbols BTCUSDT,ETHUSDT    # 只加载指定交易对
+    python serve_lstm.py --port 5001
+    python serve_lstm.py --panel                      # 一个面板模型服务所有交易对
+    python serve_lstm.py --numpy                      # 纯 NumPy 推理（export_lstm.py --format numpy）
+    python serve_lstm.py --streaming --resync-every 240  # 流式推理，每根K线只前进一步
+
+    curl http://127.0.0.1:5001/api/lstm/predict/BTCUSDT?steps=24
+    curl http://127.0.0.1:5001/api/lstm/predict?steps=24&symbols=BTCUSDT,ETHUSDT
+    curl http://127.0.0.1:5001/health
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+import threading
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify, request
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config_lstm import DataConfig, ModelConfig, PathConfig, RunConfig
+from utils.lstm_data_processor import LSTMDataProcessor, append_symbol_column
+from utils.binance_client import BinanceUtility
+from utils.market_data_cache import INTERVAL_SECONDS, next_candle_close
+from utils.lstm_forecaster import MultiStepForecaster, engine_model_path, load_inference_model
+from utils.lstm_streaming import StreamingForecaster
+import warnings
+warnings.filterwarnings('ignore')
+
+# 技术指标预热需要的额外K线数
+INDICATOR_WARMUP = 200
+
+
+def discover_symbols(models_dir: str = PathConfig.MODELS_DIR, engine: str = 'keras'):
+    """找出同时有模型（该推理引擎的文件）和 scaler 的交易对"""
+    # 文件名后缀，例如 '_lstm_model.h5' / '_lstm_model.npz'
+    suffix = os.path.basename(engine_model_path(PathConfig(SYMBOL='', MODELS_DIR=models_dir), engine))
+    symbols = []
+    for path in sorted(glob.glob(os.path.join(models_dir, '*' + suffix))):
+        symbol = os.path.basename(path)[:-len(suffix)]
+        if os.path.exists(PathConfig(SYMBOL=symbol, MODELS_DIR=models_dir).SCALER_PATH):
+            symbols.append(symbol)
+    return symbols
+
+
+def discover_panel_symbols(paths: PathConfig = None):
+    """面板模型训练过的交易对"""
+    meta_path = (paths or PathConfig()).PANEL_META_PATH
+    if not os.path.exists(meta_path):
+        return []
+    return list(joblib.load(meta_path)['symbols'])
+
+
+class ModelRegistry:
+    """
+    常驻的模型注册表 / Warm model registry
+
+    每个交易对保存：模型、编译好的预测器、带 scaler 的数据处理器，以及最近一次
+    刷新得到的归一化窗口。刷新时先在锁外构建新快照，再在锁内整体替换，
+    请求线程看到的永远是完整的一份快照。
+
+    面板模式下所有交易对共用一个模型和一个编译好的推理函数，每个交易对只保存
+    scaler 和窗口（窗口最后一列是交易对编号），内存几乎不随交易对数量增长。
+
+    流式模式下快照里还有该交易对的循环层状态 (stream)：刷新时正好多了一根收盘K线
+    就只前进一步，K线有缺口、模型热加载或到了重新同步周期时用完整窗口重新计算。
+    """
+
+    def __init__(self, symbols, interval: str = DataConfig.INTERVAL,
+                 time_steps: int = DataConfig.TIME_STEPS, client=None, config: RunConfig = None,
+                 panel: bool = False, engine: str = 'keras', streaming: bool = False,
+                 resync_every: int = ModelConfig.STREAM_RESYNC_EVERY):
+        """
+        Args:
+            symbols: 要加载的交易对列表
+            interval: K线间隔
+            time_steps: 模型加载前使用的窗口长度；加载后每个交易对以模型的 input_shape[1] 为准
+            client: BinanceUtility 或 BackgroundAsyncClient（默认新建 BinanceUtility，所有交易对共用）
+            config: 基础配置，每个交易对在此基础上生成自己的 RunConfig
+            panel: 是否使用面板模型（所有交易对共用一个模型）
+            engine: 推理引擎 'keras' / 'tflite' / 'numpy'（后两个使用 export_lstm.py 导出的文件）
+            streaming: 流式推理（只适用于单向模型，engine 为 keras 或 numpy）
+            resync_every: 流式推理每多少根K线用完整窗口重新同步一次
+        """
+        self.symbols = list(symbols)
+        self.config = config or RunConfig()
+        self.interval = interval
+        self.interval_seconds = INTERVAL_SECONDS.get(interval, 3600)
+        self.time_steps = time_steps
+        self.client = client or BinanceUtility()
+        self.panel = panel
+        self.engine = engine
+        self.streaming = streaming
+        self.resync_every = resync_every
+        self.shared = None  # 面板模式下共享的模型/推理函数/scaler
+        self.entries = {}
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # 加载模型 / Loading
+    # ------------------------------------------------------------------
+
+    def model_path(self, symbol: str) -> str:
+        """交易对使用的模型文件（面板模式下所有交易对相同）"""
+        if self.panel:
+            return engine_model_path(self.config.paths.panel_paths(), self.engine)
+        return engine_model_path(self.config.replace(SYMBOL=symbol).paths, self.engine)
+
+    def load_panel(self) -> dict:
+        """加载共享的面板模型（模型文件未变化时直接复用），并预热推理函数"""
+        model_path = self.model_path(None)
+        model_mtime = os.path.getmtime(model_path)
+        shared = self.shared
+        if shared is not None and shared['model_mtime'] == model_mtime:
+            return shared
+
+        print(f"📂 加载面板模型: {model_path}")
+        model = load_inference_model(model_path, self.engine)
+        processors, meta = LSTMDataProcessor(self.config.data, self.config.paths).load_panel_processors()
+        forecaster = MultiStepForecaster(model)
+        forecaster.predict_step(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32))
+
+        self.shared = {'forecaster': forecaster, 'streamer': self._streamer(model), 'processors': processors,
+                       'symbols': list(meta['symbols']), 'model_mtime': model_mtime,
+                       'time_steps': int(model.input_shape[1])}
+        return self.shared
+
+    def load(self, symbol: str):
+        """加载（或重新加载）一个交易对的模型和 scaler，并预热推理函数"""
+        symbol_id = None
+        if self.panel:
+            shared = self.load_panel()
+            if symbol not in shared['processors']:
+                raise KeyError(f"面板模型没有训练过 {symbol}")
+            forecaster, streamer, processor = shared['forecaster'], shared['streamer'], shared['processors'][symbol]
+            symbol_id = shared['symbols'].index(symbol)
+            model_mtime, time_steps = shared['model_mtime'], shared['time_steps']
+        else:
+            config = self.config.replace(SYMBOL=symbol)
+            model_path, scaler_path = self.model_path(symbol), config.paths.SCALER_PATH
+            print(f"📂 加载模型: {model_path}")
+            model = load_inference_model(model_path, self.engine)
+            processor = LSTMDataProcessor(config.data, config.paths)
+            processor.load_scaler(scaler_path)
+
+            forecaster = MultiStepForecaster(model)
+            # 预热：第一次调用会追踪并编译推理函数
+            forecaster.predict_step(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32))
+            streamer = self._streamer(model)
+            model_mtime = os.path.getmtime(model_path)
+            # 窗口长度以模型为准（可能用 --quick-test 等预设训练）
+            time_steps = int(model.input_shape[1])
+
+        entry = {
+            'forecaster': forecaster,
+            'streamer': streamer,
+            'stream': None,
+            'processor': processor,
+            'symbol_id': symbol_id,
+            'model_mtime': model_mtime,
+            'time_steps': time_steps,
+            'window': None,
+            'current_price': None,
+            'last_candle': None,
+            'refreshed_at': None,
+            'cache': {},
+        }
+        with self.lock:
+            previous = self.entries.get(symbol)
+            if previous is not None and previous['window'] is not None:
+                # 热加载时保留已有窗口，新模型立即可用
+                for key in ('window', 'current_price', 'last_candle', 'refreshed_at'):
+                    entry[key] = previous[key]
+            self.entries[symbol] = entry
+        return entry
+
+    def _streamer(self, model):
+        """流式模式下的逐步预测器（非流式模式返回 None）"""
+        if not self.streaming:
+            return None
+        return StreamingForecaster(model, resync_every=self.resync_every)
+
+    def load_all(self):
+        for symbol in self.symbols:
+            self.load(symbol)
+        if self.panel:
+            print(f"✅ 面板模型已加载，服务 {len(self.entries)} 个交易对: {list(self.entries)}")
+        else:
+            print(f"✅ 已加载 {len(self.entries)} 个模型: {list(self.entries)}")
+
+    # ------------------------------------------------------------------
+    # 刷新特征窗口 / Refreshing windows
+    # ------------------------------------------------------------------
+
+    def lookback_start(self, time_steps: int = None) -> str:
+        """
+        下载K线的起点（窗口长度 + 指标预热）
+
+        Args:
+            time_steps: 窗口长度；默认取已加载模型中最长的（还没有模型时用构造参数）
+        """
+        if time_steps is None:
+            with self.lock:
+                loaded = [entry['time_steps'] for entry in self.entries.values()]
+            time_steps = max(loaded, default=self.time_steps)
+        lookback_minutes = (time_steps + INDICATOR_WARMUP) * self.interval_seconds // 60
+        return f'{lookback_minutes} minutes ago UTC'
+
+    def fetch_closed_candles(self, symbol: str, df: pd.DataFrame = None,
+                             time_steps: int = None) -> pd.DataFrame:
+        """下载最近的K线（或使用已下载的 df），只保留已收盘的"""
+        if df is None:
+            df = self.client.fetch_historical_data(symbol, self.interval, self.lookback_start(time_steps))
+        if df is None or df.empty:
+            raise ValueError(f"无法获取 {symbol} 的数据")
+
+        df = df.copy()
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # 最后一根K线可能尚未收盘（收盘时间晚于当前时间），不参与预测
+        close_time = df['timestamp'] + pd.Timedelta(seconds=self.interval_seconds)
+        df = df[close_time <= pd.Timestamp.now(tz='UTC').tz_localize(None)]
+        return df.set_index('timestamp')
+
+    def refresh(self, symbol: str, raw: pd.DataFrame = None):
+        """
+        重新构建一个交易对的归一化窗口
+
+        Args:
+            symbol: 交易对
+            raw: 已下载的K线（为 None 时在这里下载）
+        """
+        with self.lock:
+            entry = self.entries[symbol]
+
+        # 模型文件被重新训练覆盖 → 热加载
+        if os.path.getmtime(self.model_path(symbol)) != entry['model_mtime']:
+            print(f"🔄 检测到新模型，重新加载: {symbol}")
+            entry = self.load(symbol)
+
+        processor, time_steps = entry['processor'], entry['time_steps']
+        df = self.fetch_closed_candles(symbol, raw, time_steps)
+        df = processor.clean_data(df)
+        df = processor.add_features(df)
+        df = processor.select_features(df)
+        if len(df) < time_steps:
+            raise ValueError(f"{symbol} 的有效数据不足 {time_steps} 行")
+
+        window = processor.normalize_data(df, fit=False).values[-time_steps:]
+        if entry['symbol_id'] is not None:
+            window = append_symbol_column(window, entry['symbol_id'])
+        window = window[None].astype(np.float32)
+        snapshot = {
+            'window': window,
+            'stream': self._advance_stream(entry, window, df.index[-1]),
+            'current_price': float(df['close'].iloc[-1]),
+            'last_candle': str(df.index[-1]),
+            'refreshed_at': datetime.now().isoformat(timespec='seconds'),
+            'cache': {},
+        }
+        with self.lock:
+            self.entries[symbol].update(snapshot)
+
+    def _advance_stream(self, entry: dict, window: np.ndarray, last_candle: pd.Timestamp):
+        """
+        流式状态：正好多了一根收盘K线 → 前进一步（到期时用 window 重新同步）；
+        没有新K线 → 保持不变；第一次刷新或K线有缺口 → 用完整窗口重新计算
+        """
+        streamer, stream = entry['streamer'], entry['stream']
+        if streamer is None:
+            return None
+        if stream is None or entry['last_candle'] is None:
+            return streamer.start(window)
+        elapsed = (last_candle - pd.Timestamp(entry['last_candle'])).total_seconds()
+        if elapsed == 0:
+            return stream
+        if elapsed == self.interval_seconds:
+            return streamer.advance(stream, window[:, -1], window)
+        return streamer.start(window)
+
+    def refresh_all(self):
+        frames = {}
+        if hasattr(self.client, 'fetch_many'):
+            # 异步客户端：所有交易对的K线并发下载
+            frames = self.client.fetch_many(self.symbols, self.interval, self.lookback_start())
+        for symbol in self.symbols:
+            try:
+                self.refresh(symbol, frames.get(symbol))
+            except Exception as e:
+                print(f"⚠️ 刷新 {symbol} 失败: {e}")
+
+    def seconds_until_next_close(self, grace: float) -> float:
+        """距离下一根K线收盘（再加 grace 秒）的时间"""
+        now = time.time()
+        return next_candle_close(self.interval, now) + grace - now
+
+    def start_background_refresh(self, grace: float = 5.0) -> threading.Thread:
+        """后台线程：每根K线收盘后 grace 秒刷新所有交易对"""
+        def _loop():
+            while not self._stop.wait(self.seconds_until_next_close(grace)):
+                self.refresh_all()
+
+        thread = threading.Thread(target=_loop, name='lstm-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # 预测 / Prediction
+    # ------------------------------------------------------------------
+
+    def predict(self, symbol: str, steps: int = 1) -> dict:
+        """
+        用缓存的窗口预测未来 steps 步
+
+        Returns:
+            JSON 可序列化的结果字典
+        """
+        with self.lock:
+            entry = self.entries.get(symbol)
+            if entry is None:
+                raise KeyError(symbol)
+            window, stream = entry['window'], entry['stream']
+            cached = entry['cache'].get(steps)
+            snapshot = {k: entry[k] for k in ('current_price', 'last_candle', 'refreshed_at')}
+        if window is None:
+            raise RuntimeError(f"{symbol} 的特征窗口尚未就绪")
+
+        if cached is None:
+            if stream is not None:
+                scaled = entry['streamer'].forecast(stream, steps)[0]
+            else:
+                scaled = entry['forecaster'].forecast(window, steps)[0]
+            cached = self._store(symbol, entry, window, steps, scaled)
+        return self._result(symbol, steps, cached, snapshot)
+
+    def predict_many(self, symbols=None, steps: int = 1) -> dict:
+        """
+        多个交易对一起预测 / Predict many symbols at once
+
+        面板模式下所有未命中缓存的窗口拼成一个批次，只做一次前向计算；
+        单交易对模式下每个交易对用自己的模型逐个预测。
+
+        Returns:
+            {'predictions': [...], 'not_ready': [...]}
+        """
+        if not self.panel:
+            predictions, not_ready = [], []
+            for symbol in symbols or list(self.entries):
+                try:
+                    predictions.append(self.predict(symbol, steps))
+                except (KeyError, RuntimeError):
+                    not_ready.append(symbol)
+            return {'predictions': predictions, 'not_ready': not_ready}
+
+        with self.lock:
+            symbols = symbols or list(self.entries)
+            ready, not_ready, streams = [], [], {}
+            for symbol in symbols:
+                entry = self.entries.get(symbol)
+                if entry is None or entry['window'] is None:
+                    not_ready.append(symbol)
+                    continue
+                snapshot = {k: entry[k] for k in ('current_price', 'last_candle', 'refreshed_at')}
+                ready.append((symbol, entry, entry['window'], entry['cache'].get(steps), snapshot))
+                streams[symbol] = entry['stream']
+
+        prices = {symbol: cached for symbol, _, _, cached, _ in ready if cached is not None}
+        pending = [item for item in ready if item[3] is None]
+        if self.streaming:
+            # 流式状态每个交易对单独保存，逐个从状态预测（每个只需几次单步计算）
+            for symbol, entry, window, _, _ in pending:
+                stream = streams[symbol]
+                scaled = (entry['streamer'].forecast(stream, steps) if stream is not None
+                          else entry['forecaster'].forecast(window, steps))
+                prices[symbol] = self._store(symbol, entry, window, steps, scaled[0])
+        elif pending:
+            # 共用一个模型：所有窗口一个批次，一次前向计算
+            batch = np.concatenate([window for _, _, window, _, _ in pending])
+            scaled = pending[0][1]['forecaster'].forecast(batch, steps)
+            for (symbol, entry, window, _, _), row in zip(pending, scaled):
+                prices[symbol] = self._store(symbol, entry, window, steps, row)
+
+        predictions = [self._result(symbol, steps, prices[symbol], snapshot)
+                       for symbol, _, _, _, snapshot in ready]
+        return {'predictions': predictions, 'not_ready': not_ready}
+
+    def _store(self, symbol: str, entry: dict, window: np.ndarray, steps: int, scaled: np.ndarray) -> list:
+        """反归一化并写入缓存（期间窗口被刷新时不写）"""
+        processor = entry['processor']
+        full = np.zeros((steps, len(processor.feature_columns)))
+        full[:, 3] = scaled  # close在索引3
+        prices = processor.scaler.inverse_transform(full)[:, 3].tolist()
+        with self.lock:
+            # 期间窗口可能已被刷新，只有同一份快照才写入缓存
+            if self.entries.get(symbol) is entry and entry['window'] is window:
+                entry['cache'][steps] = prices
+        return prices
+
+    @staticmethod
+    def _result(symbol: str, steps: int, cached: list, snapshot: dict) -> dict:
+        current_price = snapshot['current_price']
+        return {
+            'symbol': symbol,
+            'steps': steps,
+            'current_price': current_price,
+            'predicted_prices': cached,
+            'change_pct': (cached[-1] - current_price) / current_price * 100,
+            'last_candle': snapshot['last_candle'],
+            'refreshed_at': snapshot['refreshed_at'],
+        }
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                symbol: {
+                    'ready': entry['window'] is not None,
+                    'last_candle': entry['last_candle'],
+                    'refreshed_at': entry['refreshed_at'],
+                    'horizon': entry['forecaster'].horizon,
+                    **self._stream_status(entry['stream']),
+                }
+                for symbol, entry in self.entries.items()
+            }
+
+    @staticmethod
+    def _stream_status(stream) -> dict:
+        if stream is None:
+            return {}
+        return {'stream': {
+            'since_sync': stream.since_sync,
+            'resyncs': stream.resyncs,
+            'last_drift': None if np.isnan(stream.drift) else stream.drift,
+        }}
+
+
+def create_app(registry: ModelRegistry, max_steps: int = 168) -> Flask:
+    """创建 Flask 应用 / Build the Flask app around a loaded registry"""
+    app = Flask(__name__)
+
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'ok', 'interval': registry.interval, 'symbols': registry.status()})
+
+    @app.route('/api/lstm/predict/<symbol>')
+    def predict(symbol):
+        symbol = symbol.upper()
+        steps = request.args.get('steps', default=1, type=int)
+        if not 1 <= steps <= max_steps:
+            return jsonify({'error': f'steps 必须在 1 到 {max_steps} 之间'}), 400
+
+        start = time.perf_counter()
+        try:
+            result = registry.predict(symbol, steps)
+        except KeyError:
+            return jsonify({'error': f'Model for {symbol} not loaded'}), 404
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 503
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return jsonify(result)
+
+    @app.route('/api/lstm/predict')
+    def predict_many():
+        steps = request.args.get('steps', default=1, type=int)
+        if not 1 <= steps <= max_steps:
+            return jsonify({'error': f'steps 必须在 1 到 {max_steps} 之间'}), 400
+        symbols = request.args.get('symbols', default='', type=str)
+        symbols = [s.strip().upper() for s in symbols.split(',') if s.strip()] or None
+
+        start = time.perf_counter()
+        result = registry.predict_many(symbols, steps)
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return jsonify(result)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LSTM 常驻预测服务')
+    parser.add_argument('--symbols', type=str, default=None,
+                        help='逗号分隔的交易对（默认: lstm_models/ 下所有已训练的模型）')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=5001, help='端口 (默认: 5001)')
+    parser.add_argument('--async-client', action='store_true',
+                        help='使用异步客户端（连接池常驻，所有交易对并发刷新）')
+    parser.add_argument('--grace', type=float, default=5.0,
+                        help='K线收盘后等待多少秒再刷新 (默认: 5)')
+    parser.add_argument('--panel', action='store_true',
+                        help='使用面板模型：所有交易对共用一个模型（train_lstm.py --panel）')
+    parser.add_argument('--tflite', dest='engine', action='store_const', const='tflite', default='keras',
+                        help='使用 export_lstm.py 导出的 TFLite 文件')
+    parser.add_argument('--numpy', dest='engine', action='store_const', const='numpy',
+                        help='使用 export_lstm.py --format numpy 导出的 NumPy 模型（不需要 TensorFlow）')
+    parser.add_argument('--streaming', action='store_true',
+                        help='流式推理：每根新K线只前进一步（单向 LSTM/GRU，keras 或 numpy 引擎）')
+    parser.add_argument('--resync-every', type=int, default=ModelConfig.STREAM_RESYNC_EVERY,
+                        help=f'流式推理每多少根K线用完整窗口重新同步 (默认: {ModelConfig.STREAM_RESYNC_EVERY})')
+    args = parser.parse_args()
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    elif args.panel:
+        symbols = discover_panel_symbols()
+    else:
+        symbols = discover_symbols(engine=args.engine)
+    if not symbols:
+        print(f"❌ 在 {PathConfig.MODELS_DIR} 中没有找到模型")
+        print("\n💡 请先训练模型:")
+        print(f"   python scripts/lstm/train_lstm.py{' --panel' if args.panel else ''}")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(" " * 20 + "🛰️ LSTM 常驻预测服务")
+    print("=" * 70)
+
+    client = None
+    if args.async_client:
+        from utils.async_binance_client import BackgroundAsyncClient
+        client = BackgroundAsyncClient()
+    registry = ModelRegistry(symbols, client=client, panel=args.panel, engine=args.engine,
+                             streaming=args.streaming, resync_every=args.resync_every)
+    registry.load_all()
+    registry.refresh_all()
+    registry.start_background_refresh(args.grace)
+
+    print(f"\n🌐 服务地址: http://{args.host}:{args.port}/api/lstm/predict/<symbol>?steps=N")
+    app = create_app(registry)
+    app.run(host=args.host, port=args.port, threaded=True, use_reloader=False)
+
+
+if __name__ == "__main__":
+    main()
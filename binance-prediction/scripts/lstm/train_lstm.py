@@ -10,6 +10,9 @@ Complete LSTM model training pipeline
     python train_lstm.py                    # 使用默认配置训练
     python train_lstm.py --quick-test       # 快速测试模式
     python train_lstm.py --symbol ETHUSDT   # 指定交易对
+    python train_lstm.py --streaming        # tf.data 流式输入管道
+    python train_lstm.py --fast-rnn         # 循环层快速路径（融合内核）
+    python train_lstm.py --panel --symbols BTCUSDT,ETHUSDT,BNBUSDT   # 多个交易对共用一个模型
 """
 
 import os
@@ -25,60 +28,102 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 # 导入模块
 from config_lstm import (
-    DataConfig, ModelConfig, TrainingConfig, PathConfig,
-    PresetConfigs, print_config_summary, estimate_training_time
+    RunConfig, PresetConfigs, print_config_summary, estimate_training_time
 )
 from utils.lstm_data_processor import LSTMDataProcessor
-from utils.lstm_model_builder import LSTMModelBuilder, setup_gpu
-from utils.visualizer import Visualizer
+from utils.lstm_model_builder import LSTMModelBuilder, WindowSequence, setup_gpu
+from utils.lstm_windows import predict_in_batches
+from utils.columnar_storage import table_exists
 import pandas as pd
 import numpy as np
 
 
-def train_model(args):
+def build_config(args) -> RunConfig:
     """
-    主训练函数
+    由命令行参数生成本次训练的配置（预设 + 自定义覆盖）
     
     Args:
         args: 命令行参数
+        
+    Returns:
+        RunConfig（模型、scaler、检查点路径都跟随 --symbol）
     """
-    start_time = time.time()
-    
-    # ============================================
-    # 1. 应用配置
-    # ============================================
-    print("="*70)
-    print(" "*20 + "🚀 LSTM 价格预测模型训练")
-    print("="*70)
+    config = RunConfig()
     
     # 应用预设配置
     if args.quick_test:
         print("\n⚡ 应用快速测试配置...")
-        PresetConfigs.quick_test()
+        config = PresetConfigs.quick_test(config)
     elif args.production:
         print("\n🏭 应用生产环境配置...")
-        PresetConfigs.production()
+        config = PresetConfigs.production(config)
     elif args.gpu_optimized:
         print("\n🎮 应用GPU优化配置...")
-        PresetConfigs.gpu_optimized()
+        config = PresetConfigs.gpu_optimized(config)
     elif args.cpu_friendly:
         print("\n💻 应用CPU友好配置...")
-        PresetConfigs.cpu_friendly()
+        config = PresetConfigs.cpu_friendly(config)
     
     # 自定义配置覆盖
+    overrides = {}
     if args.symbol:
-        DataConfig.SYMBOL = args.symbol
+        overrides['SYMBOL'] = args.symbol
     if args.epochs:
-        TrainingConfig.EPOCHS = args.epochs
+        overrides['EPOCHS'] = args.epochs
     if args.batch_size:
-        TrainingConfig.BATCH_SIZE = args.batch_size
+        overrides['BATCH_SIZE'] = args.batch_size
+    if args.streaming:
+        overrides['USE_TF_DATA'] = True
+    if args.tf_cache:
+        overrides['TF_DATA_CACHE_DIR'] = args.tf_cache
+    if args.no_feature_cache:
+        overrides['USE_FEATURE_CACHE'] = False
+    if args.fast_rnn:
+        overrides['RNN_FAST_PATH'] = True
+    return config.replace(**overrides)
+
+
+def parse_panel_symbols(args, config: RunConfig):
+    """面板模式的交易对列表（--symbols，默认 PANEL_SYMBOLS）；非面板模式返回 None"""
+    if not args.panel:
+        return None
+    if args.symbols:
+        return [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    return list(config.data.PANEL_SYMBOLS)
+
+
+def train_model(args):
+    """
+    主训练函数
+    
+    Args:
+        args: 命令行参数
+    """
+    start_time = time.time()
+    
+    # ============================================
+    # 1. 应用配置
+    # ============================================
+    print("="*70)
+    print(" "*20 + "🚀 LSTM 价格预测模型训练")
+    print("="*70)
+    
+    config = build_config(args)
+    panel_symbols = parse_panel_symbols(args, config)
+    if panel_symbols and config.training.USE_TF_DATA:
+        print("\n⚠️ 面板模式使用 WindowSequence 输入，忽略 --streaming")
+        config = config.replace(USE_TF_DATA=False)
+    # 面板模型的文件以 panel_ 为前缀，不覆盖单交易对模型
+    paths = config.paths.panel_paths() if panel_symbols else config.paths
     
     # 打印配置摘要
-    print_config_summary()
-    print(f"\n⏱️ {estimate_training_time()}\n")
+    print_config_summary(config)
+    if panel_symbols:
+        print(f"\n🧩 面板训练: {len(panel_symbols)} 个交易对共用一个模型: {', '.join(panel_symbols)}")
+    print(f"\n⏱️ {estimate_training_time(config)}\n")
     
     # 创建必要的目录
-    PathConfig.create_directories()
+    paths.create_directories()
     
     # ============================================
     # 2. 配置GPU/CPU
@@ -87,11 +132,11 @@ def train_model(args):
     print("⚙️ 步骤 1: 配置计算设备")
     print("="*70)
     
-    has_gpu = setup_gpu()
+    has_gpu = setup_gpu(config.training)
     
     if not has_gpu and args.gpu_optimized:
         print("\n⚠️ 警告: 请求GPU优化但未检测到GPU，将使用CPU")
-        PresetConfigs.cpu_friendly()
+        config = PresetConfigs.cpu_friendly(config)
     
     # ============================================
     # 3. 数据处理
@@ -101,21 +146,28 @@ def train_model(args):
     print("="*70)
     
     # 检查数据文件是否存在
-    if not os.path.exists(DataConfig.RAW_DATA_FILE):
-        print(f"\n❌ 错误: 数据文件不存在: {DataConfig.RAW_DATA_FILE}")
-        print("\n💡 解决方案:")
-        print("   1. 运行数据下载脚本:")
-        print(f"      python scripts/lstm/download_lstm_data.py")
-        print("\n   2. 或者手动下载数据并放到 data/ 目录")
-        print(f"      文件名应为: {os.path.basename(DataConfig.RAW_DATA_FILE)}")
-        sys.exit(1)
+    for symbol in panel_symbols or [config.data.SYMBOL]:
+        raw_data_file = config.replace(SYMBOL=symbol).data.RAW_DATA_FILE
+        if not table_exists(raw_data_file):
+            print(f"\n❌ 错误: 数据文件不存在: {raw_data_file}")
+            print("\n💡 解决方案:")
+            print("   1. 运行数据下载脚本:")
+            print(f"      python scripts/lstm/download_lstm_data.py --symbol {symbol}")
+            print("\n   2. 或者手动下载数据并放到 data/ 目录")
+            print(f"      文件名应为: {os.path.basename(raw_data_file)}")
+            sys.exit(1)
     
     # 创建数据处理器
-    processor = LSTMDataProcessor()
+    processor = LSTMDataProcessor(config.data, config.paths)
     
     try:
-        # 执行完整的数据处理流程
-        X_train, X_val, X_test, y_train, y_val, y_test = processor.process_all()
+        if panel_symbols:
+            # 各交易对分别归一化，窗口堆叠后训练一个共享模型
+            X_train, X_val, X_test, y_train, y_val, y_test = processor.process_panel(panel_symbols)
+            processor.save_panel_meta()
+        else:
+            # 执行完整的数据处理流程
+            X_train, X_val, X_test, y_train, y_val, y_test = processor.process_all()
         
         print(f"\n✅ 数据处理完成!")
         print(f"  训练集: X={X_train.shape}, y={y_train.shape}")
@@ -135,15 +187,17 @@ def train_model(args):
     print("⚙️ 步骤 3: 构建LSTM模型")
     print("="*70)
     
-    # 获取输入形状
+    # 获取输入形状；多步目标 (PREDICTION_HORIZON > 1) 时输出层宽度等于预测步数
     input_shape = (X_train.shape[1], X_train.shape[2])
+    output_units = y_train.shape[1] if y_train.ndim > 1 else 1
     
     # 创建模型构建器
-    model_builder = LSTMModelBuilder()
+    model_builder = LSTMModelBuilder(config.model, config.training, paths)
     
     try:
         # 构建模型
-        model = model_builder.build_model(input_shape)
+        model = model_builder.build_model(input_shape, output_units,
+                                          n_symbols=len(panel_symbols) if panel_symbols else 0)
         
     except Exception as e:
         print(f"\n❌ 模型构建失败: {e}")
@@ -166,14 +220,16 @@ def train_model(args):
     try:
         print(f"\n⏰ 训练开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
+        # 窗口按批次生成，不需要把全部窗口物化到内存
+        train_data, val_data = build_training_inputs(X_train, y_train, X_val, y_val, config,
+                                                     processor.feature_columns)
         history = model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
-            epochs=TrainingConfig.EPOCHS,
-            batch_size=TrainingConfig.BATCH_SIZE,
+            train_data,
+            validation_data=val_data,
+            epochs=config.training.EPOCHS,
             callbacks=callbacks,
-            verbose=TrainingConfig.VERBOSE,
-            shuffle=TrainingConfig.SHUFFLE
+            verbose=config.training.VERBOSE,
+            shuffle=config.training.SHUFFLE and not config.training.USE_TF_DATA
         )
         
         print(f"\n⏰ 训练结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -201,8 +257,8 @@ def train_model(args):
     
     # 保存训练历史
     history_df = pd.DataFrame(history.history)
-    history_df.to_csv(PathConfig.TRAINING_HISTORY_PATH, index=False)
-    print(f"✓ 训练历史已保存: {PathConfig.TRAINING_HISTORY_PATH}")
+    history_df.to_csv(paths.TRAINING_HISTORY_PATH, index=False)
+    print(f"✓ 训练历史已保存: {paths.TRAINING_HISTORY_PATH}")
     
     # ============================================
     # 7. 评估模型
@@ -213,7 +269,7 @@ def train_model(args):
     
     # 在测试集上评估
     print("\n📊 测试集评估:")
-    test_results = model.evaluate(X_test, y_test, verbose=0)
+    test_results = model.evaluate(WindowSequence(X_test, y_test, config.training.BATCH_SIZE), verbose=0)
     
     print(f"  Loss (MSE): {test_results[0]:.6f}")
     print(f"  MAE: {test_results[1]:.6f}")
@@ -223,6 +279,9 @@ def train_model(args):
     rmse = np.sqrt(test_results[0])
     print(f"  RMSE: {rmse:.6f}")
     
+    if panel_symbols:
+        print_panel_test_metrics(model, X_test, y_test, panel_symbols)
+    
     # ============================================
     # 8. 可视化结果
     # ============================================
@@ -231,7 +290,7 @@ def train_model(args):
     print("="*70)
     
     try:
-        visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_test, processor)
+        visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_test, processor, paths)
     except Exception as e:
         print(f"⚠️ 可视化生成失败 (这不影响模型训练): {e}")
     
@@ -247,27 +306,88 @@ def train_model(args):
     print("="*70)
     print(f"\n📊 训练总结:")
     print(f"  总用时: {minutes} 分 {seconds} 秒")
-    print(f"  训练轮数: {len(history.history['loss'])} / {TrainingConfig.EPOCHS}")
+    print(f"  训练轮数: {len(history.history['loss'])} / {config.training.EPOCHS}")
     print(f"  最佳验证Loss: {min(history.history['val_loss']):.6f}")
     print(f"  测试集Loss: {test_results[0]:.6f}")
     print(f"  测试集RMSE: {rmse:.6f}")
     
     print(f"\n📁 输出文件:")
-    print(f"  模型文件: {PathConfig.MODEL_PATH}")
-    print(f"  检查点: {PathConfig.CHECKPOINT_PATH}")
-    print(f"  Scaler: {PathConfig.SCALER_PATH}")
-    print(f"  训练历史: {PathConfig.TRAINING_HISTORY_PATH}")
-    print(f"  可视化结果: {PathConfig.RESULTS_DIR}/")
+    print(f"  模型文件: {paths.MODEL_PATH}")
+    print(f"  检查点: {paths.CHECKPOINT_PATH}")
+    print(f"  Scaler: {paths.PANEL_META_PATH if panel_symbols else paths.SCALER_PATH}")
+    print(f"  训练历史: {paths.TRAINING_HISTORY_PATH}")
+    print(f"  可视化结果: {paths.RESULTS_DIR}/")
     
     print(f"\n🎯 下一步:")
-    print(f"  1. 查看可视化结果: ls {PathConfig.RESULTS_DIR}/")
-    print(f"  2. 进行预测: python scripts/lstm/predict_lstm.py")
+    print(f"  1. 查看可视化结果: ls {paths.RESULTS_DIR}/")
+    print(f"  2. 进行预测: python scripts/lstm/predict_lstm.py{' --panel' if panel_symbols else ''}")
     print(f"  3. 回测模型: python scripts/lstm/backtest_lstm.py")
     
     print("\n" + "="*70)
 
 
-def visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_test, processor):
+def print_panel_test_metrics(model, X_test, y_test, symbols):
+    """面板模型按交易对拆分的测试集指标（归一化尺度）"""
+    y_pred = predict_in_batches(model, X_test)[:, 0]
+    y_true = y_test[:, 0] if y_test.ndim > 1 else y_test
+    # 每个窗口的交易对编号就是特征矩阵最后一列
+    symbol_ids = np.rint(X_test.data[X_test.starts, -1]).astype(int)
+    
+    rows = []
+    for symbol_id, symbol in enumerate(symbols):
+        mask = symbol_ids == symbol_id
+        errors = y_true[mask] - y_pred[mask]
+        rows.append({'symbol': symbol, 'samples': int(mask.sum()),
+                     'mae': float(np.mean(np.abs(errors))) if mask.any() else np.nan,
+                     'rmse': float(np.sqrt(np.mean(errors ** 2))) if mask.any() else np.nan})
+    print("\n📊 各交易对测试集指标（归一化尺度）:")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def build_training_inputs(X_train, y_train, X_val, y_val, config: RunConfig,
+                          feature_columns=()):
+    """
+    构建训练/验证输入
+    
+    默认使用 WindowSequence；开启 USE_TF_DATA 时改用 tf.data 流式管道，
+    窗口组装在后台线程并行进行，并预取下一批，GPU 不必等待数据。
+    磁盘缓存文件名带有数据和窗口配置的指纹（window_cache_key），数据、TIME_STEPS、
+    预测步数、特征或 scaler 变化后不会读到上一次运行的缓存。
+    
+    Args:
+        feature_columns: 特征列名（计入缓存指纹）
+    
+    Returns:
+        (train_data, val_data)
+    """
+    training = config.training
+    batch_size = training.BATCH_SIZE
+    if not training.USE_TF_DATA:
+        return (WindowSequence(X_train, y_train, batch_size),
+                WindowSequence(X_val, y_val, batch_size))
+    
+    from utils.lstm_input_pipeline import make_window_dataset, window_cache_key
+    
+    cache_dir = training.TF_DATA_CACHE_DIR
+    
+    def _cache_path(split, X, y):
+        if not cache_dir:
+            return None
+        key = window_cache_key(X, y, config.data, feature_columns, batch_size)
+        return os.path.join(cache_dir, f"{config.data.SYMBOL}_{config.data.INTERVAL}_{split}_{key}")
+    
+    print("\n🌊 使用 tf.data 流式输入管道")
+    if cache_dir:
+        print(f"  磁盘缓存: {cache_dir}")
+    train_data = make_window_dataset(X_train, y_train, batch_size,
+                                     shuffle=training.SHUFFLE,
+                                     cache_path=_cache_path('train', X_train, y_train))
+    val_data = make_window_dataset(X_val, y_val, batch_size,
+                                   cache_path=_cache_path('val', X_val, y_val))
+    return train_data, val_data
+
+
+def visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_test, processor, paths):
     """
     生成可视化结果
     """
@@ -282,7 +402,7 @@ def visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_
     except:
         pass
     
-    results_dir = PathConfig.RESULTS_DIR
+    results_dir = paths.RESULTS_DIR
     
     # 1. 训练历史曲线
     print("\n  📈 生成训练历史曲线...")
@@ -314,8 +434,10 @@ def visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_
     # 2. 预测 vs 实际值
     print("\n  📊 生成预测对比图...")
     
-    # 在测试集上预测
-    y_pred = model.predict(X_test, verbose=0).flatten()
+    # 在测试集上预测（多步模型只画第1步）
+    y_pred = predict_in_batches(model, X_test)[:, 0]
+    if y_test.ndim > 1:
+        y_test = y_test[:, 0]
     
     fig, ax = plt.subplots(figsize=(15, 6))
     
@@ -375,8 +497,8 @@ def visualize_results(model, history, X_train, y_train, X_val, y_val, X_test, y_
         'error': errors,
         'abs_error': np.abs(errors)
     })
-    predictions_df.to_csv(PathConfig.PREDICTIONS_PATH, index=False)
-    print(f"    ✓ 已保存: {PathConfig.PREDICTIONS_PATH}")
+    predictions_df.to_csv(paths.PREDICTIONS_PATH, index=False)
+    print(f"    ✓ 已保存: {paths.PREDICTIONS_PATH}")
     
     print("\n✅ 可视化完成!")
 
@@ -406,6 +528,15 @@ def main():
   # 自定义参数
   python train_lstm.py --symbol ETHUSDT --epochs 50 --batch-size 64
   
+  # tf.data 流式输入（可选磁盘缓存）
+  python train_lstm.py --streaming --tf-cache data/tf_cache
+  
+  # 循环层快速路径（先用 scripts/lstm/benchmark_rnn.py 对比吞吐量）
+  python train_lstm.py --fast-rnn
+  
+  # 面板训练：多个交易对共用一个模型（带交易对嵌入）
+  python train_lstm.py --panel --symbols BTCUSDT,ETHUSDT,BNBUSDT
+  
 提示:
   - 首次训练建议使用 --quick-test 快速验证流程
   - 确保已下载数据: python scripts/lstm/download_lstm_data.py
@@ -430,6 +561,18 @@ def main():
     custom_group.add_argument('--symbol', type=str, help='交易对符号')
     custom_group.add_argument('--epochs', type=int, help='训练轮数')
     custom_group.add_argument('--batch-size', type=int, help='批大小')
+    custom_group.add_argument('--streaming', action='store_true',
+                              help='使用 tf.data 流式输入管道（并行组装窗口 + 预取）')
+    custom_group.add_argument('--tf-cache', type=str,
+                              help='tf.data 磁盘缓存目录（配合 --streaming 使用）')
+    custom_group.add_argument('--no-feature-cache', action='store_true',
+                              help='不使用特征缓存，重新计算技术指标和归一化')
+    custom_group.add_argument('--fast-rnn', action='store_true',
+                              help='循环层快速路径（recurrent_dropout=0 + SpatialDropout1D，可用融合内核）')
+    custom_group.add_argument('--panel', action='store_true',
+                              help='面板训练：多个交易对共用一个模型（交易对嵌入）')
+    custom_group.add_argument('--symbols', type=str,
+                              help='面板训练的交易对，逗号分隔（默认 PANEL_SYMBOLS）')
     
     args = parser.parse_args()
     
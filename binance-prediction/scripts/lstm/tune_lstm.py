@@ -0,0 +1,219 @@
+"""
+LSTM 超参数搜索
+LSTM Hyperparameter Search
+
+在 ModelConfig / TrainingConfig 的参数和 TRIAL_DATA_PARAMS 上做网格、随机、连续减半或 Hyperband 搜索：
+- 特征只计算一次（命中特征缓存），通过共享内存传给所有工作进程；
+  其他 DataConfig 参数（SCALER_TYPE、TECHNICAL_INDICATORS 等）会改变特征本身，不能搜索
+- 每个试验在独立进程中训练，按自己的 TIME_STEPS 在共享特征上构建零拷贝窗口
+- 验证集的目标行对所有 TIME_STEPS 相同，验证损失可以直接比较
+- grid / random 按已完成试验的中位数曲线提前剪枝；halving / hyperband 按轮次淘汰，
+  晋级的试验从上一轮保存的模型继续训练
+- 结果表保存到 lstm_results/tuning_{交易对}_{时间}.csv，最佳参数保存为 JSON
+
+使用：
+    cd binance-prediction
+    python scripts/lstm/tune_lstm.py --method random --trials 20 --workers 4
+    python scripts/lstm/tune_lstm.py --method hyperband --max-epochs 27 --min-epochs 1
+    python scripts/lstm/tune_lstm.py --method grid --space my_space.json --quick-test
+    python scripts/lstm/tune_lstm.py --symbol ETHUSDT --method random --trials 20
+
+搜索空间 JSON 示例：
+    {"LSTM_UNITS": [[64, 32], [128, 64]], "LEARNING_RATE": {"loguniform": [1e-4, 1e-2]}}
+
+作者: qinshihuang166
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config_lstm import DataConfig, PresetConfigs, RunConfig
+from utils.lstm_data_processor import LSTMDataProcessor
+from utils.hyperparameter_search import check_space, load_space, median_should_prune, run_search
+
+CLOSE_INDEX = 3
+
+# 每个试验在共享特征上自己应用的 DataConfig 参数（窗口长度、预测步数、切分比例）
+# DataConfig fields run_trial applies on the shared features; the rest change the features themselves
+TRIAL_DATA_PARAMS = ('TIME_STEPS', 'PREDICTION_HORIZON', 'TRAIN_RATIO', 'VAL_RATIO')
+
+# 默认搜索空间 / Default search space
+DEFAULT_SPACE = {
+    'LSTM_UNITS': [[64, 32], [128, 64], [128, 64, 32]],
+    'DROPOUT_RATE': [0.1, 0.2, 0.3],
+    'LEARNING_RATE': [3e-4, 1e-3, 3e-3],
+    'TIME_STEPS': [30, 60, 90],
+}
+
+
+def make_pruning_callback(trial: dict):
+    """
+    中位数剪枝回调：记录每轮 val_loss，比已完成试验的中位数差时停止训练
+    Keras callback applying the median stopping rule
+    """
+    import tensorflow as tf
+
+    class MedianPruningCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.curve = []
+            self.pruned = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            value = float((logs or {}).get('val_loss', np.nan))
+            self.curve.append(value)
+            spec = trial.get('prune')
+            if spec and median_should_prune(epoch, float(np.nanmin(self.curve)), trial['references'], **spec):
+                self.pruned = True
+                self.model.stop_training = True
+
+    return MedianPruningCallback()
+
+
+def run_trial(arrays: dict, trial: dict) -> dict:
+    """
+    训练一个试验（在工作进程中运行）
+
+    样本 k 的输入是特征行 [k, k+T)，目标是第 k+T 行的收盘价；
+    训练/验证按目标行切分（TRAIN_RATIO / VAL_RATIO），与 TIME_STEPS 无关。
+    """
+    # TensorFlow 在工作进程内才导入，线程数限制（环境变量）才能生效
+    import tensorflow as tf
+    from utils.lstm_model_builder import LSTMModelBuilder, WindowSequence
+    from utils.lstm_windows import WindowedArray
+
+    data = arrays['features']
+    config = trial['config']
+    training = config.training
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(trial['seed'])
+
+    T = int(config.data.TIME_STEPS)
+    H = max(1, int(config.data.PREDICTION_HORIZON))
+    n_samples = len(data) - T - H + 1
+    train_end = int(len(data) * config.data.TRAIN_RATIO) - T
+    val_end = min(n_samples, int(len(data) * (config.data.TRAIN_RATIO + config.data.VAL_RATIO)) - T)
+    if train_end <= 0 or val_end <= train_end:
+        raise ValueError(f"❌ 数据太少，无法使用 TIME_STEPS={T}（{len(data)} 行）")
+
+    X = WindowedArray(data, T, stop=val_end)
+    close = data[T:, CLOSE_INDEX]
+    y = close[:val_end] if H == 1 else np.lib.stride_tricks.sliding_window_view(close, H)[:val_end]
+
+    if trial.get('checkpoint') and trial['initial_epoch'] > 0:
+        model = tf.keras.models.load_model(trial['checkpoint'])
+    else:
+        model = LSTMModelBuilder(config.model, training, config.paths).build_model((T, data.shape[1]), H)
+
+    pruning = make_pruning_callback(trial)
+    callbacks = [pruning]
+    if training.USE_EARLY_STOPPING:
+        callbacks.append(tf.keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=training.EARLY_STOPPING_PATIENCE,
+            min_delta=training.EARLY_STOPPING_MIN_DELTA, restore_best_weights=False))
+
+    model.fit(
+        WindowSequence(X[:train_end], y[:train_end], training.BATCH_SIZE),
+        validation_data=WindowSequence(X[train_end:val_end], y[train_end:val_end], training.BATCH_SIZE),
+        initial_epoch=trial['initial_epoch'],
+        epochs=trial['epochs'],
+        callbacks=callbacks,
+        verbose=0,
+    )
+    if trial.get('checkpoint'):
+        model.save(trial['checkpoint'])
+
+    return {'curve': pruning.curve, 'pruned': pruning.pruned}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='LSTM 超参数搜索 / LSTM hyperparameter search')
+    parser.add_argument('--symbol', type=str, default=DataConfig.SYMBOL,
+                        help=f'交易对符号 (默认: {DataConfig.SYMBOL})')
+    parser.add_argument('--method', type=str, default='random',
+                        choices=['grid', 'random', 'halving', 'hyperband'], help='搜索方法')
+    parser.add_argument('--trials', type=int, default=20, help='random / halving 的配置数')
+    parser.add_argument('--space', type=str, default=None, help='搜索空间 JSON 文件（默认内置空间）')
+    parser.add_argument('--max-epochs', type=int, default=None, help='单个试验最大训练轮数')
+    parser.add_argument('--min-epochs', type=int, default=3, help='halving / hyperband 第一轮训练轮数')
+    parser.add_argument('--eta', type=int, default=3, help='每轮保留 1/eta 的试验')
+    parser.add_argument('--no-prune', action='store_true', help='grid / random 不做中位数剪枝')
+    parser.add_argument('--workers', type=int, default=None, help='并发试验数（默认每个 CPU 核一个）')
+    parser.add_argument('--quick-test', action='store_true', help='使用快速测试配置')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    print('=' * 70)
+    print('🎛️ LSTM 超参数搜索')
+    print('=' * 70)
+
+    config = RunConfig.for_symbol(args.symbol.upper())
+    if args.quick_test:
+        config = PresetConfigs.quick_test(config)
+    config.paths.create_directories()
+
+    space = load_space(args.space) if args.space else DEFAULT_SPACE
+    check_space(space, extra_params=TRIAL_DATA_PARAMS)
+    max_epochs = args.max_epochs or config.training.EPOCHS
+
+    # 特征只计算一次（命中缓存时直接读取），所有试验共享
+    processor = LSTMDataProcessor(config.data, config.paths)
+    _, df_scaled = processor.prepare_features(fit=True)
+    features = df_scaled.to_numpy(dtype=np.float32)
+
+    print(f'\n🔍 交易对: {config.data.SYMBOL}, 方法: {args.method}, 最大轮数: {max_epochs}, 搜索参数: {", ".join(space)}')
+    print(f'  共享特征: {features.shape[0]} 行 × {features.shape[1]} 列')
+
+    def report(result: dict) -> None:
+        curve = result.get('curve') or [np.nan]
+        status = '✂️ 剪枝' if result.get('pruned') else '✓'
+        rung = f" 第{result['rung']}轮" if result.get('rung') is not None else ''
+        print(f"  {status} 试验 {result['trial_id']}{rung}: val_loss={np.nanmin(curve):.6f} "
+              f"({len(curve)} 轮, {result['seconds']:.1f} 秒) {result['params']}")
+
+    with tempfile.TemporaryDirectory(prefix='lstm_tuning_') as checkpoint_dir:
+        table = run_search(
+            run_trial, {'features': features}, space, method=args.method, n_trials=args.trials,
+            max_epochs=max_epochs, min_epochs=args.min_epochs, eta=args.eta, prune=not args.no_prune,
+            seed=args.seed, checkpoint_dir=checkpoint_dir if args.method in ('halving', 'hyperband') else None,
+            base_config=config, max_workers=args.workers, on_result=report,
+        )
+
+    print('\n📊 搜索结果（按验证损失排序）')
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(table.drop(columns='params').head(10).to_string(index=False))
+    counts = table['status'].value_counts()
+    print(f"\n  完成 {counts.get('complete', 0)} 个, 剪枝 {counts.get('pruned', 0)} 个, "
+          f"试验耗时之和 {table['seconds'].sum():.1f} 秒")
+
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    table_path = os.path.join(config.paths.RESULTS_DIR, f'tuning_{config.data.SYMBOL}_{ts}.csv')
+    table.to_csv(table_path, index=False)
+
+    best = table.iloc[0]
+    best_params = json.loads(best['params'])
+    best_path = os.path.join(config.paths.RESULTS_DIR, f'tuning_{config.data.SYMBOL}_{ts}_best.json')
+    with open(best_path, 'w', encoding='utf-8') as f:
+        json.dump({'symbol': config.data.SYMBOL, 'params': best_params,
+                   'val_loss': float(best['val_loss']), 'method': args.method}, f, indent=2)
+
+    print(f'\n🏆 最佳参数: {best_params} (val_loss={best["val_loss"]:.6f})')
+    print(f'💾 结果表已保存: {table_path}')
+    print(f'💾 最佳参数已保存: {best_path}')
+
+
+if __name__ == '__main__':
+    main()
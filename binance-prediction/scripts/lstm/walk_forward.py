@@ -0,0 +1,182 @@
+"""
+LSTM 滚动前向验证（Walk-Forward）
+
+固定的 70/15/15 切分只给出一个测试区间上的结果，容易受行情阶段影响。
+滚动前向验证在多个按时间排列的测试区间上分别重新训练和评估：
+- 每折只用测试区间之前的数据训练，scaler 也只在该折训练数据上拟合（无信息泄漏）
+- 每折在独立进程中训练，特征矩阵通过共享内存传给所有进程
+- 指标用 lstm_metrics 计算后按折汇总（均值 ± 标准差）
+
+使用：
+    cd binance-prediction
+    python scripts/lstm/walk_forward.py --folds 5 --window expanding --workers 4
+    python scripts/lstm/walk_forward.py --quick-test --window rolling --epochs 5
+    python scripts/lstm/walk_forward.py --symbol ETHUSDT --folds 5
+
+作者: qinshihuang166
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config_lstm import DataConfig, PresetConfigs, RunConfig
+from utils.lstm_data_processor import LSTMDataProcessor
+from utils.lstm_metrics import calc_regression_metrics, calc_classification_metrics, metrics_to_dict
+from utils.walk_forward import walk_forward_splits, run_walk_forward
+
+CLOSE_INDEX = 3
+
+
+def fit_predict_fold(arrays: dict, fold, params: dict) -> dict:
+    """
+    在工作进程中训练并评估一个折
+
+    样本 k 的输入是特征行 [k, k+T)，目标是第 k+T 行的收盘价；
+    scaler 只在训练样本覆盖的行上拟合。
+    """
+    # TensorFlow 在工作进程内才导入，线程数限制（环境变量）才能生效
+    import tensorflow as tf
+    from sklearn.preprocessing import MinMaxScaler, StandardScaler
+    from utils.lstm_model_builder import LSTMModelBuilder, WindowSequence
+    from utils.lstm_windows import WindowedArray, predict_in_batches
+
+    config = params['config']
+    tf.keras.utils.set_random_seed(params['seed'] + fold.index)
+
+    data = arrays['features']
+    T, H = params['time_steps'], params['horizon']
+
+    # 1. 只在训练数据上拟合 scaler
+    scaler = MinMaxScaler(feature_range=config.data.FEATURE_RANGE) \
+        if config.data.SCALER_TYPE == 'MinMaxScaler' else StandardScaler()
+    scaler.fit(data[fold.train_start:fold.train_end + T])
+    rows = data[fold.train_start:fold.test_end + T + H - 1]
+    scaled = scaler.transform(rows).astype(np.float32)
+
+    # 2. 零拷贝窗口（局部索引：0 = 本折第一个训练样本）
+    n_local = fold.test_end - fold.train_start
+    X = WindowedArray(scaled, T, stop=n_local)
+    close = scaled[T:, CLOSE_INDEX]
+    y = close[:n_local] if H == 1 else np.lib.stride_tricks.sliding_window_view(close, H)[:n_local]
+
+    train_n = fold.train_end - fold.train_start
+    val_n = max(1, int(train_n * params['val_ratio']))
+    test_offset = fold.test_start - fold.train_start
+
+    # 3. 训练（训练区间末尾留一段做早停验证）
+    model = LSTMModelBuilder(config.model, config.training, config.paths).build_model((T, data.shape[1]), H)
+    model.fit(
+        WindowSequence(X[:train_n - val_n], y[:train_n - val_n], params['batch_size']),
+        validation_data=WindowSequence(X[train_n - val_n:train_n], y[train_n - val_n:train_n], params['batch_size']),
+        epochs=params['epochs'],
+        callbacks=[tf.keras.callbacks.EarlyStopping(patience=params['patience'], restore_best_weights=True)],
+        verbose=0,
+    )
+
+    # 4. 预测测试区间并还原到真实价格
+    pred_scaled = predict_in_batches(model, X[test_offset:n_local])[:, 0]
+    full = np.zeros((len(pred_scaled), data.shape[1]))
+    full[:, CLOSE_INDEX] = pred_scaled
+    y_pred = scaler.inverse_transform(full)[:, CLOSE_INDEX]
+
+    return {
+        'y_true': data[fold.test_start + T:fold.test_end + T, CLOSE_INDEX],
+        'y_pred': y_pred,
+        'prev': data[fold.test_start + T - 1:fold.test_end + T - 1, CLOSE_INDEX],
+    }
+
+
+def fold_metrics(output: dict) -> dict:
+    """回归指标 + 相对上一根收盘价的涨跌方向指标 + 持平基线"""
+    y_true, y_pred, prev = output['y_true'], output['y_pred'], output['prev']
+    metrics = metrics_to_dict(calc_regression_metrics(y_true, y_pred))
+    metrics.update(metrics_to_dict(calc_classification_metrics(y_true > prev, y_pred > prev), prefix='dir_'))
+    metrics['naive_mae'] = metrics_to_dict(calc_regression_metrics(y_true, prev))['mae']
+    return metrics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='LSTM 滚动前向验证 / LSTM walk-forward evaluation')
+    parser.add_argument('--symbol', type=str, default=DataConfig.SYMBOL,
+                        help=f'交易对符号 (默认: {DataConfig.SYMBOL})')
+    parser.add_argument('--folds', type=int, default=5, help='折数')
+    parser.add_argument('--window', type=str, default='expanding', choices=['expanding', 'rolling'],
+                        help='训练窗口：扩展 / 固定长度滚动')
+    parser.add_argument('--train-size', type=int, default=None, help='rolling 时的训练样本数')
+    parser.add_argument('--test-size', type=int, default=None, help='每折测试样本数')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认每个 CPU 核一个）')
+    parser.add_argument('--epochs', type=int, default=None, help='每折最大训练轮数')
+    parser.add_argument('--batch-size', type=int, default=None, help='批大小')
+    parser.add_argument('--quick-test', action='store_true', help='使用快速测试配置')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    print('=' * 70)
+    print('🔁 LSTM 滚动前向验证（Walk-Forward）')
+    print('=' * 70)
+
+    config = RunConfig.for_symbol(args.symbol.upper())
+    if args.quick_test:
+        config = PresetConfigs.quick_test(config)
+
+    config.paths.create_directories()
+
+    # 只需要原始尺度的特征：每折自己拟合 scaler
+    processor = LSTMDataProcessor(config.data, config.paths)
+    df_features_real, _ = processor.prepare_features(fit=True)
+    features = df_features_real.to_numpy(dtype=np.float64)
+
+    T = config.data.TIME_STEPS
+    H = max(1, int(config.data.PREDICTION_HORIZON))
+    n_samples = len(features) - T - H + 1
+
+    # 多步目标会和下一折的输入重叠，间隔 H-1 个样本
+    folds = walk_forward_splits(n_samples, n_folds=args.folds, test_size=args.test_size,
+                                window=args.window, train_size=args.train_size, gap=H - 1)
+    params = {
+        'config': config,
+        'time_steps': T,
+        'horizon': H,
+        'epochs': args.epochs or config.training.EPOCHS,
+        'batch_size': args.batch_size or config.training.BATCH_SIZE,
+        'patience': config.training.EARLY_STOPPING_PATIENCE,
+        'val_ratio': config.data.VAL_RATIO,
+        'seed': args.seed,
+    }
+
+    print(f'\n📐 {config.data.SYMBOL}: {len(folds)} 折（{args.window}），每折测试 {folds[0].test_size} 个样本，'
+          f'共 {n_samples} 个样本, {features.shape[1]} 个特征')
+    result = run_walk_forward(fit_predict_fold, {'features': features}, folds, fold_metrics, params,
+                              max_workers=args.workers)
+
+    columns = ['fold', 'train_start', 'train_end', 'test_start', 'test_end', 'mae', 'rmse', 'mape',
+               'naive_mae', 'dir_accuracy', 'fit_seconds']
+    print('\n📊 各折结果（真实价格尺度）')
+    with pd.option_context('display.width', 160, 'display.max_columns', 20):
+        print(result.folds[columns].to_string(index=False))
+        print('\n📈 汇总（均值 ± 标准差）')
+        print(result.summary)
+    print(f'\n⏱️ 总用时 {result.elapsed:.1f} 秒，各折耗时之和 {result.folds["fit_seconds"].sum():.1f} 秒'
+          f'（并行加速 {result.speedup:.1f}x）')
+
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    out_path = os.path.join(config.paths.RESULTS_DIR, f'walk_forward_{config.data.SYMBOL}_{ts}.csv')
+    result.folds.to_csv(out_path, index=False)
+    print(f'\n💾 各折指标已保存: {out_path}')
+
+
+if __name__ == '__main__':
+    main()
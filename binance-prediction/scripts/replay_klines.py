@@ -0,0 +1,47 @@
+import os
+import sys
+import asyncio
+import argparse
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.kline_replay import KlineReplayServer
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay downloaded klines as a local Binance WebSocket stream')
+    parser.add_argument('--symbols', type=str, default='BTCUSDT,ETHUSDT', help='Comma separated symbols')
+    parser.add_argument('--interval', type=str, default='1h', help='Interval of the CSV data')
+    parser.add_argument('--last', type=int, default=200, help='Replay only the last N candles of each CSV')
+    parser.add_argument('--delay', type=float, default=1.0, help='Seconds between candles')
+    parser.add_argument('--partial-updates', type=int, default=3, help='Unclosed updates sent before each close')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9443)
+
+    args = parser.parse_args()
+
+    frames = {}
+    for symbol in [s.strip().upper() for s in args.symbols.split(',')]:
+        file_path = f'data/{symbol}_hist.csv'
+        if not os.path.exists(file_path):
+            print(f"⚠️ 未找到 {file_path}，先运行 download_data.py / Missing {file_path}")
+            continue
+        df = pd.read_csv(file_path, parse_dates=['timestamp'])
+        frames[symbol] = df.tail(args.last)
+
+    if not frames:
+        return
+
+    server = KlineReplayServer(frames, args.interval, delay=args.delay,
+                               partial_updates=args.partial_updates,
+                               host=args.host, port=args.port)
+    print(f"🔁 回放服务器 / Replay server: {server.url} ({', '.join(frames)})")
+    print(f"   KLINE_STREAM=1 KLINE_STREAM_URL={server.url} python scripts/app.py")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
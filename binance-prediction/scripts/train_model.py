@@ -2,7 +2,7 @@ import os
 import sys
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 import joblib
 import argparse
@@ -12,7 +12,24 @@ import argparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.binance_client import BinanceUtility
+from utils.kline_store import KlineStore
 from utils.data_processor import DataProcessor
+from utils.lstm_metrics import calc_classification_metrics, metrics_to_dict
+from utils.walk_forward import walk_forward_splits, run_walk_forward
+
+def fit_predict_fold(arrays, fold, params):
+    """
+    在工作进程中训练一个折的随机森林并预测测试区间
+    Fit one walk-forward fold in a worker process
+    """
+    X, y = arrays['X'], arrays['y']
+    model = RandomForestClassifier(n_estimators=params['n_estimators'], random_state=42, n_jobs=1)
+    model.fit(X[fold.train_start:fold.train_end], y[fold.train_start:fold.train_end])
+    return {'y_true': y[fold.test_start:fold.test_end],
+            'y_pred': model.predict(X[fold.test_start:fold.test_end])}
+
+def fold_metrics(output):
+    return metrics_to_dict(calc_classification_metrics(output['y_true'], output['y_pred']))
 
 def main(args):
     # 1. 获取数据
@@ -22,7 +39,11 @@ def main(args):
         df = pd.read_csv(args.local_data)
     else:
         print(f"从 Binance 获取数据 for {args.symbol}...")
-        client = BinanceUtility()
+        # 使用本地K线仓库，只下载缺失的部分
+        # Use the local kline store so only missing klines are downloaded
+        store = KlineStore(os.path.join('data', 'klines'))
+        store.seed_from_csv(args.symbol, '1h', f'data/{args.symbol}_hist.csv')
+        client = BinanceUtility(kline_store=store)
         df = client.fetch_historical_data(args.symbol, '1h', '1 year ago UTC')
         # 保存原始数据
         if not os.path.exists('data'): os.makedirs('data')
@@ -53,9 +74,15 @@ def main(args):
     print("\n分类报告 / Classification Report:")
     print(classification_report(y_test, y_pred))
 
-    # 交叉验证
-    cv_scores = cross_val_score(model, X, y, cv=5)
-    print(f"\n5折交叉验证平均分: {cv_scores.mean():.4f} / 5-Fold CV Mean Score: {cv_scores.mean():.4f}")
+    # 滚动前向验证：每折只用之前的数据训练（普通 K 折会用未来数据训练）
+    # Walk-forward validation: every fold trains strictly on earlier data
+    print(f"\n滚动前向验证 ({args.folds} 折, {args.window}) / Walk-forward validation...")
+    folds = walk_forward_splits(len(X), n_folds=args.folds, window=args.window)
+    wf = run_walk_forward(fit_predict_fold, {'X': X.to_numpy(dtype='float64'), 'y': y.to_numpy()},
+                          folds, fold_metrics, {'n_estimators': 100}, max_workers=args.workers)
+    print(wf.folds[['fold', 'train_start', 'train_end', 'test_start', 'test_end', 'accuracy', 'f1']].to_string(index=False))
+    print(f"\n滚动前向验证平均准确率: {wf.summary.loc['accuracy', 'mean']:.4f} ± {wf.summary.loc['accuracy', 'std']:.4f}"
+          f" / Walk-forward mean accuracy (用时 {wf.elapsed:.1f}s, 加速 {wf.speedup:.1f}x)")
 
     # 6. 保存模型
     # 6. Save Model
@@ -68,6 +95,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Binance Price Prediction Model Training')
     parser.add_argument('--symbol', type=str, default='BTCUSDT', help='Trading pair symbol')
     parser.add_argument('--local_data', type=str, default=None, help='Path to local CSV data file')
+    parser.add_argument('--folds', type=int, default=5, help='Number of walk-forward folds')
+    parser.add_argument('--window', type=str, default='expanding', choices=['expanding', 'rolling'], help='Walk-forward train window')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the folds (default: one per core)')
     
     args = parser.parse_args()
     main(args)
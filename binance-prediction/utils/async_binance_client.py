@@ -0,0 +1,335 @@
+"""
+异步 Binance 客户端
+Async Binance Client
+
+基于 asyncio + aiohttp 的K线客户端：
+- 一个 ClientSession 复用连接池（keep-alive），不再每次请求/每个脚本新建 Client
+- 长历史按时间切成互不重叠的页区间并发下载，而不是 get_historical_klines 的逐页顺序翻页
+- 与同步代码共用 WeightRateLimiter 的请求权重预算，遇到 429/418 全局退避
+- BackgroundAsyncClient 在后台线程运行事件循环，提供与 BinanceUtility 相同的同步接口，
+  Flask 应用和预测服务可以直接替换使用
+asyncio/aiohttp kline client with a pooled keep-alive session. Long histories
+are split into non-overlapping page ranges fetched concurrently, all requests
+share the WeightRateLimiter budget, and BackgroundAsyncClient exposes the same
+synchronous interface as BinanceUtility for the Flask app and model server.
+
+作者: qinshihuang166
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+import pandas as pd
+from binance.helpers import interval_to_milliseconds
+
+from utils.kline_store import (PAGE_LIMIT, OUTPUT_COLUMNS, KlineStore, klines_to_frame,
+                               store_to_output, to_milliseconds)
+from utils.rate_limiter import KLINES_REQUEST_WEIGHT, RATE_LIMIT_STATUS_CODES, WeightRateLimiter
+
+BASE_URL = 'https://api.binance.com'
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_PAGE_CONCURRENCY = 8
+
+
+class BinanceAsyncAPIError(Exception):
+    """Binance 返回的错误响应 / Error response from Binance"""
+
+    def __init__(self, status_code: int, code=None, message: str = ''):
+        super().__init__(f"APIError(status={status_code}, code={code}): {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+
+class AsyncBinanceUtility:
+    """
+    异步 Binance 助手类 / Async Binance helper
+
+    用法 / Usage:
+        async with AsyncBinanceUtility() as client:
+            df = await client.fetch_historical_data('BTCUSDT', '1h', '1 year ago UTC')
+    """
+
+    def __init__(self, base_url: str = BASE_URL,
+                 limiter: Optional[WeightRateLimiter] = None,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 page_concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                 timeout: float = 30.0, max_retries: int = 5):
+        """
+        Args:
+            base_url: REST 接口地址
+            limiter: 共享的请求权重限流器（默认新建一个）
+            max_connections: 连接池大小
+            page_concurrency: 同时进行的K线请求数上限（所有交易对共用）
+            timeout: 单个请求超时（秒）
+            max_retries: 限流或网络错误时的最大重试次数
+        """
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter or WeightRateLimiter()
+        self.max_connections = max_connections
+        self.page_concurrency = page_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # ------------------------------------------------------------------
+    # 会话管理 / Session management
+    # ------------------------------------------------------------------
+
+    async def open(self):
+        """创建连接池（必须在事件循环中调用）/ Create the pooled session"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.page_concurrency)
+        return self
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # ------------------------------------------------------------------
+    # 请求 / Requests
+    # ------------------------------------------------------------------
+
+    async def _acquire(self, weight: int):
+        """异步等待权重预算（不阻塞事件循环）"""
+        while True:
+            wait = self.limiter.reserve(weight)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def _get(self, path: str, params: dict, weight: int = KLINES_REQUEST_WEIGHT):
+        """带限流、重试的 GET 请求 / GET with rate limiting and retries"""
+        await self.open()
+        url = self.base_url + path
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(weight)
+            try:
+                async with self._semaphore:
+                    async with self.session.get(url, params=params) as resp:
+                        self.limiter.update_from_headers(resp.headers)
+                        if resp.status in RATE_LIMIT_STATUS_CODES and attempt < self.max_retries:
+                            self.limiter.penalize(resp.headers.get('Retry-After'))
+                            continue
+                        payload = await resp.json(content_type=None)
+                        if resp.status >= 400:
+                            payload = payload if isinstance(payload, dict) else {}
+                            raise BinanceAsyncAPIError(resp.status, payload.get('code'), payload.get('msg', ''))
+                        return payload
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"请求失败，重试中: {e} / Request failed, retrying: {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+        raise BinanceAsyncAPIError(429, message='rate limit retries exhausted')
+
+    async def get_klines(self, symbol: str, interval: str, start_ms: int,
+                         end_ms: Optional[int] = None, limit: int = PAGE_LIMIT) -> List[list]:
+        """单页K线（原始列表）/ One page of raw klines"""
+        params = {'symbol': symbol, 'interval': interval, 'startTime': int(start_ms), 'limit': limit}
+        if end_ms is not None:
+            params['endTime'] = int(end_ms)
+        return await self._get('/api/v3/klines', params)
+
+    async def get_realtime_price(self, symbol: str) -> float:
+        ticker = await self._get('/api/v3/ticker/price', {'symbol': symbol}, weight=2)
+        return float(ticker['price'])
+
+    # ------------------------------------------------------------------
+    # 历史K线 / Historical klines
+    # ------------------------------------------------------------------
+
+    async def iter_raw_ranges(self, symbol: str, interval: str,
+                              start_ms: int, end_ms: Optional[int] = None):
+        """
+        按时间顺序逐段产出 [start_ms, end_ms] 区间的K线（存储格式）
+        Yield klines in [start_ms, end_ms] range by range, in time order
+
+        第一页顺序请求（同时确定上市后的第一根K线），剩余区间按每页 1000 根K线切分后并发请求；
+        各区间互不重叠，按时间顺序逐个产出：后面的区间可能先下载完成，但只有前面的区间都
+        产出后才会产出，调用方可以边下载边落盘。
+        The first page is fetched on its own (which also finds the first listed
+        candle); the remaining span is split into non-overlapping 1000-candle
+        ranges requested concurrently and yielded strictly in time order, so
+        callers can persist each range as soon as everything before it arrived.
+        """
+        first_page = await self.get_klines(symbol, interval, start_ms, end_ms)
+        if not first_page:
+            return
+        yield klines_to_frame(first_page)
+
+        interval_ms = interval_to_milliseconds(interval)
+        next_start = first_page[-1][0] + (interval_ms or 1)
+        end_ms = end_ms if end_ms is not None else int(time.time() * 1000)
+        if len(first_page) < PAGE_LIMIT or next_start > end_ms:
+            return
+
+        if interval_ms is None:
+            # 月线长度不固定，无法按时间切分，退回顺序翻页
+            page = first_page
+            while len(page) == PAGE_LIMIT:
+                page = await self.get_klines(symbol, interval, page[-1][0] + 1, end_ms)
+                if not page:
+                    return
+                yield klines_to_frame(page)
+            return
+
+        span = PAGE_LIMIT * interval_ms
+        tasks = [asyncio.ensure_future(self.get_klines(symbol, interval, begin, min(begin + span - 1, end_ms)))
+                 for begin in range(next_start, end_ms + 1, span)]
+        try:
+            for task in tasks:
+                page = await task
+                if page:
+                    yield klines_to_frame(page)
+        finally:
+            # 出错或调用方提前停止时取消剩余请求
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_raw_range(self, symbol: str, interval: str,
+                              start_ms: int, end_ms: Optional[int] = None) -> pd.DataFrame:
+        """
+        下载 [start_ms, end_ms] 区间的K线（存储格式）
+        Download klines in [start_ms, end_ms] (store format)
+        """
+        frames = [df async for df in self.iter_raw_ranges(symbol, interval, start_ms, end_ms)]
+        if not frames:
+            return klines_to_frame([])
+        df = pd.concat(frames, ignore_index=True)
+        return df.drop_duplicates(subset='open_time', keep='last').sort_values('open_time').reset_index(drop=True)
+
+    async def fetch_historical_data(self, symbol: str, interval: str,
+                                    start_str, end_str=None) -> pd.DataFrame:
+        """
+        获取历史K线数据（输出格式与 BinanceUtility.fetch_historical_data 相同）
+        Fetch historical klines in the same format as BinanceUtility
+        """
+        raw = await self.fetch_raw_range(symbol, interval, to_milliseconds(start_str), to_milliseconds(end_str))
+        if raw.empty:
+            return pd.DataFrame(columns=OUTPUT_COLUMNS)
+        return store_to_output(raw)
+
+    async def sync_store(self, store: KlineStore, symbol: str, interval: str,
+                         start_str, end_str=None) -> pd.DataFrame:
+        """
+        与 KlineStore.sync 相同的增量同步（同一个 SyncPlan），缺失的区间改为并发下载
+        Same incremental sync as KlineStore.sync (same SyncPlan), with concurrent range fetches
+
+        尾部区间按时间顺序逐段落盘，中断后下次从最后一根已保存的K线继续。
+        Tail ranges are persisted in time order as they arrive, so an interrupted sync resumes.
+        """
+        plan = store.plan_sync(symbol, interval, start_str, end_str)
+        if plan.head_range is not None:
+            plan.commit_head(await self.fetch_raw_range(symbol, interval, *plan.head_range))
+        if plan.tail_range is not None:
+            async for page in self.iter_raw_ranges(symbol, interval, *plan.tail_range):
+                plan.commit(page)
+        return plan.result()
+
+    async def fetch_many(self, symbols: List[str], interval: str, start_str, end_str=None,
+                         store: Optional[KlineStore] = None,
+                         on_result: Optional[Callable[[str, Optional[pd.DataFrame]], None]] = None
+                         ) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        并发下载多个交易对 / Download many symbols concurrently
+
+        Returns:
+            {symbol: DataFrame 或 None（失败）}，与 download_symbols 相同
+        """
+        async def _one(symbol):
+            try:
+                if store is not None:
+                    df = await self.sync_store(store, symbol, interval, start_str, end_str)
+                else:
+                    df = await self.fetch_historical_data(symbol, interval, start_str, end_str)
+            except Exception as e:
+                logging.error(f"下载 {symbol} 失败: {e} / Failed to download {symbol}: {e}")
+                df = None
+            if on_result is not None:
+                on_result(symbol, df)
+            return df
+
+        frames = await asyncio.gather(*[_one(symbol) for symbol in symbols])
+        return dict(zip(symbols, frames))
+
+
+def download_symbols_async(symbols: List[str], interval: str, start_str, end_str=None,
+                           store: Optional[KlineStore] = None,
+                           limiter: Optional[WeightRateLimiter] = None,
+                           page_concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+                           on_result: Optional[Callable[[str, Optional[pd.DataFrame]], None]] = None,
+                           base_url: str = BASE_URL) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    download_symbols 的异步版本（同步调用接口）
+    Async counterpart of download_symbols with a synchronous entry point
+    """
+    async def _run():
+        async with AsyncBinanceUtility(base_url=base_url, limiter=limiter,
+                                       page_concurrency=page_concurrency) as client:
+            return await client.fetch_many(symbols, interval, start_str, end_str,
+                                           store=store, on_result=on_result)
+
+    return asyncio.run(_run())
+
+
+class BackgroundAsyncClient:
+    """
+    在后台线程运行事件循环的异步客户端 / Async client on a background event loop
+
+    提供与 BinanceUtility 相同的同步方法，连接池在整个进程生命周期内保持，
+    可以在 Flask 请求线程或预测服务中直接使用。
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Args:
+            **kwargs: 传给 AsyncBinanceUtility 的参数
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='binance-async', daemon=True)
+        self._thread.start()
+        self.client = AsyncBinanceUtility(**kwargs)
+        self.run(self.client.open())
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """在后台事件循环中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def fetch_historical_data(self, symbol, interval, start_str, end_str=None):
+        """与 BinanceUtility.fetch_historical_data 相同：失败时记录日志并返回 None"""
+        try:
+            return self.run(self.client.fetch_historical_data(symbol, interval, start_str, end_str))
+        except Exception as e:
+            logging.error(f"获取历史数据失败: {e} / Failed to fetch historical data: {e}")
+            return None
+
+    def fetch_many(self, symbols, interval, start_str, end_str=None, store=None):
+        return self.run(self.client.fetch_many(symbols, interval, start_str, end_str, store=store))
+
+    def get_realtime_price(self, symbol):
+        try:
+            return self.run(self.client.get_realtime_price(symbol))
+        except Exception as e:
+            logging.error(f"获取实时价格失败: {e} / Failed to fetch real-time price: {e}")
+            return None
+
+    def close(self):
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
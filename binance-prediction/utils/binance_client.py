@@ -4,6 +4,8 @@ import logging
 import os
 from dotenv import load_dotenv
 
+from utils.kline_store import fetch_klines
+
 # 加载环境变量
 # Load environment variables
 load_dotenv()
@@ -13,7 +15,7 @@ class BinanceUtility:
     Binance API 助手类，用于获取市场数据
     Binance API helper class for fetching market data
     """
-    def __init__(self, api_key=None, api_secret=None):
+    def __init__(self, api_key=None, api_secret=None, kline_store=None, rate_limiter=None):
         # 如果没有提供API Key，可以尝试从环境变量获取，或者使用匿名访问（仅限公开接口）
         # If no API Key is provided, try getting from environment or use anonymous access (public endpoints only)
         self.api_key = api_key or os.getenv('BINANCE_API_KEY')
@@ -26,6 +28,13 @@ class BinanceUtility:
             logging.error(f"Binance Client 初始化失败: {e} / Failed to initialize Binance Client: {e}")
             self.client = None
 
+        # 可选的本地K线仓库：设置后只增量下载缺失的K线
+        # Optional local kline store: when set, only missing klines are downloaded
+        self.kline_store = kline_store
+        # 可选的共享请求权重限流器（多线程下载时共用）
+        # Optional shared request-weight limiter (shared by concurrent downloaders)
+        self.rate_limiter = rate_limiter
+
     def fetch_historical_data(self, symbol, interval, start_str, end_str=None):
         """
         获取历史K线数据
@@ -41,6 +50,15 @@ class BinanceUtility:
             raise Exception("Binance Client 未初始化 / Binance Client not initialized")
 
         try:
+            if self.kline_store is not None:
+                logging.info(f"正在同步 {symbol} 的本地K线仓库... / Syncing local kline store for {symbol}...")
+                return self.kline_store.sync(self.client, symbol, interval, start_str, end_str,
+                                             limiter=self.rate_limiter)
+
+            if self.rate_limiter is not None:
+                return fetch_klines(self.client, symbol, interval, start_str, end_str,
+                                    limiter=self.rate_limiter)
+
             logging.info(f"正在从 Binance 获取 {symbol} 的历史数据... / Fetching historical data for {symbol} from Binance...")
             klines = self.client.get_historical_klines(symbol, interval, start_str, end_str)
             
@@ -0,0 +1,160 @@
+"""
+列式存储模块
+Columnar Storage Module
+
+用 Parquet 保存原始K线和处理后的特征数据：列带类型、时间戳为原生类型，
+读取时可以只读需要的列和时间范围，避免每次启动都解析大 CSV。
+Stores raw klines and processed features as Parquet: typed columns, native
+timestamps, and reads limited to the requested columns and time range, so
+training/evaluation no longer re-parse large CSV files on every start.
+
+依赖 pyarrow；未安装时自动回退到 CSV。
+Requires pyarrow; falls back to CSV when it is not installed.
+
+作者: qinshihuang166
+"""
+
+import os
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+TIMESTAMP_COLUMN = 'timestamp'
+# 需要保存为整数的列（Binance 完整K线中的成交笔数）
+INTEGER_COLUMNS = ['number_of_trades']
+
+
+def columnar_path(path: str) -> str:
+    """data/BTCUSDT_raw_data.csv → data/BTCUSDT_raw_data.parquet"""
+    root, _ = os.path.splitext(path)
+    return root + '.parquet'
+
+
+def use_columnar(fmt: str) -> bool:
+    """是否使用列式存储（配置为 parquet 且已安装 pyarrow）"""
+    return fmt == 'parquet' and HAS_PYARROW
+
+
+def to_typed_frame(df: pd.DataFrame, float_dtype: str = 'float64') -> pd.DataFrame:
+    """
+    统一列类型: 时间戳 → datetime64，计数列 → int64，其余数值列 → float_dtype
+
+    Args:
+        df: 原始数据（timestamp 可以是列，也可以是索引）
+        float_dtype: 浮点列类型，'float32' 或 'float64'
+    """
+    df = df.copy()
+    if TIMESTAMP_COLUMN in df.columns:
+        df[TIMESTAMP_COLUMN] = pd.to_datetime(df[TIMESTAMP_COLUMN])
+    for col in df.columns:
+        if col == TIMESTAMP_COLUMN:
+            continue
+        if col in INTEGER_COLUMNS:
+            df[col] = df[col].astype('int64')
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(float_dtype)
+    return df
+
+
+def table_exists(path: str) -> bool:
+    """CSV 或对应的 Parquet 文件任意一个存在即可"""
+    return os.path.exists(path) or os.path.exists(columnar_path(path))
+
+
+def save_table(df: pd.DataFrame, path: str, fmt: str = 'parquet',
+               float_dtype: str = 'float64', index: bool = False) -> str:
+    """
+    保存数据表
+    Save a table
+
+    Args:
+        df: 要保存的数据
+        path: 目标路径（以 .csv 结尾也可以，Parquet 会自动换成 .parquet 后缀）
+        fmt: 'parquet' 或 'csv'
+        float_dtype: 浮点列类型
+        index: 是否保存索引（处理后的数据以时间戳为索引）
+
+    Returns:
+        实际写入的文件路径
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if not use_columnar(fmt):
+        df.to_csv(path, index=index)
+        return path
+
+    out_path = columnar_path(path)
+    typed = to_typed_frame(df, float_dtype)
+    typed.to_parquet(out_path, index=index)
+    return out_path
+
+
+def load_table(path: str,
+               columns: Optional[List[str]] = None,
+               start=None,
+               end=None,
+               fmt: str = 'parquet') -> pd.DataFrame:
+    """
+    读取数据表，CSV 会被透明地转换为 Parquet
+    Load a table; CSV files are transparently converted to Parquet
+
+    读取顺序:
+    1. 如果 Parquet 存在且不比 CSV 旧 → 直接读 Parquet（只读需要的列/时间范围）
+    2. 否则读 CSV，并在旁边写一份 Parquet，下次启动直接使用
+
+    Args:
+        path: 文件路径（.csv 或 .parquet）
+        columns: 只读取这些列（timestamp 总会被读取）
+        start: 开始时间（含）
+        end: 结束时间（含）
+        fmt: 'parquet' 或 'csv'
+
+    Returns:
+        DataFrame（timestamp 为普通列）
+    """
+    parquet_path = path if path.endswith('.parquet') else columnar_path(path)
+    csv_path = None if path.endswith('.parquet') else path
+
+    parquet_fresh = os.path.exists(parquet_path) and (
+        csv_path is None or not os.path.exists(csv_path)
+        or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+    )
+
+    if parquet_fresh and HAS_PYARROW:
+        read_columns = None
+        if columns is not None:
+            read_columns = [TIMESTAMP_COLUMN] + [c for c in columns if c != TIMESTAMP_COLUMN]
+        filters = []
+        if start is not None:
+            filters.append((TIMESTAMP_COLUMN, '>=', pd.Timestamp(start)))
+        if end is not None:
+            filters.append((TIMESTAMP_COLUMN, '<=', pd.Timestamp(end)))
+        table = pq.read_table(parquet_path, columns=read_columns, filters=filters or None)
+        return table.to_pandas()
+
+    if csv_path is None or not os.path.exists(csv_path):
+        raise FileNotFoundError(f"❌ 数据文件不存在: {path}")
+
+    df = pd.read_csv(csv_path)
+    if TIMESTAMP_COLUMN in df.columns:
+        df[TIMESTAMP_COLUMN] = pd.to_datetime(df[TIMESTAMP_COLUMN])
+
+    # 透明转换：下次启动直接读 Parquet
+    # Transparent conversion: the next start reads Parquet directly
+    if use_columnar(fmt):
+        to_typed_frame(df).to_parquet(parquet_path, index=False)
+        print(f"  ✓ 已转换为列式存储: {parquet_path}")
+
+    if start is not None:
+        df = df[df[TIMESTAMP_COLUMN] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df[TIMESTAMP_COLUMN] <= pd.Timestamp(end)]
+    if columns is not None:
+        df = df[[TIMESTAMP_COLUMN] + [c for c in columns if c != TIMESTAMP_COLUMN]]
+    return df.reset_index(drop=True)
@@ -0,0 +1,320 @@
+"""
+事件驱动回测引擎（手续费 / 滑点 / 做空 / 杠杆 / 延迟）
+Event-Driven Backtester with Fees, Slippage, Shorts, Leverage and Latency
+
+模拟按事件推进，而不是逐根K线创建对象：
+- 订单事件：目标仓位发生变化的K线（加上延迟后成交）
+- 强平事件：两次订单之间价格触及强平价
+
+两次事件之间持仓数量和现金不变，所以：
+- 区间内是否触及强平价用稀疏表做 O(1) 的区间最低价/最高价查询
+- 净值曲线在最后一次性向量化计算（现金 + 持仓 × 收盘价）
+一年的 1m K线（52.5 万根）通常在 1 秒内完成，耗时只和事件数量有关。
+
+The simulation advances from event to event (order fills after latency and
+liquidations) instead of bar by bar. Between events the position and cash
+are constant, so liquidation checks are O(1) sparse-table range queries and
+the equity curve is computed with NumPy once at the end.
+
+信号约定 / Signal convention:
+    target[t] 是在第 t 根K线收盘时决定的目标仓位（占净值的比例，负数为做空，
+    绝对值可以超过 1 表示杠杆）。latency_bars=0 时在第 t 根收盘价成交，
+    latency_bars=k≥1 时在第 t+k 根开盘价成交。目标不变时持仓数量保持不变。
+
+作者: qinshihuang166
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vectorized_backtest import HOURLY_PERIODS_PER_YEAR, summary_stats
+
+
+@dataclass
+class ExecutionModel:
+    """
+    成交成本和账户规则 / Execution costs and account rules
+
+    滑点曲线：slippage_bps = half_spread_bps + impact_bps × 参与率^impact_exponent，
+    参与率 = 成交数量 / 该K线成交量（平方根冲击模型）。
+    """
+
+    fee_rate: float = 0.001            # 手续费率（按成交额）/ Commission on notional
+    half_spread_bps: float = 1.0       # 半个买卖价差 / Half spread
+    impact_bps: float = 10.0           # 参与率为 100% 时的冲击成本 / Impact at 100% participation
+    impact_exponent: float = 0.5       # 冲击曲线指数 / Impact curve exponent
+    latency_bars: int = 1              # 下单到成交的延迟（K线数）/ Order latency in bars
+    max_leverage: float = 1.0          # 最大杠杆（目标仓位绝对值上限）/ Max |target|
+    maintenance_margin: float = 0.005  # 维持保证金率，低于则强平 / Maintenance margin ratio
+    allow_short: bool = False          # 是否允许做空 / Allow short positions
+
+    def slippage(self, quantity: float, bar_volume: float) -> float:
+        """单边滑点（比例）/ One-sided slippage as a fraction of price"""
+        participation = min(quantity / bar_volume, 1.0) if bar_volume > 0 else 1.0
+        return (self.half_spread_bps + self.impact_bps * participation ** self.impact_exponent) * 1e-4
+
+
+@dataclass
+class EventBacktestResult:
+    """
+    回测结果 / Backtest result
+
+    - equity / position / cash: 每根K线收盘时的净值、持仓数量和现金
+    - trades: 成交明细（bar, side, quantity, price, fee, slippage_cost, kind）
+    - stats: 统计指标（与 vectorized_backtest 相同的字段，外加成本汇总）
+    """
+
+    equity: np.ndarray
+    position: np.ndarray
+    cash: np.ndarray
+    trades: pd.DataFrame
+    stats: pd.Series
+    elapsed: float
+
+
+class _RangeExtrema:
+    """稀疏表：O(1) 查询任意区间的最小值和最大值 / Sparse table for O(1) range min/max"""
+
+    def __init__(self, low: np.ndarray, high: np.ndarray):
+        self.mins = [low]
+        self.maxs = [high]
+        span = 1
+        while span * 2 <= len(low):
+            prev_min, prev_max = self.mins[-1], self.maxs[-1]
+            self.mins.append(np.minimum(prev_min[:-span], prev_min[span:]))
+            self.maxs.append(np.maximum(prev_max[:-span], prev_max[span:]))
+            span *= 2
+
+    def query(self, start: int, end: int):
+        """区间 [start, end) 的 (最低价, 最高价)"""
+        level = (end - start).bit_length() - 1
+        right = end - (1 << level)
+        mins, maxs = self.mins[level], self.maxs[level]
+        return min(mins[start], mins[right]), max(maxs[start], maxs[right])
+
+
+def liquidation_price(cash: float, quantity: float, maintenance_margin: float) -> Optional[float]:
+    """
+    净值跌到维持保证金时的价格 / Price at which equity hits the maintenance margin
+
+    多头：cash + q·p = m·q·p  → p = -cash / (q·(1-m))
+    空头：cash + q·p = m·|q|·p → p = cash / (|q|·(1+m))
+    """
+    if quantity > 0:
+        price = -cash / (quantity * (1.0 - maintenance_margin))
+        return price if price > 0 else None
+    if quantity < 0:
+        return cash / (-quantity * (1.0 + maintenance_margin))
+    return None
+
+
+def run_event_backtest(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       volume: np.ndarray, target: np.ndarray,
+                       execution: Optional[ExecutionModel] = None,
+                       initial_capital: float = 10_000.0,
+                       periods_per_year: float = HOURLY_PERIODS_PER_YEAR) -> EventBacktestResult:
+    """
+    事件驱动回测
+    Event-driven backtest
+
+    Args:
+        open_, high, low, close, volume: (T,) K线数据
+        target: (T,) 每根K线收盘时的目标仓位（占净值比例）
+        execution: 成本和账户规则
+        initial_capital: 初始资金
+        periods_per_year: 年化用的周期数
+
+    Returns:
+        EventBacktestResult
+    """
+    start_time = time.perf_counter()
+    execution = execution or ExecutionModel()
+    open_, high, low, close, volume = (np.asarray(a, dtype=np.float64).reshape(-1)
+                                       for a in (open_, high, low, close, volume))
+    T = len(close)
+
+    lower = -execution.max_leverage if execution.allow_short else 0.0
+    target = np.clip(np.nan_to_num(np.asarray(target, dtype=np.float64).reshape(-1)), lower, execution.max_leverage)
+
+    # 订单事件：目标变化的K线，延迟 k 根后成交
+    latency = max(int(execution.latency_bars), 0)
+    changed = np.flatnonzero(np.diff(target, prepend=0.0) != 0)
+    fill_bars = changed + latency
+    keep = fill_bars < T
+    fill_bars, order_targets = fill_bars[keep], target[changed[keep]]
+    fill_prices = close[fill_bars] if latency == 0 else open_[fill_bars]
+    n_orders = len(fill_bars)
+
+    extrema = _RangeExtrema(low, high)
+    margin = execution.maintenance_margin
+
+    # 状态变化点（成交或强平）：从该K线收盘起生效的现金和持仓
+    state_bar, state_cash, state_qty = [0], [initial_capital], [0.0]
+    # 成交明细：bar, 数量（正买负卖）, 价格, 手续费, 滑点成本, 是否强平
+    trade_log = []
+
+    cash, qty, last_bar = initial_capital, 0.0, 0
+    fill_bars_list = fill_bars.tolist()
+    fill_prices_list = fill_prices.tolist()
+    order_targets_list = order_targets.tolist()
+    volume_list = volume.tolist()
+
+    fee_rate = execution.fee_rate
+    # 全局最低/最高价：强平价在范围之外时不需要查询区间
+    global_low, global_high = float(low.min()), float(high.max())
+
+    # 开盘价成交时成交K线本身就有风险；收盘价成交时从下一根开始
+    # With open fills the fill bar itself is at risk; with close fills the next one
+    at_open = 1 if latency >= 1 else 0
+
+    for i in range(n_orders + 1):
+        bar = fill_bars_list[i] if i < n_orders else T
+
+        # 1) 检查上一个状态到这次成交之间是否触及强平价
+        if qty != 0.0:
+            liq = liquidation_price(cash, qty, margin)
+            seg_start = last_bar + 1 - at_open
+            seg_end = bar + 1 - at_open if bar < T else T
+            if liq is not None and seg_start < seg_end and \
+                    ((qty > 0 and liq >= global_low) or (qty < 0 and liq <= global_high)):
+                seg_low, seg_high = extrema.query(seg_start, seg_end)
+                if (qty > 0 and seg_low <= liq) or (qty < 0 and seg_high >= liq):
+                    window = slice(seg_start, seg_end)
+                    hits = low[window] <= liq if qty > 0 else high[window] >= liq
+                    liq_bar = seg_start + int(np.argmax(hits))
+                    # 跳空时按开盘价强平（更差的价格）
+                    gap = float(open_[liq_bar])
+                    price = min(liq, gap) if qty > 0 else max(liq, gap)
+                    fee = abs(qty) * price * fee_rate
+                    trade_log.append((liq_bar, -qty, price, fee, 0.0, True))
+                    cash = max(cash + qty * price - fee, 0.0)
+                    qty, last_bar = 0.0, liq_bar
+                    state_bar.append(liq_bar)
+                    state_cash.append(cash)
+                    state_qty.append(qty)
+
+        if i == n_orders:
+            break
+
+        # 2) 按目标仓位调仓
+        ref_price = fill_prices_list[i]
+        equity = cash + qty * ref_price
+        if equity <= 0.0:
+            # 爆仓：清空账户，停止交易
+            state_bar.append(bar)
+            state_cash.append(0.0)
+            state_qty.append(0.0)
+            break
+        delta = order_targets_list[i] * equity / ref_price - qty
+        if delta == 0.0:
+            continue
+        size = abs(delta)
+        # 每笔订单调用一次（不是每根K线），滑点公式只在 ExecutionModel.slippage 中维护
+        # Called once per order, not per bar; the formula lives only in ExecutionModel.slippage
+        slip = execution.slippage(size, volume_list[bar])
+        price = ref_price * (1.0 + slip) if delta > 0 else ref_price * (1.0 - slip)
+        fee = size * price * fee_rate
+        cash -= delta * price + fee
+        qty += delta
+        last_bar = bar
+
+        trade_log.append((bar, delta, price, fee, size * ref_price * slip, False))
+        state_bar.append(bar)
+        state_cash.append(cash)
+        state_qty.append(qty)
+
+    # 3) 向量化计算每根K线收盘时的现金、持仓和净值
+    # 同一根K线上的多个状态只保留最后一个
+    bars = np.asarray(state_bar, dtype=np.int64)
+    last_of_bar = np.append(bars[1:] != bars[:-1], True)
+    owner = np.searchsorted(bars[last_of_bar], np.arange(T), side='right') - 1
+    cash_curve = np.asarray(state_cash)[last_of_bar][owner]
+    qty_curve = np.asarray(state_qty)[last_of_bar][owner]
+    equity_curve = cash_curve + qty_curve * close
+
+    log = np.array(trade_log, dtype=np.float64).reshape(-1, 6)
+    trades = pd.DataFrame({
+        'bar': log[:, 0].astype(np.int64),
+        'side': pd.Categorical.from_codes((log[:, 1] < 0).astype(np.int8), ['BUY', 'SELL']),
+        'quantity': np.abs(log[:, 1]),
+        'price': log[:, 2],
+        'fee': log[:, 3],
+        'slippage_cost': log[:, 4],
+        'kind': pd.Categorical.from_codes(log[:, 5].astype(np.int8), ['order', 'liquidation']),
+    })
+
+    normalized = equity_curve / initial_capital
+    returns = np.diff(normalized, prepend=1.0) / np.concatenate([[1.0], np.maximum(normalized[:-1], 1e-12)])
+    exposure = np.divide(qty_curve * close, equity_curve, out=np.zeros(T), where=equity_curve > 0)
+    stats = summary_stats(exposure[None, :], returns[None, :], normalized[None, :], periods_per_year).iloc[0]
+    stats['trades'] = len(trades)
+    stats['total_fees'] = float(trades['fee'].sum())
+    stats['total_slippage'] = float(trades['slippage_cost'].sum())
+    stats['liquidations'] = int((trades['kind'] == 'liquidation').sum())
+    stats['final_equity'] = float(equity_curve[-1])
+
+    return EventBacktestResult(equity=equity_curve, position=qty_curve, cash=cash_curve,
+                               trades=trades, stats=stats, elapsed=time.perf_counter() - start_time)
+
+
+def test_event_backtest():
+    """无成本时与向量化回测一致；一年 1m K线的耗时 / Zero-cost parity and 1m-year timing"""
+    from utils.vectorized_backtest import run_sweep
+
+    rng = np.random.default_rng(0)
+
+    # 1) 无成本、无延迟、0/1 仓位：与向量化回测完全一致
+    T = 2000
+    close = 100 * np.exp(rng.normal(0, 0.01, T).cumsum())
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    signal = (rng.random(T) > 0.5).astype(float)
+    free = ExecutionModel(fee_rate=0, half_spread_bps=0, impact_bps=0, latency_bars=0)
+    result = run_event_backtest(open_, close, close, close, np.full(T, 1e9), signal, free)
+    market = close / open_ - 1.0
+    vectorized = run_sweep(np.concatenate([[0.0], signal[:-1]])[None, :] - 0.5, market)
+    assert np.allclose(result.equity / 10_000.0, vectorized.equity[0])
+    print(f"无成本一致性: 期末净值 {result.equity[-1]:.2f}")
+
+    # 2) 做空 + 3 倍杠杆 + 成本：暴涨行情触发强平
+    up = np.linspace(100, 200, 500)
+    short = run_event_backtest(up, up * 1.001, up * 0.999, up, np.full(500, 1e3), np.full(500, -3.0),
+                               ExecutionModel(allow_short=True, max_leverage=3.0, latency_bars=1))
+    assert short.stats['liquidations'] == 1 and short.position[-1] == 0
+    print(f"3x 做空强平于第 {short.trades['bar'].iloc[-1]} 根K线，剩余净值 {short.equity[-1]:.2f}")
+
+    # 3) 一年的 1m K线
+    T = 365 * 24 * 60
+    close = 30_000 * np.exp(rng.normal(0, 0.0008, T).cumsum())
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.random(T) * 0.0005)
+    low = np.minimum(open_, close) * (1 - rng.random(T) * 0.0005)
+    volume = rng.random(T) * 50 + 1
+    fast = pd.Series(close).rolling(60).mean().values
+    slow = pd.Series(close).rolling(1440).mean().values
+    target = np.where(fast > slow, 2.0, -2.0)
+    model = ExecutionModel(allow_short=True, max_leverage=2.0, latency_bars=1)
+
+    result = run_event_backtest(open_, high, low, close, volume, target, model,
+                                periods_per_year=365 * 24 * 60)
+    print(f"一年 1m K线 ({T} 根, {len(result.trades)} 笔成交): {result.elapsed:.3f} 秒")
+    print(result.stats[['total_return', 'sharpe', 'max_drawdown', 'total_fees', 'total_slippage', 'liquidations']])
+
+    # 最坏情况：每根K线都换仓
+    flip = np.where(np.arange(T) % 2 == 0, 1.0, -1.0)
+    worst = run_event_backtest(open_, high, low, close, volume, flip, model, periods_per_year=365 * 24 * 60)
+    print(f"每根K线换仓 ({len(worst.trades)} 笔成交): {worst.elapsed:.3f} 秒")
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_event_backtest()
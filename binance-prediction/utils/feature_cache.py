@@ -0,0 +1,209 @@
+"""
+特征缓存模块
+Feature Cache Module
+
+按内容寻址缓存 "清洗 → 技术指标 → 选择特征 → 归一化" 的结果。
+缓存键由原始数据的哈希、技术指标配置和 scaler 配置（或已拟合的 scaler 参数）组成，
+任何输入变化都会得到新的键，旧条目按最近使用时间淘汰，总大小不超过上限。
+Content-addressed cache for the clean → indicators → select → normalize
+pipeline. The key hashes the raw data slice, the indicator configuration and
+the scaler configuration (or the fitted scaler parameters), so any change in
+the inputs yields a new key; old entries are evicted least-recently-used
+first to keep the cache under a size limit.
+
+作者: qinshihuang166
+"""
+
+import hashlib
+import io
+import json
+import os
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# 特征计算逻辑变化时递增，使旧缓存全部失效
+# Bump when the feature engineering code changes to invalidate old entries
+FEATURE_CACHE_VERSION = 1
+
+DEFAULT_MAX_MB = 2048
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """对 DataFrame 的索引、列名和数值做哈希 / Hash index, columns and values"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def hash_scaler(scaler) -> str:
+    """对已拟合 scaler 的参数做哈希（类名 + 所有以 _ 结尾的拟合属性）"""
+    digest = hashlib.sha256(type(scaler).__name__.encode())
+    for name in sorted(vars(scaler)):
+        value = getattr(scaler, name)
+        if name.endswith('_') and isinstance(value, np.ndarray):
+            digest.update(name.encode())
+            if value.dtype == object:
+                # 例如 feature_names_in_：对象数组的字节是指针，按字符串哈希
+                digest.update(json.dumps([str(v) for v in value.ravel()]).encode())
+            else:
+                digest.update(np.ascontiguousarray(value).tobytes())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    特征缓存 / Feature cache
+
+    每个条目是一个 .npz 文件，包含原始尺度特征、归一化特征、时间索引、列名，
+    以及（训练时）拟合好的 scaler。命中时更新文件修改时间，作为 LRU 的依据。
+    """
+
+    def __init__(self, cache_dir: str, max_mb: float = DEFAULT_MAX_MB):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_mb: 缓存总大小上限（MB）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    # ------------------------------------------------------------------
+    # 缓存键 / Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(raw_df: pd.DataFrame, config, scaler=None) -> str:
+        """
+        计算缓存键
+        Compute the cache key
+
+        Args:
+            raw_df: 原始K线数据（load_raw_data 的结果）
+            config: DataConfig（使用其中的技术指标和 scaler 配置）
+            scaler: 已拟合的 scaler；为 None 表示在这份数据上重新拟合
+
+        Returns:
+            十六进制字符串
+        """
+        parts = {
+            'version': FEATURE_CACHE_VERSION,
+            'data': hash_frame(raw_df),
+            'use_indicators': bool(config.USE_TECHNICAL_INDICATORS),
+            'indicators': list(config.TECHNICAL_INDICATORS),
+        }
+        if scaler is None:
+            parts['scaler'] = [config.SCALER_TYPE, list(config.FEATURE_RANGE)]
+        else:
+            parts['scaler'] = hash_scaler(scaler)
+        payload = json.dumps(parts, sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:32]
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.npz')
+
+    # ------------------------------------------------------------------
+    # 读写 / Load and save
+    # ------------------------------------------------------------------
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        读取缓存条目，不存在或已损坏时返回 None
+
+        Returns:
+            {'real': DataFrame, 'scaled': DataFrame, 'scaler': scaler 或 None}
+        """
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                columns: List[str] = [str(c) for c in entry['columns']]
+                index = pd.DatetimeIndex(entry['index'], name='timestamp')
+                real = pd.DataFrame(entry['real'], index=index, columns=columns)
+                scaled = pd.DataFrame(entry['scaled'], index=index, columns=columns)
+                scaler = None
+                if entry['scaler'].size:
+                    scaler = joblib.load(io.BytesIO(entry['scaler'].tobytes()))
+        except Exception as e:
+            print(f"  ⚠️ 特征缓存条目已损坏，忽略: {path} ({e})")
+            os.remove(path)
+            return None
+
+        os.utime(path)  # 记录最近使用时间
+        return {'real': real, 'scaled': scaled, 'scaler': scaler}
+
+    def save(self, key: str, real: pd.DataFrame, scaled: pd.DataFrame, scaler=None) -> str:
+        """
+        写入缓存条目（先写临时文件再重命名，避免读到写了一半的文件）
+
+        Args:
+            key: 缓存键
+            real: 原始尺度特征（select_features 的结果）
+            scaled: 归一化后的特征
+            scaler: 拟合好的 scaler（训练时保存，评估时为 None）
+
+        Returns:
+            条目路径
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        scaler_bytes = b''
+        if scaler is not None:
+            buffer = io.BytesIO()
+            joblib.dump(scaler, buffer)
+            scaler_bytes = buffer.getvalue()
+
+        path = self.path_for(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                real=real.to_numpy(dtype=np.float64),
+                scaled=scaled.to_numpy(dtype=np.float64),
+                index=real.index.values.astype('datetime64[ns]'),
+                columns=np.array(list(real.columns), dtype=str),
+                scaler=np.frombuffer(scaler_bytes, dtype=np.uint8),
+            )
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    # ------------------------------------------------------------------
+    # 淘汰 / Eviction
+    # ------------------------------------------------------------------
+
+    def entries(self) -> List[str]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir) if name.endswith('.npz')]
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(path) for path in self.entries())
+
+    def evict(self) -> int:
+        """
+        按最近使用时间淘汰，直到总大小不超过上限
+        Evict least recently used entries until under the size limit
+
+        Returns:
+            删除的条目数
+        """
+        entries = sorted(self.entries(), key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in entries)
+        removed = 0
+        # 最新的条目即使超过上限也保留
+        while total > self.max_bytes and len(entries) > 1:
+            oldest = entries.pop(0)
+            total -= os.path.getsize(oldest)
+            os.remove(oldest)
+            removed += 1
+        return removed
+
+    def clear(self):
+        """清空缓存 / Remove every entry"""
+        for path in self.entries():
+            os.remove(path)
@@ -0,0 +1,395 @@
+"""
+超参数搜索模块
+Hyperparameter Search Module
+
+在 RunConfig 的参数（ModelConfig / TrainingConfig / DataConfig 的字段）上做搜索，不需要改 config_lstm.py：
+- grid：网格搜索（全部组合）
+- random：随机搜索（列表均匀抽取，或 uniform / loguniform / int 分布）
+- halving：连续减半（Successive Halving），每轮只保留最好的 1/eta 继续训练
+- hyperband：多组不同「试验数 × 起始轮数」的连续减半
+
+试验在独立的工作进程中并发运行；特征矩阵只计算一次（命中特征缓存），
+通过共享内存传给所有进程。grid / random 使用中位数剪枝：
+某个试验在第 e 轮的最佳验证损失比已完成试验同一轮的中位数差时提前停止。
+Trials run concurrently in worker processes that share one feature matrix
+through shared memory. Grid and random search use the median stopping rule
+against completed trials; successive halving and Hyperband prune by rung.
+
+试验函数签名 / Trial function:
+    trial_fn(arrays, trial) -> {'curve': [每轮验证损失], 'pruned': bool}
+    trial 包含 trial_id, params, config（应用了 params 的 RunConfig）, seed, epochs,
+    initial_epoch, checkpoint, references, prune
+
+作者: qinshihuang166
+"""
+
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_lstm import RunConfig
+from utils.walk_forward import init_worker, share_arrays, worker_arrays
+
+
+# ----------------------------------------------------------------------
+# 搜索空间 / Search space
+# ----------------------------------------------------------------------
+
+
+def load_space(path: str) -> Dict[str, Any]:
+    """
+    从 JSON 读取搜索空间，例如：
+    {"LSTM_UNITS": [[64, 32], [128, 64]], "LEARNING_RATE": {"loguniform": [1e-4, 1e-2]}}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        space = json.load(f)
+    for name in space:
+        RunConfig().section_of(name)
+    return space
+
+
+def check_space(space: Dict[str, Any], sections=('model', 'training'), extra_params=()) -> None:
+    """
+    检查搜索参数是否都能被试验函数使用，避免结果表里出现「搜索了但没有生效」的参数
+    Reject parameters the trial function would silently ignore
+
+    Args:
+        space: 搜索空间
+        sections: 试验函数会应用的配置段
+        extra_params: 其他配置段中同样会被应用的参数（例如按试验切窗口的 TIME_STEPS）
+
+    Raises:
+        ValueError: 参数属于其他配置段
+    """
+    config = RunConfig()
+    ignored = [name for name in space
+               if name not in extra_params and config.section_of(name) not in sections]
+    if ignored:
+        allowed = ' / '.join(sections) + (f"，以及 {', '.join(extra_params)}" if extra_params else '')
+        raise ValueError(f"❌ 搜索空间中的参数不会在试验中生效: {', '.join(ignored)}（只支持 {allowed}）")
+
+
+def grid_trials(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """网格搜索的全部组合（只支持列表）/ Every combination of list-valued parameters"""
+    names = list(space)
+    for name in names:
+        if not isinstance(space[name], list):
+            raise ValueError(f"❌ 网格搜索要求 {name} 是列表，当前: {space[name]}")
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def sample_params(space: Dict[str, Any], rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    随机抽取一组参数 / Draw one parameter set
+
+    列表：均匀抽取；{"uniform": [lo, hi]}、{"loguniform": [lo, hi]}、{"int": [lo, hi]}（含两端）
+    """
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[int(rng.integers(len(spec)))]
+        elif isinstance(spec, dict) and len(spec) == 1:
+            (kind, (low, high)), = spec.items()
+            if kind == 'uniform':
+                params[name] = float(rng.uniform(low, high))
+            elif kind == 'loguniform':
+                params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+            elif kind == 'int':
+                params[name] = int(rng.integers(low, high + 1))
+            else:
+                raise ValueError(f"❌ 不支持的分布: {kind}")
+        else:
+            params[name] = spec
+    return params
+
+
+# ----------------------------------------------------------------------
+# 剪枝 / Pruning
+# ----------------------------------------------------------------------
+
+def running_best(values: List[float]) -> List[float]:
+    """每轮为止的最佳值（越小越好）/ Best-so-far curve"""
+    return np.minimum.accumulate(np.asarray(values, dtype=float)).tolist() if values else []
+
+
+def median_should_prune(epoch: int, best_value: float, references: List[List[float]],
+                        warmup_epochs: int = 3, min_trials: int = 3) -> bool:
+    """
+    中位数剪枝规则：当前最佳值比已完成试验在同一轮的中位数差则停止
+    Median stopping rule against completed trials at the same epoch
+
+    Args:
+        epoch: 当前轮次（从 0 开始）
+        best_value: 当前试验到这一轮为止的最佳验证损失
+        references: 已完成试验的 running_best 曲线
+        warmup_epochs: 前几轮不剪枝
+        min_trials: 至少有几条参考曲线才剪枝
+    """
+    if epoch < warmup_epochs:
+        return False
+    at_epoch = [curve[epoch] for curve in references if len(curve) > epoch]
+    if len(at_epoch) < min_trials:
+        return False
+    return best_value > float(np.median(at_epoch))
+
+
+# ----------------------------------------------------------------------
+# 运行 / Running
+# ----------------------------------------------------------------------
+
+def _run_trial(trial_fn: Callable, trial: dict) -> dict:
+    start = time.perf_counter()
+    output = trial_fn(worker_arrays(), trial)
+    return {**trial, **output, 'seconds': time.perf_counter() - start}
+
+
+class TrialRunner:
+    """
+    并发运行试验 / Run trials concurrently
+
+    最多 max_workers 个试验同时运行；每完成一个就把它的曲线加入剪枝参考，
+    然后才提交下一个，所以越往后的试验剪枝越积极。
+    """
+
+    def __init__(self, trial_fn: Callable[[Dict[str, np.ndarray], dict], dict],
+                 arrays: Dict[str, np.ndarray], max_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None, quiet_workers: bool = True,
+                 start_method: str = 'spawn'):
+        """
+        Args:
+            trial_fn: 模块级试验函数（spawn 模式下按名称导入）
+            arrays: 共享给所有试验的数组（放入共享内存）
+            max_workers: 并发试验数，默认 CPU 核数；1 表示在当前进程中顺序执行
+            threads_per_worker: 每个进程的线程数，默认 CPU 核数 // 并发数
+            quiet_workers: 丢弃工作进程的标准输出
+            start_method: 进程启动方式（TensorFlow 需要 spawn）
+        """
+        cpus = os.cpu_count() or 1
+        self.trial_fn = trial_fn
+        self.arrays = arrays
+        self.max_workers = max_workers or cpus
+        self.threads_per_worker = threads_per_worker or max(1, cpus // self.max_workers)
+        self.quiet_workers = quiet_workers
+        self.start_method = start_method
+        self.references: List[List[float]] = []
+        self._pool = None
+        self._blocks = []
+
+    def __enter__(self):
+        if self.max_workers > 1:
+            specs, self._blocks = share_arrays(self.arrays)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=get_context(self.start_method),
+                initializer=init_worker, initargs=(specs, self.threads_per_worker, self.quiet_workers))
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        return False
+
+    def _finish(self, result: dict, on_result: Optional[Callable[[dict], None]]) -> dict:
+        if not result.get('pruned') and result.get('curve'):
+            self.references.append(running_best(result['curve']))
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    def run(self, trials: List[dict], on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """运行一批试验，返回结果（按完成顺序）/ Run a batch of trials"""
+        results = []
+        if self._pool is None:
+            for trial in trials:
+                start = time.perf_counter()
+                output = self.trial_fn(self.arrays, {**trial, 'references': list(self.references)})
+                result = {**trial, **output, 'seconds': time.perf_counter() - start}
+                results.append(self._finish(result, on_result))
+            return results
+
+        pending = list(trials)
+        running = set()
+        while pending or running:
+            while pending and len(running) < self.max_workers:
+                trial = pending.pop(0)
+                running.add(self._pool.submit(_run_trial, self.trial_fn,
+                                              {**trial, 'references': list(self.references)}))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results.append(self._finish(future.result(), on_result))
+        return results
+
+
+def _summarize(result: dict) -> dict:
+    curve = result.get('curve') or []
+    return {
+        'trial_id': result['trial_id'],
+        **{name: (json.dumps(value) if isinstance(value, (list, tuple)) else value)
+           for name, value in result['params'].items()},
+        'val_loss': float(min(curve)) if curve else float('nan'),
+        'epochs_run': result.get('initial_epoch', 0) + len(curve),
+        'status': 'pruned' if result.get('pruned') else 'complete',
+        'bracket': result.get('bracket'),
+        'rung': result.get('rung'),
+        'seconds': result.get('seconds', 0.0),
+        'params': json.dumps(result['params']),
+    }
+
+
+def successive_halving(runner: TrialRunner, configs: List[Dict[str, Any]], min_epochs: int,
+                       max_epochs: int, eta: int, checkpoint_dir: Optional[str],
+                       base_config: Optional[RunConfig] = None,
+                       bracket: int = 0, first_id: int = 0, seed: int = 42,
+                       on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+    """
+    连续减半：所有配置先训练 min_epochs 轮，保留最好的 1/eta 训练到 eta 倍轮数，直到 max_epochs
+    Successive halving from min_epochs up to max_epochs, keeping the best 1/eta per rung
+
+    有 checkpoint_dir 时下一轮从上一轮保存的模型继续训练，否则从头训练
+    """
+    base_config = base_config or RunConfig()
+    survivors = [{'trial_id': first_id + i, 'params': params, 'config': base_config.replace(**params),
+                  'bracket': bracket, 'seed': seed + first_id + i,
+                  'checkpoint': os.path.join(checkpoint_dir, f'trial_{first_id + i}.keras') if checkpoint_dir else None}
+                 for i, params in enumerate(configs)]
+    rows, rung, previous, budget = [], 0, 0, min_epochs
+    while survivors:
+        budget = min(budget, max_epochs)
+        trials = [{**t, 'rung': rung, 'epochs': budget,
+                   'initial_epoch': previous if t['checkpoint'] else 0, 'prune': None} for t in survivors]
+        results = runner.run(trials, on_result)
+        rows.extend(results)
+        if budget >= max_epochs:
+            break
+        results.sort(key=lambda r: min(r['curve']) if r.get('curve') else float('inf'))
+        keep = max(1, len(results) // eta)
+        survivors = [{k: r[k] for k in ('trial_id', 'params', 'config', 'bracket', 'seed', 'checkpoint')}
+                     for r in results[:keep]]
+        previous, budget, rung = budget, budget * eta, rung + 1
+    return rows
+
+
+def run_search(trial_fn: Callable, arrays: Dict[str, np.ndarray], space: Dict[str, Any],
+               method: str = 'random', n_trials: int = 20, max_epochs: int = 50,
+               min_epochs: int = 3, eta: int = 3, prune: bool = True,
+               warmup_epochs: int = 3, min_trials: int = 3, seed: int = 42,
+               checkpoint_dir: Optional[str] = None, base_config: Optional[RunConfig] = None,
+               max_workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+               on_result: Optional[Callable[[dict], None]] = None) -> pd.DataFrame:
+    """
+    运行超参数搜索并返回结果表（按验证损失排序）
+    Run a hyperparameter search and return the results table sorted by val_loss
+
+    Args:
+        trial_fn: 试验函数（见模块说明）
+        arrays: 共享给所有试验的数组
+        space: 搜索空间 {参数名: 列表或分布}
+        method: 'grid' / 'random' / 'halving' / 'hyperband'
+        n_trials: random / halving 的配置数（grid 为全部组合，hyperband 自动计算）
+        max_epochs: 单个试验的最大训练轮数
+        min_epochs: halving / hyperband 第一轮的训练轮数
+        eta: 每轮保留 1/eta
+        prune: grid / random 是否启用中位数剪枝
+        warmup_epochs, min_trials: 中位数剪枝参数
+        seed: 随机种子
+        checkpoint_dir: halving / hyperband 保存中间模型的目录（用于继续训练）
+        base_config: 基础配置，每个试验在此基础上应用自己的参数，默认 RunConfig()
+        max_workers, threads_per_worker: 并发设置
+        on_result: 每个试验完成时的回调
+
+    Returns:
+        每个试验（halving 时为每个试验的每一轮）一行的 DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    base_config = base_config or RunConfig()
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    rows = []
+    with TrialRunner(trial_fn, arrays, max_workers, threads_per_worker) as runner:
+        if method in ('grid', 'random'):
+            configs = grid_trials(space) if method == 'grid' else \
+                [sample_params(space, rng) for _ in range(n_trials)]
+            prune_spec = {'warmup_epochs': warmup_epochs, 'min_trials': min_trials} if prune else None
+            trials = [{'trial_id': i, 'params': params, 'config': base_config.replace(**params), 'seed': seed + i,
+                       'epochs': max_epochs, 'initial_epoch': 0, 'checkpoint': None, 'prune': prune_spec,
+                       'bracket': None, 'rung': None}
+                      for i, params in enumerate(configs)]
+            rows = runner.run(trials, on_result)
+
+        elif method == 'halving':
+            configs = [sample_params(space, rng) for _ in range(n_trials)]
+            rows = successive_halving(runner, configs, min_epochs, max_epochs, eta, checkpoint_dir,
+                                      base_config, seed=seed, on_result=on_result)
+
+        elif method == 'hyperband':
+            # s_max + 1 个 bracket：从「很多配置 × 很少轮数」到「很少配置 × 完整轮数」
+            s_max = int(math.log(max(max_epochs // min_epochs, 1), eta))
+            next_id = 0
+            for s in range(s_max, -1, -1):
+                n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+                start_epochs = max(min_epochs, int(max_epochs * eta ** -s))
+                configs = [sample_params(space, rng) for _ in range(n)]
+                print(f"  🎰 Hyperband bracket {s_max - s}: {n} 个配置, 起始 {start_epochs} 轮")
+                rows.extend(successive_halving(runner, configs, start_epochs, max_epochs, eta, checkpoint_dir,
+                                               base_config, bracket=s_max - s, first_id=next_id, seed=seed,
+                                               on_result=on_result))
+                next_id += n
+        else:
+            raise ValueError(f"❌ 不支持的搜索方法: {method}")
+
+    table = pd.DataFrame([_summarize(r) for r in rows])
+    return table.sort_values('val_loss', kind='stable').reset_index(drop=True)
+
+
+def _demo_trial(arrays: Dict[str, np.ndarray], trial: dict) -> dict:
+    """
+    自测用的试验：损失曲线 = 最优点距离 × 衰减，带少量噪声
+    Synthetic trial for the self-test
+    """
+    model = trial['config'].model
+    distance = abs(math.log10(model.LEARNING_RATE) + 3) + abs(model.DROPOUT_RATE - 0.2)
+    rng = np.random.default_rng(trial['trial_id'])
+    curve, best = [], float('inf')
+    for epoch in range(trial['initial_epoch'], trial['epochs']):
+        value = distance + float(arrays['noise'][epoch % len(arrays['noise'])]) + 1.0 / (epoch + 1) \
+            + rng.normal(0, 0.01)
+        curve.append(value)
+        best = min(best, value)
+        spec = trial.get('prune')
+        if spec and median_should_prune(epoch, best, trial['references'], **spec):
+            return {'curve': curve, 'pruned': True}
+    return {'curve': curve, 'pruned': False}
+
+
+def test_hyperparameter_search():
+    """四种搜索方法都能找到最优区域"""
+    space = {'LEARNING_RATE': [1e-4, 1e-3, 1e-2], 'DROPOUT_RATE': [0.1, 0.2, 0.3]}
+    arrays = {'noise': np.zeros(100)}
+
+    for method in ('grid', 'random', 'halving', 'hyperband'):
+        table = run_search(_demo_trial, arrays, space, method=method, n_trials=9, max_epochs=27,
+                           min_epochs=1, eta=3, max_workers=1 if method != 'random' else 2)
+        best = table.iloc[0]
+        pruned = int((table['status'] == 'pruned').sum())
+        print(f"{method:10s}: {len(table)} 行, 剪枝 {pruned}, 最佳 lr={best['LEARNING_RATE']}, "
+              f"dropout={best['DROPOUT_RATE']}, val_loss={best['val_loss']:.3f}, 总轮数 {int(table['epochs_run'].sum())}")
+        assert best['LEARNING_RATE'] == 1e-3
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_hyperparameter_search()
@@ -0,0 +1,134 @@
+"""
+K线流本地回放服务器
+Local Kline Stream Replay Server
+
+把历史K线按 Binance combined stream 的消息格式通过 WebSocket 推送出去，
+测试和本地开发时代替 wss://stream.binance.com。
+Replays historical candles as Binance combined-stream kline messages over a
+local WebSocket, standing in for wss://stream.binance.com in tests and
+local development.
+
+作者: qinshihuang166
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import websockets
+from binance.helpers import interval_to_milliseconds
+
+
+def kline_message(symbol: str, interval: str, interval_ms: int, candle: Dict,
+                  closed: bool, close_fraction: float = 1.0) -> str:
+    """
+    构造一条 combined stream 格式的K线消息
+    Build one combined-stream kline message
+
+    Args:
+        candle: 含 timestamp, open, high, low, close, volume 的K线
+        closed: 是否已收盘
+        close_fraction: 未收盘时的进度（0~1），用于生成逐步变化的中间价格
+    """
+    open_ms = int(pd.Timestamp(candle['timestamp']).value // 1_000_000)
+    o, c = float(candle['open']), float(candle['close'])
+    price = o + (c - o) * close_fraction
+    return json.dumps({
+        'stream': f'{symbol.lower()}@kline_{interval}',
+        'data': {
+            'e': 'kline',
+            'E': int(time.time() * 1000),
+            's': symbol,
+            'k': {
+                't': open_ms,
+                'T': open_ms + interval_ms - 1,
+                's': symbol,
+                'i': interval,
+                'o': str(o),
+                'c': str(c if closed else price),
+                'h': str(float(candle['high'])),
+                'l': str(float(candle['low'])),
+                'v': str(float(candle['volume']) * (1.0 if closed else close_fraction)),
+                'x': closed,
+            },
+        },
+    })
+
+
+class KlineReplayServer:
+    """
+    回放服务器 / Replay server
+
+    客户端按 Binance 的方式连接 /stream?streams=btcusdt@kline_1h/...，
+    服务器对每根K线先推送 partial_updates 条未收盘消息，再推送一条收盘消息。
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], interval: str = '1h',
+                 delay: float = 0.0, partial_updates: int = 1,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            frames: {symbol: fetch_historical_data 格式的 DataFrame}
+            interval: K线间隔
+            delay: 每根K线之间的间隔（秒）
+            partial_updates: 每根K线收盘前推送的未收盘消息数
+            host: 监听地址
+            port: 端口（0 表示自动分配）
+        """
+        self.frames = {s.upper(): df.reset_index(drop=True) for s, df in frames.items()}
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.delay = delay
+        self.partial_updates = partial_updates
+        self.host = host
+        self.port = port
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f'ws://{self.host}:{self.port}'
+
+    @staticmethod
+    def _request_path(ws) -> str:
+        request = getattr(ws, 'request', None)
+        return getattr(request, 'path', None) or getattr(ws, 'path', '')
+
+    def _subscribed(self, path: str):
+        streams = parse_qs(urlparse(path).query).get('streams', [''])[0]
+        symbols = [s.split('@')[0].upper() for s in streams.split('/') if s]
+        return [s for s in symbols if s in self.frames]
+
+    async def _handler(self, ws, path: Optional[str] = None):
+        symbols = self._subscribed(path or self._request_path(ws))
+        length = max((len(self.frames[s]) for s in symbols), default=0)
+        for i in range(length):
+            for symbol in symbols:
+                df = self.frames[symbol]
+                if i >= len(df):
+                    continue
+                candle = df.iloc[i]
+                for j in range(self.partial_updates):
+                    await ws.send(kline_message(symbol, self.interval, self.interval_ms, candle,
+                                                closed=False, close_fraction=(j + 1) / (self.partial_updates + 1)))
+                await ws.send(kline_message(symbol, self.interval, self.interval_ms, candle, closed=True))
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        # 回放结束后保持连接，直到客户端断开
+        await ws.wait_closed()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        await asyncio.Future()
@@ -0,0 +1,352 @@
+"""
+K线本地存储模块
+Local Kline Store Module
+
+按 (交易对, 时间间隔) 在本地保存已经收盘的K线，每次只下载缺失的尾部数据；
+下载被中断后，下次运行会从最后一根已保存的K线继续。
+Persist closed klines per (symbol, interval) and only fetch the missing tail;
+an interrupted download resumes from the last candle on disk.
+
+作者: qinshihuang166
+"""
+
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from binance.helpers import date_to_milliseconds, interval_to_milliseconds
+
+from utils.rate_limiter import call_with_limits
+
+# 本地文件中的列（open_time 为毫秒时间戳，便于精确续传）
+# Columns on disk (open_time in milliseconds for exact resume)
+STORE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+OUTPUT_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Binance 单次请求最多返回 1000 根K线
+# Binance returns at most 1000 klines per request
+PAGE_LIMIT = 1000
+
+
+def to_milliseconds(value) -> Optional[int]:
+    """把 '1 year ago UTC' / '1 Jan, 2023' / 毫秒整数 统一转换为毫秒"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return date_to_milliseconds(value)
+
+
+def iter_kline_pages(client, symbol: str, interval: str,
+                     start_ms: int, end_ms: Optional[int], limiter=None):
+    """
+    按页从 Binance 拉取 [start_ms, end_ms] 区间的K线
+    Page through klines in [start_ms, end_ms]
+
+    Args:
+        limiter: 可选的共享 WeightRateLimiter，多线程下载时共用一个请求权重预算
+    """
+    interval_ms = interval_to_milliseconds(interval)
+    cursor = start_ms
+    while True:
+        params = dict(symbol=symbol, interval=interval, startTime=cursor, limit=PAGE_LIMIT)
+        if end_ms is not None:
+            params['endTime'] = end_ms
+        page = call_with_limits(limiter, client, client.get_klines, **params)
+        if not page:
+            return
+        yield page
+        if len(page) < PAGE_LIMIT:
+            return
+        cursor = page[-1][0] + interval_ms
+        if end_ms is not None and cursor > end_ms:
+            return
+
+
+def store_to_output(df: pd.DataFrame) -> pd.DataFrame:
+    """存储格式 → fetch_historical_data 的输出格式"""
+    out = pd.DataFrame({
+        'timestamp': pd.to_datetime(df['open_time'].values, unit='ms'),
+        'open': df['open'].values,
+        'high': df['high'].values,
+        'low': df['low'].values,
+        'close': df['close'].values,
+        'volume': df['volume'].values,
+    })
+    return out[OUTPUT_COLUMNS]
+
+
+def fetch_klines(client, symbol: str, interval: str, start_str, end_str=None,
+                 limiter=None) -> pd.DataFrame:
+    """不经过本地仓库，直接按页下载K线 / Download klines without the local store"""
+    pages = [klines_to_frame(p) for p in iter_kline_pages(
+        client, symbol, interval, to_milliseconds(start_str), to_milliseconds(end_str), limiter)]
+    if not pages:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    return store_to_output(pd.concat(pages, ignore_index=True))
+
+
+def klines_to_frame(klines: List[list]) -> pd.DataFrame:
+    """把 Binance 原始K线列表转换为存储格式的 DataFrame"""
+    if not klines:
+        return pd.DataFrame(columns=STORE_COLUMNS)
+    df = pd.DataFrame([k[:6] for k in klines], columns=STORE_COLUMNS)
+    df['open_time'] = df['open_time'].astype('int64')
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = df[col].astype(float)
+    return df
+
+
+class KlineStore:
+    """
+    本地K线仓库 / Local kline store
+
+    每个 (symbol, interval) 对应一个 CSV 文件和一个元数据文件:
+    One CSV file plus a small metadata file per (symbol, interval):
+
+        {root_dir}/{symbol}_{interval}.csv
+        {root_dir}/{symbol}_{interval}.meta.json
+
+    - 只保存已收盘的K线，未收盘的K线只出现在返回结果中，不会落盘
+      Only closed candles are persisted; the in-progress candle is returned but never stored
+    - 尾部数据按页追加写入，中断后可以续传
+      Tail pages are appended as they arrive, so interrupted downloads resume
+    """
+
+    def __init__(self, root_dir: str = os.path.join('data', 'klines')):
+        self.root_dir = root_dir
+
+    # ------------------------------------------------------------------
+    # 文件路径和元数据 / Paths and metadata
+    # ------------------------------------------------------------------
+
+    def path_for(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root_dir, f'{symbol}_{interval}.csv')
+
+    def _meta_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root_dir, f'{symbol}_{interval}.meta.json')
+
+    def _read_meta(self, symbol: str, interval: str) -> dict:
+        path = self._meta_path(symbol, interval)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol: str, interval: str, meta: dict):
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self._meta_path(symbol, interval)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # 读写 / Reading and writing
+    # ------------------------------------------------------------------
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame:
+        """读取本地已保存的全部K线（存储格式）"""
+        path = self.path_for(symbol, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=STORE_COLUMNS)
+
+        df = pd.read_csv(path)
+        # 被中断的写入可能留下不完整的最后一行，直接丢弃，下次会重新下载
+        # A write interrupted mid-line leaves a partial last row; drop it and re-fetch
+        df = df.dropna()
+        df['open_time'] = df['open_time'].astype('int64')
+        df = df.drop_duplicates(subset='open_time', keep='last').sort_values('open_time')
+        return df.reset_index(drop=True)
+
+    def _append(self, symbol: str, interval: str, df: pd.DataFrame):
+        """把新的已收盘K线追加到本地文件"""
+        if df.empty:
+            return
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self.path_for(symbol, interval)
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        df[STORE_COLUMNS].to_csv(path, mode='a', header=write_header, index=False)
+
+    def _rewrite(self, symbol: str, interval: str, df: pd.DataFrame):
+        """整体重写本地文件（仅在向前补齐历史数据时使用）"""
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self.path_for(symbol, interval)
+        tmp_path = path + '.tmp'
+        df[STORE_COLUMNS].to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def seed_from_csv(self, symbol: str, interval: str, csv_path: str) -> int:
+        """
+        用已有的 data/{symbol}_hist.csv 初始化本地仓库
+        Seed the store from an existing data/{symbol}_hist.csv
+
+        最后一行可能是下载时尚未收盘的K线，因此不导入。
+        The last row may have been an unclosed candle at download time, so it is skipped.
+
+        旧文件名里没有时间间隔，可能是别的间隔下载的：K线间隔的中位数
+        与 interval 不一致时不导入，交给增量同步重新下载。
+        The legacy file name has no interval, so it is only imported when the
+        median spacing of its candles matches `interval`.
+
+        Returns:
+            导入的K线数量
+        """
+        if not os.path.exists(self.path_for(symbol, interval)) and os.path.exists(csv_path):
+            legacy = pd.read_csv(csv_path)
+            if len(legacy) < 3:
+                return 0
+            legacy = legacy.iloc[:-1]
+            df = pd.DataFrame({
+                'open_time': pd.to_datetime(legacy['timestamp']).values.astype('datetime64[ms]').astype('int64'),
+                'open': legacy['open'].astype(float),
+                'high': legacy['high'].astype(float),
+                'low': legacy['low'].astype(float),
+                'close': legacy['close'].astype(float),
+                'volume': legacy['volume'].astype(float),
+            })
+            spacing = int(df['open_time'].diff().median())
+            if spacing != interval_to_milliseconds(interval):
+                logging.warning(f"{csv_path} 的K线间隔 ({spacing} ms) 与 {interval} 不一致，不导入 / "
+                                f"Not seeding {symbol} {interval}: {csv_path} has {spacing} ms spacing")
+                return 0
+            self._rewrite(symbol, interval, df)
+            self._write_meta(symbol, interval, {'covered_from_ms': int(df['open_time'].iloc[0])})
+            logging.info(f"已从 {csv_path} 导入 {len(df)} 根K线 / Seeded {len(df)} klines from {csv_path}")
+            return len(df)
+        return 0
+
+    # ------------------------------------------------------------------
+    # 下载 / Fetching
+    # ------------------------------------------------------------------
+
+    def plan_sync(self, symbol: str, interval: str, start_str, end_str=None) -> 'SyncPlan':
+        """
+        增量同步计划：需要下载的区间 + 每段数据到达后落盘的钩子
+        Plan an incremental sync: the ranges to fetch plus commit hooks
+
+        同步版 (sync) 和异步客户端 (AsyncBinanceUtility.sync_store) 共用同一份计划逻辑，
+        只是下载方式不同。
+        """
+        return SyncPlan(self, symbol, interval, to_milliseconds(start_str), to_milliseconds(end_str))
+
+    def sync(self, client, symbol: str, interval: str,
+             start_str, end_str=None, limiter=None) -> pd.DataFrame:
+        """
+        同步本地仓库并返回 [start_str, end_str] 区间的K线
+        Sync the store and return klines in [start_str, end_str]
+
+        Args:
+            client: binance.client.Client 实例
+            symbol: 交易对 (e.g., 'BTCUSDT')
+            interval: 时间间隔 (e.g., '1h')
+            start_str: 开始时间 (e.g., "1 Jan, 2023" / "1 year ago UTC")
+            end_str: 结束时间 (可选)
+            limiter: 可选的共享 WeightRateLimiter
+
+        Returns:
+            与 BinanceUtility.fetch_historical_data 相同格式的 DataFrame
+        """
+        plan = self.plan_sync(symbol, interval, start_str, end_str)
+
+        # 1. 向前补齐：请求的开始时间早于本地覆盖范围
+        # 1. Extend backwards when the requested start predates what we cover
+        if plan.head_range is not None:
+            logging.info(f"{symbol} {interval}: 补齐早期数据 / back-filling older klines")
+            pages = [klines_to_frame(p) for p in iter_kline_pages(client, symbol, interval, *plan.head_range, limiter)]
+            plan.commit_head(pd.concat(pages, ignore_index=True) if pages else klines_to_frame([]))
+
+        # 2. 增量下载尾部：每页立即落盘，保证可以断点续传
+        # 2. Fetch the missing tail; every page is persisted right away so the download can resume
+        if plan.tail_range is not None:
+            for page in iter_kline_pages(client, symbol, interval, *plan.tail_range, limiter):
+                plan.commit(klines_to_frame(page))
+
+        if plan.n_fetched:
+            logging.info(f"{symbol} {interval}: 新增 {plan.n_fetched} 根K线 / fetched {plan.n_fetched} new klines")
+
+        # 3. 截取请求区间并转换为统一输出格式
+        return plan.result()
+
+
+class SyncPlan:
+    """
+    一次增量同步的计划 / One incremental sync
+
+    - head_range: 需要向前补齐的区间 (start_ms, end_ms)，不需要时为 None
+    - tail_range: 需要增量下载的尾部 (start_ms, end_ms 或 None)，不需要时为 None
+    - commit_head(df): 补齐的早期K线下载完成后调用，重写本地文件并更新覆盖范围
+    - commit(df): 尾部每到一段（按时间顺序）调用一次，已收盘的K线立即追加到本地文件
+    - result(): 返回 [start_ms, end_ms] 区间的K线（输出格式）
+    """
+
+    def __init__(self, store: KlineStore, symbol: str, interval: str,
+                 start_ms: int, end_ms: Optional[int]):
+        self.store = store
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.now_ms = int(time.time() * 1000)
+
+        self.stored = store.load(symbol, interval)
+        self.fetched: List[pd.DataFrame] = []
+        self.unclosed: List[pd.DataFrame] = []
+        self.head_range: Optional[Tuple[int, int]] = None
+        self.tail_range: Optional[Tuple[int, Optional[int]]] = None
+
+        covered_from = store._read_meta(symbol, interval).get('covered_from_ms')
+        self._covered_from = covered_from
+        if not self.stored.empty and (covered_from is None or start_ms < covered_from):
+            self._covered_from = start_ms if covered_from is None else min(start_ms, covered_from)
+            head_end = int(self.stored['open_time'].iloc[0]) - 1
+            if start_ms <= head_end:
+                self.head_range = (start_ms, head_end)
+            else:
+                # 本地数据已经从请求的开始时间（上市时间）起，只需记录覆盖范围
+                store._write_meta(symbol, interval, {'covered_from_ms': self._covered_from})
+
+        if self.stored.empty:
+            tail_start = start_ms
+            store._write_meta(symbol, interval, {'covered_from_ms': start_ms})
+        else:
+            tail_start = int(self.stored['open_time'].iloc[-1]) + self.interval_ms
+        if end_ms is None or tail_start <= end_ms:
+            self.tail_range = (tail_start, end_ms)
+
+    @property
+    def n_fetched(self) -> int:
+        """本次新落盘的K线数量"""
+        return sum(len(df) for df in self.fetched)
+
+    def commit_head(self, head: pd.DataFrame):
+        """补齐的早期K线（存储格式）：与本地数据合并后重写文件，并扩大覆盖范围"""
+        if not head.empty:
+            stored = pd.concat([head, self.stored], ignore_index=True)
+            self.stored = stored.drop_duplicates(subset='open_time', keep='last')
+            self.store._rewrite(self.symbol, self.interval, self.stored)
+        self.store._write_meta(self.symbol, self.interval, {'covered_from_ms': self._covered_from})
+
+    def commit(self, page: pd.DataFrame):
+        """
+        尾部的一段K线（存储格式，必须按时间顺序提交）：已收盘的部分立即追加到本地文件，
+        未收盘的只出现在 result() 中
+        """
+        closed_mask = (page['open_time'] + self.interval_ms) <= self.now_ms
+        closed = page[closed_mask]
+        self.store._append(self.symbol, self.interval, closed)
+        self.fetched.append(closed)
+        self.unclosed.append(page[~closed_mask])
+
+    def result(self) -> pd.DataFrame:
+        """本地数据 + 新下载的数据，截取请求区间并转换为统一输出格式"""
+        df = pd.concat([self.stored] + self.fetched + self.unclosed, ignore_index=True)
+        df = df.drop_duplicates(subset='open_time', keep='last').sort_values('open_time')
+        mask = df['open_time'] >= self.start_ms
+        if self.end_ms is not None:
+            mask &= df['open_time'] <= self.end_ms
+        return store_to_output(df[mask])
@@ -0,0 +1,415 @@
+"""
+K线 WebSocket 流式接入模块
+Kline WebSocket Stream Ingestion Module
+
+订阅多个交易对的 Binance K线流（combined stream），每个交易对在内存中保留一个
+固定长度的环形缓冲区；K线收盘时立即回调，驱动指标和预测流水线，
+从收盘到预测只需要毫秒级，而不是一次 REST 往返加全量重算。
+Subscribes to Binance kline streams for many symbols, keeps a fixed-size
+in-memory ring buffer of recent candles per symbol and fires a callback as
+soon as a candle closes, so predictions follow the close within milliseconds
+instead of a REST round trip plus recomputation.
+
+测试时可以把 base_url 指向 utils/kline_replay.py 的本地回放服务器。
+Point base_url at the local replay server in utils/kline_replay.py for tests.
+
+作者: qinshihuang166
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import websockets
+from binance.helpers import interval_to_milliseconds
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.kline_store import OUTPUT_COLUMNS
+
+WS_BASE_URL = 'wss://stream.binance.com:9443'
+DEFAULT_BUFFER_SIZE = 1000
+
+# 环形缓冲区的列：open_time（毫秒）+ OHLCV
+_FIELDS = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+
+class CandleRingBuffer:
+    """
+    固定容量的K线环形缓冲区 / Fixed-capacity candle ring buffer
+
+    每根K线占一行 [open_time_ms, open, high, low, close, volume]，追加是 O(1)，
+    满了以后覆盖最旧的K线；同一 open_time 重复到达时替换最后一行。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE):
+        self.capacity = capacity
+        self.data = np.empty((capacity, len(_FIELDS)), dtype=np.float64)
+        self.head = 0   # 下一次写入的位置
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        if self.size == 0:
+            return None
+        return int(self.data[(self.head - 1) % self.capacity, 0])
+
+    def push(self, row) -> None:
+        """追加一根已收盘的K线 / Append one closed candle"""
+        if self.size and int(row[0]) == self.last_open_time:
+            self.data[(self.head - 1) % self.capacity] = row
+            return
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回所有K线（复制）/ Candles in time order (copy)"""
+        if self.size < self.capacity:
+            return self.data[:self.size].copy()
+        return np.concatenate([self.data[self.head:], self.data[:self.head]])
+
+
+def candle_row(candle: Mapping) -> Tuple[float, ...]:
+    """K线字典 → 环形缓冲区的一行"""
+    return (float(candle['open_time']), float(candle['open']), float(candle['high']),
+            float(candle['low']), float(candle['close']), float(candle['volume']))
+
+
+def rows_to_frame(rows: np.ndarray) -> pd.DataFrame:
+    """缓冲区的行 → 与 fetch_historical_data 相同格式的 DataFrame"""
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(rows[:, 0].astype('int64'), unit='ms'),
+        'open': rows[:, 1],
+        'high': rows[:, 2],
+        'low': rows[:, 3],
+        'close': rows[:, 4],
+        'volume': rows[:, 5],
+    })[OUTPUT_COLUMNS]
+
+
+def parse_kline_message(message) -> Optional[Tuple[str, dict, bool, int]]:
+    """
+    解析K线流消息（支持单一流和 combined stream 两种格式）
+    Parse a kline stream message (raw or combined stream format)
+
+    Returns:
+        (symbol, candle, is_closed, event_time_ms)；不是K线消息时返回 None
+    """
+    payload = json.loads(message) if isinstance(message, (str, bytes)) else message
+    data = payload.get('data', payload)
+    if data.get('e') != 'kline':
+        return None
+    k = data['k']
+    candle = {
+        'open_time': int(k['t']),
+        'open': float(k['o']),
+        'high': float(k['h']),
+        'low': float(k['l']),
+        'close': float(k['c']),
+        'volume': float(k['v']),
+    }
+    return k['s'].upper(), candle, bool(k['x']), int(data.get('E', k['T']))
+
+
+class KlineStreamClient:
+    """
+    多交易对K线流客户端 / Multi-symbol kline stream client
+
+    - buffers[symbol]: 已收盘K线的环形缓冲区
+    - live[symbol]: 正在形成的K线（每条推送都会更新）
+    - on_closed(symbol, candle): K线收盘时在工作线程中调用
+    - backfill(symbol, interval, start_ms, end_ms) -> DataFrame: 断线重连后补齐缺失的K线（可选，通常用 REST）
+
+    backfill 和 on_closed 可能阻塞（REST 请求、模型预测），run() 把收盘K线交给线程池处理，
+    事件循环只负责接收消息：同一交易对的收盘K线按顺序处理，不同交易对并行处理，
+    同一分钟有很多交易对收盘时也不会停止接收推送。
+    backfill and on_closed may block (REST calls, model inference), so run()
+    hands closes to a thread pool and the event loop only receives: closes of
+    one symbol are processed in order, different symbols in parallel.
+    """
+
+    def __init__(self, symbols: List[str], interval: str = '1h',
+                 base_url: str = WS_BASE_URL,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 on_closed: Optional[Callable[[str, dict], None]] = None,
+                 backfill: Optional[Callable[[str, str, int, int], pd.DataFrame]] = None,
+                 max_reconnect_delay: float = 60.0,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            symbols: 交易对列表
+            interval: K线间隔
+            base_url: WebSocket 地址（测试时指向本地回放服务器）
+            buffer_size: 每个交易对保留的已收盘K线数
+            on_closed: 收盘回调
+            backfill: 缺口补齐函数
+            max_reconnect_delay: 重连退避的最长间隔（秒）
+            max_workers: 处理收盘K线的线程数（默认每个交易对一个，最多 32 个）
+        """
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.base_url = base_url.rstrip('/')
+        self.buffers = {s: CandleRingBuffer(buffer_size) for s in self.symbols}
+        self.live: Dict[str, dict] = {}
+        self.on_closed = on_closed
+        self.backfill = backfill
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_workers = max_workers or min(32, len(self.symbols)) or 1
+        self.lock = threading.Lock()
+        self.closed_count = 0
+        self.last_latency_ms: Optional[float] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def url(self) -> str:
+        streams = '/'.join(f'{s.lower()}@kline_{self.interval}' for s in self.symbols)
+        return f'{self.base_url}/stream?streams={streams}'
+
+    # ------------------------------------------------------------------
+    # 状态 / State
+    # ------------------------------------------------------------------
+
+    def seed(self, symbol: str, df: pd.DataFrame):
+        """
+        用历史K线预填缓冲区（df 为 fetch_historical_data 格式，只应包含已收盘的K线）
+        Pre-fill a buffer with closed historical candles
+        """
+        open_times = pd.to_datetime(df['timestamp']).values.astype('datetime64[ms]').astype('int64')
+        rows = np.column_stack([open_times.astype(np.float64)] +
+                               [df[c].to_numpy(dtype=np.float64) for c in _FIELDS[1:]])
+        with self.lock:
+            buffer = self.buffers[symbol.upper()]
+            for row in rows:
+                buffer.push(row)
+
+    def frame(self, symbol: str, include_live: bool = True) -> Tuple[pd.DataFrame, bool]:
+        """
+        当前缓冲区的K线 / Buffered candles as a DataFrame
+
+        Returns:
+            (df, last_closed)：include_live 且有正在形成的K线时，它作为最后一行，
+            last_closed 为 False
+        """
+        with self.lock:
+            rows = self.buffers[symbol].values()
+            live = self.live.get(symbol)
+        last_closed = True
+        if include_live and live is not None and (len(rows) == 0 or live['open_time'] > rows[-1, 0]):
+            rows = np.vstack([rows, candle_row(live)])
+            last_closed = False
+        return rows_to_frame(rows), last_closed
+
+    def receive(self, message) -> Optional[Tuple[str, dict, int]]:
+        """
+        处理一条推送中不阻塞的部分：更新正在形成的K线
+        Non-blocking part of a message: update the live candle
+
+        Returns:
+            收盘K线 (symbol, candle, event_time_ms)，交给 process_close；否则 None
+        """
+        parsed = parse_kline_message(message)
+        if parsed is None:
+            return None
+        symbol, candle, is_closed, event_ms = parsed
+        if symbol not in self.buffers:
+            return None
+
+        if not is_closed:
+            with self.lock:
+                self.live[symbol] = candle
+            return None
+        return symbol, candle, event_ms
+
+    def process_close(self, symbol: str, candle: dict, event_ms: int) -> Tuple[str, dict]:
+        """
+        处理一根收盘K线：补齐缺口、写入缓冲区、调用 on_closed（可能阻塞，在工作线程中运行）
+        Process one closed candle: backfill gaps, buffer it and fire on_closed (may block)
+        """
+        buffer = self.buffers[symbol]
+        last = buffer.last_open_time
+        if self.backfill is not None and last is not None and candle['open_time'] > last + self.interval_ms:
+            # 断线期间错过的K线用 REST 补齐
+            try:
+                missing = self.backfill(symbol, self.interval, last + self.interval_ms, candle['open_time'] - 1)
+                if missing is not None and not missing.empty:
+                    self.seed(symbol, missing)
+            except Exception as e:
+                logging.warning(f"补齐 {symbol} 缺失K线失败: {e} / Backfill failed: {e}")
+
+        with self.lock:
+            buffer.push(candle_row(candle))
+            if self.live.get(symbol, {}).get('open_time') == candle['open_time']:
+                del self.live[symbol]
+            self.closed_count += 1
+
+        if self.on_closed is not None:
+            try:
+                self.on_closed(symbol, candle)
+            except Exception as e:
+                logging.error(f"处理 {symbol} 收盘K线失败: {e} / on_closed failed for {symbol}: {e}")
+        self.last_latency_ms = time.time() * 1000 - event_ms
+        return symbol, candle
+
+    def handle_message(self, message) -> Optional[Tuple[str, dict]]:
+        """
+        同步处理一条推送（在调用线程中完成收盘处理）；K线收盘时返回 (symbol, candle)
+        Process one message synchronously; returns (symbol, candle) on a close
+        """
+        closed = self.receive(message)
+        if closed is None:
+            return None
+        return self.process_close(*closed)
+
+    def _dispatch(self, symbol: str, candle: dict, event_ms: int):
+        """把收盘K线放入该交易对的队列（事件循环线程中调用）"""
+        queue = self._queues.get(symbol)
+        if queue is None:
+            queue = self._queues[symbol] = asyncio.Queue()
+            self._workers.append(asyncio.ensure_future(self._close_worker(symbol, queue)))
+        queue.put_nowait((candle, event_ms))
+
+    async def _close_worker(self, symbol: str, queue: asyncio.Queue):
+        """按顺序处理一个交易对的收盘K线，阻塞的部分放到线程池"""
+        loop = asyncio.get_running_loop()
+        while True:
+            candle, event_ms = await queue.get()
+            try:
+                await loop.run_in_executor(self._executor, self.process_close, symbol, candle, event_ms)
+            except Exception as e:
+                logging.error(f"处理 {symbol} 收盘K线失败: {e} / close processing failed for {symbol}: {e}")
+
+    # ------------------------------------------------------------------
+    # 连接 / Connection
+    # ------------------------------------------------------------------
+
+    async def run(self):
+        """连接并持续接收，断线后指数退避重连，直到 stop() / Receive until stop()"""
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='kline-close')
+        try:
+            await self._receive_loop()
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers, self._queues = [], {}
+            self._executor.shutdown(wait=False)
+
+    async def _receive_loop(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_queue=None) as ws:
+                    logging.info(f"已连接K线流 / Connected to kline stream: {self.url}")
+                    delay = 1.0
+                    stop_task = asyncio.ensure_future(self._stop.wait())
+                    try:
+                        while True:
+                            recv_task = asyncio.ensure_future(ws.recv())
+                            done, _ = await asyncio.wait({recv_task, stop_task},
+                                                         return_when=asyncio.FIRST_COMPLETED)
+                            if stop_task in done:
+                                recv_task.cancel()
+                                return
+                            closed = self.receive(recv_task.result())
+                            if closed is not None:
+                                self._dispatch(*closed)
+                    finally:
+                        stop_task.cancel()
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                if self._stop.is_set():
+                    return
+                logging.warning(f"K线流断开，{delay:.0f} 秒后重连: {e} / Stream lost, reconnecting in {delay:.0f}s")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def start(self) -> threading.Thread:
+        """在后台线程中运行（Flask 等同步程序使用）/ Run in a background thread"""
+        self._loop = asyncio.new_event_loop()
+
+        def _target():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.run())
+
+        self._thread = threading.Thread(target=_target, name='kline-stream', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def request_stop(self):
+        """从任意线程请求停止（on_closed 在工作线程中运行时也可以调用）"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    def stop(self, timeout: float = 5.0):
+        self.request_stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def test_kline_stream():
+    """用本地回放服务器测试 / Test against the local replay server"""
+    from utils.kline_replay import KlineReplayServer
+
+    n = 60
+    frames = {}
+    seen = {}
+    for i, symbol in enumerate(['BTCUSDT', 'ETHUSDT']):
+        close = 100 * (i + 1) + np.random.randn(n).cumsum()
+        frames[symbol] = pd.DataFrame({
+            'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+            'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': np.random.rand(n) * 10,
+        })
+
+    async def main():
+        server = KlineReplayServer(frames, interval='1h', delay=0.005, partial_updates=2)
+        await server.start()
+        client = KlineStreamClient(list(frames), '1h', base_url=server.url, buffer_size=50)
+
+        def on_closed(symbol, candle):
+            # 模拟预测耗时：在工作线程中运行，不阻塞接收；同一交易对按顺序到达
+            time.sleep(0.01)
+            seen.setdefault(symbol, []).append(candle['open_time'])
+            if client.closed_count == 2 * n:
+                client.request_stop()
+
+        client.on_closed = on_closed
+        await asyncio.wait_for(client.run(), timeout=30)
+        await server.stop()
+        return client
+
+    client = asyncio.run(main())
+    for symbol, df in frames.items():
+        buffered, last_closed = client.frame(symbol)
+        assert last_closed and len(buffered) == 50
+        assert seen[symbol] == sorted(seen[symbol]) and len(seen[symbol]) == n
+        expected = df.iloc[-50:].reset_index(drop=True)
+        pd.testing.assert_frame_equal(buffered, expected, check_dtype=False)
+    print(f"收到 {client.closed_count} 根收盘K线，最后一次收盘→回调延迟 {client.last_latency_ms:.2f} ms")
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_kline_stream()
@@ -0,0 +1,113 @@
+"""
+轻量推理模块
+Lightweight Inference Module
+
+加载 scripts/lstm/export_lstm.py 导出的 .tflite 文件，在 CPU 上推理，
+接口与 Keras 模型的推理部分一致（predict_on_batch / predict / input_shape /
+output_shape），可以直接传给 predict_in_batches 和 MultiStepForecaster。
+Loads the .tflite file written by scripts/lstm/export_lstm.py and runs it on
+CPU behind the inference half of the Keras model interface, so it plugs into
+predict_in_batches and MultiStepForecaster unchanged.
+
+解释器按顺序查找：ai-edge-litert → tflite-runtime → TensorFlow。
+前两个只有几 MB，安装任意一个即可不导入完整的 TensorFlow。
+The interpreter is taken from ai-edge-litert, then tflite-runtime, and only
+then from TensorFlow; either of the first two avoids importing TensorFlow.
+
+作者: qinshihuang166
+"""
+
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+    LITE_RUNTIME = 'ai-edge-litert'
+except ImportError:
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        LITE_RUNTIME = 'tflite-runtime'
+    except ImportError:
+        Interpreter = None
+        LITE_RUNTIME = 'tensorflow'
+
+
+def _interpreter_class():
+    """解释器类；没有轻量运行时才导入 TensorFlow"""
+    if Interpreter is not None:
+        return Interpreter
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLitePredictor:
+    """
+    TFLite 模型推理器 / TFLite model runner
+
+    批大小变化时重新分配输入张量，同样大小的批次直接复用。
+    Input tensors are resized only when the batch size changes.
+    """
+
+    is_lite = True
+
+    def __init__(self, model_path: str, num_threads: Optional[int] = None):
+        """
+        Args:
+            model_path: .tflite 文件路径
+            num_threads: 推理线程数（默认由运行时决定）
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"❌ 找不到轻量推理文件: {model_path}\n"
+                f"请先导出：python scripts/lstm/export_lstm.py"
+            )
+
+        self.model_path = model_path
+        self.runtime = LITE_RUNTIME
+        self.interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = None
+        # 同一个解释器不能被多个线程同时调用
+        self._lock = threading.Lock()
+
+        signature = self._input.get('shape_signature', self._input['shape'])
+        self.input_shape = (None,) + tuple(int(d) for d in signature[1:])
+        self.output_shape = (None,) + tuple(int(d) for d in self._output['shape'][1:])
+
+    def _allocate(self, batch: int) -> None:
+        self.interpreter.resize_tensor_input(self._input['index'], [batch] + list(self.input_shape[1:]))
+        self.interpreter.allocate_tensors()
+        self._batch = batch
+
+    def predict_on_batch(self, X) -> np.ndarray:
+        """
+        单批推理 / Run one batch
+
+        Args:
+            X: (batch, time_steps, features)
+
+        Returns:
+            (batch, horizon) 预测结果
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self._lock:
+            if X.shape[0] != self._batch:
+                self._allocate(X.shape[0])
+            self.interpreter.set_tensor(self._input['index'], X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output['index']).copy()
+
+    def predict(self, X, batch_size: int = 256, verbose: int = 0) -> np.ndarray:
+        """与 keras Model.predict 相同的调用方式 / Same call shape as Model.predict"""
+        from utils.lstm_windows import predict_in_batches
+
+        return predict_in_batches(self, X, batch_size=batch_size)
+
+    def summary(self) -> None:
+        size_kb = os.path.getsize(self.model_path) / 1024
+        print(f"📦 TFLite 模型: {self.model_path} ({size_kb:.1f} KB, 运行时: {self.runtime})")
+        print(f"  输入: {self.input_shape}, 输出: {self.output_shape}")
@@ -11,7 +11,9 @@ Specifically processes time-series data for LSTM models
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from typing import Tuple, Optional, List
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Tuple, Optional, List, Sequence
+from dataclasses import replace
 import joblib
 import os
 
@@ -20,6 +22,27 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config_lstm import DataConfig, PathConfig
 from utils.technical_indicators import TechnicalIndicators
+from utils.columnar_storage import load_table, save_table, table_exists
+from utils.lstm_windows import PanelWindows, WindowedArray
+from utils.feature_cache import FeatureCache
+
+
+def append_symbol_column(values: np.ndarray, symbol_id: int) -> np.ndarray:
+    """
+    在特征矩阵最后追加一列交易对编号（面板模型的输入格式）
+    
+    编号列不参与归一化；模型里的 SymbolEmbedding 层把它换成可学习的嵌入向量
+    
+    Args:
+        values: 归一化后的特征 (..., 特征数)
+        symbol_id: 交易对在面板中的编号
+        
+    Returns:
+        float32 数组 (..., 特征数 + 1)
+    """
+    values = np.asarray(values, dtype=np.float32)
+    ids = np.full(values.shape[:-1] + (1,), symbol_id, dtype=np.float32)
+    return np.concatenate([values, ids], axis=-1)
 
 
 class LSTMDataProcessor:
@@ -34,40 +57,52 @@ class LSTMDataProcessor:
     5. 数据集划分（训练/验证/测试）
     """
     
-    def __init__(self, config: Optional[DataConfig] = None):
+    def __init__(self, config: Optional[DataConfig] = None, path_config: Optional[PathConfig] = None):
         """
         初始化数据处理器
         
         Args:
-            config: 数据配置对象，默认使用全局配置
+            config: 数据配置对象（RunConfig.data），默认使用默认配置
+            path_config: 路径配置对象（RunConfig.paths），默认按 config.SYMBOL 生成
         """
         self.config = config or DataConfig()
+        self.paths = path_config or PathConfig(SYMBOL=self.config.SYMBOL)
         self.scaler = None
         self.feature_columns = None
         
-    def load_raw_data(self, file_path: Optional[str] = None) -> pd.DataFrame:
+    def load_raw_data(self, file_path: Optional[str] = None,
+                      columns: Optional[List[str]] = None,
+                      start=None, end=None) -> pd.DataFrame:
         """
         加载原始数据
         
+        优先读取列式存储（Parquet），旧的CSV会在第一次读取时自动转换
+        
         Args:
             file_path: 数据文件路径，默认使用配置中的路径
+            columns: 只读取这些列，默认读取全部
+            start: 开始时间（含），默认不限
+            end: 结束时间（含），默认不限
             
         Returns:
             原始数据DataFrame
         """
         file_path = file_path or self.config.RAW_DATA_FILE
         
-        if not os.path.exists(file_path):
+        if not table_exists(file_path):
             raise FileNotFoundError(
                 f"❌ 数据文件不存在: {file_path}\n"
                 f"请先运行 download_data.py 下载数据！"
             )
         
         print(f"📂 加载数据: {file_path}")
-        df = pd.read_csv(file_path)
+        df = load_table(file_path, columns=columns, start=start, end=end,
+                        fmt=self.config.STORAGE_FORMAT)
         
         # 确保必需的列存在
         required_cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        if columns is not None:
+            required_cols = ['timestamp'] + [c for c in required_cols if c in columns]
         missing_cols = [col for col in required_cols if col not in df.columns]
         if missing_cols:
             raise ValueError(f"❌ 数据缺少必需列: {missing_cols}")
@@ -174,7 +209,7 @@ class LSTMDataProcessor:
         # 从配置中获取技术指标特征
         if self.config.USE_TECHNICAL_INDICATORS:
             # 使用配置中指定的指标
-            selected_features = base_features + self.config.TECHNICAL_INDICATORS
+            selected_features = base_features + list(self.config.TECHNICAL_INDICATORS)
         else:
             selected_features = base_features
         
@@ -228,8 +263,55 @@ class LSTMDataProcessor:
         
         return scaled_df
     
+    def prepare_features(self, file_path: Optional[str] = None, fit: bool = True,
+                         use_cache: Optional[bool] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        加载原始数据并完成 清洗 → 技术指标 → 选择特征 → 归一化
+        
+        结果按内容寻址缓存：原始数据、技术指标配置或 scaler 变化时自动重新计算，
+        否则直接读取缓存（训练时连同拟合好的 scaler 一起恢复）
+        
+        Args:
+            file_path: 原始数据文件路径
+            fit: 是否拟合scaler（训练用True；评估/回测先 load_scaler 再用False）
+            use_cache: 是否使用特征缓存，默认使用配置 USE_FEATURE_CACHE
+            
+        Returns:
+            (原始尺度特征, 归一化后的特征)
+        """
+        if not fit and self.scaler is None:
+            raise ValueError("❌ Scaler尚未拟合，请先在训练集上调用fit=True")
+        
+        df_raw = self.load_raw_data(file_path)
+        
+        use_cache = self.config.USE_FEATURE_CACHE if use_cache is None else use_cache
+        cache = key = None
+        if use_cache:
+            cache = FeatureCache(self.paths.FEATURE_CACHE_DIR, self.config.FEATURE_CACHE_MAX_MB)
+            key = cache.make_key(df_raw, self.config, scaler=None if fit else self.scaler)
+            entry = cache.load(key)
+            if entry is not None:
+                print(f"\n⚡ 命中特征缓存: {key}")
+                self.feature_columns = list(entry['real'].columns)
+                if fit:
+                    self.scaler = entry['scaler']
+                print(f"  ✓ {entry['real'].shape[0]} 行, {len(self.feature_columns)} 个特征")
+                return entry['real'], entry['scaled']
+        
+        df = self.clean_data(df_raw)
+        df = self.add_features(df)
+        df_features = self.select_features(df)
+        df_normalized = self.normalize_data(df_features, fit=fit)
+        
+        if cache is not None:
+            cache.save(key, df_features, df_normalized, self.scaler if fit else None)
+            print(f"  ✓ 特征已缓存: {key}")
+        
+        return df_features, df_normalized
+    
     def create_sequences(self, data: np.ndarray, 
-                        time_steps: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+                        time_steps: Optional[int] = None,
+                        lazy: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         创建时间序列窗口（滑动窗口）
         
@@ -240,26 +322,38 @@ class LSTMDataProcessor:
         则创建:
         X = [[1,2,3], [2,3,4]], y = [4, 5]
         
+        默认返回零拷贝的 WindowedArray（窗口在按批次使用时才被复制），
+        内存占用为 O(行数 × 特征数)，而不是 O(行数 × 时间步长 × 特征数)
+        
+        PREDICTION_HORIZON > 1 时 y 是 (样本数, horizon) 的矩阵，
+        y[k, h] = data[k+time_steps+h] 的收盘价，用于训练一次输出全部步数的多输出模型
+        
         Args:
-            data: 归一化后的数据（2D numpy array）
+            data: 归一化后的数据（2D numpy array，也可以是 np.memmap）
             time_steps: 时间窗口大小，默认使用配置
+            lazy: 是否返回惰性窗口视图，默认使用配置 LAZY_WINDOWS
             
         Returns:
-            (X, y): X是3D数组，y是目标值
+            (X, y): X是3D窗口（WindowedArray 或 np.ndarray），y是目标值
         """
         time_steps = time_steps or self.config.TIME_STEPS
+        lazy = self.config.LAZY_WINDOWS if lazy is None else lazy
         
-        X, y = [], []
+        horizon = max(1, int(self.config.PREDICTION_HORIZON))
         
-        for i in range(time_steps, len(data)):
-            # X: 过去time_steps个时间点的所有特征
-            X.append(data[i - time_steps:i])
-            # y: 下一个时间点的收盘价（假设收盘价是第4列，索引3）
-            # 注意：这里假设特征顺序为 [open, high, low, close, ...]
-            y.append(data[i, 3])  # 索引3是close
+        # X[k] = data[k : k+time_steps]，y[k] = data[k+time_steps] 的收盘价
+        # 注意：这里假设特征顺序为 [open, high, low, close, ...]，索引3是close
+        n_samples = len(data) - time_steps - horizon + 1
+        X = WindowedArray(data, time_steps, stop=n_samples)
+        if horizon == 1:
+            y = data[time_steps:, 3]
+        else:
+            # 多步目标同样是零拷贝视图 / Multi-horizon targets are a zero-copy view too
+            y = sliding_window_view(data[time_steps:, 3], horizon)
         
-        X = np.array(X)
-        y = np.array(y)
+        if not lazy:
+            X = np.array(X)
+            y = np.array(y)
         
         print(f"  ✓ 创建序列: X shape = {X.shape}, y shape = {y.shape}")
         print(f"    - 样本数: {X.shape[0]}")
@@ -268,6 +362,25 @@ class LSTMDataProcessor:
         
         return X, y
     
+    def save_feature_matrix(self, values: np.ndarray, path: Optional[str] = None) -> np.ndarray:
+        """
+        把特征矩阵保存为 .npy 并以内存映射方式重新打开
+        
+        训练时窗口按批次从磁盘读取，特征矩阵本身也不需要常驻内存
+        
+        Args:
+            values: 归一化后的特征矩阵
+            path: 保存路径，默认 LSTM_DATA_DIR/{SYMBOL}_features.npy
+            
+        Returns:
+            只读的 np.memmap
+        """
+        path = path or os.path.join(self.config.LSTM_DATA_DIR, f'{self.config.SYMBOL}_features.npy')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.save(path, np.ascontiguousarray(values, dtype=np.float32))
+        print(f"  ✓ 特征矩阵已保存（内存映射）: {path}")
+        return np.load(path, mmap_mode='r')
+    
     def split_data(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, ...]:
         """
         划分训练集、验证集、测试集
@@ -306,7 +419,7 @@ class LSTMDataProcessor:
     
     def save_scaler(self, path: Optional[str] = None):
         """保存scaler以供预测时使用"""
-        path = path or PathConfig.SCALER_PATH
+        path = path or self.paths.SCALER_PATH
         
         if self.scaler is None:
             raise ValueError("❌ Scaler尚未初始化")
@@ -317,7 +430,7 @@ class LSTMDataProcessor:
     
     def load_scaler(self, path: Optional[str] = None):
         """加载已保存的scaler"""
-        path = path or PathConfig.SCALER_PATH
+        path = path or self.paths.SCALER_PATH
         
         if not os.path.exists(path):
             raise FileNotFoundError(f"❌ Scaler文件不存在: {path}")
@@ -343,24 +456,15 @@ class LSTMDataProcessor:
         print("🚀 开始完整数据处理流程")
         print("="*60)
         
-        # 1. 加载数据
-        df = self.load_raw_data(file_path)
-        
-        # 2. 清洗数据
-        df = self.clean_data(df)
+        # 1-5. 加载 → 清洗 → 技术指标 → 选择特征 → 归一化（命中缓存时直接读取）
+        _, df_normalized = self.prepare_features(file_path, fit=True)
         
-        # 3. 添加特征
-        df = self.add_features(df)
-        
-        # 4. 选择特征
-        df = self.select_features(df)
-        
-        # 5. 归一化数据
-        df_normalized = self.normalize_data(df, fit=True)
-        
-        # 6. 创建序列
+        # 6. 创建序列（零拷贝窗口，可选内存映射）
         print("\n🔄 创建时间序列窗口...")
-        X, y = self.create_sequences(df_normalized.values)
+        values = df_normalized.values
+        if self.config.MEMMAP_FEATURES:
+            values = self.save_feature_matrix(values)
+        X, y = self.create_sequences(values)
         
         # 7. 划分数据集
         X_train, X_val, X_test, y_train, y_val, y_test = self.split_data(X, y)
@@ -378,11 +482,140 @@ class LSTMDataProcessor:
         
         return X_train, X_val, X_test, y_train, y_val, y_test
     
+    # ------------------------------------------------------------------
+    # 面板训练：多个交易对共用一个模型 / Panel training across symbols
+    # ------------------------------------------------------------------
+    
+    def for_symbol(self, symbol: str) -> 'LSTMDataProcessor':
+        """同样配置下另一个交易对的数据处理器（各自的原始数据、特征缓存和scaler）"""
+        return LSTMDataProcessor(replace(self.config, SYMBOL=symbol), replace(self.paths, SYMBOL=symbol))
+    
+    def process_panel(self, symbols: Sequence[str]) -> Tuple[PanelWindows, ...]:
+        """
+        面板数据处理流程：每个交易对单独做特征工程和归一化，再把窗口堆叠到一起
+        
+        - 每个交易对使用自己的 scaler（价格量级不同，必须分别归一化）
+        - 特征矩阵最后追加交易对编号列，模型据此查表得到交易对嵌入
+        - 每个交易对内部按时间顺序划分训练/验证/测试，再按目标时间合并，
+          同一批次里混合多个交易对，且验证/测试集始终晚于训练集
+        
+        结果保存在 self.panel_symbols / self.panel_scalers，用 save_panel_meta() 保存
+        
+        Args:
+            symbols: 交易对列表（顺序决定编号）
+            
+        Returns:
+            (X_train, X_val, X_test, y_train, y_val, y_test)，X 是 PanelWindows
+        """
+        print("="*60)
+        print(f"🚀 开始面板数据处理流程（{len(symbols)} 个交易对）")
+        print("="*60)
+        
+        time_steps = self.config.TIME_STEPS
+        horizon = max(1, int(self.config.PREDICTION_HORIZON))
+        
+        blocks, scalers = [], {}
+        splits = {name: {'starts': [], 'y': [], 'times': []} for name in ('train', 'val', 'test')}
+        offset = 0
+        for symbol_id, symbol in enumerate(symbols):
+            print(f"\n🔹 [{symbol_id}] {symbol}")
+            processor = self.for_symbol(symbol)
+            _, df_scaled = processor.prepare_features(fit=True)
+            if self.feature_columns is None:
+                self.feature_columns = processor.feature_columns
+            elif processor.feature_columns != self.feature_columns:
+                raise ValueError(f"❌ {symbol} 的特征列与其他交易对不一致: {processor.feature_columns}")
+            scalers[symbol] = processor.scaler
+            
+            values = df_scaled.to_numpy(dtype=np.float32)
+            n_samples = len(values) - time_steps - horizon + 1
+            if n_samples <= 0:
+                raise ValueError(f"❌ {symbol} 的数据太少，无法构建 TIME_STEPS={time_steps} 的窗口")
+            blocks.append(append_symbol_column(values, symbol_id))
+            
+            close = values[time_steps:, 3]
+            y = close[:n_samples] if horizon == 1 else sliding_window_view(close, horizon)[:n_samples]
+            times = df_scaled.index.values[time_steps:time_steps + n_samples].astype('datetime64[ns]').astype(np.int64)
+            
+            train_end = int(n_samples * self.config.TRAIN_RATIO)
+            val_end = train_end + int(n_samples * self.config.VAL_RATIO)
+            for name, part in (('train', slice(0, train_end)),
+                               ('val', slice(train_end, val_end)),
+                               ('test', slice(val_end, n_samples))):
+                splits[name]['starts'].append(offset + np.arange(n_samples)[part])
+                splits[name]['y'].append(y[part])
+                splits[name]['times'].append(times[part])
+            offset += len(values)
+        
+        data = np.concatenate(blocks)
+        result = {}
+        for name, split in splits.items():
+            # 按目标时间排序（同一时间按交易对编号），批次内混合多个交易对
+            order = np.argsort(np.concatenate(split['times']), kind='stable')
+            starts = np.concatenate(split['starts'])[order]
+            result[name] = (PanelWindows(data, time_steps, starts), np.concatenate(split['y'])[order])
+        
+        self.panel_symbols = list(symbols)
+        self.panel_scalers = scalers
+        
+        X_train, y_train = result['train']
+        X_val, y_val = result['val']
+        X_test, y_test = result['test']
+        print(f"\n📊 面板数据集划分（各交易对分别按时间划分）:")
+        print(f"  训练集: {X_train.shape[0]} 样本")
+        print(f"  验证集: {X_val.shape[0]} 样本")
+        print(f"  测试集: {X_test.shape[0]} 样本")
+        print(f"  特征矩阵: {data.shape[0]} 行 × {data.shape[1]} 列（含交易对编号列）, "
+              f"{data.nbytes / 1024**2:.1f} MB")
+        
+        return X_train, X_val, X_test, y_train, y_val, y_test
+    
+    def save_panel_meta(self, path: Optional[str] = None):
+        """保存面板模型的交易对列表、特征列和各交易对的scaler"""
+        path = path or self.paths.PANEL_META_PATH
+        if not getattr(self, 'panel_scalers', None):
+            raise ValueError("❌ 面板数据尚未处理，请先调用 process_panel")
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump({
+            'symbols': self.panel_symbols,
+            'scalers': self.panel_scalers,
+            'feature_columns': self.feature_columns,
+            'time_steps': self.config.TIME_STEPS,
+            'interval': self.config.INTERVAL,
+        }, path)
+        print(f"✓ 面板元数据已保存: {path}")
+    
+    def load_panel_processors(self, path: Optional[str] = None) -> Tuple[Dict[str, 'LSTMDataProcessor'], dict]:
+        """
+        加载面板元数据，为每个交易对生成带 scaler 的数据处理器
+        
+        Returns:
+            ({交易对: 数据处理器}, 元数据字典)，交易对编号 = meta['symbols'].index(交易对)
+        """
+        path = path or self.paths.PANEL_META_PATH
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ 面板元数据不存在: {path}")
+        
+        meta = joblib.load(path)
+        processors = {}
+        for symbol in meta['symbols']:
+            processor = self.for_symbol(symbol)
+            processor.scaler = meta['scalers'][symbol]
+            processor.feature_columns = list(meta['feature_columns'])
+            processors[symbol] = processor
+        print(f"✓ 面板元数据已加载: {path} ({len(processors)} 个交易对)")
+        return processors, meta
+    
     def _save_processed_data(self, df: pd.DataFrame):
         """保存处理后的数据"""
         os.makedirs(self.config.LSTM_DATA_DIR, exist_ok=True)
-        save_path = self.config.PROCESSED_DATA_FILE
-        df.to_csv(save_path)
+        save_path = save_table(
+            df, self.config.PROCESSED_DATA_FILE,
+            fmt=self.config.STORAGE_FORMAT,
+            float_dtype=self.config.PROCESSED_FLOAT_DTYPE,
+            index=True
+        )
         print(f"✓ 处理后的数据已保存: {save_path}")
 
 
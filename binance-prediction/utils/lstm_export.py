@@ -0,0 +1,199 @@
+"""
+LSTM 模型导出模块
+LSTM Model Export Module
+
+把训练好的 Keras 模型转换为 TFLite 文件（可选 float16 / int8 量化），
+并与原模型在同一批测试窗口上对比精度、文件大小和单窗口延迟（NumPy 导出同样适用）。
+Converts a trained Keras model to a TFLite file with optional float16 / int8
+quantization, and compares it with the Keras model on the same test windows
+(accuracy delta, file size, single-window latency). The same comparison is
+used for the NumPy weights exported by utils/lstm_numpy.py.
+
+转换前先构建推理副本：去掉 Dropout / recurrent_dropout，并把 LSTM / GRU 按
+TIME_STEPS 展开 (unroll)。展开后图中没有 while 循环和 TensorList，只用内置
+算子，批大小保持动态，推理端不需要 Flex (TF Select) 算子。
+The converter gets an inference clone with dropout removed and recurrent
+layers unrolled over the fixed TIME_STEPS, so the graph has no while loops or
+TensorLists, uses builtin ops only and keeps a dynamic batch dimension.
+
+作者: qinshihuang166
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lstm_metrics import calc_direction_metrics, calc_regression_metrics
+from utils.lstm_windows import as_batch, predict_in_batches
+
+# 'none'    : float32
+# 'float16' : 权重存为 float16，文件约减半
+# 'dynamic' : 权重存为 int8，激活保持 float（不需要校准数据）
+# 'int8'    : 权重和激活都量化为 int8，需要校准窗口；输入输出仍是 float32
+QUANTIZATION_MODES = ('none', 'float16', 'dynamic', 'int8')
+
+# 导出格式 / Export formats (NumPy 权重由 utils/lstm_numpy.py 导出)
+FORMAT_LABELS = {'tflite': 'TFLite', 'numpy': 'NumPy'}
+
+
+def _inference_config(config: dict) -> dict:
+    """去掉 dropout 并展开循环层（递归处理 Bidirectional 包装的子层）"""
+    for key in ('dropout', 'recurrent_dropout', 'rate'):
+        if key in config:
+            config[key] = 0.0
+    if 'unroll' in config:
+        config['unroll'] = True
+    for key in ('layer', 'backward_layer'):
+        if isinstance(config.get(key), dict):
+            _inference_config(config[key]['config'])
+    return config
+
+
+def inference_clone(model):
+    """
+    构建只用于推理的模型副本（权重相同，推理结果相同）
+    Build an inference-only clone with identical weights and outputs
+
+    Args:
+        model: 训练好的 Keras 模型
+
+    Returns:
+        新模型：没有 dropout，循环层已展开
+    """
+    from tensorflow import keras
+
+    clone = keras.models.clone_model(
+        model,
+        clone_function=lambda layer: layer.__class__.from_config(_inference_config(layer.get_config())),
+    )
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+def convert_to_tflite(model, quantization: str = 'dynamic',
+                      calibration: Optional[np.ndarray] = None) -> bytes:
+    """
+    转换为 TFLite / Convert to TFLite
+
+    Args:
+        model: 训练好的 Keras 模型
+        quantization: QUANTIZATION_MODES 之一
+        calibration: int8 量化的校准窗口 (n, time_steps, features)
+
+    Returns:
+        .tflite 文件内容
+    """
+    import tensorflow as tf
+
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"❌ 不支持的量化方式: {quantization}，可选 {QUANTIZATION_MODES}")
+    if quantization == 'int8' and (calibration is None or len(calibration) == 0):
+        raise ValueError("❌ int8 量化需要校准数据 (calibration)")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(inference_clone(model))
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    if quantization == 'int8':
+        def representative_dataset():
+            for i in range(len(calibration)):
+                yield [as_batch(calibration, i, i + 1).astype(np.float32)]
+        converter.representative_dataset = representative_dataset
+
+    # 转换器会打印临时 SavedModel 的路径，这里不需要
+    with contextlib.redirect_stdout(io.StringIO()):
+        return converter.convert()
+
+
+def export_tflite(model, path: str, quantization: str = 'dynamic',
+                  calibration: Optional[np.ndarray] = None) -> int:
+    """
+    导出 .tflite 文件
+
+    Returns:
+        文件大小（字节）
+    """
+    content = convert_to_tflite(model, quantization, calibration)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return len(content)
+
+
+def _latency_ms(model, X, repeats: int = 20) -> float:
+    """单个窗口的平均推理延迟（毫秒）"""
+    window = as_batch(X, 0, 1).astype(np.float32)
+    model.predict_on_batch(window)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict_on_batch(window)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def compare_models(keras_model, lite_model, X, y_true_real: np.ndarray,
+                   to_real: Callable[[np.ndarray], np.ndarray]) -> Dict[str, float]:
+    """
+    对比 Keras 模型和导出的模型
+    Compare the Keras model with the exported model
+
+    Args:
+        keras_model: 原模型
+        lite_model: TFLitePredictor 或 NumpyModel
+        X: 测试窗口
+        y_true_real: 真实价格（与 X 对齐）
+        to_real: 归一化 close → 真实价格
+
+    Returns:
+        报告字典：预测差异、两者的 MAE / 方向准确率及差值、延迟
+    """
+    keras_scaled = predict_in_batches(keras_model, X)
+    lite_scaled = predict_in_batches(lite_model, X)
+    diff = np.abs(keras_scaled - lite_scaled)
+
+    # 多步模型取第1步 / First horizon of multi-output models
+    keras_real = to_real(keras_scaled[:, 0])
+    lite_real = to_real(lite_scaled[:, 0])
+    keras_reg = calc_regression_metrics(y_true_real, keras_real)
+    lite_reg = calc_regression_metrics(y_true_real, lite_real)
+    keras_dir = calc_direction_metrics(y_true_real, keras_real)
+    lite_dir = calc_direction_metrics(y_true_real, lite_real)
+
+    return {
+        'samples': int(len(keras_scaled)),
+        'max_abs_diff_scaled': float(diff.max()),
+        'mean_abs_diff_scaled': float(diff.mean()),
+        'max_abs_diff_price': float(np.max(np.abs(keras_real - lite_real))),
+        'keras_mae': keras_reg.mae,
+        'lite_mae': lite_reg.mae,
+        'mae_delta': lite_reg.mae - keras_reg.mae,
+        'keras_direction_accuracy': keras_dir.accuracy,
+        'lite_direction_accuracy': lite_dir.accuracy,
+        'direction_accuracy_delta': lite_dir.accuracy - keras_dir.accuracy,
+        'keras_latency_ms': _latency_ms(keras_model, X),
+        'lite_latency_ms': _latency_ms(lite_model, X),
+    }
+
+
+def print_export_report(report: dict) -> None:
+    """打印导出报告 / Print the export report"""
+    label = FORMAT_LABELS[report['format']]
+    print(f"\n📦 文件大小: Keras {report['keras_size_kb']:.1f} KB → "
+          f"{label} {report['lite_size_kb']:.1f} KB ({report['quantization']})")
+    print(f"\n📏 预测差异（{report['samples']} 个测试窗口）")
+    print(f"  最大差异 (归一化): {report['max_abs_diff_scaled']:.2e}")
+    print(f"  平均差异 (归一化): {report['mean_abs_diff_scaled']:.2e}")
+    print(f"  最大差异 (价格)  : {report['max_abs_diff_price']:.4f}")
+    print(f"\n✅ 测试集指标        Keras {label:>12}       差值")
+    print(f"  MAE         {report['keras_mae']:12.4f} {report['lite_mae']:12.4f} {report['mae_delta']:+10.4f}")
+    print(f"  方向准确率  {report['keras_direction_accuracy']:12.4f} "
+          f"{report['lite_direction_accuracy']:12.4f} {report['direction_accuracy_delta']:+10.4f}")
+    print(f"\n⏱️ 单窗口延迟: Keras {report['keras_latency_ms']:.2f} ms, "
+          f"{label} {report['lite_latency_ms']:.2f} ms")
@@ -0,0 +1,234 @@
+"""
+LSTM 多步预测模块
+LSTM Multi-Step Forecaster
+
+多步预测原来每一步都调用一次 model.predict，并用 np.roll 移动整个窗口。
+这里改为：
+- 编译好的单步推理函数（tf.function，固定输入签名），没有 model.predict 的调度开销
+- 镜像环形缓冲区：追加一个时间点只写两行，当前窗口始终是一个连续切片
+- 模型带多步直接预测头 (PREDICTION_HORIZON > 1) 时，一次前向计算得到全部步数
+- 批维度可以是多个交易对或多个情景，整批一起预测
+Multi-step forecasting used to call model.predict once per step and np.roll
+the whole window. Instead this uses a compiled single-step function, a
+mirrored ring buffer whose current window is always one contiguous slice, an
+optional direct multi-horizon head, and a batch dimension that covers many
+symbols or scenarios at once.
+
+作者: qinshihuang166
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CLOSE_INDEX = 3  # 特征顺序 [open, high, low, close, ...]
+
+# 推理引擎 / Inference engines
+# keras : 训练得到的 .h5 模型（需要 TensorFlow）
+# tflite: export_lstm.py --format tflite 导出的文件（utils/lite_predictor.py）
+# numpy : export_lstm.py --format numpy 导出的权重（utils/lstm_numpy.py，只需要 NumPy）
+INFERENCE_ENGINES = ('keras', 'tflite', 'numpy')
+
+
+def engine_model_path(paths, engine: str = 'keras') -> str:
+    """推理引擎对应的模型文件 / Model file used by an inference engine"""
+    if engine not in INFERENCE_ENGINES:
+        raise ValueError(f"❌ 不支持的推理引擎: {engine}，可选 {INFERENCE_ENGINES}")
+    return {'keras': paths.MODEL_PATH, 'tflite': paths.TFLITE_PATH, 'numpy': paths.NUMPY_MODEL_PATH}[engine]
+
+
+def load_inference_model(path: str, engine: str = 'keras'):
+    """
+    按推理引擎加载模型，返回的对象都可以传给 MultiStepForecaster / predict_in_batches
+    Load a model for the given engine
+
+    Args:
+        path: 模型文件（engine_model_path 的返回值）
+        engine: INFERENCE_ENGINES 之一；tflite / numpy 不导入 TensorFlow
+    """
+    if engine == 'tflite':
+        from utils.lite_predictor import TFLitePredictor
+        return TFLitePredictor(path)
+    if engine == 'numpy':
+        from utils.lstm_numpy import NumpyModel
+        return NumpyModel.load(path)
+
+    import tensorflow as tf
+    import utils.lstm_model_builder  # noqa: F401  注册 SymbolEmbedding 层
+    return tf.keras.models.load_model(path, compile=False)
+
+
+class WindowRingBuffer:
+    """
+    镜像环形缓冲区 / Mirrored ring buffer
+
+    存储形状为 (batch, 2 * time_steps, features)，每个时间点同时写在 head 和
+    head + time_steps 两个位置，所以当前窗口 storage[:, head:head + time_steps]
+    永远是连续切片，不需要 np.roll 或拼接。
+    Every point is written twice (at head and head + time_steps), so the
+    current window is always the contiguous slice starting at head.
+    """
+
+    def __init__(self, windows: np.ndarray):
+        """
+        Args:
+            windows: 初始窗口 (batch, time_steps, features)
+        """
+        batch, time_steps, n_features = windows.shape
+        self.time_steps = time_steps
+        self.storage = np.empty((batch, 2 * time_steps, n_features), dtype=np.float32)
+        self.storage[:, :time_steps] = windows
+        self.storage[:, time_steps:] = windows
+        self.head = 0
+
+    def window(self) -> np.ndarray:
+        """当前窗口（视图）/ Current window as a view"""
+        return self.storage[:, self.head:self.head + self.time_steps]
+
+    def last(self) -> np.ndarray:
+        """窗口中最新的时间点 (batch, features)"""
+        return self.storage[:, self.head + self.time_steps - 1]
+
+    def push(self, points: np.ndarray):
+        """追加一个时间点并丢弃最旧的 / Append one point, dropping the oldest"""
+        self.storage[:, self.head] = points
+        self.storage[:, self.head + self.time_steps] = points
+        self.head = (self.head + 1) % self.time_steps
+
+
+class MultiStepForecaster:
+    """
+    多步预测器 / Multi-step forecaster
+
+    - 模型输出宽度 (horizon) >= steps：一次前向计算直接得到全部步数
+    - 否则递归预测：每次前向得到 horizon 步，把预测的 close 写回窗口后继续，
+      新时间点沿用上一个时间点的其他特征（与原 predict_multiple_steps 相同）
+    """
+
+    def __init__(self, model, target_index: int = CLOSE_INDEX):
+        """
+        Args:
+            model: 训练好的 Keras 模型，或 TFLitePredictor / NumpyModel（导出的轻量
+                   推理文件，不需要导入 TensorFlow），输入 (batch, time_steps, features)
+            target_index: 预测目标在特征中的位置（默认 close）
+        """
+        self.model = model
+        self.target_index = target_index
+        self.horizon = int(model.output_shape[-1])
+
+        if getattr(model, 'is_lite', False):
+            self._step = model.predict_on_batch
+            return
+
+        import tensorflow as tf
+
+        input_spec = tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)
+
+        @tf.function(input_signature=[input_spec])
+        def _step(x):
+            return model(x, training=False)
+
+        self._step = lambda X: _step(tf.convert_to_tensor(X, dtype=tf.float32)).numpy()
+
+    def predict_step(self, X: np.ndarray) -> np.ndarray:
+        """
+        单次前向计算 / One forward pass
+
+        Args:
+            X: (batch, time_steps, features)
+
+        Returns:
+            (batch, horizon) 归一化尺度的预测
+        """
+        return np.asarray(self._step(np.asarray(X, dtype=np.float32)))
+
+    def forecast(self, X: np.ndarray, steps: int) -> np.ndarray:
+        """
+        预测未来 steps 步
+        Forecast `steps` points ahead
+
+        Args:
+            X: (batch, time_steps, features) 或单个窗口 (time_steps, features)；
+               批内每一行可以是不同的交易对或情景
+            steps: 预测步数
+
+        Returns:
+            (batch, steps) 归一化尺度的预测
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 2:
+            X = X[None]
+
+        if steps <= self.horizon:
+            return self.predict_step(X)[:, :steps]
+
+        buffer = WindowRingBuffer(X)
+        predictions = np.empty((X.shape[0], steps), dtype=np.float32)
+        filled = 0
+        while filled < steps:
+            block = self.predict_step(buffer.window())
+            take = min(self.horizon, steps - filled)
+            predictions[:, filled:filled + take] = block[:, :take]
+            filled += take
+            if filled >= steps:
+                break
+            # 新时间点 = 最新时间点 + 预测的 close
+            for j in range(take):
+                point = buffer.last().copy()
+                point[:, self.target_index] = block[:, j]
+                buffer.push(point)
+
+        return predictions
+
+
+def test_forecaster():
+    """与逐步 model.predict + np.roll 的结果对比 / Compare against the old loop"""
+    import time
+
+    from tensorflow import keras
+
+    np.random.seed(42)
+    time_steps, n_features, steps = 60, 8, 24
+    model = keras.Sequential([
+        keras.layers.Input(shape=(time_steps, n_features)),
+        keras.layers.LSTM(32, return_sequences=True),
+        keras.layers.LSTM(16),
+        keras.layers.Dense(1),
+    ])
+    X = np.random.rand(4, time_steps, n_features).astype(np.float32)
+
+    start = time.perf_counter()
+    expected = []
+    for row in X:
+        current = row[None].copy()
+        preds = []
+        for _ in range(steps):
+            p = model.predict(current, verbose=0)[0, 0]
+            preds.append(p)
+            point = current[0, -1].copy()
+            point[CLOSE_INDEX] = p
+            current = np.roll(current, -1, axis=1)
+            current[0, -1] = point
+        expected.append(preds)
+    expected = np.array(expected)
+    loop_time = time.perf_counter() - start
+
+    forecaster = MultiStepForecaster(model)
+    forecaster.forecast(X, steps)  # 预热（编译）
+    start = time.perf_counter()
+    actual = forecaster.forecast(X, steps)
+    fast_time = time.perf_counter() - start
+
+    error = float(np.max(np.abs(actual - expected)))
+    print(f"最大误差: {error:.2e}")
+    print(f"逐步 predict: {loop_time:.3f}s, 批量预测器: {fast_time:.3f}s "
+          f"({loop_time / fast_time:.0f}x)")
+    assert error < 1e-4
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_forecaster()
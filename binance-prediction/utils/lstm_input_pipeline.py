@@ -0,0 +1,153 @@
+"""
+LSTM 流式输入管道
+LSTM Streaming Input Pipeline
+
+用 tf.data 从特征矩阵流式生成训练窗口：窗口按批次并行组装、预取，
+可选缓存到磁盘，训练时数据准备和模型计算可以重叠进行。
+Streams training windows from the feature matrix with tf.data: windows are
+assembled per batch in parallel, prefetched and optionally cached on disk, so
+data preparation overlaps with training compute.
+
+作者: qinshihuang166
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.lstm_windows import PanelWindows, WindowedArray
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def make_window_dataset(X, y, batch_size: int = 32,
+                        shuffle: bool = False,
+                        cache_path: Optional[str] = None,
+                        seed: Optional[int] = None) -> tf.data.Dataset:
+    """
+    构建流式窗口数据集
+    Build a streaming window dataset
+
+    - 内存中的特征矩阵：转成常量张量，窗口在图内用 tf.gather 组装
+      In-memory matrix: kept as a constant tensor, windows gathered in-graph
+    - 内存映射的特征矩阵 (np.memmap)：每个批次只从磁盘读取需要的行，
+      数据集可以大于内存
+      Memory-mapped matrix: each batch reads only the rows it needs from disk,
+      so the dataset may be larger than RAM
+
+    Args:
+        X: WindowedArray（由 create_sequences 返回）或已物化的 3D 数组
+        y: 目标值，长度与 X 相同
+        batch_size: 批大小
+        shuffle: 是否按批次打乱顺序（批内保持时间顺序）
+        cache_path: 可选的磁盘缓存路径（第一个 epoch 之后直接读缓存）
+        seed: 打乱顺序的随机种子
+
+    Returns:
+        产出 (X_batch, y_batch) 的 tf.data.Dataset
+    """
+    y = np.asarray(y, dtype=np.float32)
+
+    if not isinstance(X, WindowedArray):
+        # 窗口已经物化（LAZY_WINDOWS=False），直接按批切分
+        ds = tf.data.Dataset.from_tensor_slices((np.asarray(X, dtype=np.float32), y))
+        return _finish(ds.batch(batch_size), len(X), batch_size, shuffle, cache_path, seed)
+
+    data, first, n_samples, time_steps = X.data, X.start, len(X), X.time_steps
+    n_features = data.shape[1]
+
+    batch_starts = tf.data.Dataset.range(0, n_samples, batch_size)
+
+    if isinstance(data, np.memmap):
+        def _load_batch(begin):
+            begin = int(begin)
+            end = min(begin + batch_size, n_samples)
+            rows = np.asarray(data[first + begin:first + end + time_steps - 1], dtype=np.float32)
+            windows = sliding_window_view(rows, time_steps, axis=0).transpose(0, 2, 1)
+            return np.ascontiguousarray(windows), y[begin:end]
+
+        def _map(begin):
+            X_batch, y_batch = tf.numpy_function(_load_batch, [begin], (tf.float32, tf.float32))
+            X_batch.set_shape((None, time_steps, n_features))
+            y_batch.set_shape((None,) + y.shape[1:])
+            return X_batch, y_batch
+    else:
+        features = tf.constant(np.asarray(data, dtype=np.float32))
+        targets = tf.constant(y)
+        offsets = tf.range(time_steps, dtype=tf.int64)
+
+        def _map(begin):
+            end = tf.minimum(begin + batch_size, n_samples)
+            sample_idx = tf.range(begin, end, dtype=tf.int64)
+            # (batch, time_steps) 的行号矩阵 → 一次 gather 组装整个批次
+            row_idx = first + sample_idx[:, None] + offsets[None, :]
+            return tf.gather(features, row_idx), tf.gather(targets, sample_idx)
+
+    ds = batch_starts.map(_map, num_parallel_calls=AUTOTUNE, deterministic=True)
+    return _finish(ds, n_samples, batch_size, shuffle, cache_path, seed)
+
+
+def _finish(ds, n_samples, batch_size, shuffle, cache_path, seed):
+    """缓存 → 按批打乱 → 预取"""
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        ds = ds.cache(cache_path)
+
+    if shuffle:
+        ds = ds.shuffle(buffer_size=max(1, (n_samples + batch_size - 1) // batch_size),
+                        seed=seed, reshuffle_each_iteration=True)
+
+    return ds.prefetch(AUTOTUNE)
+
+
+def _hash_array(digest, a, chunk_rows: int = 65536) -> None:
+    """按行分块哈希（内存映射的大矩阵不会一次读入内存）"""
+    if not isinstance(a, np.memmap):
+        a = np.asarray(a)
+    digest.update(json.dumps([list(a.shape), str(a.dtype)]).encode())
+    for begin in range(0, len(a), chunk_rows):
+        digest.update(np.ascontiguousarray(a[begin:begin + chunk_rows]).tobytes())
+
+
+def window_cache_key(X, y, config, feature_columns: Sequence[str], batch_size: int) -> str:
+    """
+    tf.data 磁盘缓存的键
+    Key for the tf.data disk cache
+
+    缓存里存的是组装好的批次，所以键包含窗口用到的全部数据（数据范围和归一化
+    结果）、TIME_STEPS、PREDICTION_HORIZON、特征列、scaler 类型和批大小；
+    任何一项变化都会得到新的缓存文件，不会读到上一次运行的窗口。
+
+    Args:
+        X: WindowedArray / PanelWindows / 已物化的 3D 数组
+        y: 目标值
+        config: DataConfig
+        feature_columns: 特征列名
+        batch_size: 批大小
+
+    Returns:
+        十六进制字符串
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        'time_steps': int(config.TIME_STEPS),
+        'horizon': int(config.PREDICTION_HORIZON),
+        'features': [str(c) for c in feature_columns],
+        'scaler': [config.SCALER_TYPE, list(config.FEATURE_RANGE)],
+        'batch_size': int(batch_size),
+    }, sort_keys=True).encode())
+    if isinstance(X, WindowedArray):
+        digest.update(f'{X.start}:{X.stop}:{X.time_steps}'.encode())
+        _hash_array(digest, X.data[X.start:X.stop + X.time_steps - 1])
+    elif isinstance(X, PanelWindows):
+        _hash_array(digest, X.starts)
+        _hash_array(digest, X.data)
+    else:
+        _hash_array(digest, X)
+    _hash_array(digest, np.asarray(y, dtype=np.float32))
+    return digest.hexdigest()[:16]
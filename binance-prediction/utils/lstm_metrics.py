@@ -4,6 +4,7 @@ LSTM 评估指标工具
 提供：
 - 回归指标：MAE / MSE / RMSE / MAPE / R2
 - 方向指标：涨跌方向 Accuracy + Confusion Matrix
+- 分类指标：直接比较涨跌标签（随机森林 / 滚动前向验证）
 
 所有输出尽量使用中文描述，方便初学者理解。
 
@@ -12,7 +13,7 @@ LSTM 评估指标工具
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Dict, Tuple
 
 import numpy as np
@@ -76,19 +77,31 @@ def to_direction_labels(prices: np.ndarray) -> np.ndarray:
     return (diff > 0).astype(int)
 
 
+def calc_classification_metrics(y_true_labels: np.ndarray, y_pred_labels: np.ndarray) -> DirectionMetrics:
+    """根据涨跌标签（1=涨，0=跌）计算分类指标"""
+
+    y_true_labels = np.asarray(y_true_labels).reshape(-1).astype(int)
+    y_pred_labels = np.asarray(y_pred_labels).reshape(-1).astype(int)
+
+    acc = float(accuracy_score(y_true_labels, y_pred_labels))
+    prec = float(precision_score(y_true_labels, y_pred_labels, zero_division=0))
+    rec = float(recall_score(y_true_labels, y_pred_labels, zero_division=0))
+    f1 = float(f1_score(y_true_labels, y_pred_labels, zero_division=0))
+    cm = confusion_matrix(y_true_labels, y_pred_labels, labels=[0, 1])
+
+    return DirectionMetrics(accuracy=acc, precision=prec, recall=rec, f1=f1, cm=cm)
+
+
 def calc_direction_metrics(y_true_prices: np.ndarray, y_pred_prices: np.ndarray) -> DirectionMetrics:
     """根据价格序列计算涨跌方向的分类指标"""
 
-    y_true_dir = to_direction_labels(y_true_prices)
-    y_pred_dir = to_direction_labels(y_pred_prices)
+    return calc_classification_metrics(to_direction_labels(y_true_prices), to_direction_labels(y_pred_prices))
 
-    acc = float(accuracy_score(y_true_dir, y_pred_dir))
-    prec = float(precision_score(y_true_dir, y_pred_dir, zero_division=0))
-    rec = float(recall_score(y_true_dir, y_pred_dir, zero_division=0))
-    f1 = float(f1_score(y_true_dir, y_pred_dir, zero_division=0))
-    cm = confusion_matrix(y_true_dir, y_pred_dir)
 
-    return DirectionMetrics(accuracy=acc, precision=prec, recall=rec, f1=f1, cm=cm)
+def metrics_to_dict(metrics, prefix: str = '') -> Dict[str, float]:
+    """把指标 dataclass 转成扁平字典（去掉混淆矩阵），方便按折汇总成表格"""
+
+    return {f'{prefix}{k}': v for k, v in asdict(metrics).items() if k != 'cm'}
 
 
 def calc_naive_baseline(prev_prices: np.ndarray) -> np.ndarray:
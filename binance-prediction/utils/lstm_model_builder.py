@@ -18,9 +18,9 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras.models import Sequential, Model
 from tensorflow.keras.layers import (
-    LSTM, Bidirectional, Dense, Dropout, 
+    LSTM, Bidirectional, Dense, Dropout, SpatialDropout1D,
     BatchNormalization, Input, Attention,
-    Layer, LayerNormalization
+    Layer, LayerNormalization, Embedding
 )
 from tensorflow.keras.regularizers import l1, l2, l1_l2
 from tensorflow.keras.optimizers import Adam, RMSprop, SGD
@@ -32,6 +32,7 @@ from tensorflow.keras.callbacks import (
 # 导入配置
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config_lstm import ModelConfig, TrainingConfig, PathConfig
+from utils.lstm_windows import as_batch
 
 
 class LSTMModelBuilder:
@@ -45,22 +46,32 @@ class LSTMModelBuilder:
     - 带Attention机制的LSTM
     """
     
-    def __init__(self, config: Optional[ModelConfig] = None):
+    def __init__(self, config: Optional[ModelConfig] = None,
+                 training_config: Optional[TrainingConfig] = None,
+                 path_config: Optional[PathConfig] = None):
         """
         初始化模型构建器
         
         Args:
-            config: 模型配置对象
+            config: 模型配置对象（RunConfig.model），默认使用默认配置
+            training_config: 训练配置对象（RunConfig.training），决定回调函数
+            path_config: 路径配置对象（RunConfig.paths），决定模型/检查点保存位置
         """
         self.config = config or ModelConfig()
+        self.training_config = training_config or TrainingConfig()
+        self.paths = path_config or PathConfig()
         self.model = None
         
-    def build_model(self, input_shape: Tuple[int, int]) -> keras.Model:
+    def build_model(self, input_shape: Tuple[int, int], output_units: int = 1,
+                    n_symbols: int = 0) -> keras.Model:
         """
         根据配置构建LSTM模型
         
         Args:
             input_shape: 输入形状 (time_steps, features)
+            output_units: 输出层宽度；>1 时为多步直接预测头（每个单元对应一个预测步）
+            n_symbols: >0 时构建面板模型：输入最后一列是交易对编号，
+                       经 SymbolEmbedding 换成嵌入向量后再进入循环层
             
         Returns:
             编译好的Keras模型
@@ -68,11 +79,17 @@ class LSTMModelBuilder:
         print(f"\n🏗️ 开始构建LSTM模型...")
         print(f"  输入形状: {input_shape}")
         print(f"  模型类型: {self.config.MODEL_TYPE}")
+        if output_units > 1:
+            print(f"  多步输出: {output_units} 个预测步")
+        if n_symbols:
+            print(f"  面板模型: {n_symbols} 个交易对, 嵌入维度 {self.config.SYMBOL_EMBEDDING_DIM}")
+        if self.config.RNN_FAST_PATH:
+            print("  循环层快速路径: recurrent_dropout=0, 层间 SpatialDropout1D")
         
         if self.config.MODEL_TYPE in ['LSTM', 'BiLSTM']:
-            self.model = self._build_stacked_lstm(input_shape)
+            self.model = self._build_stacked_lstm(input_shape, output_units, n_symbols)
         elif self.config.MODEL_TYPE in ['GRU', 'BiGRU']:
-            self.model = self._build_stacked_gru(input_shape)
+            self.model = self._build_stacked_gru(input_shape, output_units, n_symbols)
         else:
             raise ValueError(f"不支持的模型类型: {self.config.MODEL_TYPE}")
         
@@ -89,15 +106,17 @@ class LSTMModelBuilder:
         
         return self.model
     
-    def _build_stacked_lstm(self, input_shape: Tuple[int, int]) -> keras.Model:
+    def _build_stacked_lstm(self, input_shape: Tuple[int, int], output_units: int = 1,
+                            n_symbols: int = 0) -> keras.Model:
         """
         构建堆叠LSTM模型
         
         架构:
-        Input → [LSTM → BatchNorm → Dropout] × N → Dense → Output
+        Input → [SymbolEmbedding] → [LSTM → BatchNorm → Dropout] × N → Dense → Output
         
         Args:
             input_shape: (time_steps, features)
+            n_symbols: 面板模型的交易对数量（0 = 单交易对模型）
             
         Returns:
             Keras模型
@@ -122,7 +141,7 @@ class LSTMModelBuilder:
                 units=units,
                 return_sequences=return_sequences,
                 dropout=self.config.DROPOUT_RATE,
-                recurrent_dropout=self.config.RECURRENT_DROPOUT,
+                recurrent_dropout=self._recurrent_dropout(),
                 kernel_regularizer=regularizer,
                 name=f'lstm_{i+1}'
             )
@@ -134,6 +153,8 @@ class LSTMModelBuilder:
             # 第一层需要指定输入形状
             if i == 0:
                 model.add(Input(shape=input_shape, name='input'))
+                if n_symbols:
+                    model.add(SymbolEmbedding(n_symbols, self.config.SYMBOL_EMBEDDING_DIM, name='symbol_embedding'))
                 model.add(lstm_layer)
             else:
                 model.add(lstm_layer)
@@ -144,7 +165,7 @@ class LSTMModelBuilder:
             
             # Dropout（额外的Dropout层）
             if self.config.DROPOUT_RATE > 0 and return_sequences:
-                model.add(Dropout(self.config.DROPOUT_RATE, name=f'dropout_{i+1}'))
+                model.add(self._sequence_dropout(i))
         
         # Dense层
         for i, units in enumerate(self.config.DENSE_UNITS):
@@ -165,19 +186,21 @@ class LSTMModelBuilder:
         
         # 输出层
         model.add(Dense(
-            units=1,
+            units=output_units,
             activation=self.config.OUTPUT_ACTIVATION,
             name='output'
         ))
         
         return model
     
-    def _build_stacked_gru(self, input_shape: Tuple[int, int]) -> keras.Model:
+    def _build_stacked_gru(self, input_shape: Tuple[int, int], output_units: int = 1,
+                           n_symbols: int = 0) -> keras.Model:
         """
         构建堆叠GRU模型（类似LSTM但更简单）
         
         Args:
             input_shape: (time_steps, features)
+            n_symbols: 面板模型的交易对数量（0 = 单交易对模型）
             
         Returns:
             Keras模型
@@ -198,7 +221,7 @@ class LSTMModelBuilder:
                 units=units,
                 return_sequences=return_sequences,
                 dropout=self.config.DROPOUT_RATE,
-                recurrent_dropout=self.config.RECURRENT_DROPOUT,
+                recurrent_dropout=self._recurrent_dropout(),
                 kernel_regularizer=regularizer,
                 name=f'gru_{i+1}'
             )
@@ -208,6 +231,8 @@ class LSTMModelBuilder:
             
             if i == 0:
                 model.add(Input(shape=input_shape, name='input'))
+                if n_symbols:
+                    model.add(SymbolEmbedding(n_symbols, self.config.SYMBOL_EMBEDDING_DIM, name='symbol_embedding'))
                 model.add(gru_layer)
             else:
                 model.add(gru_layer)
@@ -216,7 +241,7 @@ class LSTMModelBuilder:
                 model.add(BatchNormalization(name=f'batch_norm_{i+1}'))
             
             if self.config.DROPOUT_RATE > 0 and return_sequences:
-                model.add(Dropout(self.config.DROPOUT_RATE, name=f'dropout_{i+1}'))
+                model.add(self._sequence_dropout(i))
         
         # Dense层
         for i, units in enumerate(self.config.DENSE_UNITS):
@@ -234,10 +259,25 @@ class LSTMModelBuilder:
                 model.add(Dropout(self.config.DROPOUT_RATE, name=f'dense_dropout_{i+1}'))
         
         # 输出层
-        model.add(Dense(units=1, activation=self.config.OUTPUT_ACTIVATION, name='output'))
+        model.add(Dense(units=output_units, activation=self.config.OUTPUT_ACTIVATION, name='output'))
         
         return model
     
+    def _recurrent_dropout(self) -> float:
+        """循环层内部的 Dropout；快速路径为 0，保证可以使用融合内核"""
+        return 0.0 if self.config.RNN_FAST_PATH else self.config.RECURRENT_DROPOUT
+    
+    def _sequence_dropout(self, i: int) -> Layer:
+        """
+        循环层之间的 Dropout
+        
+        快速路径用 SpatialDropout1D：整条序列丢弃同样的特征通道（变分 Dropout），
+        代替被去掉的 recurrent_dropout，在循环之外完成，不影响融合内核。
+        """
+        if self.config.RNN_FAST_PATH:
+            return SpatialDropout1D(self.config.DROPOUT_RATE, name=f'spatial_dropout_{i+1}')
+        return Dropout(self.config.DROPOUT_RATE, name=f'dropout_{i+1}')
+    
     def _get_regularizer(self):
         """获取正则化器"""
         if self.config.USE_L1_REGULARIZATION and self.config.USE_L2_REGULARIZATION:
@@ -267,13 +307,13 @@ class LSTMModelBuilder:
         self.model.compile(
             optimizer=optimizer,
             loss=self.config.LOSS_FUNCTION,
-            metrics=self.config.METRICS
+            metrics=list(self.config.METRICS)
         )
         
         print(f"  ✓ 优化器: {self.config.OPTIMIZER}")
         print(f"  ✓ 学习率: {self.config.LEARNING_RATE}")
         print(f"  ✓ 损失函数: {self.config.LOSS_FUNCTION}")
-        print(f"  ✓ 评估指标: {self.config.METRICS}")
+        print(f"  ✓ 评估指标: {list(self.config.METRICS)}")
     
     def get_callbacks(self) -> List[Callback]:
         """
@@ -283,7 +323,7 @@ class LSTMModelBuilder:
             回调函数列表
         """
         callbacks = []
-        train_config = TrainingConfig()
+        train_config = self.training_config
         
         # 1. EarlyStopping
         if train_config.USE_EARLY_STOPPING:
@@ -312,10 +352,10 @@ class LSTMModelBuilder:
         # 3. ModelCheckpoint
         if train_config.USE_MODEL_CHECKPOINT:
             # 确保目录存在
-            os.makedirs(os.path.dirname(PathConfig.CHECKPOINT_PATH), exist_ok=True)
+            os.makedirs(os.path.dirname(self.paths.CHECKPOINT_PATH), exist_ok=True)
             
             checkpoint = ModelCheckpoint(
-                filepath=PathConfig.CHECKPOINT_PATH,
+                filepath=self.paths.CHECKPOINT_PATH,
                 monitor=train_config.CHECKPOINT_MONITOR,
                 mode=train_config.CHECKPOINT_MODE,
                 save_best_only=train_config.CHECKPOINT_SAVE_BEST_ONLY,
@@ -323,11 +363,11 @@ class LSTMModelBuilder:
                 verbose=1
             )
             callbacks.append(checkpoint)
-            print(f"  ✓ ModelCheckpoint (保存路径: {PathConfig.CHECKPOINT_PATH})")
+            print(f"  ✓ ModelCheckpoint (保存路径: {self.paths.CHECKPOINT_PATH})")
         
         # 4. TensorBoard (可选)
         if train_config.USE_TENSORBOARD:
-            log_dir = os.path.join(PathConfig.LOGS_DIR, 'tensorboard')
+            log_dir = os.path.join(self.paths.LOGS_DIR, 'tensorboard')
             os.makedirs(log_dir, exist_ok=True)
             
             tensorboard = TensorBoard(
@@ -350,7 +390,7 @@ class LSTMModelBuilder:
         if self.model is None:
             raise ValueError("❌ 模型尚未构建")
         
-        path = path or PathConfig.MODEL_PATH
+        path = path or self.paths.MODEL_PATH
         os.makedirs(os.path.dirname(path), exist_ok=True)
         
         self.model.save(path)
@@ -358,7 +398,7 @@ class LSTMModelBuilder:
     
     def load_model(self, path: Optional[str] = None) -> keras.Model:
         """加载模型"""
-        path = path or PathConfig.MODEL_PATH
+        path = path or self.paths.MODEL_PATH
         
         if not os.path.exists(path):
             raise FileNotFoundError(f"❌ 模型文件不存在: {path}")
@@ -369,6 +409,72 @@ class LSTMModelBuilder:
         return self.model
 
 
+@keras.utils.register_keras_serializable(package='binance_lstm')
+class SymbolEmbedding(Layer):
+    """
+    交易对嵌入层 / Symbol embedding layer for panel models
+
+    输入最后一列是交易对编号（整批窗口内不变），查表得到该交易对的嵌入向量，
+    替换编号列并拼接到每个时间步的特征后面：
+    (batch, time_steps, features + 1) → (batch, time_steps, features + embedding_dim)
+
+    编号放在特征矩阵里而不是单独的输入，所以窗口视图、WindowSequence、
+    多步预测的环形缓冲区都不需要改动。加载面板模型前需要先导入本模块（注册该层）。
+    """
+
+    def __init__(self, n_symbols: int, embedding_dim: int = 8, **kwargs):
+        super().__init__(**kwargs)
+        self.n_symbols = int(n_symbols)
+        self.embedding_dim = int(embedding_dim)
+        self.embedding = Embedding(self.n_symbols, self.embedding_dim, name='table')
+
+    def build(self, input_shape):
+        self.embedding.build((None,))
+        super().build(input_shape)
+
+    def call(self, inputs):
+        features = inputs[..., :-1]
+        ids = keras.ops.cast(keras.ops.round(inputs[:, -1, -1]), 'int32')
+        vectors = keras.ops.cast(self.embedding(ids), features.dtype)
+        # (batch, embedding_dim) → 广播到每个时间步 (batch, time_steps, embedding_dim)
+        vectors = vectors[:, None, :] * keras.ops.ones_like(inputs[..., :1])
+        return keras.ops.concatenate([features, vectors], axis=-1)
+
+    def compute_output_shape(self, input_shape):
+        return tuple(input_shape[:-1]) + (input_shape[-1] - 1 + self.embedding_dim,)
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'n_symbols': self.n_symbols, 'embedding_dim': self.embedding_dim})
+        return config
+
+
+class WindowSequence(keras.utils.Sequence):
+    """
+    按批次把窗口喂给 model.fit / evaluate / predict
+    
+    X 可以是 WindowedArray（零拷贝窗口）或普通数组；每个批次只复制
+    batch_size 个窗口，整个训练过程中不会物化全部窗口
+    """
+    
+    def __init__(self, X, y=None, batch_size: int = 32):
+        super().__init__()
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+    
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+    
+    def __getitem__(self, index):
+        begin = index * self.batch_size
+        end = begin + self.batch_size
+        X_batch = as_batch(self.X, begin, end)
+        if self.y is None:
+            return X_batch
+        return X_batch, np.asarray(self.y[begin:end])
+
+
 class TrainingProgressCallback(Callback):
     """自定义训练进度回调"""
     
@@ -412,9 +518,14 @@ class TrainingProgressCallback(Callback):
         print("="*60)
 
 
-def setup_gpu():
-    """配置GPU"""
-    train_config = TrainingConfig()
+def setup_gpu(train_config: Optional[TrainingConfig] = None):
+    """
+    配置GPU
+    
+    Args:
+        train_config: 训练配置对象（RunConfig.training），默认使用默认配置
+    """
+    train_config = train_config or TrainingConfig()
     
     if not train_config.USE_GPU:
         # 禁用GPU
@@ -0,0 +1,518 @@
+"""
+NumPy 推理模块
+NumPy Inference Module
+
+不依赖 TensorFlow，用 NumPy 重现 LSTMModelBuilder 构建的模型的前向计算：
+LSTM / GRU（含 Bidirectional）、BatchNormalization（推理模式）、Dense、
+SymbolEmbedding（面板模型），Dropout 在推理时不起作用直接跳过。
+Re-implements the forward pass of models built by LSTMModelBuilder in plain
+NumPy: LSTM / GRU (optionally Bidirectional), inference-mode
+BatchNormalization, Dense and SymbolEmbedding; Dropout is a no-op.
+
+- 权重从 Keras 模型导出为一个 .npz 文件（结构描述 + 权重数组），加载时不需要 TensorFlow
+- predict_on_batch：整批窗口一次计算，输入投影 x @ W 对所有时间步一次矩阵乘法完成
+- run / step：显式传递循环层状态 (h, c)，可以先跑一遍窗口，之后每根新K线只前进一步
+  （只适用于单向模型，反向层需要整个窗口）
+
+门的顺序与 Keras 相同 / Gate order follows Keras:
+    LSTM: i, f, c, o
+    GRU : z, r, h（reset_after=True 时输入和循环各有一组 bias）
+
+作者: qinshihuang166
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+FORMAT_NAME = 'binance_lstm_numpy'
+FORMAT_VERSION = 1
+
+
+def _sigmoid(x):
+    # 用 tanh 表示，避免 exp 溢出警告
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': lambda x: np.clip(x / 6.0 + 0.5, 0.0, 1.0),
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'swish': lambda x: x * _sigmoid(x),
+    'silu': lambda x: x * _sigmoid(x),
+}
+
+
+def _activation(name: str):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"❌ NumPy 推理不支持激活函数: {name}，可选 {sorted(ACTIVATIONS)}")
+    return ACTIVATIONS[name]
+
+
+# ----------------------------------------------------------------------
+# 层 / Layers
+# 每个层保存 config（可 JSON 序列化）和 weights（NumPy 数组），
+# run(X, state) 处理整个序列，step(x, state) 处理一个时间步
+# ----------------------------------------------------------------------
+
+class _Layer:
+    kind = ''
+
+    def __init__(self, config: dict, weights: Dict[str, np.ndarray]):
+        self.config = config
+        self.weights = {k: np.asarray(v, dtype=np.float32) for k, v in weights.items()}
+
+    def run(self, X, state=None):
+        return self.apply(X), None
+
+    def step(self, x, state=None):
+        return self.apply(x), None
+
+    def apply(self, x):
+        raise NotImplementedError
+
+
+class _Dense(_Layer):
+    kind = 'dense'
+
+    def __init__(self, config, weights):
+        super().__init__(config, weights)
+        self.activation = _activation(config['activation'])
+
+    def apply(self, x):
+        y = x @ self.weights['kernel']
+        if 'bias' in self.weights:
+            y = y + self.weights['bias']
+        return self.activation(y)
+
+
+class _BatchNorm(_Layer):
+    """推理模式：y = (x - mean) / sqrt(var + eps) * gamma + beta，合并成一次乘加"""
+    kind = 'batch_norm'
+
+    def __init__(self, config, weights):
+        super().__init__(config, weights)
+        w = self.weights
+        inv = 1.0 / np.sqrt(w['moving_variance'] + np.float32(config['epsilon']))
+        if 'gamma' in w:
+            inv = inv * w['gamma']
+        self.scale = inv.astype(np.float32)
+        self.shift = (w.get('beta', 0.0) - w['moving_mean'] * self.scale).astype(np.float32)
+
+    def apply(self, x):
+        return x * self.scale + self.shift
+
+
+class _SymbolEmbedding(_Layer):
+    """面板模型：最后一列交易对编号 → 嵌入向量，拼接到每个时间步"""
+    kind = 'symbol_embedding'
+
+    def _lookup(self, ids):
+        return self.weights['table'][np.rint(ids).astype(np.int64)]
+
+    def run(self, X, state=None):
+        vectors = self._lookup(X[:, -1, -1])
+        vectors = np.broadcast_to(vectors[:, None, :], X.shape[:2] + vectors.shape[-1:])
+        return np.concatenate([X[..., :-1], vectors], axis=-1), None
+
+    def step(self, x, state=None):
+        return np.concatenate([x[:, :-1], self._lookup(x[:, -1])], axis=-1), None
+
+
+class _LSTM(_Layer):
+    kind = 'lstm'
+
+    def __init__(self, config, weights):
+        super().__init__(config, weights)
+        self.units = int(config['units'])
+        self.activation = _activation(config['activation'])
+        self.recurrent_activation = _activation(config['recurrent_activation'])
+        self.bias = self.weights.get('bias', np.zeros(4 * self.units, dtype=np.float32))
+
+    def initial_state(self, batch: int):
+        zeros = np.zeros((batch, self.units), dtype=np.float32)
+        return zeros, zeros.copy()
+
+    def _cell(self, xw, state):
+        h, c = state
+        u = self.units
+        z = xw + h @ self.weights['recurrent_kernel']
+        i = self.recurrent_activation(z[:, :u])
+        f = self.recurrent_activation(z[:, u:2 * u])
+        g = self.activation(z[:, 2 * u:3 * u])
+        o = self.recurrent_activation(z[:, 3 * u:])
+        c = f * c + i * g
+        h = o * self.activation(c)
+        return h, (h, c)
+
+    def run(self, X, state=None):
+        """
+        处理整个序列 / Run a whole sequence
+
+        Returns:
+            (输出, 最终状态)；return_sequences 时输出为 (batch, T, units)，否则为最后一步的 h。
+            go_backwards 时从最后一个时间步向前处理，输出仍按原时间顺序排列。
+        """
+        batch, T, _ = X.shape
+        state = state if state is not None else self.initial_state(batch)
+        # 输入投影对所有时间步一次完成，循环内只剩 h @ U
+        xw = X @ self.weights['kernel'] + self.bias
+        outputs = np.empty((batch, T, self.units), dtype=np.float32) if self.config['return_sequences'] else None
+        h = state[0]
+        for t in (range(T - 1, -1, -1) if self.config['go_backwards'] else range(T)):
+            h, state = self._cell(xw[:, t], state)
+            if outputs is not None:
+                outputs[:, t] = h
+        return (outputs if outputs is not None else h), state
+
+    def step(self, x, state=None):
+        state = state if state is not None else self.initial_state(x.shape[0])
+        return self._cell(x @ self.weights['kernel'] + self.bias, state)
+
+
+class _GRU(_LSTM):
+    kind = 'gru'
+
+    def __init__(self, config, weights):
+        _Layer.__init__(self, config, weights)
+        self.units = int(config['units'])
+        self.activation = _activation(config['activation'])
+        self.recurrent_activation = _activation(config['recurrent_activation'])
+        bias = self.weights.get('bias', np.zeros((2, 3 * self.units) if config['reset_after'] else 3 * self.units,
+                                                 dtype=np.float32))
+        if config['reset_after']:
+            self.bias, self.recurrent_bias = bias[0], bias[1]
+        else:
+            self.bias, self.recurrent_bias = bias, None
+
+    def initial_state(self, batch: int):
+        return (np.zeros((batch, self.units), dtype=np.float32),)
+
+    def _cell(self, xw, state):
+        (h,) = state
+        u = self.units
+        U = self.weights['recurrent_kernel']
+        if self.recurrent_bias is not None:
+            inner = h @ U + self.recurrent_bias
+            z = self.recurrent_activation(xw[:, :u] + inner[:, :u])
+            r = self.recurrent_activation(xw[:, u:2 * u] + inner[:, u:2 * u])
+            hh = self.activation(xw[:, 2 * u:] + r * inner[:, 2 * u:])
+        else:
+            inner = h @ U[:, :2 * u]
+            z = self.recurrent_activation(xw[:, :u] + inner[:, :u])
+            r = self.recurrent_activation(xw[:, u:2 * u] + inner[:, u:])
+            hh = self.activation(xw[:, 2 * u:] + (r * h) @ U[:, 2 * u:])
+        h = z * h + (1.0 - z) * hh
+        return h, (h,)
+
+
+_RECURRENT = {'lstm': _LSTM, 'gru': _GRU}
+
+
+class _Bidirectional(_Layer):
+    kind = 'bidirectional'
+
+    def __init__(self, config, weights):
+        super().__init__(config, weights)
+        self.forward_layer = self._child('forward', weights)
+        self.backward_layer = self._child('backward', weights)
+
+    def _child(self, prefix, weights):
+        config = self.config[prefix]
+        sub = {k[len(prefix) + 1:]: v for k, v in weights.items() if k.startswith(prefix + '/')}
+        return _RECURRENT[config['type']](config, sub)
+
+    def run(self, X, state=None):
+        y_fwd, _ = self.forward_layer.run(X)
+        y_bwd, _ = self.backward_layer.run(X)
+        mode = self.config['merge_mode']
+        if mode == 'concat':
+            return np.concatenate([y_fwd, y_bwd], axis=-1), None
+        if mode == 'sum':
+            return y_fwd + y_bwd, None
+        if mode == 'mul':
+            return y_fwd * y_bwd, None
+        if mode == 'ave':
+            return (y_fwd + y_bwd) / 2, None
+        raise ValueError(f"❌ 不支持的 merge_mode: {mode}")
+
+    def step(self, x, state=None):
+        raise ValueError("❌ 双向循环层需要整个窗口，不能逐步推理 / Bidirectional layers cannot be stepped")
+
+
+_LAYERS = {cls.kind: cls for cls in (_Dense, _BatchNorm, _SymbolEmbedding, _LSTM, _GRU, _Bidirectional)}
+
+
+# ----------------------------------------------------------------------
+# 从 Keras 读取权重 / Reading weights from Keras
+# ----------------------------------------------------------------------
+
+def _recurrent_from_keras(layer) -> Tuple[dict, dict]:
+    cfg = layer.get_config()
+    kind = type(layer).__name__.lower()
+    config = {
+        'type': kind,
+        'units': int(cfg['units']),
+        'activation': cfg['activation'],
+        'recurrent_activation': cfg['recurrent_activation'],
+        'return_sequences': bool(cfg['return_sequences']),
+        'go_backwards': bool(cfg.get('go_backwards', False)),
+    }
+    if kind == 'gru':
+        config['reset_after'] = bool(cfg.get('reset_after', True))
+    names = ['kernel', 'recurrent_kernel'] + (['bias'] if cfg.get('use_bias', True) else [])
+    return config, dict(zip(names, layer.get_weights()))
+
+
+def _layer_from_keras(layer) -> Optional[Tuple[dict, dict]]:
+    """Keras 层 → (config, weights)；推理时无作用的层返回 None"""
+    name = type(layer).__name__
+    cfg = layer.get_config()
+    if name in ('InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise', 'GaussianDropout'):
+        return None
+    if name in ('LSTM', 'GRU'):
+        return _recurrent_from_keras(layer)
+    if name == 'Bidirectional':
+        fwd_config, fwd_weights = _recurrent_from_keras(layer.forward_layer)
+        bwd_config, bwd_weights = _recurrent_from_keras(layer.backward_layer)
+        weights = {f'forward/{k}': v for k, v in fwd_weights.items()}
+        weights.update({f'backward/{k}': v for k, v in bwd_weights.items()})
+        return {'type': 'bidirectional', 'merge_mode': cfg['merge_mode'],
+                'forward': fwd_config, 'backward': bwd_config}, weights
+    if name == 'BatchNormalization':
+        axis = cfg['axis']
+        if (axis[0] if isinstance(axis, (list, tuple)) else axis) not in (-1, len(layer.input.shape) - 1):
+            raise ValueError(f"❌ NumPy 推理只支持最后一维的 BatchNormalization: {layer.name}")
+        names = (['gamma'] if cfg['scale'] else []) + (['beta'] if cfg['center'] else [])
+        names += ['moving_mean', 'moving_variance']
+        return {'type': 'batch_norm', 'epsilon': float(cfg['epsilon'])}, dict(zip(names, layer.get_weights()))
+    if name == 'Dense':
+        names = ['kernel'] + (['bias'] if cfg['use_bias'] else [])
+        return {'type': 'dense', 'activation': cfg['activation']}, dict(zip(names, layer.get_weights()))
+    if name == 'SymbolEmbedding':
+        return {'type': 'symbol_embedding'}, {'table': layer.get_weights()[0]}
+    raise ValueError(f"❌ NumPy 推理不支持层: {name} ({layer.name})")
+
+
+# ----------------------------------------------------------------------
+# 模型 / Model
+# ----------------------------------------------------------------------
+
+class NumpyModel:
+    """
+    NumPy 推理模型 / NumPy inference model
+
+    接口与 Keras 模型的推理部分一致（predict_on_batch / predict / input_shape /
+    output_shape），可以直接传给 predict_in_batches 和 MultiStepForecaster。
+
+    逐步推理 / Step-by-step inference:
+        out, states = model.run(window)          # 整个窗口，保留每个循环层的最终状态
+        out, states = model.step(new_point, states)  # 新K线只前进一步
+    状态由调用方保存，一个模型可以同时服务多个交易对。
+    """
+
+    is_lite = True
+
+    def __init__(self, layers: List[Tuple[str, dict, dict]], input_shape, output_shape, name: str = 'model'):
+        """
+        Args:
+            layers: [(层名, config, weights), ...]，按前向顺序
+            input_shape: (None, time_steps, features)
+            output_shape: (None, horizon)
+        """
+        self.name = name
+        self.layer_names = [layer_name for layer_name, _, _ in layers]
+        self.layers = [_LAYERS[config['type']](config, weights) for _, config, weights in layers]
+        self.input_shape = (None,) + tuple(int(d) for d in input_shape[1:])
+        self.output_shape = (None,) + tuple(int(d) for d in output_shape[1:])
+
+    @property
+    def streamable(self) -> bool:
+        """是否支持逐步推理（没有双向层）"""
+        return not any(isinstance(layer, _Bidirectional) for layer in self.layers)
+
+    # ------------------------------------------------------------------
+    # 导入 / 导出
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_keras(cls, model) -> 'NumpyModel':
+        """从 Keras 模型读取结构和权重（需要 TensorFlow）"""
+        layers = []
+        for layer in model.layers:
+            converted = _layer_from_keras(layer)
+            if converted is not None:
+                layers.append((layer.name, *converted))
+        return cls(layers, model.input_shape, model.output_shape, name=model.name)
+
+    def save(self, path: str) -> int:
+        """
+        保存为 .npz（结构描述存为 JSON 字符串，加载时不需要 pickle）
+
+        Returns:
+            文件大小（字节）
+        """
+        spec = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'name': self.name,
+            'input_shape': list(self.input_shape[1:]),
+            'output_shape': list(self.output_shape[1:]),
+            'layers': [],
+        }
+        arrays = {}
+        for layer_name, layer in zip(self.layer_names, self.layers):
+            spec['layers'].append({'name': layer_name, 'config': layer.config})
+            for key, value in layer.weights.items():
+                arrays[f'{layer_name}/{key}'] = value
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, __spec__=np.array(json.dumps(spec)), **arrays)
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path: str) -> 'NumpyModel':
+        """加载 save() 保存的 .npz 文件"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"❌ 找不到 NumPy 模型文件: {path}\n"
+                f"请先导出：python scripts/lstm/export_lstm.py --format numpy"
+            )
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data['__spec__']))
+            if spec.get('format') != FORMAT_NAME:
+                raise ValueError(f"❌ 不是 NumPy 模型文件: {path}")
+            layers = []
+            for item in spec['layers']:
+                prefix = item['name'] + '/'
+                weights = {k[len(prefix):]: data[k] for k in data.files if k.startswith(prefix)}
+                layers.append((item['name'], item['config'], weights))
+        return cls(layers, [None] + spec['input_shape'], [None] + spec['output_shape'], name=spec['name'])
+
+    # ------------------------------------------------------------------
+    # 推理 / Inference
+    # ------------------------------------------------------------------
+
+    def initial_states(self, batch_size: int = 1) -> list:
+        """全零初始状态（每个循环层一个，非循环层为 None）"""
+        return [layer.initial_state(batch_size) if isinstance(layer, _LSTM) else None for layer in self.layers]
+
+    def run(self, X, states: Optional[list] = None) -> Tuple[np.ndarray, list]:
+        """
+        处理整个窗口 / Run a whole window
+
+        Args:
+            X: (batch, time_steps, features)
+            states: 每个循环层的起始状态（默认全零，与 Keras 相同）
+
+        Returns:
+            (输出 (batch, horizon), 每层的最终状态)
+        """
+        x = np.asarray(X, dtype=np.float32)
+        states = states or [None] * len(self.layers)
+        new_states = []
+        for layer, state in zip(self.layers, states):
+            x, state = layer.run(x, state)
+            new_states.append(state)
+        return x, new_states
+
+    def step(self, x, states: list) -> Tuple[np.ndarray, list]:
+        """
+        前进一个时间步 / Advance one time step
+
+        Args:
+            x: 新时间点的特征 (batch, features)
+            states: run() 或上一次 step() 返回的状态
+
+        Returns:
+            (输出 (batch, horizon), 新状态)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        new_states = []
+        for layer, state in zip(self.layers, states):
+            x, state = layer.step(x, state)
+            new_states.append(state)
+        return x, new_states
+
+    def predict_on_batch(self, X) -> np.ndarray:
+        """单批推理（全零初始状态，不保留状态）/ Stateless batch prediction"""
+        return self.run(X)[0]
+
+    def predict(self, X, batch_size: int = 256, verbose: int = 0) -> np.ndarray:
+        """与 keras Model.predict 相同的调用方式 / Same call shape as Model.predict"""
+        from utils.lstm_windows import predict_in_batches
+
+        return predict_in_batches(self, X, batch_size=batch_size)
+
+    def summary(self) -> None:
+        print(f"🧮 NumPy 模型: {self.name}")
+        print(f"  输入: {self.input_shape}, 输出: {self.output_shape}")
+        for layer_name, layer in zip(self.layer_names, self.layers):
+            n_params = sum(w.size for w in layer.weights.values())
+            print(f"  - {layer_name:<24} {layer.kind:<18} {n_params:>10,} 参数")
+
+
+def test_numpy_model():
+    """与 Keras 模型的输出对比 / Compare against Keras"""
+    import tempfile
+    import time
+
+    from tensorflow import keras
+
+    np.random.seed(42)
+    time_steps, n_features = 60, 8
+    X = np.random.rand(16, time_steps, n_features).astype(np.float32)
+
+    def stacked(rnn, bidirectional=False):
+        model = keras.Sequential([keras.layers.Input(shape=(time_steps, n_features))])
+        for i, units in enumerate((32, 16)):
+            layer = rnn(units, return_sequences=i == 0, dropout=0.1)
+            model.add(keras.layers.Bidirectional(layer) if bidirectional else layer)
+            model.add(keras.layers.BatchNormalization())
+            model.add(keras.layers.Dropout(0.2))
+        model.add(keras.layers.Dense(16, activation='relu'))
+        model.add(keras.layers.Dense(1))
+        # 训练一轮，让 BatchNormalization 的滑动均值/方差不再是初始值
+        model.compile(optimizer='adam', loss='mse')
+        model.fit(X, np.random.rand(len(X)), epochs=1, verbose=0)
+        return model
+
+    for label, model in [('LSTM', stacked(keras.layers.LSTM)),
+                         ('GRU', stacked(keras.layers.GRU)),
+                         ('BiLSTM', stacked(keras.layers.LSTM, True)),
+                         ('BiGRU', stacked(keras.layers.GRU, True))]:
+        expected = model.predict(X, verbose=0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.npz')
+            NumpyModel.from_keras(model).save(path)
+            numpy_model = NumpyModel.load(path)
+
+        start = time.perf_counter()
+        numpy_model.predict_on_batch(X[:1])
+        numpy_time = time.perf_counter() - start
+        model.predict_on_batch(X[:1])  # 预热（追踪推理函数）
+        start = time.perf_counter()
+        model.predict_on_batch(X[:1])
+        keras_time = time.perf_counter() - start
+
+        error = float(np.max(np.abs(numpy_model.predict_on_batch(X) - expected)))
+        print(f"{label:<7} 最大误差: {error:.2e}  单窗口: NumPy {numpy_time * 1000:.2f} ms, "
+              f"Keras {keras_time * 1000:.2f} ms")
+        assert error < 1e-4
+
+        if numpy_model.streamable:
+            # 前 T-1 步跑窗口，最后一步用 step，结果应与整个窗口相同
+            _, states = numpy_model.run(X[:, :-1])
+            stepped, _ = numpy_model.step(X[:, -1], states)
+            assert float(np.max(np.abs(stepped - expected))) < 1e-4
+
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_numpy_model()
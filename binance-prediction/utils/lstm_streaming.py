@@ -0,0 +1,231 @@
+"""
+LSTM 流式推理模块
+LSTM Streaming Inference Module
+
+实时预测每根新K线都把整个 TIME_STEPS 窗口重新跑一遍，其中 TIME_STEPS - 1 步
+上一根K线已经算过。流式推理保存每个交易对的循环层状态 (h, c)，每根收盘的K线
+只前进一步，单根K线的计算量约为原来的 1 / TIME_STEPS。
+Live prediction used to re-run the whole window on every candle although all
+but one step were already processed. Streaming keeps the recurrent state per
+symbol and advances it by one step per closed candle.
+
+逐步推进相当于模型看到了比训练窗口更长的历史，与"只看最近 TIME_STEPS 根"的
+结果会慢慢产生偏差：每 resync_every 根K线（或K线有缺口时）用完整窗口重新计算
+状态，并记录重新同步时的偏差 (drift)。
+Stepping means the model sees a longer history than its training windows, so
+the state is rebuilt from a full window every `resync_every` candles (or
+after a gap) and the drift measured at that point is recorded.
+
+只适用于单向 LSTM / GRU 模型（反向层需要整个窗口）。Keras 模型会先转换为
+NumpyModel（utils/lstm_numpy.py），逐步计算在 NumPy 中完成。
+
+作者: qinshihuang166
+"""
+
+import os
+import sys
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_lstm import ModelConfig
+from utils.lstm_forecaster import CLOSE_INDEX
+from utils.lstm_numpy import NumpyModel
+
+
+@dataclass(frozen=True)
+class StreamState:
+    """
+    一个交易对（或一批交易对）的流式状态，不可变，每次前进返回新对象
+    Immutable stream state; every advance returns a new one
+    """
+
+    states: list  # 每个循环层的 (h, c) / (h,)
+    output: np.ndarray  # 当前状态下的预测 (batch, horizon)，归一化尺度
+    last_point: np.ndarray  # 最新时间点的特征 (batch, features)
+    since_sync: int = 0  # 距上次用完整窗口同步过了几根K线
+    drift: float = float('nan')  # 上次重新同步时流式预测与完整窗口预测的最大差异
+    resyncs: int = 0  # 重新同步次数
+
+
+class StreamingForecaster:
+    """
+    流式预测器 / Streaming forecaster
+
+    状态由调用方保存（例如 ModelRegistry 的每个交易对快照），一个预测器可以服务
+    任意多个交易对：
+        stream = forecaster.start(window)              # 完整窗口
+        stream = forecaster.advance(stream, point)     # 每根新K线前进一步
+        stream = forecaster.advance(stream, point, window)  # 到期时用 window 重新同步
+        forecaster.forecast(stream, steps)
+    """
+
+    def __init__(self, model, resync_every: int = ModelConfig.STREAM_RESYNC_EVERY,
+                 target_index: int = CLOSE_INDEX):
+        """
+        Args:
+            model: NumpyModel 或 Keras 模型（自动转换为 NumpyModel）
+            resync_every: 每前进多少根K线用完整窗口重新同步一次（<= 0 表示不定期同步）
+            target_index: 预测目标在特征中的位置（默认 close）
+        """
+        if not isinstance(model, NumpyModel):
+            if getattr(model, 'is_lite', False):
+                raise ValueError("❌ 流式推理需要 Keras 模型或 NumPy 模型（TFLite 不能保存循环层状态）")
+            model = NumpyModel.from_keras(model)
+        if not model.streamable:
+            raise ValueError("❌ 双向模型不能流式推理（反向层需要整个窗口）")
+
+        self.model = model
+        self.resync_every = int(resync_every)
+        self.target_index = target_index
+        self.horizon = int(model.output_shape[-1])
+
+    def start(self, window: np.ndarray) -> StreamState:
+        """
+        用完整窗口初始化状态 / Initialise from a full window
+
+        Args:
+            window: (batch, time_steps, features) 或单个窗口 (time_steps, features)
+        """
+        window = np.asarray(window, dtype=np.float32)
+        if window.ndim == 2:
+            window = window[None]
+        output, states = self.model.run(window)
+        return StreamState(states=states, output=output, last_point=window[:, -1].copy())
+
+    def due(self, stream: StreamState) -> bool:
+        """下一根K线是否需要重新同步"""
+        return self.resync_every > 0 and stream.since_sync + 1 >= self.resync_every
+
+    def advance(self, stream: StreamState, point: np.ndarray,
+                window: Optional[np.ndarray] = None) -> StreamState:
+        """
+        前进一根K线 / Advance by one candle
+
+        Args:
+            stream: 当前状态
+            point: 新K线的特征 (batch, features) 或 (features,)
+            window: 以新K线结尾的完整窗口；重新同步到期且提供了 window 时，
+                    用它重新计算状态并记录偏差
+
+        Returns:
+            新状态
+        """
+        point = np.asarray(point, dtype=np.float32)
+        if point.ndim == 1:
+            point = point[None]
+        output, states = self.model.step(point, stream.states)
+
+        if window is not None and self.due(stream):
+            fresh = self.start(window)
+            drift = float(np.max(np.abs(output - fresh.output)))
+            return replace(fresh, drift=drift, resyncs=stream.resyncs + 1)
+
+        return replace(stream, states=states, output=output, last_point=point,
+                       since_sync=stream.since_sync + 1)
+
+    def forecast(self, stream: StreamState, steps: int) -> np.ndarray:
+        """
+        从当前状态预测未来 steps 步 / Forecast from the current state
+
+        模型输出宽度 >= steps 时直接返回当前预测；否则把预测的 close 作为新时间点
+        继续逐步推进（只作用于状态的副本，不改变 stream）。
+
+        Returns:
+            (batch, steps) 归一化尺度的预测
+        """
+        block, states, point = stream.output, stream.states, stream.last_point
+        predictions = np.empty((block.shape[0], steps), dtype=np.float32)
+        filled = 0
+        while True:
+            take = min(self.horizon, steps - filled)
+            predictions[:, filled:filled + take] = block[:, :take]
+            filled += take
+            if filled >= steps:
+                return predictions
+            # 新时间点 = 最新时间点 + 预测的 close；这 take 个点都来自同一个预测块，
+            # 循环内 block 会被新的输出替换，先保留一份
+            # All `take` points come from the same predicted block, which step() replaces
+            prev = block
+            for j in range(take):
+                point = point.copy()
+                point[:, self.target_index] = prev[:, j]
+                block, states = self.model.step(point, states)
+
+
+def test_streaming():
+    """逐根K线推进 vs 每根K线重跑完整窗口：耗时和偏差 / Cost and drift"""
+    import time
+
+    from tensorflow import keras
+
+    np.random.seed(42)
+    time_steps, n_features, n_candles = 60, 16, 480
+    keras_model = keras.Sequential([
+        keras.layers.Input(shape=(time_steps, n_features)),
+        keras.layers.LSTM(64, return_sequences=True),
+        keras.layers.LSTM(32),
+        keras.layers.Dense(16, activation='relu'),
+        keras.layers.Dense(1),
+    ])
+    # 随机游走特征，接近归一化后的行情
+    series = np.cumsum(np.random.randn(time_steps + n_candles, n_features), axis=0).astype(np.float32)
+    series = (series - series.min(0)) / (series.max(0) - series.min(0))
+    windows = np.lib.stride_tricks.sliding_window_view(series, time_steps, axis=0).transpose(0, 2, 1)
+
+    forecaster = StreamingForecaster(keras_model, resync_every=ModelConfig.STREAM_RESYNC_EVERY)
+    model = forecaster.model
+
+    start = time.perf_counter()
+    expected = np.concatenate([model.predict_on_batch(windows[k][None]) for k in range(1, n_candles + 1)])
+    window_time = time.perf_counter() - start
+
+    stream = forecaster.start(windows[0])
+    streamed = []
+    start = time.perf_counter()
+    for k in range(1, n_candles + 1):
+        stream = forecaster.advance(stream, series[time_steps - 1 + k], windows[k])
+        streamed.append(stream.output[0])
+    stream_time = time.perf_counter() - start
+    streamed = np.array(streamed)
+
+    # 前一根K线刚同步过时，单步结果应与完整窗口完全一致
+    first = forecaster.advance(forecaster.start(windows[0][:-1]), windows[0][-1])
+    assert float(np.max(np.abs(first.output - model.predict_on_batch(windows[0][None])))) < 1e-5
+
+    drift = np.abs(streamed - expected)
+    print(f"每根K线: 完整窗口 {window_time / n_candles * 1000:.3f} ms, "
+          f"流式 {stream_time / n_candles * 1000:.3f} ms ({window_time / stream_time:.1f}x)")
+    print(f"与完整窗口的偏差: 平均 {drift.mean():.2e}, 最大 {drift.max():.2e}, "
+          f"重新同步 {stream.resyncs} 次")
+
+    # forecast 不改变状态，重复调用结果相同
+    assert np.array_equal(forecaster.forecast(stream, 5), forecaster.forecast(stream, 5))
+
+    # 多步输出模型：每轮把整块预测作为新时间点追加，与把这些点拼到窗口后面整段运行一致
+    # Multi-output model: compare against running the extended sequence in one pass
+    horizon, steps = 3, 8
+    multi = StreamingForecaster(keras.Sequential([
+        keras.layers.Input(shape=(time_steps, n_features)),
+        keras.layers.LSTM(32),
+        keras.layers.Dense(horizon),
+    ]), resync_every=0)
+    sequence = windows[0].copy()
+    reference = []
+    while len(reference) < steps:
+        block = multi.model.run(sequence[None])[0][0]
+        reference.extend(block[:steps - len(reference)])
+        points = np.repeat(sequence[-1:], horizon, axis=0)
+        points[:, multi.target_index] = block
+        sequence = np.concatenate([sequence, points])
+    multi_error = float(np.max(np.abs(multi.forecast(multi.start(windows[0]), steps)[0] - reference)))
+    print(f"多步输出 (horizon={horizon}, steps={steps}) 与整段运行的偏差: {multi_error:.2e}")
+    assert multi_error < 1e-5
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_streaming()
@@ -0,0 +1,227 @@
+"""
+LSTM 时间窗口视图模块
+LSTM Window View Module
+
+用零拷贝的滑动窗口视图代替把所有窗口复制成一个大 3D 数组。
+create_sequences 原来的做法需要 TIME_STEPS 倍于特征矩阵的内存（默认约60倍），
+这里只保存特征矩阵本身，窗口在用到时（按批次）才被复制出来。
+Zero-copy sliding-window views instead of materializing every window into one
+big 3D array. Only the feature matrix is kept in memory (or memory-mapped);
+windows are copied batch by batch when they are consumed.
+
+作者: qinshihuang166
+"""
+
+from typing import Iterator, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WindowedArray:
+    """
+    惰性的 3D 窗口数组 / Lazy 3D window array
+
+    X[i] = data[start + i : start + i + time_steps]
+
+    - 形状、长度、切片和普通的 (样本数, 时间步长, 特征数) 数组一致
+      Shape, len() and slicing behave like a (samples, time_steps, features) array
+    - 连续切片（X[a:b]）返回新的 WindowedArray，不复制数据
+      Contiguous slices return another WindowedArray without copying
+    - 整数/花式索引只复制被选中的窗口
+      Integer and fancy indexing copy only the selected windows
+    - data 可以是 np.memmap，此时整个特征矩阵也不需要载入内存
+      data may be an np.memmap, so the feature matrix itself can stay on disk
+    """
+
+    def __init__(self, data: np.ndarray, time_steps: int,
+                 start: int = 0, stop: Optional[int] = None):
+        """
+        Args:
+            data: 2D 特征矩阵 (行数, 特征数)
+            time_steps: 窗口长度
+            start: 第一个窗口的起始行
+            stop: 窗口数量的上界（不含），默认到最后一个完整窗口
+        """
+        if data.ndim != 2:
+            raise ValueError(f"❌ 特征矩阵必须是2D数组，当前维度: {data.ndim}")
+
+        max_windows = len(data) - time_steps + 1
+        stop = max_windows if stop is None else min(stop, max_windows)
+
+        self.data = data
+        self.time_steps = time_steps
+        self.start = start
+        self.stop = max(start, stop)
+
+    # ------------------------------------------------------------------
+    # 类数组接口 / Array-like interface
+    # ------------------------------------------------------------------
+
+    @property
+    def shape(self):
+        return (self.stop - self.start, self.time_steps, self.data.shape[1])
+
+    @property
+    def ndim(self) -> int:
+        return 3
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        """如果物化成普通数组需要的字节数 / Bytes if materialized"""
+        return int(np.prod(self.shape)) * self.data.dtype.itemsize
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def view(self) -> np.ndarray:
+        """
+        返回只读的跨步视图 (样本数, 时间步长, 特征数)，不复制数据
+        Read-only strided view (samples, time_steps, features); no copy
+        """
+        windows = sliding_window_view(self.data, self.time_steps, axis=0)
+        # sliding_window_view 把窗口维放在最后: (N, features, time_steps)
+        return windows[self.start:self.stop].transpose(0, 2, 1)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) and key.step in (None, 1):
+            begin, end, _ = key.indices(len(self))
+            return WindowedArray(self.data, self.time_steps,
+                                 start=self.start + begin,
+                                 stop=self.start + max(begin, end))
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(f"window index {key} out of range")
+            first = self.start + index
+            return self.data[first:first + self.time_steps]
+        # 花式索引 / 多维索引：只复制被选中的窗口
+        return np.array(self.view()[key])
+
+    def __array__(self, dtype=None, copy=None):
+        # 物化全部窗口（内存占用为 TIME_STEPS 倍），只在确实需要时使用
+        # Materializes every window (TIME_STEPS x memory); only when really needed
+        return np.ascontiguousarray(self.view(), dtype=dtype)
+
+    def __repr__(self) -> str:
+        return (f"WindowedArray(shape={self.shape}, dtype={self.dtype}, "
+                f"memmap={isinstance(self.data, np.memmap)})")
+
+    # ------------------------------------------------------------------
+    # 批处理 / Batching
+    # ------------------------------------------------------------------
+
+    def iter_batches(self, batch_size: int) -> Iterator[np.ndarray]:
+        """按批次返回连续的窗口数组（每批复制一次）/ Yield contiguous batches"""
+        for begin in range(0, len(self), batch_size):
+            yield np.ascontiguousarray(self[begin:begin + batch_size].view())
+
+
+class PanelWindows:
+    """
+    多个交易对的惰性窗口数组 / Lazy windows over a stacked multi-symbol panel
+
+    X[i] = data[starts[i] : starts[i] + time_steps]
+
+    data 是各交易对特征矩阵的纵向拼接，starts 只包含不跨越交易对边界的窗口起点，
+    顺序可以任意（面板训练按目标时间排序，使每个批次混合多个交易对）。
+    和 WindowedArray 一样，只有被取出的批次才会被复制。
+    data stacks every symbol's feature matrix; starts holds only windows that
+    do not cross a symbol boundary, in any order. Only consumed batches are copied.
+    """
+
+    def __init__(self, data: np.ndarray, time_steps: int, starts: np.ndarray):
+        """
+        Args:
+            data: 2D 特征矩阵，各交易对按行拼接
+            time_steps: 窗口长度
+            starts: 每个样本窗口的起始行
+        """
+        if data.ndim != 2:
+            raise ValueError(f"❌ 特征矩阵必须是2D数组，当前维度: {data.ndim}")
+        self.data = data
+        self.time_steps = time_steps
+        self.starts = np.asarray(starts, dtype=np.int64)
+
+    @property
+    def shape(self):
+        return (len(self.starts), self.time_steps, self.data.shape[1])
+
+    @property
+    def ndim(self) -> int:
+        return 3
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        """如果物化成普通数组需要的字节数 / Bytes if materialized"""
+        return int(np.prod(self.shape)) * self.data.dtype.itemsize
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def view(self) -> np.ndarray:
+        """
+        复制出全部窗口 (样本数, 时间步长, 特征数)；起点不连续，无法做零拷贝视图
+        Gathers every window; starts are not contiguous so this is a copy
+        """
+        windows = sliding_window_view(self.data, self.time_steps, axis=0)
+        return windows[self.starts].transpose(0, 2, 1)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            first = int(self.starts[key])
+            return self.data[first:first + self.time_steps]
+        if isinstance(key, slice) or (isinstance(key, np.ndarray) and key.ndim == 1):
+            # 切片/花式索引只选择起点，仍然是惰性的 / Still lazy: only starts are selected
+            return PanelWindows(self.data, self.time_steps, self.starts[key])
+        return np.array(self.view()[key])
+
+    def __array__(self, dtype=None, copy=None):
+        return np.ascontiguousarray(self.view(), dtype=dtype)
+
+    def __repr__(self) -> str:
+        return f"PanelWindows(shape={self.shape}, dtype={self.dtype})"
+
+    def iter_batches(self, batch_size: int) -> Iterator[np.ndarray]:
+        """按批次返回连续的窗口数组 / Yield contiguous batches"""
+        for begin in range(0, len(self), batch_size):
+            yield np.ascontiguousarray(self[begin:begin + batch_size].view())
+
+
+def as_batch(X, begin: int, end: int) -> np.ndarray:
+    """取出 [begin, end) 区间的样本，WindowedArray、PanelWindows 和普通数组都适用"""
+    batch = X[begin:end]
+    if isinstance(batch, (WindowedArray, PanelWindows)):
+        return np.ascontiguousarray(batch.view())
+    return np.asarray(batch)
+
+
+def predict_in_batches(model, X, batch_size: int = 1024) -> np.ndarray:
+    """
+    分批预测，避免把所有窗口一次性物化
+    Predict batch by batch so the windows are never materialized all at once
+
+    Args:
+        model: Keras 模型或 TFLitePredictor
+        X: WindowedArray 或普通 3D 数组
+        batch_size: 每批样本数
+
+    Returns:
+        预测结果，形状与 model.predict(X) 相同
+    """
+    outputs = []
+    for begin in range(0, len(X), batch_size):
+        outputs.append(np.asarray(model.predict_on_batch(as_batch(X, begin, begin + batch_size))))
+    if not outputs:
+        return np.empty((0,) + tuple(model.output_shape[1:]))
+    return np.concatenate(outputs, axis=0)
@@ -0,0 +1,158 @@
+"""
+行情数据缓存模块
+Market Data Cache Module
+
+进程级的K线缓存，按 (交易对, 间隔, 起始时间) 缓存下载结果，直到下一根K线收盘才失效；
+同一个键的并发请求共享同一次下载（single-flight），不会重复请求交易所。
+Process-wide kline cache keyed by (symbol, interval, start). Entries stay
+valid until the next candle closes, and concurrent requests for the same key
+share a single in-flight fetch.
+
+作者: qinshihuang166
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# Binance K线间隔对应的秒数
+INTERVAL_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '8h': 28800, '12h': 43200,
+    '1d': 86400, '3d': 259200, '1w': 604800,
+}
+
+
+def next_candle_close(interval: str, now: Optional[float] = None) -> float:
+    """当前这根K线的收盘时间（Unix 秒）/ Close time of the current candle"""
+    seconds = INTERVAL_SECONDS[interval]
+    now = time.time() if now is None else now
+    return (now // seconds + 1) * seconds
+
+
+class MarketDataCache:
+    """
+    行情数据缓存 / Market data cache
+
+    fetch_fn(symbol, interval, start_str) 负责真正的下载（例如
+    BinanceUtility.fetch_historical_data）。返回的 DataFrame 在多个请求之间共享，
+    调用方只能读取，不能原地修改。
+    """
+
+    def __init__(self, fetch_fn: Callable[[str, str, str], pd.DataFrame],
+                 grace_seconds: float = 2.0, max_age_seconds: Optional[float] = None):
+        """
+        Args:
+            fetch_fn: 下载函数 fetch_fn(symbol, interval, start_str) -> DataFrame
+            grace_seconds: K线收盘后再等待多少秒才认为交易所已经有新K线
+            max_age_seconds: 可选的最长缓存时间（希望未收盘K线的价格更新时使用）
+        """
+        self.fetch_fn = fetch_fn
+        self.grace = grace_seconds
+        self.max_age = max_age_seconds
+        self._entries: Dict[Tuple, Tuple[float, pd.DataFrame]] = {}
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, interval: str, fetched_at: float) -> float:
+        expires = next_candle_close(interval, fetched_at) + self.grace
+        if self.max_age is not None:
+            expires = min(expires, fetched_at + self.max_age)
+        return expires
+
+    def get(self, symbol: str, interval: str, start_str: str) -> pd.DataFrame:
+        """
+        读取K线；缓存过期时下载，同一个键的并发调用只下载一次
+        Get klines, fetching at most once per key even under concurrency
+
+        Returns:
+            K线 DataFrame（共享对象，只读）
+        """
+        key = (symbol, interval, start_str)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() < entry[0]:
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            fetched_at = time.time()
+            df = self.fetch_fn(symbol, interval, start_str)
+            if df is None or df.empty:
+                raise ValueError(f"没有获取到 {symbol} {interval} 的K线")
+        except Exception as e:
+            # 失败不缓存：等待者收到同一个异常，下一次请求重新下载
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (self._expires_at(interval, fetched_at), df)
+            del self._inflight[key]
+        future.set_result(df)
+        return df
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """清除缓存（指定交易对或全部）"""
+        with self._lock:
+            for key in list(self._entries):
+                if symbol is None or key[0] == symbol:
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+def test_market_data_cache():
+    """并发读取同一个键只下载一次 / Single-flight smoke test"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+
+    def fetch(symbol, interval, start_str):
+        calls.append(symbol)
+        time.sleep(0.05)
+        return pd.DataFrame({'close': [1.0, 2.0]})
+
+    cache = MarketDataCache(fetch)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        frames = list(pool.map(lambda i: cache.get('BTCUSDT', '1h', '2 days ago UTC'), range(100)))
+    assert len(calls) == 1 and all(df is frames[0] for df in frames)
+
+    cache.get('ETHUSDT', '1h', '2 days ago UTC')
+    assert len(calls) == 2
+
+    # 过期后重新下载
+    cache._entries[('BTCUSDT', '1h', '2 days ago UTC')] = (0.0, frames[0])
+    cache.get('BTCUSDT', '1h', '2 days ago UTC')
+    assert len(calls) == 3
+    print(f"下载次数: {len(calls)}, 统计: {cache.stats()}")
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_market_data_cache()
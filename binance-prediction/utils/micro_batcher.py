@@ -0,0 +1,154 @@
+"""
+请求微批处理模块
+Request Micro-Batching Module
+
+把短时间内并发到达的同类请求合并成一批，只调用一次向量化的处理函数，
+再把结果分发回各个请求。
+Collects concurrent requests with the same key for a short window, runs one
+vectorized handler call for the whole batch and fans the results back out.
+
+不需要后台线程：每批的第一个请求作为 "leader"，等待 max_wait 或批次装满后
+在自己的线程里执行处理函数，其余请求只等待结果。
+No background thread: the first request of a batch acts as the leader, waits
+up to max_wait (or until the batch is full) and runs the handler in its own
+thread while the followers wait for their result.
+
+作者: qinshihuang166
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class _Batch:
+    __slots__ = ('items', 'futures', 'full')
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List[Future] = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    微批处理器 / Micro-batcher
+
+    handler(key, items) 接收同一个 key 的一批请求，返回等长的结果列表；
+    抛出的异常会传给这一批中的每个请求。
+    """
+
+    def __init__(self, handler: Callable[[Hashable, List[Any]], List[Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        """
+        Args:
+            handler: 批处理函数 handler(key, items) -> results
+            max_batch_size: 每批最多合并的请求数
+            max_wait_ms: 第一个请求最多等待多久（毫秒）再执行
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 必须 >= 1")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, key: Hashable, item: Any, timeout: Optional[float] = None) -> Any:
+        """
+        提交一个请求并阻塞等待结果
+        Submit one request and block until its result is ready
+
+        Args:
+            key: 分组键（例如交易对），只有相同 key 的请求会被合并
+            item: 请求内容
+            timeout: 等待结果的超时时间（秒）
+
+        Returns:
+            handler 为该请求返回的结果
+        """
+        future: Future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_batch_size:
+                # 批次已满：后续请求开始新的一批
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self._batches += 1
+                self._items += len(batch.items)
+            self._run(key, batch)
+
+        return future.result(timeout)
+
+    def _run(self, key: Hashable, batch: _Batch):
+        try:
+            results = self.handler(key, batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(f"handler 返回了 {len(results)} 个结果，期望 {len(batch.items)} 个")
+        except Exception as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """批次统计 / Batch statistics"""
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'requests': self._items,
+                'avg_batch_size': self._items / self._batches if self._batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+            }
+
+
+def test_micro_batcher():
+    """并发提交，检查结果正确且请求被合并 / Concurrency smoke test"""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+
+    def handler(key, items):
+        calls.append((key, len(items)))
+        time.sleep(0.002)
+        return [f"{key}:{x * 2}" for x in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=16, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        futures = [pool.submit(batcher.submit, 'AB'[i % 2], i) for i in range(200)]
+        results = [f.result() for f in futures]
+
+    assert results == [f"{'AB'[i % 2]}:{i * 2}" for i in range(200)]
+    assert all(size <= 16 for _, size in calls)
+    print(f"200 个请求 → {len(calls)} 次处理调用, 统计: {batcher.stats()}")
+
+    def failing(key, items):
+        raise ValueError("boom")
+
+    try:
+        MicroBatcher(failing, max_wait_ms=1).submit('A', 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("异常没有传给请求")
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_micro_batcher()
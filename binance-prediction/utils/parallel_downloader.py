@@ -0,0 +1,81 @@
+"""
+多交易对并发下载模块
+Concurrent Multi-Symbol Downloader
+
+用线程池同时下载多个交易对，所有线程共享同一个请求权重预算，
+总耗时取决于 Binance 的限流额度，而不是交易对数量。
+Downloads many symbols with a worker pool that shares one request-weight
+budget, so wall-clock time scales with the rate limit instead of the number
+of symbols.
+
+作者: qinshihuang166
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from utils.binance_client import BinanceUtility
+from utils.kline_store import KlineStore
+from utils.rate_limiter import WeightRateLimiter
+
+DEFAULT_WORKERS = 8
+
+
+def download_symbols(symbols: List[str],
+                     interval: str,
+                     start_str,
+                     end_str=None,
+                     store: Optional[KlineStore] = None,
+                     max_workers: int = DEFAULT_WORKERS,
+                     limiter: Optional[WeightRateLimiter] = None,
+                     on_result: Optional[Callable[[str, Optional[pd.DataFrame]], None]] = None
+                     ) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    并发下载多个交易对的历史K线
+    Download historical klines for many symbols concurrently
+
+    Args:
+        symbols: 交易对列表
+        interval: 时间间隔 (e.g., '1h')
+        start_str: 开始时间
+        end_str: 结束时间 (可选)
+        store: 可选的本地K线仓库（增量下载 + 断点续传）
+        max_workers: 线程数
+        limiter: 共享限流器，默认新建一个
+        on_result: 每个交易对完成时的回调 (symbol, df)，在工作线程中调用
+
+    Returns:
+        {symbol: DataFrame 或 None（失败）}
+    """
+    limiter = limiter or WeightRateLimiter()
+    local = threading.local()
+
+    def _worker_client() -> BinanceUtility:
+        # 每个线程一个 Client（requests.Session 不是线程安全的），但共享限流器
+        # One Client per thread (requests.Session is not thread-safe), shared limiter
+        if not hasattr(local, 'client'):
+            local.client = BinanceUtility(kline_store=store, rate_limiter=limiter)
+        return local.client
+
+    def _download(symbol: str) -> Optional[pd.DataFrame]:
+        df = _worker_client().fetch_historical_data(symbol, interval, start_str, end_str)
+        if on_result is not None:
+            on_result(symbol, df)
+        return df
+
+    results: Dict[str, Optional[pd.DataFrame]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        futures = {pool.submit(_download, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                logging.error(f"下载 {symbol} 失败: {e} / Failed to download {symbol}: {e}")
+                results[symbol] = None
+
+    return {symbol: results.get(symbol) for symbol in symbols}
@@ -0,0 +1,148 @@
+"""
+预测快照调度模块
+Prediction Snapshot Scheduler
+
+模型和特征只在新K线收盘时才会变化，所以预测不需要按请求计算：
+调度器在每根K线收盘后为所有交易对计算一次预测并保存快照，
+API 读取快照是常数时间；订阅者（SSE / 长轮询）在快照更新时被唤醒。
+The model and its features only change when a candle closes, so predictions
+are computed once per symbol right after each close and stored as snapshots.
+Reads are constant time and subscribers are woken up when a new snapshot
+is published.
+
+作者: qinshihuang166
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.market_data_cache import next_candle_close
+
+
+class PredictionScheduler:
+    """
+    预测快照调度器 / Prediction snapshot scheduler
+
+    compute_fn(symbol) 返回一个 JSON 可序列化的预测字典；计算失败时保留上一份快照。
+    每发布一份快照 version 加 1，订阅者用 wait_for_update(version) 等待下一次更新。
+    """
+
+    def __init__(self, compute_fn: Callable[[str], dict], symbols: Iterable[str],
+                 interval: str = '1h', grace_seconds: float = 5.0):
+        """
+        Args:
+            compute_fn: 计算单个交易对预测的函数
+            symbols: 要调度的交易对
+            interval: K线间隔（决定刷新时间点）
+            grace_seconds: K线收盘后等待多少秒再计算（等交易所生成新K线）
+        """
+        self.compute_fn = compute_fn
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.grace = grace_seconds
+        self.snapshots: Dict[str, dict] = {}
+        self.version = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # 计算 / Computing
+    # ------------------------------------------------------------------
+
+    def refresh(self, symbol: str) -> dict:
+        """重新计算一个交易对的快照并发布 / Recompute and publish one snapshot"""
+        snapshot = dict(self.compute_fn(symbol))
+        snapshot['computed_at'] = datetime.now().isoformat(timespec='seconds')
+        with self._cond:
+            self.version += 1
+            snapshot['version'] = self.version
+            self.snapshots[symbol] = snapshot
+            self._cond.notify_all()
+        return snapshot
+
+    def refresh_all(self):
+        for symbol in self.symbols:
+            try:
+                self.refresh(symbol)
+            except Exception as e:
+                print(f"⚠️ 计算 {symbol} 的预测失败: {e}")
+
+    def start(self) -> threading.Thread:
+        """启动后台线程：立即计算一次，之后每根K线收盘后计算"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def _loop():
+            self.refresh_all()
+            while not self._stop.wait(next_candle_close(self.interval) + self.grace - time.time()):
+                self.refresh_all()
+
+        self._thread = threading.Thread(target=_loop, name='prediction-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # 读取 / Reading
+    # ------------------------------------------------------------------
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """最新快照（没有时返回 None）/ Latest snapshot or None"""
+        with self._cond:
+            return self.snapshots.get(symbol)
+
+    def wait_for_update(self, since: int, timeout: Optional[float] = None) -> Tuple[int, Dict[str, dict]]:
+        """
+        阻塞直到 version > since 或超时
+        Block until a snapshot newer than `since` is published or timeout
+
+        Returns:
+            (当前 version, 所有快照的浅拷贝)
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since or self._stop.is_set(), timeout)
+            return self.version, dict(self.snapshots)
+
+
+def test_prediction_scheduler():
+    """发布快照并唤醒订阅者 / Publish snapshots and wake a subscriber"""
+    counter = {'n': 0}
+
+    def compute(symbol):
+        counter['n'] += 1
+        return {'symbol': symbol, 'value': counter['n']}
+
+    scheduler = PredictionScheduler(compute, ['BTCUSDT', 'ETHUSDT'])
+    received = []
+
+    def subscriber():
+        version, snapshots = scheduler.wait_for_update(0, timeout=5)
+        received.append((version, snapshots))
+
+    thread = threading.Thread(target=subscriber)
+    thread.start()
+    time.sleep(0.05)
+    scheduler.refresh_all()
+    thread.join()
+
+    assert received and received[0][0] >= 1
+    assert scheduler.get('ETHUSDT')['value'] == 2 and scheduler.version == 2
+    version, _ = scheduler.wait_for_update(scheduler.version, timeout=0.05)
+    assert version == 2  # 超时返回当前版本
+    print(f"快照: {scheduler.snapshots}")
+    print("✅ 测试通过")
+
+
+if __name__ == "__main__":
+    test_prediction_scheduler()
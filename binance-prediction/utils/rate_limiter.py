@@ -0,0 +1,136 @@
+"""
+Binance 请求权重限流器
+Binance Request-Weight Rate Limiter
+
+多个下载线程共享同一个每分钟请求权重预算，并在收到 429/418 时全局退避
+Several download workers share one per-minute request-weight budget and back
+off globally when Binance answers 429/418
+
+作者: qinshihuang166
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from binance.exceptions import BinanceAPIException
+
+# Binance 现货接口默认每分钟 6000 权重，K线接口每次请求权重为 2
+# Binance spot allows 6000 weight per minute by default; a klines request costs 2
+DEFAULT_WEIGHT_PER_MINUTE = 6000
+KLINES_REQUEST_WEIGHT = 2
+
+# 429 = 超出限流，418 = IP 已被临时封禁
+# 429 = rate limit exceeded, 418 = IP temporarily banned
+RATE_LIMIT_STATUS_CODES = (429, 418)
+
+
+class WeightRateLimiter:
+    """
+    线程安全的请求权重限流器 / Thread-safe request-weight limiter
+
+    - 按 Binance 的自然分钟窗口统计已用权重
+      Tracks used weight per calendar-minute window, like Binance does
+    - 每次响应后用 X-MBX-USED-WEIGHT-1M 头同步服务器端的真实用量
+      Syncs with the server-side count from the X-MBX-USED-WEIGHT-1M header
+    - 收到 429/418 时暂停所有线程，直到 Retry-After 过去
+      Pauses every worker until Retry-After elapses on 429/418
+    """
+
+    def __init__(self, max_weight_per_minute: int = DEFAULT_WEIGHT_PER_MINUTE,
+                 safety_margin: float = 0.9):
+        self.budget = int(max_weight_per_minute * safety_margin)
+        self._lock = threading.Lock()
+        self._window_start = self._current_window(time.time())
+        self._used = 0
+        self._paused_until = 0.0
+
+    @staticmethod
+    def _current_window(now: float) -> float:
+        return now - (now % 60)
+
+    def reserve(self, weight: int) -> float:
+        """
+        尝试预占权重；成功返回 0，否则返回需要等待的秒数
+        Try to reserve weight; returns 0 on success, otherwise seconds to wait
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._paused_until:
+                return self._paused_until - now
+
+            window = self._current_window(now)
+            if window != self._window_start:
+                self._window_start = window
+                self._used = 0
+
+            if self._used + weight <= self.budget:
+                self._used += weight
+                return 0.0
+            return self._window_start + 60 - now
+
+    def acquire(self, weight: int = KLINES_REQUEST_WEIGHT):
+        """阻塞直到预占成功 / Block until the weight is reserved"""
+        while True:
+            wait = self.reserve(weight)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 1.0))
+
+    def update_from_headers(self, headers) -> None:
+        """用响应头里的已用权重校准本地计数 / Calibrate from response headers"""
+        if not headers:
+            return
+        used = headers.get('x-mbx-used-weight-1m') or headers.get('X-MBX-USED-WEIGHT-1M')
+        if used is None:
+            return
+        with self._lock:
+            if self._current_window(time.time()) == self._window_start:
+                self._used = max(self._used, int(used))
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """全局暂停 / Pause every worker"""
+        retry_after = float(retry_after) if retry_after else 60.0
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + retry_after)
+        logging.warning(f"触发 Binance 限流，全局暂停 {retry_after:.0f} 秒 / "
+                        f"Rate limited by Binance, pausing all workers for {retry_after:.0f}s")
+
+    @property
+    def used_weight(self) -> int:
+        with self._lock:
+            return self._used
+
+
+def call_with_limits(limiter: Optional[WeightRateLimiter], client, request: Callable,
+                     weight: int = KLINES_REQUEST_WEIGHT, max_retries: int = 5, **params):
+    """
+    在限流器保护下调用一次 Binance 接口
+    Call a Binance endpoint under the limiter
+
+    Args:
+        limiter: 共享限流器；为 None 时直接调用
+        client: binance.client.Client（用于读取最近一次响应的头信息）
+        request: 要调用的方法，例如 client.get_klines
+        weight: 本次请求的权重
+        max_retries: 遇到 429/418 时的最大重试次数
+        **params: 传给 request 的参数
+    """
+    if limiter is None:
+        return request(**params)
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(weight)
+        try:
+            result = request(**params)
+        except BinanceAPIException as e:
+            if e.status_code not in RATE_LIMIT_STATUS_CODES or attempt == max_retries:
+                raise
+            headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+            limiter.penalize(headers.get('Retry-After'))
+            continue
+
+        response = getattr(client, 'response', None)
+        limiter.update_from_headers(getattr(response, 'headers', None))
+        return result
@@ -0,0 +1,561 @@
+"""
+流式技术指标模块
+Streaming Technical Indicators Module
+
+每来一根新K线，以 O(1) 的代价增量更新所有技术指标，
+结果与 TechnicalIndicators / DataProcessor 的批量计算一致。
+Updates every indicator in constant time per new candle; results match the
+batch (pandas) implementations in TechnicalIndicators and DataProcessor.
+
+实现要点 / Building blocks:
+- 滚动和 / Running sums             → SMA, ATR, RSI, Stochastic 平滑
+- Welford 滑动方差 / sliding variance → 布林带, 波动率
+- 单调双端队列 / Monotonic deques    → 滚动最高价/最低价
+- EMA 状态 / EMA state               → EMA, MACD
+
+update() 提交一根已收盘的K线；peek() 计算一根未收盘K线的指标但不改变状态，
+所以正在形成的K线可以每个 tick 重新计算而不会污染历史。
+update() commits a closed candle; peek() evaluates an unclosed candle without
+changing any state, so the forming candle can be re-evaluated on every tick.
+
+作者: qinshihuang166
+"""
+
+import math
+import os
+import sys
+from collections import OrderedDict, deque
+from typing import Dict, Mapping, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.technical_indicators import INDICATOR_COLUMNS
+
+NAN = float('nan')
+INF = float('inf')
+
+
+def _is_finite(x: float) -> bool:
+    return not (math.isnan(x) or math.isinf(x))
+
+
+def _div(a: float, b: float) -> float:
+    """与 numpy 浮点除法一致的除法（除以0得到 ±inf 或 NaN，而不是抛异常）"""
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return NAN
+        return math.copysign(INF, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class RollingWindow:
+    """
+    定长滑动窗口的均值/标准差 / Fixed-size rolling mean and std
+
+    - 运行和 + Welford 方差，push 和 peek 都是 O(1)
+    - 与 pandas 一致：窗口未满或窗口内有 NaN/inf 时结果为 NaN，
+      窗口内所有值相同时均值精确等于该值、标准差为 0
+    - 每 window 次更新从缓冲区重新求和一次，消除浮点累积误差（均摊 O(1)）
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.m2 = 0.0
+        self.nonfinite = 0
+        self.same_run = 0
+        self._since_resync = 0
+
+    # ------------------------------------------------------------------
+
+    def _resync(self):
+        finite = [v for v in self.values if _is_finite(v)]
+        n = len(finite)
+        self.total = math.fsum(finite)
+        mean = self.total / n if n else 0.0
+        self.m2 = math.fsum((v - mean) ** 2 for v in finite)
+        self._since_resync = 0
+
+    def _next_state(self, x: float):
+        """计算加入 x 之后的 (total, m2, nonfinite, same_run, n)，不修改状态"""
+        n = len(self.values)
+        out = self.values[0] if n == self.window else None
+        last = self.values[-1] if n else None
+
+        same_run = self.same_run + 1 if last is not None and x == last else 1
+        nonfinite = self.nonfinite + (0 if _is_finite(x) else 1)
+        total, m2 = self.total, self.m2
+
+        if out is not None and not _is_finite(out):
+            nonfinite -= 1
+
+        # 窗口内有 NaN/inf 时结果本来就是 NaN，运行和只在 _resync 时重建
+        if _is_finite(x) and (out is None or _is_finite(out)):
+            if out is None:
+                # 窗口还没满：Welford 增加一个样本
+                n_finite = n - self.nonfinite + 1
+                old_mean = total / (n_finite - 1) if n_finite > 1 else 0.0
+                total += x
+                new_mean = total / n_finite
+                m2 += (x - old_mean) * (x - new_mean)
+            elif not self.nonfinite:
+                # 窗口已满：一进一出
+                old_mean = total / self.window
+                total += x - out
+                new_mean = total / self.window
+                m2 += (x - out) * (x - new_mean + out - old_mean)
+        n_after = n + 1 if out is None else n
+        return total, m2, nonfinite, same_run, n_after
+
+    def _result(self, total, m2, nonfinite, same_run, n, last):
+        if n < self.window or nonfinite:
+            return NAN, NAN
+        if same_run >= self.window:
+            return last, 0.0
+        mean = total / self.window
+        var = max(m2, 0.0) / (self.window - 1) if self.window > 1 else NAN
+        return mean, math.sqrt(var)
+
+    # ------------------------------------------------------------------
+
+    def push(self, x: float):
+        """加入一个值，返回 (均值, 标准差)"""
+        total, m2, nonfinite, same_run, n = self._next_state(x)
+        out = self.values[0] if len(self.values) == self.window else None
+        self.values.append(x)
+        if out is not None:
+            self.values.popleft()
+        self.total, self.m2, self.nonfinite, self.same_run = total, m2, nonfinite, same_run
+
+        self._since_resync += 1
+        entered_or_left_nonfinite = not _is_finite(x) or (out is not None and not _is_finite(out))
+        if entered_or_left_nonfinite or self._since_resync >= self.window:
+            self._resync()
+            total, m2 = self.total, self.m2
+        return self._result(total, m2, nonfinite, same_run, n, x)
+
+    def peek(self, x: float):
+        """假如加入 x，返回 (均值, 标准差)，不修改状态"""
+        out = self.values[0] if len(self.values) == self.window else None
+        if not _is_finite(x) or (out is not None and not _is_finite(out)):
+            # 罕见路径：直接按窗口重新计算
+            values = list(self.values)[1:] if out is not None else list(self.values)
+            values.append(x)
+            nonfinite = sum(1 for v in values if not _is_finite(v))
+            total = math.fsum(v for v in values if _is_finite(v))
+            mean = total / len(values) if values else 0.0
+            m2 = math.fsum((v - mean) ** 2 for v in values if _is_finite(v))
+            same_run = self.same_run + 1 if self.values and x == self.values[-1] else 1
+            return self._result(total, m2, nonfinite, same_run, len(values), x)
+        return self._result(*self._next_state(x), x)
+
+
+class RollingExtreme:
+    """
+    滚动最大值/最小值（单调双端队列）/ Rolling max or min with a monotonic deque
+
+    队列中保存 (序号, 值)，值单调，队首就是当前窗口的极值，每次更新均摊 O(1)。
+    """
+
+    def __init__(self, window: int, mode: str = 'max'):
+        if mode not in ('max', 'min'):
+            raise ValueError(f"mode 必须是 'max' 或 'min'，当前: {mode}")
+        self.window = window
+        self.is_max = mode == 'max'
+        self.queue = deque()
+        self.recent = deque(maxlen=window)  # 最近 window 个值是否为非有限值
+        self.nonfinite = 0
+        self.count = 0
+
+    def _beats(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def _extreme(self, x: float, index: int) -> float:
+        """加入 (index, x) 后窗口 [index-window+1, index] 的极值"""
+        best = x if _is_finite(x) else None
+        for i, v in self.queue:
+            if i > index - self.window:
+                if best is None or self._beats(v, best):
+                    best = v
+                # 队列单调：第一个仍在窗口内的元素就是其余元素的极值
+                break
+        return best
+
+    def _nonfinite_after(self, x: float) -> int:
+        nonfinite = self.nonfinite
+        if len(self.recent) == self.window and self.recent[0]:
+            nonfinite -= 1
+        return nonfinite + (0 if _is_finite(x) else 1)
+
+    def push(self, x: float) -> float:
+        index = self.count
+        value = self.peek(x)
+        self.count += 1
+        if len(self.recent) == self.window and self.recent[0]:
+            self.nonfinite -= 1
+        self.recent.append(not _is_finite(x))
+        self.nonfinite += self.recent[-1]
+        if _is_finite(x):
+            while self.queue and self._beats(x, self.queue[-1][1]):
+                self.queue.pop()
+            self.queue.append((index, x))
+        while self.queue and self.queue[0][0] <= index - self.window:
+            self.queue.popleft()
+        return value
+
+    def peek(self, x: float) -> float:
+        if self.count + 1 < self.window or self._nonfinite_after(x):
+            return NAN
+        return self._extreme(x, self.count)
+
+
+class EMA:
+    """pandas ewm(span, adjust=False) 的递推形式 / Recursive EMA"""
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def peek(self, x: float) -> float:
+        if self.value is None:
+            return x
+        return self.alpha * x + (1.0 - self.alpha) * self.value
+
+    def push(self, x: float) -> float:
+        self.value = self.peek(x)
+        return self.value
+
+
+class Lag:
+    """保存最近的值，用于 diff/shift/pct_change / Keeps recent values"""
+
+    def __init__(self, periods: int):
+        self.periods = periods
+        self.values = deque(maxlen=periods)
+
+    def get(self) -> float:
+        """periods 步之前的值（不足时为 NaN）"""
+        if len(self.values) < self.periods:
+            return NAN
+        return self.values[0]
+
+    def push(self, x: float):
+        self.values.append(x)
+
+
+class _RSI:
+    """RSI = 100 - 100 / (1 + 平均涨幅 / 平均跌幅)，第一根K线的涨跌记为 0"""
+
+    def __init__(self, period: int):
+        self.prev = Lag(1)
+        self.gain = RollingWindow(period)
+        self.loss = RollingWindow(period)
+
+    def _moves(self, close: float):
+        delta = close - self.prev.get()
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        return gain, loss
+
+    @staticmethod
+    def _value(avg_gain: float, avg_loss: float) -> float:
+        rs = _div(avg_gain, avg_loss)
+        return 100 - _div(100, 1 + rs)
+
+    def push(self, close: float) -> float:
+        gain, loss = self._moves(close)
+        self.prev.push(close)
+        return self._value(self.gain.push(gain)[0], self.loss.push(loss)[0])
+
+    def peek(self, close: float) -> float:
+        gain, loss = self._moves(close)
+        return self._value(self.gain.peek(gain)[0], self.loss.peek(loss)[0])
+
+
+class _StreamingEngine:
+    """流式指标引擎的公共部分：逐根提交、追赶到最新的K线"""
+
+    FEATURE_COLUMNS = []
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.last_timestamp = None
+        self.count = 0
+        self.latest: Optional[Dict[str, float]] = None
+        self._build()
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _step(self, o: float, h: float, l: float, c: float, v: float, commit: bool) -> Dict[str, float]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _ohlcv(candle: Mapping):
+        return (float(candle['open']), float(candle['high']), float(candle['low']),
+                float(candle['close']), float(candle['volume']))
+
+    def update(self, candle: Mapping) -> Dict[str, float]:
+        """
+        提交一根已收盘的K线，返回最新指标
+        Commit one closed candle and return the new indicator values
+
+        Args:
+            candle: 含 open, high, low, close, volume（可选 timestamp）的映射
+        """
+        values = self._step(*self._ohlcv(candle), commit=True)
+        self.count += 1
+        self.last_timestamp = candle.get('timestamp', self.last_timestamp)
+        self.latest = values
+        return values
+
+    def peek(self, candle: Mapping) -> Dict[str, float]:
+        """
+        计算一根未收盘K线的指标，不修改状态
+        Evaluate an unclosed candle without changing state
+        """
+        return self._step(*self._ohlcv(candle), commit=False)
+
+    def warm_up(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        用历史数据预热，返回每一行的指标（与批量计算的结果逐行对应）
+        Feed historical candles; returns per-row indicators aligned with df
+        """
+        rows = [self.update(candle) for candle in df.to_dict('records')]
+        return pd.DataFrame(rows, columns=self.FEATURE_COLUMNS, index=df.index)
+
+    def catch_up(self, df: pd.DataFrame, last_closed: bool = False) -> Dict[str, float]:
+        """
+        追赶到 df 的最新K线
+        Catch up with the newest candles in df
+
+        只提交上次之后新收盘的K线；如果 df 与已处理的历史接不上（例如服务中断过），
+        重置状态后用 df 重新预热。
+        Only candles newer than the last committed one are fed; if df no longer
+        overlaps the committed history, the engine is reset and re-warmed.
+
+        Args:
+            df: 按时间排序、含 timestamp 列的K线
+            last_closed: 最后一行是否已收盘（Binance 返回的最后一根通常还在形成中）
+
+        Returns:
+            最后一行的指标
+        """
+        closed = df if last_closed else df.iloc[:-1]
+        timestamps = closed['timestamp']
+
+        if self.last_timestamp is not None and len(timestamps) and \
+                not (timestamps == self.last_timestamp).any():
+            self.reset()
+
+        if self.last_timestamp is None:
+            new_rows = closed
+        else:
+            new_rows = closed[timestamps > self.last_timestamp]
+
+        for candle in new_rows.to_dict('records'):
+            self.update(candle)
+
+        if last_closed or df.empty:
+            return self.latest
+        return self.peek(df.iloc[-1])
+
+
+class StreamingIndicators(_StreamingEngine):
+    """
+    TechnicalIndicators.add_all_indicators 的流式版本
+    Streaming counterpart of TechnicalIndicators.add_all_indicators
+
+    使用示例:
+        engine = StreamingIndicators()
+        engine.warm_up(history_df)            # 预热一次 O(n)
+        features = engine.update(new_candle)  # 之后每根K线 O(1)
+    """
+
+    FEATURE_COLUMNS = INDICATOR_COLUMNS
+
+    def _build(self):
+        self.rsi = _RSI(14)
+        self.ema_fast = EMA(12)
+        self.ema_slow = EMA(26)
+        self.macd_signal = EMA(9)
+        self.bollinger = RollingWindow(20)
+        self.ema_50 = EMA(50)
+        self.sma_50 = RollingWindow(50)
+        self.atr = RollingWindow(14)
+        self.obv = 0.0
+        self.stoch_low = RollingExtreme(14, 'min')
+        self.stoch_high = RollingExtreme(14, 'max')
+        self.stoch_k = RollingWindow(3)
+        self.stoch_d = RollingWindow(3)
+        self.will_low = self.stoch_low
+        self.will_high = self.stoch_high
+        self.close_lag = Lag(12)
+        self.prev_close = Lag(1)
+        self.prev_volume = Lag(1)
+
+    def _step(self, o, h, l, c, v, commit):
+        def apply(block, x):
+            return block.push(x) if commit else block.peek(x)
+
+        out = OrderedDict()
+        prev_close = self.prev_close.get()
+        prev_volume = self.prev_volume.get()
+
+        # 1. RSI
+        out['RSI'] = apply(self.rsi, c)
+
+        # 2. MACD
+        ema_12 = apply(self.ema_fast, c)
+        ema_26 = apply(self.ema_slow, c)
+        macd = ema_12 - ema_26
+        signal = apply(self.macd_signal, macd)
+        out['MACD'] = macd
+        out['MACD_signal'] = signal
+        out['MACD_hist'] = macd - signal
+
+        # 3. Bollinger Bands（SMA_20 就是中轨）
+        middle, std = apply(self.bollinger, c)
+        out['BB_upper'] = middle + std * 2.0
+        out['BB_middle'] = middle
+        out['BB_lower'] = middle - std * 2.0
+        out['BB_width'] = out['BB_upper'] - out['BB_lower']
+
+        # 4. EMA / 5. SMA
+        out['EMA_12'] = ema_12
+        out['EMA_26'] = ema_26
+        out['EMA_50'] = apply(self.ema_50, c)
+        out['SMA_20'] = middle
+        out['SMA_50'] = apply(self.sma_50, c)[0]
+
+        # 6. ATR（第一根K线没有前收盘价，真实范围就是 high - low）
+        true_range = h - l
+        if not math.isnan(prev_close):
+            true_range = max(true_range, abs(h - prev_close), abs(l - prev_close))
+        out['ATR'] = apply(self.atr, true_range)[0]
+
+        # 7. OBV
+        obv = self.obv
+        if c > prev_close:
+            obv += v
+        elif c < prev_close:
+            obv -= v
+        out['OBV'] = obv
+
+        # 8. Stochastic / 11. Williams %R（共用同一组滚动最高/最低价）
+        lowest_low = apply(self.stoch_low, l)
+        highest_high = apply(self.stoch_high, h)
+        k = 100 * _div(c - lowest_low, highest_high - lowest_low)
+        k_smooth = apply(self.stoch_k, k)[0]
+        out['Stoch_K'] = k_smooth
+        out['Stoch_D'] = apply(self.stoch_d, k_smooth)[0]
+
+        # 9. Momentum / 10. ROC
+        close_10 = self.close_lag.values[-10] if len(self.close_lag.values) >= 10 else NAN
+        close_12 = self.close_lag.get()
+        out['Momentum'] = c - close_10
+        out['ROC'] = _div(c - close_12, close_12) * 100
+        out['Williams_R'] = -100 * _div(highest_high - c, highest_high - lowest_low)
+
+        # 12. 额外的价格特征
+        out['close_open_ratio'] = _div(c, o)
+        out['high_low_ratio'] = _div(h, l)
+        out['price_change'] = _div(c, prev_close) - 1
+        out['volume_change'] = _div(v, prev_volume) - 1
+
+        if commit:
+            self.obv = obv
+            self.close_lag.push(c)
+            self.prev_close.push(c)
+            self.prev_volume.push(v)
+        return out
+
+
+class StreamingBasicIndicators(_StreamingEngine):
+    """
+    DataProcessor.add_technical_indicators 的流式版本（Web API 的随机森林模型使用）
+    Streaming counterpart of DataProcessor.add_technical_indicators
+    """
+
+    FEATURE_COLUMNS = ['sma_7', 'sma_25', 'rsi_14', 'roc', 'volatility']
+
+    def _build(self):
+        self.window_7 = RollingWindow(7)
+        self.sma_25 = RollingWindow(25)
+        self.rsi = _RSI(14)
+        self.close_lag = Lag(5)
+
+    def _step(self, o, h, l, c, v, commit):
+        def apply(block, x):
+            return block.push(x) if commit else block.peek(x)
+
+        sma_7, volatility = apply(self.window_7, c)
+        close_5 = self.close_lag.get()
+        out = OrderedDict()
+        out['sma_7'] = sma_7
+        out['sma_25'] = apply(self.sma_25, c)[0]
+        out['rsi_14'] = apply(self.rsi, c)
+        out['roc'] = _div(c, close_5) - 1
+        out['volatility'] = volatility
+
+        if commit:
+            self.close_lag.push(c)
+        return out
+
+
+def test_streaming_indicators():
+    """与批量计算结果对比 / Compare against the batch implementations"""
+    import time
+
+    import numpy as np
+
+    from utils.data_processor import DataProcessor
+    from utils.technical_indicators import TechnicalIndicators
+
+    np.random.seed(42)
+    n = 2000
+    close = 100 + np.random.randn(n).cumsum()
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2023-01-01', periods=n, freq='h'),
+        'open': close + np.random.randn(n) * 0.5,
+        'high': close + np.abs(np.random.randn(n)),
+        'low': close - np.abs(np.random.randn(n)),
+        'close': close,
+        'volume': np.random.randint(1000, 10000, n).astype(float),
+    })
+
+    engines = [
+        (StreamingIndicators(), TechnicalIndicators.add_all_indicators(df)),
+        (StreamingBasicIndicators(), DataProcessor.add_technical_indicators(df)),
+    ]
+    for engine, batch in engines:
+        name = type(engine).__name__
+        # DataProcessor 会删除含 NaN 的行，只比较保留下来的行
+        streamed = engine.warm_up(df).loc[batch.index]
+        expected = batch[engine.FEATURE_COLUMNS]
+        np.testing.assert_allclose(streamed.values, expected.values.astype(float),
+                                   rtol=1e-7, atol=1e-7, equal_nan=True)
+        print(f"✓ {name}: {len(expected)} 行与批量计算一致")
+
+    # peek 不修改状态
+    engine = StreamingIndicators()
+    engine.warm_up(df.iloc[:-1])
+    before = engine.peek(df.iloc[-1])
+    assert before == engine.peek(df.iloc[-1])
+    np.testing.assert_allclose(list(before.values()), list(engine.update(df.iloc[-1]).values()))
+
+    candles = df.to_dict('records')
+    start = time.perf_counter()
+    for candle in candles:
+        engine.update(candle)
+    per_tick = (time.perf_counter() - start) / len(candles) * 1e6
+    print(f"✓ 每根K线更新耗时: {per_tick:.1f} µs")
+
+
+if __name__ == "__main__":
+    test_streaming_indicators()
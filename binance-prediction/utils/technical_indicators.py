@@ -10,7 +10,22 @@ Calculate various technical analysis indicators for feature engineering
 
 import pandas as pd
 import numpy as np
-from typing import Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import lfilter
+from typing import Dict, Optional, Tuple
+
+# add_all_indicators 添加的指标列（顺序固定）
+INDICATOR_COLUMNS = [
+    'RSI', 'MACD', 'MACD_signal', 'MACD_hist',
+    'BB_upper', 'BB_middle', 'BB_lower', 'BB_width',
+    'EMA_12', 'EMA_26', 'EMA_50', 'SMA_20', 'SMA_50',
+    'ATR', 'OBV', 'Stoch_K', 'Stoch_D', 'Momentum', 'ROC', 'Williams_R',
+    'close_open_ratio', 'high_low_ratio', 'price_change', 'volume_change',
+]
+
+# 滚动标准差每次计算的窗口数（限制临时数组大小）
+_STD_BLOCK = 4096
 
 
 class TechnicalIndicators:
@@ -292,7 +307,8 @@ class TechnicalIndicators:
         return williams_r
     
     @classmethod
-    def add_all_indicators(cls, df: pd.DataFrame) -> pd.DataFrame:
+    def add_all_indicators(cls, df: pd.DataFrame, engine: str = 'numpy',
+                           verbose: bool = True) -> pd.DataFrame:
         """
         为数据框添加所有技术指标
         
@@ -301,6 +317,48 @@ class TechnicalIndicators:
         Args:
             df: 包含OHLCV数据的DataFrame
                必需列: open, high, low, close, volume
+            engine: 'numpy'（默认，融合的向量化内核）或 'pandas'（逐个指标计算）
+            verbose: 是否打印进度
+               
+        Returns:
+            添加了技术指标的DataFrame
+        """
+        if engine == 'pandas':
+            return cls._add_all_indicators_pandas(df)
+        if engine != 'numpy':
+            raise ValueError(f"未知的计算引擎: {engine}，可选 'numpy' 或 'pandas'")
+        
+        ohlcv = [np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+                 for col in ['open', 'high', 'low', 'close', 'volume']]
+        
+        # 内核假设数据已清洗；有 NaN/inf 时回退到 pandas 实现以保持相同语义
+        if not all(np.isfinite(arr).all() for arr in ohlcv):
+            if verbose:
+                print("  ⚠️ OHLCV 中存在 NaN/inf，使用 pandas 实现计算指标")
+            return cls._add_all_indicators_pandas(df)
+        
+        if verbose:
+            print("📊 正在计算技术指标 (NumPy)...")
+        
+        values = compute_indicator_matrix(*ohlcv)
+        indicators = pd.DataFrame(values, index=df.index, columns=INDICATOR_COLUMNS, copy=False)
+        
+        # 一次性写回：已存在的同名列先删除
+        base = df.drop(columns=[c for c in INDICATOR_COLUMNS if c in df.columns])
+        out = pd.concat([base, indicators], axis=1)
+        
+        if verbose:
+            print(f"✅ 技术指标计算完成! 共添加 {len(INDICATOR_COLUMNS)} 个特征")
+        
+        return out
+    
+    @classmethod
+    def _add_all_indicators_pandas(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        逐个指标调用 pandas 实现（参考实现，用于对照和基准测试）
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
                
         Returns:
             添加了技术指标的DataFrame
@@ -377,6 +435,200 @@ class TechnicalIndicators:
         return df
 
 
+# ============================================
+# NumPy 批量内核 / Vectorized NumPy kernel
+# ============================================
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    滚动均值（前缀和相减，O(n)）
+    
+    与 pandas rolling(window).mean() 一致：前 window-1 个为 NaN，
+    窗口内有 NaN/inf 时为 NaN。
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+    
+    bad = ~np.isfinite(x)
+    has_bad = bad.any()
+    clean = np.where(bad, 0.0, x) if has_bad else x
+    
+    csum = np.cumsum(clean)
+    sums = csum[window - 1:].copy()
+    sums[1:] -= csum[:-window]
+    np.divide(sums, window, out=out[window - 1:])
+    
+    if has_bad:
+        cbad = np.cumsum(bad)
+        counts = cbad[window - 1:].copy()
+        counts[1:] -= cbad[:-window]
+        out[window - 1:][counts > 0] = np.nan
+    return out
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    滚动样本标准差 (ddof=1)
+    
+    每个窗口先减去自己的第一个值再求和（方差与平移无关），不用整列的前缀和相减：
+    偏差只有窗口内的波动幅度，没有抵消误差，价格长时间不变时结果精确为 0，
+    与 pandas 一致。按 _STD_BLOCK 个窗口分块计算，内存占用有上限。输入需为有限值。
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    n_windows = n - window + 1
+    if n_windows <= 0 or window < 2:
+        return out
+    
+    windows = sliding_window_view(x, window)
+    for begin in range(0, n_windows, _STD_BLOCK):
+        block = windows[begin:begin + _STD_BLOCK]
+        dev = block - block[:, :1]
+        s1 = dev.sum(axis=1)
+        var = (np.einsum('ij,ij->i', dev, dev) - s1 * s1 / window) / (window - 1)
+        np.maximum(var, 0.0, out=var)
+        np.sqrt(var, out=out[window - 1 + begin:window - 1 + begin + len(block)])
+    return out
+
+
+def _rolling_extreme(x: np.ndarray, window: int, mode: str) -> np.ndarray:
+    """滚动最大/最小值（scipy 的 O(n) 滤波器，调整 origin 使窗口只包含当前及之前的值）"""
+    out = np.full(len(x), np.nan)
+    if len(x) < window:
+        return out
+    func = maximum_filter1d if mode == 'max' else minimum_filter1d
+    out[window - 1:] = func(x, window, origin=(window - 1) // 2)[window - 1:]
+    return out
+
+
+def _ema(x: np.ndarray, span: int, prev: Optional[float] = None) -> np.ndarray:
+    """
+    EMA，与 ewm(span, adjust=False).mean() 一致：y[0] = x[0], y[t] = a·x[t] + (1-a)·y[t-1]
+    
+    Args:
+        prev: 上一个块最后的 EMA 值（分块计算时传入，用于接续递推）
+    """
+    alpha = 2.0 / (span + 1.0)
+    if len(x) == 0:
+        return x.astype(np.float64)
+    initial = x[0] if prev is None else prev
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * initial])
+    return y
+
+
+def _shift(x: np.ndarray, periods: int) -> np.ndarray:
+    """与 Series.shift(periods) 一致（前面补 NaN）"""
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+
+# 分块计算：每块的行数，以及需要向前多取的行数（最长的窗口 SMA_50 需要 49 行）
+_BLOCK_ROWS = 1 << 16
+_LOOKBACK = 49
+
+
+def compute_indicator_matrix(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                             close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    用少量融合的向量化计算一次得到全部技术指标
+    Compute every indicator in a few fused vectorized passes
+    
+    按 _BLOCK_ROWS 行分块计算（每块向前多取 _LOOKBACK 行作为滚动窗口的历史，
+    EMA 和 OBV 的状态在块之间接续），临时数组始终留在缓存里，
+    结果写入预分配的列优先矩阵，列顺序为 INDICATOR_COLUMNS。
+    数值与逐个调用 pandas 实现的结果一致（浮点误差范围内）。
+    
+    Args:
+        open_, high, low, close, volume: float64 一维数组（已清洗，无 NaN）
+        
+    Returns:
+        (行数, len(INDICATOR_COLUMNS)) 的 float64 数组
+    """
+    n = len(close)
+    out = np.empty((n, len(INDICATOR_COLUMNS)), dtype=np.float64, order='F')
+    col: Dict[str, np.ndarray] = {name: out[:, i] for i, name in enumerate(INDICATOR_COLUMNS)}
+    
+    # 块之间需要接续的递推状态
+    state = {'EMA_12': None, 'EMA_26': None, 'EMA_50': None, 'MACD_signal': None, 'OBV': 0.0}
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for begin in range(0, n, _BLOCK_ROWS):
+            end = min(begin + _BLOCK_ROWS, n)
+            halo = min(begin, _LOOKBACK)
+            seg = slice(begin - halo, end)
+            rows = slice(begin, end)
+            
+            o, h, l, c, v = open_[rows], high[seg], low[seg], close[seg], volume[seg]
+            
+            prev_close = _shift(c, 1)
+            delta = c - prev_close
+            if halo == begin:
+                delta[0] = 0.0  # 第一根K线的涨跌按 0 计
+            
+            # 1. RSI
+            avg_gain = _rolling_mean(np.maximum(delta, 0.0), 14)[halo:]
+            avg_loss = _rolling_mean(np.maximum(-delta, 0.0), 14)[halo:]
+            col['RSI'][rows] = 100 - 100 / (1 + avg_gain / avg_loss)
+            
+            # 2. MACD / 4. EMA（只对本块递推，状态来自上一块）
+            c_rows = c[halo:]
+            for name, span in (('EMA_12', 12), ('EMA_26', 26), ('EMA_50', 50)):
+                col[name][rows] = _ema(c_rows, span, state[name])
+                state[name] = col[name][end - 1]
+            np.subtract(col['EMA_12'][rows], col['EMA_26'][rows], out=col['MACD'][rows])
+            col['MACD_signal'][rows] = _ema(col['MACD'][rows], 9, state['MACD_signal'])
+            state['MACD_signal'] = col['MACD_signal'][end - 1]
+            np.subtract(col['MACD'][rows], col['MACD_signal'][rows], out=col['MACD_hist'][rows])
+            
+            # 3. Bollinger Bands / 5. SMA
+            sma_20 = _rolling_mean(c, 20)[halo:]
+            std_20 = _rolling_std(c, 20)[halo:]
+            col['SMA_20'][rows] = sma_20
+            col['SMA_50'][rows] = _rolling_mean(c, 50)[halo:]
+            col['BB_middle'][rows] = sma_20
+            col['BB_upper'][rows] = sma_20 + std_20 * 2.0
+            col['BB_lower'][rows] = sma_20 - std_20 * 2.0
+            np.subtract(col['BB_upper'][rows], col['BB_lower'][rows], out=col['BB_width'][rows])
+            
+            # 6. ATR（真实范围三项取最大，不需要拼接）
+            true_range = h - l
+            np.maximum(true_range[1:], np.abs(h[1:] - c[:-1]), out=true_range[1:])
+            np.maximum(true_range[1:], np.abs(l[1:] - c[:-1]), out=true_range[1:])
+            col['ATR'][rows] = _rolling_mean(true_range, 14)[halo:]
+            
+            # 7. OBV
+            obv = col['OBV'][rows]
+            np.cumsum(np.sign(delta[halo:]) * v[halo:], out=obv)
+            obv += state['OBV']
+            state['OBV'] = obv[-1]
+            
+            # 8. Stochastic / 11. Williams %R（共用滚动最高/最低价）
+            lowest_low = _rolling_extreme(l, 14, 'min')
+            highest_high = _rolling_extreme(h, 14, 'max')
+            price_range = highest_high - lowest_low
+            k_smooth = _rolling_mean(100 * ((c - lowest_low) / price_range), 3)
+            col['Stoch_K'][rows] = k_smooth[halo:]
+            col['Stoch_D'][rows] = _rolling_mean(k_smooth, 3)[halo:]
+            col['Williams_R'][rows] = (-100 * ((highest_high - c) / price_range))[halo:]
+            
+            # 9. Momentum / 10. ROC
+            col['Momentum'][rows] = (c - _shift(c, 10))[halo:]
+            close_12 = _shift(c, 12)
+            col['ROC'][rows] = (((c - close_12) / close_12) * 100)[halo:]
+            
+            # 12. 额外的价格特征
+            np.divide(close[rows], o, out=col['close_open_ratio'][rows])
+            np.divide(high[rows], low[rows], out=col['high_low_ratio'][rows])
+            col['price_change'][rows] = (c / prev_close - 1)[halo:]
+            col['volume_change'][rows] = (v / _shift(v, 1) - 1)[halo:]
+    
+    return out
+
+
 def test_indicators():
     """测试技术指标计算"""
     # 创建示例数据